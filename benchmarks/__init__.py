@@ -0,0 +1,5 @@
+"""
+パフォーマンスベンチマーク
+
+python -m benchmarks.run で実行する。詳細は benchmarks/run.py を参照。
+"""
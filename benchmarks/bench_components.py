@@ -0,0 +1,121 @@
+"""
+コンポーネント単体のベンチマーク
+
+メッセージブローカーの投函・取得、LLM応答のパース、プロンプト構築を
+LLMを呼び出さずに計測する。
+"""
+
+import json
+import os
+import tempfile
+from typing import Any, Dict
+
+from benchmarks.harness import measure
+from main.entities.models import Message
+from main.frameworks_and_drivers.frameworks.file_repository import (
+    FileBasedPromptRepository
+)
+from main.frameworks_and_drivers.frameworks.gemini_service import GeminiService
+from main.frameworks_and_drivers.frameworks.message_broker import (
+    SqliteMessageBroker
+)
+from main.frameworks_and_drivers.frameworks.prompt_injector_service import (
+    PromptInjectorService
+)
+
+
+def _message(recipient_id: str, turn_id: int) -> Message:
+    return Message(
+        sender_id="MODERATOR",
+        recipient_id=recipient_id,
+        message_type="REQUEST_STATEMENT",
+        payload={"topic": "AIエージェントの自律的協調", "turn": turn_id},
+        turn_id=turn_id
+    )
+
+
+def bench_broker(iterations: int = 2000,
+                 batch_size: int = 50) -> Dict[str, Any]:
+    """SqliteMessageBrokerの投函・取得のスループットと遅延"""
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "messages.db")
+        with SqliteMessageBroker(db_path) as broker:
+            broker.initialize_db()
+
+            counter = iter(range(10 ** 9))
+            results["post_message"] = measure(
+                lambda: broker.post_message(
+                    _message("DEBATER_A", next(counter))),
+                iterations, warmup=50)
+
+            results["get_message"] = measure(
+                lambda: broker.get_message("DEBATER_A"),
+                iterations, warmup=0)
+
+            batch = [_message(f"AGENT_{i % 7}", i) for i in range(batch_size)]
+            batch_result = measure(
+                lambda: broker.post_messages(batch),
+                max(iterations // batch_size, 1), warmup=1)
+            batch_result["messages_per_sec"] = (
+                batch_result["ops_per_sec"] * batch_size)
+            results["post_messages_batch"] = batch_result
+
+            # 他の宛先のメッセージが大量に溜まっていても取得が遅くならないこと
+            results["get_message_backlog"] = measure(
+                lambda: broker.get_message("AGENT_0"),
+                min(iterations, 200), warmup=0)
+    return results
+
+
+# Gemini CLIの典型的な出力（前置きの文章とコードブロックを含む）
+_CLI_OUTPUTS = {
+    "plain_json": json.dumps({
+        "recipient_id": "DEBATER_A", "sender_id": "MODERATOR",
+        "message_type": "REQUEST_STATEMENT",
+        "payload": {"topic": "AI", "instructions": "x" * 400},
+        "turn_id": 2,
+    }),
+    "fenced_with_prose": (
+        "I will now ask Debater A for an opening statement.\n```json\n"
+        + json.dumps({
+            "recipient_id": "DEBATER_A", "sender_id": "MODERATOR",
+            "message_type": "REQUEST_STATEMENT",
+            "payload": {"topic": "AI", "instructions": "y" * 2000},
+            "turn_id": 2,
+        }, indent=2)
+        + "\n```\nLet me know if anything else is needed."
+    ),
+}
+
+
+def bench_parse(iterations: int = 5000) -> Dict[str, Any]:
+    """GeminiService._parse_responseの遅延"""
+    service = GeminiService()
+    return {
+        name: measure(lambda text=text: service._parse_response(text),
+                      iterations, warmup=100)
+        for name, text in _CLI_OUTPUTS.items()
+    }
+
+
+def bench_prompt(iterations: int = 5000,
+                 config_dir: str = "./config") -> Dict[str, Any]:
+    """PromptInjectorService.build_promptの遅延（実際のペルソナを使用）"""
+    injector = PromptInjectorService(FileBasedPromptRepository(config_dir))
+    context = Message(
+        sender_id="MODERATOR",
+        recipient_id="DEBATER_A",
+        message_type="REQUEST_REBUTTAL",
+        payload={"topic": "AI", "opponent_statement": "z" * 1500},
+        turn_id=5
+    )
+    history = [_message("DEBATER_A", turn) for turn in range(20)]
+    return {
+        "build_prompt": measure(
+            lambda: injector.build_prompt("DEBATER_A", context),
+            iterations, warmup=100),
+        "build_prompt_with_history": measure(
+            lambda: injector.build_prompt("DEBATER_A", context, history),
+            iterations, warmup=100),
+    }
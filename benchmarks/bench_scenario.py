@@ -0,0 +1,165 @@
+"""
+エンドツーエンドのシナリオベンチマーク
+
+Supervisor.run_scenarioで実際にエージェントプロセスを起動し、LLMには
+SimulatedLLMService（llm.provider: simulated）を使ってディベートを実行する。
+別の接続でメッセージテーブルを監視し、各メッセージが書き込まれた時刻から
+ターン遅延とスループットを求める。
+"""
+
+import contextlib
+import io
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+import yaml
+
+from benchmarks.harness import percentiles, rss_bytes
+from main.frameworks_and_drivers.drivers.supervisor import Supervisor
+
+
+class _MessageObserver(threading.Thread):
+    """メッセージテーブルへの書き込みとエージェントのRSSを記録するスレッド"""
+
+    POLL_INTERVAL_SEC = 0.001
+    RSS_INTERVAL_SEC = 0.05
+
+    def __init__(self, db_path: str, supervisor: Supervisor):
+        super().__init__(daemon=True)
+        self.db_path = db_path
+        self.supervisor = supervisor
+        self.observed: List[Tuple[float, str]] = []
+        self.peak_rss_bytes = 0
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        conn = sqlite3.connect(self.db_path)
+        last_id = 0
+        next_rss = 0.0
+        try:
+            while not self._stop_event.is_set():
+                now = time.perf_counter()
+                for row_id, sender_id in conn.execute(
+                        "SELECT id, sender_id FROM messages WHERE id > ? "
+                        "ORDER BY id", (last_id,)):
+                    self.observed.append((now, sender_id))
+                    last_id = row_id
+                if now >= next_rss:
+                    self.peak_rss_bytes = max(
+                        self.peak_rss_bytes, sum(
+                            rss_bytes(proc.pid)
+                            for proc in list(self.supervisor.agent_processes)
+                        ))
+                    next_rss = now + self.RSS_INTERVAL_SEC
+                time.sleep(self.POLL_INTERVAL_SEC)
+        finally:
+            conn.close()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+def _write_project(base_project: str, temp_dir: str, runtime_mode: str,
+                   llm_latency_ms: float) -> Tuple[str, str]:
+    """シミュレーションLLMを使うよう書き換えたプロジェクト定義を作成する"""
+    with open(base_project, "r", encoding="utf-8") as f:
+        project = yaml.safe_load(f)
+
+    db_path = os.path.join(temp_dir, "messages.db")
+    project.setdefault("message_bus", {})["db_path"] = db_path
+    llm = project.setdefault("llm", {})
+    llm["provider"] = "simulated"
+    simulated = llm.setdefault("simulated", {})
+    simulated["script_file"] = os.path.abspath(simulated.get(
+        "script_file", "config/scenario_test/simulated_llm.yml"))
+    simulated["latency"] = {"distribution": "constant",
+                            "value_ms": llm_latency_ms}
+    simulated["error_rate"] = 0.0
+    project.setdefault("runtime", {})["mode"] = runtime_mode
+
+    project_file = os.path.join(temp_dir, "project.yml")
+    with open(project_file, "w", encoding="utf-8") as f:
+        yaml.safe_dump(project, f, allow_unicode=True)
+    return project_file, db_path
+
+
+def _run_once(base_project: str, runtime_mode: str, llm_latency_ms: float,
+              timeout_sec: int) -> Dict[str, Any]:
+    """シナリオを1回実行し、観測結果を返す"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        project_file, db_path = _write_project(
+            base_project, temp_dir, runtime_mode, llm_latency_ms)
+        supervisor = Supervisor(project_file)
+        with contextlib.redirect_stdout(io.StringIO()):
+            supervisor.initialize_message_bus()
+
+        observer = _MessageObserver(db_path, supervisor)
+        observer.start()
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            success = supervisor.run_scenario(timeout_sec=timeout_sec)
+        duration = time.perf_counter() - started
+        observer.stop()
+        supervisor.message_bus.close()
+
+    times = [observed_at for observed_at, _ in observer.observed]
+    agent_times = [observed_at for observed_at, sender in observer.observed
+                   if sender != "SYSTEM"]
+    return {
+        "success": success,
+        "duration_sec": duration,
+        "time_to_first_response_sec": (
+            agent_times[0] - started if agent_times else None),
+        "turn_latencies": [b - a for a, b in zip(times, times[1:])],
+        "messages": len(times),
+        "active_sec": times[-1] - times[0] if len(times) > 1 else 0.0,
+        "peak_agent_rss_bytes": observer.peak_rss_bytes,
+    }
+
+
+def bench_scenario(base_project: str = "project.yml", runs: int = 3,
+                   runtime_mode: str = "process",
+                   llm_latency_ms: float = 0.0,
+                   timeout_sec: int = 60) -> Dict[str, Any]:
+    """
+    シナリオをruns回実行し、ターン遅延・スループット・メモリ・起動時間を集計する
+
+    Args:
+        base_project: 元にするプロジェクト定義ファイル
+        runs: 実行回数
+        runtime_mode: runtime.mode（"process"または"async"）
+        llm_latency_ms: シミュレーションLLMの応答遅延（ミリ秒）
+        timeout_sec: 1回のシナリオのタイムアウト（秒）
+    """
+    outcomes = [_run_once(base_project, runtime_mode, llm_latency_ms,
+                          timeout_sec) for _ in range(runs)]
+
+    turn_latencies = [latency for outcome in outcomes
+                      for latency in outcome["turn_latencies"]]
+    messages = sum(outcome["messages"] for outcome in outcomes)
+    active_sec = sum(outcome["active_sec"] for outcome in outcomes)
+    first_responses = [outcome["time_to_first_response_sec"]
+                       for outcome in outcomes
+                       if outcome["time_to_first_response_sec"] is not None]
+
+    return {
+        "run_scenario": {
+            "runs": runs,
+            "successes": sum(1 for o in outcomes if o["success"]),
+            **percentiles(turn_latencies),
+            "messages_per_sec": messages / active_sec if active_sec else 0.0,
+            "scenario_sec": statistics.median(
+                outcome["duration_sec"] for outcome in outcomes),
+            "time_to_first_response_sec": (
+                statistics.median(first_responses) if first_responses
+                else 0.0),
+            "peak_agent_rss_bytes": max(
+                outcome["peak_agent_rss_bytes"] for outcome in outcomes),
+        }
+    }
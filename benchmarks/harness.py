@@ -0,0 +1,151 @@
+"""
+ベンチマークの計測・保存・比較の共通処理
+
+各ベンチマークは「指標名 → 値」の辞書を返す。指標名の接尾辞で
+良し悪しの方向を判断する:
+    - *_per_sec: 大きいほど良い
+    - *_ms, *_sec, *_bytes: 小さいほど良い
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+def percentiles(samples_sec: List[float]) -> Dict[str, float]:
+    """秒単位のサンプルからp50/p95/p99（ミリ秒）を求める"""
+    if not samples_sec:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    if len(samples_sec) == 1:
+        value = samples_sec[0] * 1000.0
+        return {"p50_ms": value, "p95_ms": value, "p99_ms": value}
+    cuts = statistics.quantiles(samples_sec, n=100, method="inclusive")
+    return {
+        "p50_ms": statistics.median(samples_sec) * 1000.0,
+        "p95_ms": cuts[94] * 1000.0,
+        "p99_ms": cuts[98] * 1000.0,
+    }
+
+
+def measure(operation: Callable[[], Any], iterations: int,
+            warmup: int = 0) -> Dict[str, float]:
+    """
+    operationを繰り返し実行し、1回あたりの遅延分布とスループットを返す
+    """
+    for _ in range(warmup):
+        operation()
+
+    samples = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        op_start = time.perf_counter()
+        operation()
+        samples.append(time.perf_counter() - op_start)
+    elapsed = time.perf_counter() - started
+
+    return {
+        **percentiles(samples),
+        "ops_per_sec": iterations / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def rss_bytes(pid: Optional[int] = None) -> int:
+    """プロセスの常駐メモリ（RSS）を返す。取得できない場合は0"""
+    status_file = f"/proc/{pid or 'self'}/status"
+    try:
+        with open(status_file, "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def python_startup_sec(module: str, repeat: int = 3) -> float:
+    """指定したモジュールをimportするだけのPythonプロセスの起動時間（中央値）"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", f"import {module}"],
+                       check=True)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def environment_info() -> Dict[str, str]:
+    """ベースラインを比較する際の参考となる実行環境の情報"""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def save_results(results: Dict[str, Any], path: str) -> None:
+    """計測結果をJSONで保存する"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    """保存済みの計測結果を読み込む"""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any],
+            tolerance: float = 0.2) -> List[str]:
+    """
+    ベースラインと比較し、tolerance以上悪化した指標を列挙する
+
+    Args:
+        current: 今回の計測結果（run_benchmarksの"benchmarks"部分）
+        baseline: ベースラインの計測結果
+        tolerance: 許容する悪化の割合（0.2は20%）
+
+    Returns:
+        "ベンチマーク.操作.指標: 基準値 -> 今回値" 形式の回帰の一覧
+    """
+    regressions = []
+    for path, value in _flatten(current):
+        base = _lookup(baseline, path)
+        if not isinstance(base, (int, float)) or base <= 0:
+            continue
+        metric = path[-1]
+        if metric.endswith("_per_sec"):
+            worse = value < base * (1 - tolerance)
+        elif metric.endswith(("_ms", "_sec", "_bytes")):
+            worse = value > base * (1 + tolerance)
+        else:
+            continue
+        if worse:
+            regressions.append(
+                f"{'.'.join(path)}: {base:.3f} -> {value:.3f}")
+    return regressions
+
+
+def _flatten(data: Dict[str, Any], prefix: tuple = ()):
+    """入れ子の辞書から (キーのパス, 数値) を列挙する"""
+    for key, value in data.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, prefix + (key,))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield prefix + (key,), value
+
+
+def _lookup(data: Dict[str, Any], path: tuple):
+    """キーのパスで入れ子の辞書から値を取り出す"""
+    for key in path:
+        if not isinstance(data, dict) or key not in data:
+            return None
+        data = data[key]
+    return data
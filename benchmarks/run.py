@@ -0,0 +1,105 @@
+"""
+ベンチマークの実行スクリプト
+
+使用方法:
+    python -m benchmarks.run                      # 全ベンチマークを実行
+    python -m benchmarks.run --only broker,parse  # 一部のみ実行
+    python -m benchmarks.run --save-baseline      # ベースラインとして保存
+    python -m benchmarks.run --compare benchmarks/baselines/baseline.json
+
+結果は benchmarks/results/<タイムスタンプ>.json に保存する。
+--compareを指定した場合、許容範囲を超えて悪化した指標があれば終了コード1を返す。
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+
+from benchmarks.bench_components import bench_broker, bench_parse, bench_prompt
+from benchmarks.bench_scenario import bench_scenario
+from benchmarks.harness import (
+    compare, environment_info, load_results, python_startup_sec, rss_bytes,
+    save_results
+)
+
+DEFAULT_BASELINE = "benchmarks/baselines/baseline.json"
+
+SUITES = {
+    "broker": bench_broker,
+    "parse": bench_parse,
+    "prompt": bench_prompt,
+    "startup": lambda: {"agent_process": {
+        "import_sec": python_startup_sec("main.agent_entrypoint")}},
+    "scenario": bench_scenario,
+}
+
+
+def run_benchmarks(names) -> dict:
+    """指定したベンチマークを実行して結果をまとめる"""
+    benchmarks = {}
+    for name in names:
+        print(f"▶ {name} ...", file=sys.stderr)
+        started = time.perf_counter()
+        benchmarks[name] = SUITES[name]()
+        print(f"  done in {time.perf_counter() - started:.1f}s",
+              file=sys.stderr)
+    return {
+        "created_at": datetime.now().isoformat(),
+        "environment": environment_info(),
+        "process": {"runner_rss_bytes": rss_bytes()},
+        "benchmarks": benchmarks,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="ベンチマークを実行する")
+    parser.add_argument(
+        "--only",
+        help=f"実行するベンチマーク（カンマ区切り）: {', '.join(SUITES)}")
+    parser.add_argument(
+        "--output",
+        help="結果の保存先 (デフォルト: benchmarks/results/<タイムスタンプ>.json)")
+    parser.add_argument(
+        "--save-baseline", nargs="?", const=DEFAULT_BASELINE,
+        help=f"結果をベースラインとしても保存する (デフォルト: {DEFAULT_BASELINE})")
+    parser.add_argument(
+        "--compare", nargs="?", const=DEFAULT_BASELINE,
+        help="ベースラインと比較し、悪化した指標を報告する")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2,
+        help="回帰とみなす悪化の割合 (デフォルト: 0.2)")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(SUITES)
+    unknown = [name for name in names if name not in SUITES]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+
+    results = run_benchmarks(names)
+    print(json.dumps(results["benchmarks"], ensure_ascii=False, indent=2))
+
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    output = args.output or f"benchmarks/results/{timestamp}.json"
+    save_results(results, output)
+    print(f"📝 Results saved to {output}", file=sys.stderr)
+    if args.save_baseline:
+        save_results(results, args.save_baseline)
+        print(f"📌 Baseline saved to {args.save_baseline}", file=sys.stderr)
+
+    if args.compare:
+        baseline = load_results(args.compare)
+        regressions = compare(results["benchmarks"],
+                              baseline.get("benchmarks", {}), args.tolerance)
+        if regressions:
+            print("❌ Regressions against baseline:", file=sys.stderr)
+            for regression in regressions:
+                print(f"  {regression}", file=sys.stderr)
+            return 1
+        print("✅ No regressions against baseline", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,18 +2,52 @@
 Agent Entrypoint - TDD Green Phase
 標準化されたエージェント起動スクリプト
 """
+import json
+import os
 import sys
+import time
+from typing import Optional
+from main.frameworks_and_drivers.frameworks import metrics, tracing
 from main.interface_adapters.controllers.agent_controller import AgentLoop
 
 
+def run_agent(agent_id: str) -> None:
+    """
+    環境変数の設定でエージェントを初期化し、メッセージループを実行する
+
+    受信を始める前に、スーパーバイザーへAGENT_READYを送る。
+
+    Args:
+        agent_id: エージェントID
+    """
+    tracing.configure(json.loads(os.environ.get("TRACING_CONFIG", "{}")),
+                      process_name=agent_id)
+    metrics.configure(json.loads(os.environ.get("METRICS_CONFIG", "{}")),
+                      os.environ.get("MESSAGE_DB_PATH"))
+    agent_loop = AgentLoop(agent_id)
+    agent_loop.announce_ready(_report_ready(agent_id))
+    agent_loop.run()
+
+
+def _report_ready(agent_id: str) -> Optional[float]:
+    """スーパーバイザーが起動した時刻からの経過時間を記録する"""
+    spawned_at = os.environ.get("AGENT_SPAWNED_AT")
+    if not spawned_at:
+        return None
+    startup_sec = max(time.time() - float(spawned_at), 0.0)
+    launcher = os.environ.get("AGENT_LAUNCHER", "subprocess")
+    metrics.AGENT_STARTUP_DURATION.observe(
+        startup_sec, agent_id=agent_id, launcher=launcher)
+    print(f"[{agent_id}] Ready in {startup_sec * 1000:.0f} ms ({launcher})")
+    return startup_sec
+
+
 def main():
     """エージェントエントリーポイントのメイン関数"""
     if len(sys.argv) < 2:
         raise IndexError("Agent ID is required as first argument")
 
-    agent_id = sys.argv[1]
-    agent_loop = AgentLoop(agent_id)
-    agent_loop.run()
+    run_agent(sys.argv[1])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,32 @@
+"""
+Async Agent Entrypoint
+複数のエージェントを1プロセスの非同期ランタイムで起動するスクリプト
+"""
+import asyncio
+import json
+import os
+import sys
+from main.frameworks_and_drivers.frameworks import metrics, tracing
+from main.frameworks_and_drivers.drivers.async_agent_runtime import (
+    create_runtime_from_environment
+)
+
+
+def main():
+    """非同期ランタイムのエントリーポイントのメイン関数"""
+    if len(sys.argv) < 2:
+        raise IndexError("At least one agent ID is required as arguments")
+
+    tracing.configure(json.loads(os.environ.get("TRACING_CONFIG", "{}")),
+                      process_name=",".join(sys.argv[1:]))
+    metrics.configure(json.loads(os.environ.get("METRICS_CONFIG", "{}")),
+                      os.environ.get("MESSAGE_DB_PATH"))
+    runtime = create_runtime_from_environment(
+        sys.argv[1:], json.loads(os.environ.get("RUNTIME_CONFIG", "{}")))
+    for controller in runtime.controllers.values():
+        controller.announce_ready()
+    asyncio.run(runtime.serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+エージェントプロセスの起動方式
+
+- subprocess: エージェントごとに新しいPythonインタプリタを起動する。
+  起動のたびにyaml・sqlite3・mainパッケージ全体を読み込み直す
+- forkserver: 必要なモジュールを読み込み済みの常駐プロセス（フォークサーバー）
+  からエージェントをforkする。インタプリタの起動とimportを省けるため、
+  起動からメッセージを受信できるまでの時間が短くなる
+
+どちらの方式でも、エージェントは起動時刻（AGENT_SPAWNED_AT）からの経過時間を
+a2a_agent_startup_seconds に記録し、スーパーバイザーへAGENT_READYを送る。
+"""
+
+import multiprocessing
+import os
+import subprocess
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, Optional
+
+from main.frameworks_and_drivers.frameworks import metrics, tracing
+
+# フォークサーバーが起動時に読み込んでおくモジュール
+# "__main__" はスーパーバイザーを起動したスクリプト（run_scenario.pyなど）で、
+# 子プロセスごとに読み込み直さないようフォークサーバーで一度だけ読み込む。
+# そのためスクリプトは if __name__ == "__main__": で保護されている必要がある
+FORKSERVER_PRELOAD = (
+    "__main__",
+    "yaml",
+    "sqlite3",
+    "main.agent_entrypoint",
+    "main.frameworks_and_drivers.frameworks.message_broker",
+    "main.frameworks_and_drivers.frameworks.gemini_service",
+    "main.frameworks_and_drivers.frameworks.prompt_injector_service",
+    "main.frameworks_and_drivers.frameworks.llm_worker_pool",
+    "main.frameworks_and_drivers.frameworks.llm_response_cache",
+    "main.frameworks_and_drivers.frameworks.simulated_llm_service",
+)
+
+
+class AgentLauncher(ABC):
+    """エージェントプロセスの起動方式"""
+
+    name = ""
+
+    def launch(self, agent_id: str, env: Dict[str, str]):
+        """
+        エージェントを起動する
+
+        Returns:
+            pid・poll()・terminate()・wait() を持つプロセスハンドル
+        """
+        env = dict(env, AGENT_SPAWNED_AT=repr(time.time()),
+                   AGENT_LAUNCHER=self.name)
+        process = self._spawn(agent_id, env)
+        metrics.SUBPROCESS_SPAWNS.inc(kind="agent")
+        return process
+
+    @abstractmethod
+    def _spawn(self, agent_id: str, env: Dict[str, str]):
+        """エージェントのプロセスを作成し、プロセスハンドルを返す"""
+        pass
+
+    def close(self) -> None:
+        """起動方式が保持する資源を解放する"""
+        pass
+
+
+class SubprocessLauncher(AgentLauncher):
+    """エージェントごとに新しいPythonインタプリタを起動する"""
+
+    name = "subprocess"
+
+    def _spawn(self, agent_id: str, env: Dict[str, str]):
+        return subprocess.Popen(
+            ["python3", "-m", "main.agent_entrypoint", agent_id], env=env)
+
+
+class ForkedAgentProcess:
+    """multiprocessing.ProcessをPopenと同じ操作で扱うためのハンドル"""
+
+    def __init__(self, process: multiprocessing.process.BaseProcess):
+        self._process = process
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._process.pid
+
+    @property
+    def sentinel(self) -> int:
+        """プロセスの終了時に読み込み可能になるファイル記述子"""
+        return self._process.sentinel
+
+    def poll(self) -> Optional[int]:
+        return self._process.exitcode
+
+    def terminate(self) -> None:
+        self._process.terminate()
+
+    def kill(self) -> None:
+        self._process.kill()
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[int]:
+        self._process.join(timeout)
+        return self._process.exitcode
+
+
+def _run_forked_agent(agent_id: str, env: Dict[str, str]) -> None:
+    """フォークサーバーからforkされたエージェントの本体"""
+    from main.agent_entrypoint import run_agent
+
+    # フォークサーバーの環境ではなく、スーパーバイザーが作成した環境で動かす
+    os.environ.clear()
+    os.environ.update(env)
+    try:
+        run_agent(agent_id)
+    finally:
+        # multiprocessingの子プロセスはatexitを実行せずに終了する
+        metrics.shutdown()
+        tracing.shutdown()
+
+
+class ForkServerLauncher(AgentLauncher):
+    """読み込み済みのフォークサーバーからエージェントをforkする"""
+
+    name = "forkserver"
+
+    def __init__(self, preload: Iterable[str] = FORKSERVER_PRELOAD):
+        if "forkserver" not in multiprocessing.get_all_start_methods():
+            raise ValueError(
+                "forkserver launcher is not supported on this platform")
+        self._context = multiprocessing.get_context("forkserver")
+        # フォークサーバーは最初のlaunchで起動し、以降のlaunchで再利用される
+        self._context.set_forkserver_preload(list(preload))
+
+    def _spawn(self, agent_id: str, env: Dict[str, str]) -> ForkedAgentProcess:
+        process = self._context.Process(
+            target=_run_forked_agent,
+            args=(agent_id, env),
+            name=f"agent-{agent_id}")
+        process.start()
+        return ForkedAgentProcess(process)
+
+
+LAUNCHERS = {
+    SubprocessLauncher.name: SubprocessLauncher,
+    ForkServerLauncher.name: ForkServerLauncher,
+}
+
+
+def create_launcher(runtime_config: Dict[str, Any]) -> AgentLauncher:
+    """project.ymlのruntime.launcherから起動方式を作成する"""
+    name = runtime_config.get("launcher", SubprocessLauncher.name)
+    if name not in LAUNCHERS:
+        raise ValueError(f"Unknown agent launcher: {name}")
+    return LAUNCHERS[name]()
@@ -0,0 +1,277 @@
+"""
+エージェントプロセスの監視と自動再起動
+
+Erlang/OTPのスーパーバイザーに倣い、異常終了したエージェントだけを
+指数バックオフを挟んで再起動する（正常終了したエージェントは再起動しない）。
+一定時間内の再起動回数が上限に達したエージェントは再起動をあきらめ、
+失敗として報告する。
+
+プロセスの終了はpidfd（multiprocessingの子プロセスはsentinel）をselectで
+待って検知し、poll()（waitpid）で回収する。pidfdを使えない環境では
+一定間隔でpoll()する。
+"""
+
+import os
+import select
+import threading
+import time
+from dataclasses import dataclass, field, fields
+from typing import Any, Callable, Dict, List, Optional
+
+# 終了を検知する手段がないプロセスを確認する間隔（秒）
+POLL_INTERVAL_SEC = 0.5
+
+
+@dataclass
+class RestartPolicy:
+    """再起動の方針"""
+    # window_sec秒の間に許す再起動回数（restart intensity）
+    max_restarts: int = 3
+    window_sec: float = 60.0
+    # 再起動までの待機時間: initial * multiplier ** (期間内の再起動回数)
+    backoff_initial_sec: float = 0.5
+    backoff_max_sec: float = 10.0
+    backoff_multiplier: float = 2.0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "RestartPolicy":
+        """project.ymlのsupervisionセクションから作成する"""
+        names = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in config.items()
+                      if key in names})
+
+    def backoff(self, attempt: int) -> float:
+        """attempt回目（0始まり）の再起動までの待機時間"""
+        return min(self.backoff_initial_sec
+                   * self.backoff_multiplier ** attempt,
+                   self.backoff_max_sec)
+
+
+@dataclass
+class SupervisionEvent:
+    """監視中に起きた出来事"""
+    # exited: プロセスが終了した / restarted: 再起動した /
+    # gave_up: 再起動回数の上限に達した
+    kind: str
+    agent_id: str
+    pid: Optional[int] = None
+    returncode: Optional[int] = None
+    # exitedの場合、再起動までの待機時間
+    delay_sec: Optional[float] = None
+    # restartedの場合、再配信したackされていないメッセージ数
+    replayed: int = 0
+    timestamp: float = field(default_factory=time.time)
+
+
+@dataclass
+class _AgentState:
+    process: Any
+    # running / restarting / exited / failed
+    status: str = "running"
+    restart_at: Optional[float] = None
+    # 再起動した時刻（clockの値）
+    restarts: List[float] = field(default_factory=list)
+    exit_fd: Optional[int] = None
+    # pidfdは自分で閉じる。multiprocessingのsentinelはProcessが所有する
+    owns_exit_fd: bool = False
+
+    def open_exit_fd(self) -> None:
+        """プロセスの終了時に読み込み可能になるファイル記述子を開く"""
+        sentinel = getattr(self.process, "sentinel", None)
+        if isinstance(sentinel, int):
+            self.exit_fd, self.owns_exit_fd = sentinel, False
+            return
+        self.exit_fd, self.owns_exit_fd = None, False
+        pid = getattr(self.process, "pid", None)
+        if not isinstance(pid, int) or not hasattr(os, "pidfd_open"):
+            return
+        try:
+            self.exit_fd, self.owns_exit_fd = os.pidfd_open(pid), True
+        except OSError:
+            pass
+
+    def close_exit_fd(self) -> None:
+        if self.exit_fd is not None and self.owns_exit_fd:
+            os.close(self.exit_fd)
+        self.exit_fd, self.owns_exit_fd = None, False
+
+
+class AgentSupervisor:
+    """エージェントプロセスを監視し、異常終了したものを再起動する"""
+
+    def __init__(self, spawn: Callable[[str], Any],
+                 policy: Optional[RestartPolicy] = None,
+                 replay: Optional[Callable[[str], int]] = None,
+                 on_event: Optional[Callable[[SupervisionEvent], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            spawn: エージェントIDを受け取り、新しいプロセスハンドルを返す
+            policy: 再起動の方針
+            replay: 再起動の直前に呼び出し、ackされていないメッセージを
+                再配信待ちに戻して件数を返す
+            on_event: SupervisionEventごとに呼び出す
+            clock: 単調増加する時刻（テスト用）
+        """
+        self.spawn = spawn
+        self.policy = policy or RestartPolicy()
+        self.replay = replay
+        self.on_event = on_event
+        self.clock = clock
+        self._agents: Dict[str, _AgentState] = {}
+        self._stopping = False
+        self._closed = False
+        # stop()でselectの待機を中断するためのパイプ
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        # pollの実行中に保持する。close()はpollが終わるまで記述子を閉じない
+        self._polling = threading.Lock()
+
+    def watch(self, agent_id: str, process: Any) -> None:
+        """起動済みのエージェントを監視対象に加える"""
+        state = _AgentState(process=process)
+        state.open_exit_fd()
+        self._agents[agent_id] = state
+
+    @property
+    def failed_agents(self) -> List[str]:
+        """再起動をあきらめたエージェント"""
+        return [agent_id for agent_id, state in self._agents.items()
+                if state.status == "failed"]
+
+    def restart_count(self, agent_id: str) -> int:
+        """エージェントを再起動した回数"""
+        return len(self._agents[agent_id].restarts)
+
+    def has_active_agents(self) -> bool:
+        """実行中または再起動待ちのエージェントがあるか"""
+        return any(state.status in ("running", "restarting")
+                   for state in self._agents.values())
+
+    def poll(self, timeout: float = 0.0) -> List[SupervisionEvent]:
+        """
+        終了したエージェントを回収し、期限が来た再起動を実行する
+
+        Args:
+            timeout: エージェントの終了または再起動の期限まで待つ最大秒数
+
+        Returns:
+            この呼び出しで起きたSupervisionEvent
+        """
+        with self._polling:
+            if self._stopping:
+                return []
+            self._wait(timeout)
+            events: List[SupervisionEvent] = []
+            for agent_id, state in self._agents.items():
+                if self._stopping:
+                    break
+                if state.status == "running":
+                    self._reap(agent_id, state, events)
+                if (state.status == "restarting"
+                        and state.restart_at <= self.clock()):
+                    self._restart(agent_id, state, events)
+            for event in events:
+                if self.on_event is not None:
+                    self.on_event(event)
+            return events
+
+    def stop(self) -> None:
+        """再起動をやめ、待機中のpollを起こす（終了処理の前に呼ぶ）"""
+        self._stopping = True
+        if not self._closed:
+            os.write(self._wake_w, b"\0")
+
+    def close(self, timeout: float = 5.0) -> bool:
+        """
+        監視に使ったファイル記述子を閉じる
+
+        実行中のpollをstop()で起こし、終わるのを待ってから閉じる。
+        pollが選択中の記述子を閉じると、別のファイルに再利用された番号を
+        selectしかねないため、timeout秒で終わらなければ閉じずに諦める。
+
+        Returns:
+            閉じた（または閉じ済みだった）場合True
+        """
+        if not self._stopping:
+            self.stop()
+        if not self._polling.acquire(timeout=timeout):
+            return False
+        try:
+            if not self._closed:
+                for state in self._agents.values():
+                    state.close_exit_fd()
+                for fd in (self._wake_r, self._wake_w):
+                    os.close(fd)
+                self._closed = True
+        finally:
+            self._polling.release()
+        return True
+
+    def _wait(self, timeout: float) -> None:
+        """エージェントの終了・再起動の期限・stop()のいずれかまで待つ"""
+        if timeout <= 0:
+            return
+        now = self.clock()
+        fds = [self._wake_r]
+        for state in self._agents.values():
+            if state.status == "restarting":
+                timeout = min(timeout, max(state.restart_at - now, 0.0))
+            elif state.status == "running":
+                if state.exit_fd is None:
+                    timeout = min(timeout, POLL_INTERVAL_SEC)
+                else:
+                    fds.append(state.exit_fd)
+        readable, _, _ = select.select(fds, [], [], timeout)
+        if self._wake_r in readable:
+            try:
+                os.read(self._wake_r, 1024)
+            except BlockingIOError:
+                pass
+
+    def _reap(self, agent_id: str, state: _AgentState,
+              events: List[SupervisionEvent]) -> None:
+        returncode = state.process.poll()
+        if returncode is None:
+            return
+        state.close_exit_fd()
+        event = SupervisionEvent("exited", agent_id, pid=state.process.pid,
+                                 returncode=returncode)
+        events.append(event)
+        if returncode == 0:
+            # 正常終了したエージェントは再起動しない
+            state.status = "exited"
+            return
+        self._schedule_restart(agent_id, state, events)
+        event.delay_sec = (None if state.restart_at is None
+                           else state.restart_at - self.clock())
+
+    def _schedule_restart(self, agent_id: str, state: _AgentState,
+                          events: List[SupervisionEvent]) -> None:
+        """再起動回数の上限を確認し、バックオフ後の再起動を予約する"""
+        now = self.clock()
+        recent = [t for t in state.restarts
+                  if now - t < self.policy.window_sec]
+        if len(recent) >= self.policy.max_restarts:
+            state.status = "failed"
+            state.restart_at = None
+            events.append(SupervisionEvent("gave_up", agent_id))
+            return
+        state.status = "restarting"
+        state.restart_at = now + self.policy.backoff(len(recent))
+
+    def _restart(self, agent_id: str, state: _AgentState,
+                 events: List[SupervisionEvent]) -> None:
+        state.restarts.append(self.clock())
+        replayed = self.replay(agent_id) if self.replay else 0
+        try:
+            state.process = self.spawn(agent_id)
+        except Exception as e:
+            print(f"⚠️ Failed to restart {agent_id}: {e}")
+            self._schedule_restart(agent_id, state, events)
+            return
+        state.status = "running"
+        state.restart_at = None
+        state.open_exit_fd()
+        events.append(SupervisionEvent(
+            "restarted", agent_id, pid=state.process.pid, replayed=replayed))
@@ -0,0 +1,254 @@
+"""
+非同期エージェントランタイム
+
+複数のエージェントを1つのプロセスのイベントループ上でコルーチンとして実行する。
+エージェントごとにPythonプロセスを起動する方式に比べ、インタプリタの起動と
+常駐メモリをエージェント数に比例して消費しないため、1台で多数のディベートを
+並行して実行できる。
+
+- LLM呼び出しは非同期サブプロセスで行い、応答待ちの間も他のエージェントが動く
+- メッセージの到着はランタイム全体で1本の監視タスクが検知し、
+  待機中のエージェントをまとめて起こす
+- SQLiteへの読み書きは専用のスレッド1本で行い、ロック待ちの間も
+  イベントループを止めない（単一接続のブローカーを同時に使わないよう直列化する）
+"""
+
+import asyncio
+import functools
+import json
+import os
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from main.entities.models import Message
+from main.frameworks_and_drivers.frameworks import tracing
+from main.frameworks_and_drivers.frameworks.debate_transitions import (
+    create_debate_service_from_config
+)
+from main.frameworks_and_drivers.frameworks.llm_service_factory import (
+    create_llm_service_from_config
+)
+from main.frameworks_and_drivers.frameworks.message_broker import (
+    create_broker_from_environment
+)
+from main.interface_adapters.controllers.agent_controller import (
+    AgentController
+)
+
+# project.ymlのruntimeセクションからコンストラクタ引数へ渡す設定キー
+_CONFIG_OPTION_KEYS = ("max_concurrent_llm_calls", "poll_interval",
+                       "wait_timeout")
+
+
+def runtime_options_from_config(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    runtime設定からAsyncAgentRuntimeのコンストラクタ引数を抽出する
+
+    Args:
+        config: project.ymlのruntimeセクション
+
+    Returns:
+        指定されていたキーのみを含むキーワード引数の辞書
+    """
+    return {key: config[key] for key in _CONFIG_OPTION_KEYS if key in config}
+
+
+class AsyncAgentRuntime:
+    """1つのイベントループで複数のAgentControllerを実行するランタイム"""
+
+    def __init__(self, agent_ids: Iterable[str], message_bus,
+                 llm_service=None, max_concurrent_llm_calls: int = 8,
+                 poll_interval: float = 0.005, wait_timeout: float = 2.0,
+                 max_iterations: Optional[int] = None,
+                 debate_services: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            agent_ids: 実行するエージェントIDのリスト
+            message_bus: 全エージェントで共有するメッセージバス
+            llm_service: 全エージェントで共有するLLMサービス。
+                Noneの場合はシナリオテスト用の簡易応答を使う
+            max_concurrent_llm_calls: 同時に実行するLLM呼び出しの上限
+            poll_interval: 他プロセスの書き込みを確認する間隔（秒）
+            wait_timeout: 1回のメッセージ待機の最大時間（秒）
+            max_iterations: エージェントごとの最大イテレーション数。
+                Noneの場合はstop()が呼ばれるまで実行する
+            debate_services: エージェントID -> 司会の遷移表を持つ
+                DebateService
+        """
+        debate_services = debate_services or {}
+        self.controllers = {
+            agent_id: AgentController(
+                agent_id, message_bus=message_bus, llm_service=llm_service,
+                debate_service=debate_services.get(agent_id))
+            for agent_id in agent_ids
+        }
+        if not self.controllers:
+            raise ValueError("At least one agent ID is required")
+        self.message_bus = message_bus
+        self.max_concurrent_llm_calls = max_concurrent_llm_calls
+        self.poll_interval = poll_interval
+        self.wait_timeout = wait_timeout
+        self.max_iterations = max_iterations
+        self.stats = {"messages_processed": 0, "wakeups": 0}
+        self._stopping = False
+        self._changed = asyncio.Event()
+        self._llm_slots: Optional[asyncio.Semaphore] = None
+        # メッセージバスの呼び出しを実行する専用スレッド
+        self._broker_thread = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="message-bus")
+
+    async def run(self) -> None:
+        """全エージェントを実行し、すべてが終了するまで待つ"""
+        self._stopping = False
+        self._llm_slots = asyncio.Semaphore(self.max_concurrent_llm_calls)
+        watcher = asyncio.create_task(self._watch_changes())
+        try:
+            await asyncio.gather(*(
+                self._run_agent(controller)
+                for controller in self.controllers.values()
+            ))
+        finally:
+            watcher.cancel()
+            with suppress(asyncio.CancelledError):
+                await watcher
+
+    async def serve(self) -> None:
+        """SIGTERM/SIGINTで停止するようにしてrun()を実行する"""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            with suppress(NotImplementedError):
+                loop.add_signal_handler(sig, self.stop)
+        await self.run()
+
+    def stop(self) -> None:
+        """
+        全エージェントに停止を指示する
+
+        イベントループのスレッドから呼び出すこと。
+        """
+        self._stopping = True
+        self._signal_change()
+
+    async def _run_agent(self, controller: AgentController) -> None:
+        """1エージェント分のメインループ（AgentController.runの非同期版）"""
+        print(f"[{controller.agent_id}] Starting agent coroutine...")
+        iteration = 0
+        while not self._stopping and (
+                self.max_iterations is None
+                or iteration < self.max_iterations):
+            try:
+                with tracing.span("agent.wait_for_message",
+                                  agent_id=controller.agent_id) as span:
+                    message = await self.wait_for_message(
+                        controller.agent_id, timeout=self.wait_timeout)
+                    if message:
+                        span.adopt(tracing.peek(message))
+                    else:
+                        span.discard()
+                if message:
+                    await controller.process_message_async(
+                        message, llm_slots=self._llm_slots,
+                        post=self._post_messages)
+                    self.stats["messages_processed"] += 1
+                    # data_versionの監視を待たずに、宛先のエージェントを
+                    # ここで起こす
+                    self._signal_change()
+                # 期限を過ぎた司会のgatherは新しいメッセージがなくても終える
+                await controller.expire_gathers_async(
+                    llm_slots=self._llm_slots, post=self._post_messages)
+                iteration += 1
+            except Exception as e:
+                # プロセスを異常終了させ、スーパーバイザーに再起動させる
+                print(f"[{controller.agent_id}] Error in message loop: {e}")
+                raise
+
+    async def wait_for_message(self, recipient_id: str,
+                               timeout: Optional[float] = None
+                               ) -> Optional[Message]:
+        """
+        指定した受信者宛のメッセージが届くまで、イベントループを止めずに待機する
+
+        Returns:
+            受信したメッセージ。タイムアウトまたは停止時はNone
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while not self._stopping:
+            # 取得前に待機対象のイベントを掴み、取得後の通知を取りこぼさない
+            changed = self._changed
+            message = await self._call_bus(
+                self.message_bus.get_message, recipient_id)
+            if message:
+                return message
+
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                return None
+            try:
+                await asyncio.wait_for(changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return None
+        return None
+
+    async def _post_messages(self, messages: List[Message]) -> None:
+        """応答をメッセージバス用のスレッドで投函する"""
+        if messages:
+            await self._call_bus(self.message_bus.post_messages, messages)
+
+    async def _call_bus(self, function: Callable[..., Any], *args) -> Any:
+        """
+        メッセージバスの同期APIを専用スレッドで呼び出す
+
+        busy_timeoutまでのロック待ちがあっても、他のエージェントの
+        LLM呼び出しやタイマーはイベントループ上で進む。
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._broker_thread, functools.partial(function, *args))
+
+    async def _watch_changes(self) -> None:
+        """他プロセスの書き込みを検知して、待機中のエージェントを起こす"""
+        version = await self._data_version()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            current = await self._data_version()
+            if current is None or current != version:
+                version = current
+                self._signal_change()
+
+    async def _data_version(self) -> Optional[int]:
+        """更新検知用の値。メッセージバスが対応していない場合はNone"""
+        data_version = getattr(self.message_bus, "data_version", None)
+        return await self._call_bus(data_version) if data_version else None
+
+    def _signal_change(self) -> None:
+        """現在待機しているエージェントをすべて起こす"""
+        self.stats["wakeups"] += 1
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+
+def create_runtime_from_environment(
+        agent_ids: list[str],
+        runtime_config: Dict[str, Any]) -> AsyncAgentRuntime:
+    """
+    スーパーバイザーから渡された環境変数の設定でランタイムを作成する
+
+    メッセージバスとLLMサービスはAgentControllerと同じ手順で1つずつ作成し、
+    全エージェントで共有する。
+    """
+    moderator_config = json.loads(os.environ.get("MODERATOR_CONFIG", "{}"))
+    return AsyncAgentRuntime(
+        agent_ids,
+        message_bus=create_broker_from_environment(),
+        llm_service=create_llm_service_from_config(
+            json.loads(os.environ.get("LLM_CONFIG", "{}"))),
+        debate_services={
+            agent_id: create_debate_service_from_config(
+                agent_id, moderator_config)
+            for agent_id in agent_ids
+        },
+        **runtime_options_from_config(runtime_config)
+    )
@@ -0,0 +1,252 @@
+"""
+複数ディベートのバッチ実行
+
+議題のリスト（YAMLまたはJSONL）を読み込み、議題ごとにrun_scenario.pyを
+独立したプロセスとして並行実行する。各ディベートは専用のDEBATE_DIRと
+メッセージDBを持つため互いに干渉せず、最後に結果と所要時間を集計した
+サマリーを書き出す。
+"""
+
+import json
+import os
+import re
+import signal
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+# 1件のディベートの結果
+OUTCOME_COMPLETED = "completed"
+OUTCOME_FAILED = "failed"
+OUTCOME_TIMEOUT = "timeout"
+OUTCOME_ERROR = "error"
+
+
+@dataclass
+class DebateTask:
+    """バッチ内の1件のディベート"""
+    task_id: str
+    topic: str
+
+
+@dataclass
+class DebateResult:
+    """1件のディベートの実行結果"""
+    task_id: str
+    topic: str
+    run_dir: str
+    outcome: str
+    exit_code: Optional[int]
+    duration_sec: float
+    statistics: Dict[str, Any] = field(default_factory=dict)
+
+
+def load_topics(topics_file: str) -> List[DebateTask]:
+    """
+    議題ファイルを読み込む
+
+    対応する形式:
+        - JSONL（拡張子.jsonl）: 1行に議題の文字列、または
+          {"id": ..., "topic": ...} のオブジェクト
+        - YAML: 議題のリスト、または "topics" キーにリストを持つマッピング。
+          リストの要素は文字列または {"id": ..., "topic": ...}
+
+    Raises:
+        ValueError: 議題が含まれていない、または形式が不正な場合
+    """
+    with open(topics_file, "r", encoding="utf-8") as f:
+        if topics_file.endswith(".jsonl"):
+            entries = [json.loads(line) for line in f if line.strip()]
+        else:
+            data = yaml.safe_load(f)
+            entries = data.get("topics") if isinstance(data, dict) else data
+
+    if not entries:
+        raise ValueError(f"No topics found in {topics_file}")
+
+    tasks = []
+    for index, entry in enumerate(entries, start=1):
+        if isinstance(entry, str):
+            entry = {"topic": entry}
+        if not isinstance(entry, dict) or not entry.get("topic"):
+            raise ValueError(f"Invalid topic entry #{index}: {entry!r}")
+        tasks.append(DebateTask(
+            task_id=str(entry.get("id") or f"{index:04d}"),
+            topic=entry["topic"]
+        ))
+
+    task_ids = [task.task_id for task in tasks]
+    if len(set(task_ids)) != len(task_ids):
+        raise ValueError("Topic ids must be unique")
+    return tasks
+
+
+class BatchDebateRunner:
+    """議題ごとにシナリオを独立したプロセスで並行実行するランナー"""
+
+    # run_scenario.pyのタイムアウトに加えて、起動と終了処理に許す時間（秒）
+    SHUTDOWN_GRACE_SEC = 30.0
+
+    def __init__(self, project_file: str, output_dir: str,
+                 workers: int = 4, timeout_sec: int = 180,
+                 scenario_command: Optional[List[str]] = None):
+        """
+        Args:
+            project_file: プロジェクト定義ファイルのパス
+            output_dir: バッチ全体の出力先。議題ごとのディレクトリを作成する
+            workers: 同時に実行するディベート数
+            timeout_sec: 1件のディベートのタイムアウト時間（秒）
+            scenario_command: シナリオを実行するコマンド。
+                Noneの場合は現在のインタプリタでrun_scenario.pyを実行する
+        """
+        if workers < 1:
+            raise ValueError("Workers must be at least 1")
+        self.project_file = project_file
+        self.output_dir = output_dir
+        self.workers = workers
+        self.timeout_sec = timeout_sec
+        self.scenario_command = scenario_command or [
+            sys.executable, "run_scenario.py"]
+
+    def run(self, tasks: List[DebateTask]) -> Dict[str, Any]:
+        """
+        全議題を実行し、集計したサマリーを返す
+
+        サマリーはoutput_dir/summary.jsonにも書き出す。
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        started_at = datetime.now().isoformat()
+        started = time.monotonic()
+
+        results: List[DebateResult] = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self._run_task, task) for task in tasks]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                print(f"[{len(results)}/{len(tasks)}] {result.task_id}: "
+                      f"{result.outcome} ({result.duration_sec:.1f}s)")
+
+        order = {task.task_id: index for index, task in enumerate(tasks)}
+        results.sort(key=lambda result: order[result.task_id])
+        summary = self._summarize(
+            results, started_at, time.monotonic() - started)
+
+        with open(os.path.join(self.output_dir, "summary.json"), "w",
+                  encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        return summary
+
+    def _run_task(self, task: DebateTask) -> DebateResult:
+        """1件のディベートを専用のディレクトリとプロセスで実行する"""
+        run_dir = os.path.abspath(
+            os.path.join(self.output_dir, _safe_dir_name(task.task_id)))
+        os.makedirs(run_dir, exist_ok=True)
+        result_file = os.path.join(run_dir, "result.json")
+
+        # 親プロセスの設定を引き継がず、ディベートごとに分離する
+        env = os.environ.copy()
+        env["DEBATE_DIR"] = run_dir
+        env.pop("MESSAGE_DB_PATH", None)
+
+        command = [
+            *self.scenario_command,
+            "--project_file", self.project_file,
+            "--timeout", str(self.timeout_sec),
+            "--topic", task.topic,
+            "--run_dir", run_dir,
+            "--result_file", result_file,
+        ]
+
+        started = time.monotonic()
+        exit_code: Optional[int] = None
+        try:
+            with open(os.path.join(run_dir, "scenario.log"), "w",
+                      encoding="utf-8") as log:
+                # エージェントの孫プロセスもまとめて終了できるよう
+                # 新しいプロセスグループで起動する
+                process = subprocess.Popen(
+                    command, env=env, stdout=log, stderr=subprocess.STDOUT,
+                    start_new_session=True)
+                try:
+                    exit_code = process.wait(
+                        timeout=self.timeout_sec + self.SHUTDOWN_GRACE_SEC)
+                    outcome = (OUTCOME_COMPLETED if exit_code == 0
+                               else OUTCOME_FAILED)
+                except subprocess.TimeoutExpired:
+                    _kill_process_group(process)
+                    outcome = OUTCOME_TIMEOUT
+        except OSError as e:
+            print(f"❌ Failed to launch debate {task.task_id}: {e}")
+            outcome = OUTCOME_ERROR
+
+        return DebateResult(
+            task_id=task.task_id,
+            topic=task.topic,
+            run_dir=run_dir,
+            outcome=outcome,
+            exit_code=exit_code,
+            duration_sec=time.monotonic() - started,
+            statistics=_read_statistics(result_file)
+        )
+
+    def _summarize(self, results: List[DebateResult], started_at: str,
+                   wall_time_sec: float) -> Dict[str, Any]:
+        """結果を集計したサマリーを作成する"""
+        outcomes = {outcome: 0 for outcome in (
+            OUTCOME_COMPLETED, OUTCOME_FAILED, OUTCOME_TIMEOUT, OUTCOME_ERROR)}
+        for result in results:
+            outcomes[result.outcome] += 1
+
+        durations = [result.duration_sec for result in results]
+        return {
+            "project_file": self.project_file,
+            "started_at": started_at,
+            "finished_at": datetime.now().isoformat(),
+            "workers": self.workers,
+            "total": len(results),
+            "outcomes": outcomes,
+            "wall_time_sec": wall_time_sec,
+            "duration_sec": {
+                "mean": statistics.fmean(durations) if durations else 0.0,
+                "median": statistics.median(durations) if durations else 0.0,
+                "max": max(durations, default=0.0),
+            },
+            "total_messages": sum(
+                result.statistics.get("total_messages", 0)
+                for result in results),
+            "results": [asdict(result) for result in results],
+        }
+
+
+def _safe_dir_name(task_id: str) -> str:
+    """議題IDをディレクトリ名として使える文字列にする"""
+    return re.sub(r"[^\w.-]", "_", task_id)
+
+
+def _kill_process_group(process: subprocess.Popen) -> None:
+    """シナリオプロセスと、それが起動したエージェントを終了させる"""
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+    except ProcessLookupError:
+        pass
+
+
+def _read_statistics(result_file: str) -> Dict[str, Any]:
+    """run_scenario.pyが書き出したメッセージバスの統計情報を読み込む"""
+    try:
+        with open(result_file, "r", encoding="utf-8") as f:
+            return json.load(f).get("statistics", {})
+    except (OSError, json.JSONDecodeError):
+        return {}
@@ -4,14 +4,23 @@ Kent BeckのTDD思想に従い、Green Phaseの後にコードを改善
 Clean Code原則を適用し、保守性と可読性を向上
 """
 import yaml
+import json
 import subprocess
 import os
+import threading
 import time
 from datetime import datetime
-from typing import List, Optional, Dict, Any, Union
+from typing import Callable, List, Optional, Dict, Any, Union
+from main.frameworks_and_drivers.drivers.agent_launcher import (
+    AgentLauncher, create_launcher
+)
+from main.frameworks_and_drivers.drivers.agent_supervision import (
+    AgentSupervisor, RestartPolicy, SupervisionEvent
+)
 from main.frameworks_and_drivers.frameworks.message_broker import (
-    SqliteMessageBroker
+    SqliteMessageBroker, broker_options_from_config
 )
+from main.frameworks_and_drivers.frameworks import metrics, tracing
 from main.frameworks_and_drivers.frameworks.platform_config import (
     PlatformConfig
 )
@@ -26,6 +35,21 @@ class Supervisor:
     テストファーストで開発されたClean Architectureの実装
     """
 
+    # 全エージェントのAGENT_READYを待つ最大時間（秒）
+    AGENT_STARTUP_TIMEOUT_SEC = 30.0
+    # monitorの1回の待機の上限（秒）。終了や再起動の期限では即座に起床する
+    MONITOR_WAIT_SEC = 60.0
+    # SUPERVISOR宛の制御メッセージの種類 -> ハンドラのメソッド名
+    # ハンドラがTrue/Falseを返すとmonitor_for_shutdownはその値で終了し、
+    # Noneを返すと監視を続ける
+    CONTROL_HANDLERS = {
+        "AGENT_READY": "_handle_agent_ready",
+        "SHUTDOWN_SYSTEM": "_handle_shutdown_system",
+        "AGENT_FAILED": "_handle_agent_failed",
+        "HEALTH_REPORT": "_handle_health_report",
+        "PROGRESS_REPORT": "_handle_progress_report",
+    }
+
     def __init__(self, config: Union[str, PlatformConfig]):
         """
         プロジェクト定義またはPlatformConfigからスーパーバイザーを初期化
@@ -61,27 +85,60 @@ class Supervisor:
     def _initialize_state(self) -> None:
         """内部状態を初期化する"""
         self.agent_processes: List[subprocess.Popen] = []
+        self.launcher: Optional[AgentLauncher] = None
+        self.agent_startup_times: Dict[str, float] = {}
+        # AGENT_READYを送ってきたエージェントID -> そのpayload
+        self.ready_agents: Dict[str, Dict[str, Any]] = {}
+        self.agent_supervisor: Optional[AgentSupervisor] = None
+        self.supervision_events: List[SupervisionEvent] = []
+        # エージェントID -> agent_processes内の位置（再起動時に差し替える）
+        self._agent_slots: Dict[str, int] = {}
+        self._monitor_thread: Optional[threading.Thread] = None
+        self._monitor_stop = threading.Event()
+        self._supervision_broker: Optional[SqliteMessageBroker] = None
         self.message_bus: Optional[SqliteMessageBroker] = None
         self.session_stats: Dict[str, Any] = {}
         self.config_validated: bool = False
+        self.metrics_server = None
+        self._metrics_store: Optional[metrics.SqliteMetricsStore] = None
+        self._metrics_broker: Optional[SqliteMessageBroker] = None
+        self.control_handlers: Dict[
+            str, Callable[[Message], Optional[bool]]] = {
+            message_type: getattr(self, name)
+            for message_type, name in self.CONTROL_HANDLERS.items()}
+        # 受信した制御メッセージ（種類を問わず、受信順）
+        self.control_messages: List[Message] = []
+        # 送信者ID -> 最新のHEALTH_REPORT / PROGRESS_REPORTのpayload
+        self.agent_health: Dict[str, Dict[str, Any]] = {}
+        self.agent_progress: Dict[str, Dict[str, Any]] = {}
+        # 準備完了の待機中にハンドラが返した監視の結果
+        self._control_result: Optional[bool] = None
 
     # ===== Core Message Bus Operations =====
 
     def initialize_message_bus(self) -> None:
         """A2Aメッセージバスを初期化する"""
+        message_bus_config = self._get_message_bus_config()
         if self.platform_config:
             # PlatformConfigオブジェクトからパスを取得
             # message_db_pathがディレクトリなので、ファイルパスを構築
             db_path = self.platform_config.get_message_db_file_path()
         else:
             # 従来の方式（後方互換性）
-            message_bus_config = self.project_def.get('message_bus', {})
             db_path = message_bus_config.get('db_path', 'messages.db')
 
-        self.message_bus = SqliteMessageBroker(db_path)
+        self.message_bus = SqliteMessageBroker(
+            db_path, **broker_options_from_config(message_bus_config))
         print(f"🔧 Database path: {db_path}")
         self.message_bus.initialize_db()
         print("🔧 Database initialized successfully")
+        tracing.configure(self._get_tracing_config(), process_name="SUPERVISOR")
+
+    def _get_message_bus_config(self) -> Dict[str, Any]:
+        """project.ymlのmessage_busセクションを取得する"""
+        if self.platform_config:
+            return self.platform_config.get_message_bus_config()
+        return self.project_def.get('message_bus', {})
 
     def _create_message(
         self, recipient_id: str, message_type: str,
@@ -110,44 +167,292 @@ class Supervisor:
         if self.message_bus is None:
             self.initialize_message_bus()
 
-        for agent_def in self.project_def['agents']:
+        agent_ids = self._agent_ids()
+        mode = self._get_runtime_config().get('mode', 'process')
+        self.start_metrics_server()
+        for agent_id in agent_ids:
+            # 再起動がなくても系列を出力しておく
+            metrics.AGENT_RESTARTS.inc(0, agent_id=agent_id)
+
+        if mode == 'async':
+            # 全エージェントを1つのプロセスのイベントループ上で実行する
+            cmd = ["python3", "-m", "main.async_agent_entrypoint", *agent_ids]
+            proc = subprocess.Popen(
+                cmd, env=self._build_agent_env(",".join(agent_ids)))
+            metrics.SUBPROCESS_SPAWNS.inc(kind="agent")
+            self.agent_processes.append(proc)
+            print(f"Launched async runtime for agents: "
+                  f"{', '.join(agent_ids)} (PID: {proc.pid})")
+            return
+        if mode != 'process':
+            raise ValueError(f"Unknown runtime mode: {mode}")
+
+        if self.launcher is None:
+            self.launcher = create_launcher(self._get_runtime_config())
+        self.agent_supervisor = AgentSupervisor(
+            spawn=self._restart_agent,
+            policy=RestartPolicy.from_config(self._get_supervision_config()),
+            replay=self._replay_unacked,
+            on_event=self._on_supervision_event)
+        for agent_id in agent_ids:
             # 各エージェントを独立したプロセスとして起動
-            cmd = [
-                "python3", "-m", "main.agent_entrypoint",
-                agent_def['id']
-            ]
+            proc = self._launch_agent(agent_id)
+            self._agent_slots[agent_id] = len(self.agent_processes)
+            self.agent_processes.append(proc)
+            self.agent_supervisor.watch(agent_id, proc)
 
-            # 環境変数の設定
-            env = os.environ.copy()
-            env['AGENT_ID'] = agent_def['id']
+    def _launch_agent(self, agent_id: str):
+        """起動方式に従ってエージェントを1つ起動する"""
+        proc = self.launcher.launch(agent_id, self._build_agent_env(agent_id))
+        print(f"Launched agent: {agent_id} (PID: {proc.pid}, "
+              f"launcher: {self.launcher.name})")
+        return proc
 
-            proc = subprocess.Popen(cmd, env=env)
-            self.agent_processes.append(proc)
-            print(f"Launched agent: {agent_def['id']} (PID: {proc.pid})")
+    def wait_for_agents_ready(
+            self, timeout_sec: Optional[float] = None) -> bool:
+        """
+        全エージェントからAGENT_READYが届くまで待つ
+
+        待機中に届いた他の制御メッセージもハンドラへ渡す。ハンドラが
+        監視の結果を返した場合（エージェントの失敗など）は待機をやめ、
+        その結果を次のmonitor_for_shutdownが返す。
+
+        Returns:
+            bool: 期限までに全エージェントの準備ができた場合True
+        """
+        if self.message_bus is None:
+            raise ConnectionError("Message bus is not initialized.")
+        if timeout_sec is None:
+            timeout_sec = self.AGENT_STARTUP_TIMEOUT_SEC
+        deadline = time.monotonic() + timeout_sec
+
+        while not self.are_agents_ready():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                missing = [agent_id for agent_id in self._agent_ids()
+                           if agent_id not in self.ready_agents]
+                print(f"⚠️ Agents not ready after {timeout_sec}s: "
+                      f"{', '.join(missing)}")
+                return False
+            claimed = self.message_bus.wait_for_claim(
+                "SUPERVISOR", timeout=remaining)
+            if claimed is None:
+                continue
+            result = self._dispatch_control_message(claimed.message)
+            self.message_bus.ack(claimed.delivery_id,
+                                 claimed.delivery_count)
+            if result is not None:
+                self._control_result = result
+                return False
+        return True
+
+    def _agent_ids(self) -> List[str]:
+        return [agent_def['id'] for agent_def in self.project_def['agents']]
+
+    def _build_agent_env(self, agent_id: str) -> Dict[str, str]:
+        """エージェントプロセスに渡す環境変数を作成する"""
+        env = os.environ.copy()
+        env['AGENT_ID'] = agent_id
+        # エージェントはスーパーバイザーと同じメッセージDBに接続する
+        if self.message_bus is not None:
+            env['MESSAGE_DB_PATH'] = os.path.abspath(self.message_bus.db_path)
+        # エージェントも同じ性能プロファイルでメッセージバスに接続する
+        env['MESSAGE_BUS_CONFIG'] = json.dumps(
+            broker_options_from_config(self._get_message_bus_config()))
+        env['LLM_CONFIG'] = json.dumps(self.project_def.get('llm', {}))
+        env['RUNTIME_CONFIG'] = json.dumps(self._get_runtime_config())
+        env['TRACING_CONFIG'] = json.dumps(self._get_tracing_config())
+        env['METRICS_CONFIG'] = json.dumps(self._get_metrics_config())
+        env['MODERATOR_CONFIG'] = json.dumps(
+            self.project_def.get('moderator', {}))
+        return env
+
+    def _get_runtime_config(self) -> Dict[str, Any]:
+        """project.ymlのruntimeセクションを取得する"""
+        return self.project_def.get('runtime', {})
+
+    def _get_tracing_config(self) -> Dict[str, Any]:
+        """
+        project.ymlのtracingセクションを取得する
+
+        outputが未指定の場合はメッセージDBと同じディレクトリに出力し、
+        実行ごとに別のトレースファイルになるようにする。
+        """
+        config = dict(self.project_def.get('tracing', {}))
+        if not config.get('enabled'):
+            return config
+        output = config.get('output')
+        if not output:
+            if self.message_bus is None:
+                return config
+            is_chrome = config.get('format', 'jsonl') == "chrome"
+            output = os.path.join(
+                os.path.dirname(self.message_bus.db_path),
+                "trace.json" if is_chrome else "trace.jsonl")
+        config['output'] = os.path.abspath(output)
+        return config
+
+    def _get_supervision_config(self) -> Dict[str, Any]:
+        """project.ymlのsupervisionセクションを取得する"""
+        return self.project_def.get('supervision', {})
+
+    def _get_metrics_config(self) -> Dict[str, Any]:
+        """project.ymlのmetricsセクションを取得する"""
+        return self.project_def.get('metrics', {})
+
+    # ===== Metrics =====
+
+    def start_metrics_server(self) -> None:
+        """metrics.enabledの場合、/metrics エンドポイントを起動する"""
+        config = self._get_metrics_config()
+        if not config.get('enabled') or self.metrics_server is not None:
+            return
+        if self.message_bus is not None:
+            self._metrics_store = metrics.SqliteMetricsStore(
+                self.message_bus.db_path)
+            # HTTPサーバーのスレッドから読むため、専用のプール付き接続を使う
+            self._metrics_broker = SqliteMessageBroker(
+                self.message_bus.db_path, pool_size=1)
+        self.metrics_server = metrics.start_http_server(
+            self.render_metrics, config.get('host', '127.0.0.1'),
+            config.get('port', 9464))
+        host, port = self.metrics_server.server_address[:2]
+        print(f"📈 Metrics available at http://{host}:{port}/metrics")
+
+    def render_metrics(self) -> str:
+        """
+        スーパーバイザーと全エージェントのメトリクスをPrometheus形式で返す
+
+        エージェントの値はmetricsテーブルに一定間隔で加算されたもの、
+        キューの深さはqueue_statsの未読数を使う。
+        """
+        if self._metrics_store is None:
+            return metrics.render()
+        statistics = self._metrics_broker.get_statistics()
+        return metrics.render(
+            extra=self._metrics_store.load(),
+            queue_depth={
+                recipient_id: counts['unread'] for recipient_id, counts
+                in statistics['by_recipient'].items()
+            })
+
+    def stop_metrics_server(self) -> None:
+        """/metrics エンドポイントを停止する"""
+        if self.metrics_server is not None:
+            self.metrics_server.shutdown()
+            self.metrics_server.server_close()
+            self.metrics_server = None
+        if self._metrics_store is not None:
+            self._metrics_store.close()
+            self._metrics_store = None
+            self._metrics_broker.close()
+            self._metrics_broker = None
 
     def are_agents_running(self) -> bool:
-        """エージェントプロセスが実行中かチェックする"""
+        """全エージェントのプロセスが実行中かチェックする"""
         if not self.agent_processes:
             return False
-
-        # 少なくとも1つのプロセスが実行中であればTrue
-        for proc in self.agent_processes:
-            if proc.poll() is None:  # プロセスが実行中
-                return True
-        return False
+        # 1つでも終了していれば、そのエージェント宛のメッセージは処理されない
+        return all(proc.poll() is None for proc in self.agent_processes)
 
     def are_agents_ready(self) -> bool:
-        """エージェントの準備状況を確認する"""
-        return len(self.agent_processes) > 0
+        """全エージェントからAGENT_READYが届いているか確認する"""
+        return all(agent_id in self.ready_agents
+                   for agent_id in self._agent_ids())
+
+    def monitor(self, timeout_sec: Optional[float] = None) -> None:
+        """
+        エージェントプロセスを監視し、異常終了したものを再起動する
 
-    def monitor(self) -> None:
-        """エージェントプロセスを監視する（簡易実装）"""
-        # 実際の監視ロジックは後で実装
-        # 今はテストを通すための最小実装
-        pass
+        stop_monitoringが呼ばれるか、全エージェントが正常終了する
+        （または再起動をあきらめる）まで戻らない。
+
+        Args:
+            timeout_sec: 監視する最大時間（秒）。Noneの場合は無期限
+        """
+        if self.agent_supervisor is None or self.message_bus is None:
+            return
+        deadline = None
+        if timeout_sec is not None:
+            deadline = time.monotonic() + timeout_sec
+        # 監視スレッドから使うため、専用のプール付き接続を使う
+        self._supervision_broker = SqliteMessageBroker(
+            self.message_bus.db_path, pool_size=1)
+        try:
+            while (not self._monitor_stop.is_set()
+                   and self.agent_supervisor.has_active_agents()):
+                wait = self.MONITOR_WAIT_SEC
+                if deadline is not None:
+                    wait = min(wait, deadline - time.monotonic())
+                    if wait <= 0:
+                        break
+                # エージェントの終了・再起動の期限・stop_monitoringで起床する
+                self.agent_supervisor.poll(timeout=wait)
+        finally:
+            self._supervision_broker.close()
+            self._supervision_broker = None
+
+    def start_monitoring(self) -> None:
+        """バックグラウンドスレッドでmonitorを開始する"""
+        if self.agent_supervisor is None or self._monitor_thread is not None:
+            return
+        self._monitor_stop.clear()
+        self._monitor_thread = threading.Thread(
+            target=self.monitor, name="agent-supervision", daemon=True)
+        self._monitor_thread.start()
+
+    def stop_monitoring(self) -> None:
+        """監視を止め、以降はエージェントを再起動しない"""
+        self._monitor_stop.set()
+        if self.agent_supervisor is not None:
+            self.agent_supervisor.stop()
+        if self._monitor_thread is not None:
+            self._monitor_thread.join(timeout=5)
+            if self._monitor_thread.is_alive():
+                # 再起動の途中などで止まらない場合、スレッドはstop()済みの
+                # pollを抜けた時点で終わる
+                print("⚠️ Agent supervision thread did not stop in time")
+            self._monitor_thread = None
+
+    def _restart_agent(self, agent_id: str):
+        """異常終了したエージェントを起動し直す"""
+        proc = self._launch_agent(agent_id)
+        self.agent_processes[self._agent_slots[agent_id]] = proc
+        return proc
+
+    def _replay_unacked(self, agent_id: str) -> int:
+        """異常終了したエージェントが処理中だったメッセージを再配信する"""
+        broker = self._supervision_broker or self.message_bus
+        return broker.release_claims(agent_id)
+
+    def _on_supervision_event(self, event: SupervisionEvent) -> None:
+        """再起動などの監視イベントを記録・通知する"""
+        self.supervision_events.append(event)
+        if event.kind == "exited":
+            # 再起動したプロセスが改めてAGENT_READYを送る
+            self.ready_agents.pop(event.agent_id, None)
+            print(f"💥 {event.agent_id} (PID: {event.pid}) exited with "
+                  f"code {event.returncode}")
+        elif event.kind == "restarted":
+            metrics.AGENT_RESTARTS.inc(agent_id=event.agent_id)
+            print(f"🔁 Restarted {event.agent_id} (PID: {event.pid}), "
+                  f"replayed {event.replayed} unacked message(s)")
+        elif event.kind == "gave_up":
+            print(f"❌ {event.agent_id} exceeded the restart limit")
+            # monitor_for_shutdownを待たせず、失敗として終わらせる
+            broker = self._supervision_broker or self.message_bus
+            broker.post_message(Message(
+                sender_id="SUPERVISOR",
+                recipient_id="SUPERVISOR",
+                message_type="AGENT_FAILED",
+                payload={"agent_id": event.agent_id},
+                turn_id=0
+            ))
 
     def shutdown(self) -> None:
         """全エージェントプロセスを終了させる"""
+        # 終了させたエージェントを再起動しないよう、先に監視を止める
+        self.stop_monitoring()
         for proc in self.agent_processes:
             if proc.poll() is None:  # まだ実行中の場合
                 proc.terminate()
@@ -155,6 +460,19 @@ class Supervisor:
 
         # プロセスリストをクリア
         self.agent_processes.clear()
+        self._agent_slots.clear()
+        self.ready_agents.clear()
+        if self.agent_supervisor is not None:
+            # 監視スレッドがpollを終えるまで待ってから記述子を閉じる
+            if not self.agent_supervisor.close(timeout=5):
+                print("⚠️ Left agent supervision descriptors open: "
+                      "the supervision thread is still polling")
+            self.agent_supervisor = None
+        if self.launcher is not None:
+            self.launcher.close()
+            self.launcher = None
+        self.stop_metrics_server()
+        tracing.shutdown()
 
     # ===== Initial Message Posting Methods =====
 
@@ -302,45 +620,128 @@ class Supervisor:
             },
             turn_id=1
         )
-        self.message_bus.post_message(kickoff_message)
+        # ディベート全体を1つのトレースとしてまとめる起点のスパン
+        with tracing.span("supervisor.kickoff", root=True, topic=topic):
+            tracing.inject(kickoff_message)
+            self.message_bus.post_message(kickoff_message)
         print(
             f"🏁 Scenario kickoff message sent to MODERATOR with topic: '{topic}'")
 
+    def register_control_handler(
+            self, message_type: str,
+            handler: Callable[[Message], Optional[bool]]) -> None:
+        """
+        SUPERVISOR宛の制御メッセージのハンドラを登録する（既存のものは置き換える）
+
+        Args:
+            message_type: 制御メッセージの種類
+            handler: メッセージを受け取り、監視を終える場合はその結果
+                （True/False）を、続ける場合はNoneを返す
+        """
+        self.control_handlers[message_type] = handler
+
     def monitor_for_shutdown(self, timeout_sec: int = 180) -> bool:
         """
-        エージェントからのシャットダウン要求を監視する
+        SUPERVISOR宛の制御メッセージを受信し、ハンドラへ振り分ける
 
-        TDD Green Phase: テストを通す最小限の実装
+        メッセージの書き込みで即座に起床するため、SHUTDOWN_SYSTEMの
+        投函から数ミリ秒で戻る。シャットダウン以外のメッセージも
+        捨てずにハンドラへ渡し、処理を終えてからackする。
 
         Args:
             timeout_sec: タイムアウト時間（秒）
 
         Returns:
-            bool: シャットダウンメッセージを受信した場合True、タイムアウト時False
+            bool: シャットダウンメッセージを受信した場合True、
+                エージェントの失敗またはタイムアウト時False
         """
         if self.message_bus is None:
             raise ConnectionError("Message bus is not initialized.")
 
-        print("\n🗣️  Debate in progress. Monitoring for SHUTDOWN_SYSTEM message...")
-        start_time = time.time()
+        if self._control_result is not None:
+            result, self._control_result = self._control_result, None
+            return result
+
+        print("\n🗣️  Debate in progress. "
+              "Monitoring for SHUTDOWN_SYSTEM message...")
+        deadline = time.monotonic() + timeout_sec
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # SUPERVISOR宛のメッセージが書き込まれると即座に起床する
+            claimed = self.message_bus.wait_for_claim(
+                "SUPERVISOR", timeout=remaining)
+            if claimed is None:
+                continue
+            result = self._dispatch_control_message(claimed.message)
+            self.message_bus.ack(claimed.delivery_id,
+                                 claimed.delivery_count)
+            if result is not None:
+                return result
+
+        print("⏰ TIMEOUT: Shutdown message not received "
+              "within the time limit.")
+        return False
 
-        while time.time() - start_time < timeout_sec:
-            # SUPERVISOR宛のメッセージを確認
-            shutdown_msg = self.message_bus.get_message("SUPERVISOR")
-            if shutdown_msg and shutdown_msg.message_type == "SHUTDOWN_SYSTEM":
-                print(
-                    f"✅ Received SHUTDOWN_SYSTEM from {shutdown_msg.sender_id}. Mission accomplished.")
-                return True
-            time.sleep(5)
+    def _dispatch_control_message(self, message: Message) -> Optional[bool]:
+        """
+        制御メッセージを種類に応じたハンドラへ渡す
 
-        print("⏰ TIMEOUT: Shutdown message not received within the time limit.")
+        Returns:
+            ハンドラの戻り値。True/Falseなら監視をその結果で終え、
+            None（ハンドラがない場合も含む）なら監視を続ける
+        """
+        self.control_messages.append(message)
+        handler = self.control_handlers.get(message.message_type)
+        if handler is None:
+            print(f"⚠️ Unhandled control message {message.message_type} "
+                  f"from {message.sender_id}")
+            return None
+        return handler(message)
+
+    def _handle_agent_ready(self, message: Message) -> None:
+        """AGENT_READY: 準備完了と起動時間を記録する（Noneで監視を続ける）"""
+        self.ready_agents[message.sender_id] = message.payload
+        startup_sec = message.payload.get("startup_sec")
+        if startup_sec is None:
+            print(f"⚡ {message.sender_id} ready")
+            return
+        self.agent_startup_times[message.sender_id] = startup_sec
+        print(f"⚡ {message.sender_id} ready in {startup_sec * 1000:.0f} ms")
+
+    def _handle_shutdown_system(self, message: Message) -> bool:
+        """SHUTDOWN_SYSTEM: Trueを返し、シナリオの成功として監視を終える"""
+        print(f"✅ Received SHUTDOWN_SYSTEM from {message.sender_id}. "
+              f"Mission accomplished.")
+        return True
+
+    def _handle_agent_failed(self, message: Message) -> bool:
+        """AGENT_FAILED: Falseを返し、シナリオの失敗として監視を終える"""
+        # 再起動をあきらめたエージェントがいればタイムアウトを待たない
+        print(f"❌ Agent {message.payload.get('agent_id')} "
+              f"failed. Aborting the scenario.")
         return False
 
+    def _handle_health_report(self, message: Message) -> None:
+        """HEALTH_REPORT: エージェントの状態を記録する（Noneで監視を続ける）"""
+        self.agent_health[message.sender_id] = message.payload
+        status = message.payload.get("status", "unknown")
+        if status != "ok":
+            print(f"🩺 {message.sender_id} health: {status}")
+
+    def _handle_progress_report(self, message: Message) -> None:
+        """PROGRESS_REPORT: 進捗を記録する（Noneで監視を続ける）"""
+        self.agent_progress[message.sender_id] = message.payload
+        print(f"📈 {message.sender_id} progress: {message.payload}")
+
     def run_scenario(self, timeout_sec: int = 180) -> bool:
         """
         完全なシナリオを実行する
 
-        1. エージェントを開始
+        1. エージェントを開始し、全エージェントの準備ができるまで待つ
+           （準備ができなければキックオフせずに終える）
         2. シナリオをキックオフ
         3. シャットダウンメッセージを監視
         4. エージェントを終了
@@ -356,9 +757,17 @@ class Supervisor:
             print("🤖 Starting agent processes...")
             self.start()
             print("✅ All agents launched successfully")
-
-            # エージェントが起動するまで少し待つ
-            time.sleep(5)
+            # 異常終了したエージェントを再起動する
+            self.start_monitoring()
+
+            # 全エージェントがAGENT_READYを送るまで待つ
+            if not self.wait_for_agents_ready():
+                # キックオフしていないシナリオは成功しない。起動中に
+                # ハンドラが記録した結果（SHUTDOWN_SYSTEMのTrueを含む）は捨てる
+                self._control_result = None
+                print("❌ Agents did not become ready. "
+                      "Scenario was not started.")
+                return False
 
             # 2. シナリオをキックオフ
             print("🏁 Starting scenario...")
@@ -0,0 +1,50 @@
+"""
+司会の遷移表をYAMLファイルから読み込む
+
+遷移表の形式はmain.use_cases.services.debate_serviceを参照。
+"""
+
+from typing import Any, Dict, Optional
+
+import yaml
+
+from main.use_cases.services.debate_service import (
+    DebateService, TransitionTable, compile_transitions
+)
+
+# rules: 遷移表で決まる応答はLLMを呼ばずに作成する
+# llm:   すべての応答をLLMで生成する（遷移表を使わない）
+MODERATOR_MODES = ("rules", "llm")
+
+
+def load_transition_table(path: str) -> TransitionTable:
+    """YAMLの遷移表を読み込み、実行用の辞書に変換する"""
+    with open(path, "r", encoding="utf-8") as f:
+        return compile_transitions(yaml.safe_load(f) or {})
+
+
+def create_debate_service_from_config(
+        agent_id: str, config: Dict[str, Any]) -> Optional[DebateService]:
+    """
+    project.ymlのmoderatorセクションからDebateServiceを作成する
+
+    Args:
+        agent_id: 起動するエージェントのID
+        config: moderatorセクション（agent_id, mode, transitions_file）
+
+    Returns:
+        agent_idが司会で、modeがrulesかつ遷移表が指定されている場合は
+        DebateService。それ以外はNone（すべての応答をLLMで生成する）
+
+    Raises:
+        ValueError: modeが不明な場合
+    """
+    mode = config.get("mode", "rules")
+    if mode not in MODERATOR_MODES:
+        raise ValueError(f"Unknown moderator mode: {mode}")
+    if agent_id != config.get("agent_id", "MODERATOR"):
+        return None
+    if mode == "llm" or not config.get("transitions_file"):
+        return None
+    return DebateService(load_transition_table(config["transitions_file"]),
+                         agent_id=agent_id)
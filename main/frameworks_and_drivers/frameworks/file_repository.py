@@ -3,31 +3,108 @@
 IPromptRepositoryインターフェースの具体的な実装
 """
 
+import glob
 import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
 from main.use_cases.interfaces import IPromptRepository
 from main.entities.models import AgentID
 
 
+@dataclass
+class _PersonaEntry:
+    """キャッシュ済みのペルソナと、変更検知用のファイル情報"""
+    persona: str
+    mtime_ns: int
+    size: int
+    checked_at: float
+
+
 class FileBasedPromptRepository(IPromptRepository):
     """ファイルシステムベースのプロンプト・ペルソナ管理"""
 
-    def __init__(self, config_dir: str = None):
+    def __init__(self, config_dir: str = None, check_interval: float = 1.0):
         """
         Args:
             config_dir: 設定ファイルディレクトリのパス。Noneの場合は./config
+            check_interval: キャッシュ済みのペルソナファイルが更新されたか
+                確認する間隔（秒）。0の場合は毎回確認する
         """
         self.config_dir = config_dir or "./config"
+        self.check_interval = check_interval
+        self._cache: dict[str, _PersonaEntry] = {}
+        self._lock = threading.Lock()
 
     def get_persona(self, agent_id: AgentID) -> str:
-        """エージェントのペルソナを取得する"""
-        persona_file = os.path.join(
-            self.config_dir, f"{agent_id.lower()}.md"
-        )
+        """
+        エージェントのペルソナを取得する
+
+        一度読み込んだペルソナはメモリに保持し、ファイルの更新時刻と
+        サイズが変わった場合のみ読み直す。
+        """
+        key = agent_id.lower()
+        entry = self._cache.get(key)
+        now = time.monotonic()
+        if entry is not None and now - entry.checked_at < self.check_interval:
+            return entry.persona
+
+        with self._lock:
+            return self._load(key, now)
+
+    def preload(self, agent_ids: Optional[Iterable[AgentID]] = None
+                ) -> List[str]:
+        """
+        ペルソナを事前に読み込む
+
+        Args:
+            agent_ids: 読み込むエージェントID。Noneの場合は
+                config_dir内のすべての*.mdファイル
 
+        Returns:
+            読み込めたペルソナのキー（小文字のエージェントID）
+        """
+        if agent_ids is None:
+            keys = [
+                os.path.splitext(os.path.basename(path))[0]
+                for path in glob.glob(os.path.join(self.config_dir, "*.md"))
+            ]
+        else:
+            keys = [agent_id.lower() for agent_id in agent_ids]
+
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                self._load(key, now)
+            return sorted(key for key in keys if key in self._cache)
+
+    def _load(self, key: str, now: float) -> str:
+        """ファイルが更新されていれば読み直し、キャッシュを更新する"""
+        persona_file = os.path.join(self.config_dir, f"{key}.md")
         try:
-            with open(persona_file, 'r', encoding='utf-8') as f:
-                return f.read().strip()
-        except FileNotFoundError:
+            stat = os.stat(persona_file)
+        except OSError:
+            self._cache.pop(key, None)
             return ""
+
+        entry = self._cache.get(key)
+        if (entry is not None and entry.mtime_ns == stat.st_mtime_ns
+                and entry.size == stat.st_size):
+            entry.checked_at = now
+            return entry.persona
+
+        try:
+            with open(persona_file, 'r', encoding='utf-8') as f:
+                persona = f.read().strip()
         except Exception:
+            self._cache.pop(key, None)
             return ""
+
+        self._cache[key] = _PersonaEntry(
+            persona=persona,
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            checked_at=now
+        )
+        return persona
@@ -3,34 +3,70 @@ Geminiサービスの実装（リファクタリング版）
 ILLMServiceインターフェースの具体的な実装
 """
 
+import asyncio
 import subprocess
 import json
 import logging
-from typing import Optional, Dict, Any
+import time
+from typing import Optional, Dict, Any, List
 
 from main.use_cases.interfaces.interfaces import ILLMService
 from main.frameworks_and_drivers.frameworks.prompt_injector_service import (
     PromptInjectorService
 )
+from main.frameworks_and_drivers.frameworks.llm_worker_pool import (
+    LLMWorkerError, LLMWorkerPool
+)
+from main.frameworks_and_drivers.frameworks.llm_response_cache import (
+    LLMResponseCache
+)
+from main.frameworks_and_drivers.frameworks import metrics, tracing
 from main.entities.models import Message
 
 
+def build_gemini_command(prompt: str, model: Optional[str] = None,
+                         mcp_server_name: Optional[str] = None) -> List[str]:
+    """gemini-cliを1回実行するコマンドリストを構築する"""
+    command = ["gemini"]
+
+    # --allowed-mcp-server-names: MCPサーバー名を指定
+    if mcp_server_name:
+        command.extend(["--allowed-mcp-server-names", mcp_server_name])
+
+    # -m, --model: 使用するモデルを指定 (コマンドライン引数)
+    if model:
+        command.extend(["-m", model])
+
+    # -p, --prompt: プロンプトを指定
+    command.extend(["-p", prompt])
+
+    return command
+
+
 class GeminiService(ILLMService):
     """Gemini APIを使ったLLMサービス（プロンプトインジェクター統合版）"""
 
     def __init__(self,
                  prompt_injector: PromptInjectorService = None,
                  timeout: int = 90,
-                 mcp_server_name: Optional[str] = None):
+                 mcp_server_name: Optional[str] = None,
+                 worker_pool: Optional[LLMWorkerPool] = None,
+                 response_cache: Optional[LLMResponseCache] = None):
         """
         Args:
             prompt_injector: プロンプト構築サービス
             timeout: API呼び出しのタイムアウト時間（秒）
             mcp_server_name: 接続するMCPサーバー名
+            worker_pool: 常駐ワーカープール。指定時は呼び出しごとに
+                CLIプロセスを起動せず、プールへリクエストを送る
+            response_cache: LLM応答キャッシュ。指定時は同一の入力に対して
+                CLIを呼び出さずにキャッシュ済みの応答を返す
         """
         self.prompt_injector = prompt_injector
         self.timeout = timeout
         self.mcp_server_name = mcp_server_name
+        self.worker_pool = worker_pool
+        self.response_cache = response_cache
         logging.basicConfig(
             level=logging.INFO,
             format='%(asctime)s - GeminiService - %(levelname)s - %(message)s'
@@ -42,7 +78,8 @@ class GeminiService(ILLMService):
         prompt = self.prompt_injector.build_prompt(agent_id, context)
 
         # 2. Gemini CLIを呼び出す（ハードコーディングされたロジックは削除）
-        response_text = self._call_gemini_cli(prompt)
+        response_text = self._cached_call(
+            prompt, None, None, lambda: self._call_gemini_cli(prompt))
 
         # 3. 応答テキストをパースしてMessageオブジェクトを返す
         # レガシー互換性のために、必ずMessageオブジェクトを返す
@@ -77,15 +114,189 @@ class GeminiService(ILLMService):
         Returns:
             LLMが生成したMessageオブジェクト。パース失敗時はNone。
         """
+        response_text = self._run_cli(
+            agent_id, context, model, generation_config)
+        if response_text is None:
+            return None
+
+        # 応答テキストをパースしてMessageオブジェクトを返す
+        return self._parse_response(response_text)
+
+    def generate_structured_responses(
+        self,
+        agent_id: str,
+        context: Message,
+        generation_config: Optional[Dict[str, Any]] = None,
+        model: Optional[str] = None
+    ) -> List[Message]:
+        """
+        1回のCLI呼び出しの応答から、複数のMessageオブジェクトを生成する。
+
+        応答がJSON配列、または"messages"キーを持つJSONオブジェクトの場合は
+        含まれるすべてのメッセージを返す。単一のJSONオブジェクトも受け付ける。
+
+        Returns:
+            LLMが生成したMessageのリスト。失敗時は空リスト。
+        """
+        response_text = self._run_cli(
+            agent_id, context, model, generation_config)
+        if response_text is None:
+            return []
+        return self._parse_responses(response_text)
+
+    def _run_cli(self, agent_id: str, context: Message,
+                 model: Optional[str],
+                 generation_config: Optional[Dict[str, Any]] = None
+                 ) -> Optional[str]:
+        """プロンプトを構築してGemini CLIを実行し、標準出力を返す"""
         # 1. プロンプトインジェクターにプロンプトの構築を依頼
         prompt = self.prompt_injector.build_prompt(agent_id, context)
 
+        return self._cached_call(
+            prompt, model, generation_config,
+            lambda: self._execute_cli_traced(prompt, model))
+
+    def _execute_cli_traced(self, prompt: str,
+                            model: Optional[str]) -> Optional[str]:
+        """_execute_cliの実行時間をスパンとメトリクスに記録する"""
+        with tracing.span("llm.cli", model=model,
+                          worker_pool=self.worker_pool is not None,
+                          prompt_chars=len(prompt)) as span:
+            started = time.perf_counter()
+            response_text = self._execute_cli(prompt, model)
+            self._record_call(span, model, started, response_text)
+            return response_text
+
+    @staticmethod
+    def _record_call(span, model: Optional[str], started: float,
+                     response_text: Optional[str]) -> None:
+        """CLI呼び出しの結果と所要時間を記録する"""
+        ok = response_text is not None
+        span.set_attribute("ok", ok)
+        metrics.LLM_CALL_DURATION.observe(
+            time.perf_counter() - started, model=model or "default",
+            ok=str(ok).lower())
+
+    def _cached_call(self, prompt: str, model: Optional[str],
+                     generation_config: Optional[Dict[str, Any]],
+                     call) -> Optional[str]:
+        """
+        応答キャッシュを確認し、未登録の場合のみcallでCLIを呼び出す
+
+        失敗した応答（Noneまたは"Error:"で始まるテキスト）は保存しない。
+        """
+        key, cached = self._cache_lookup(prompt, model, generation_config)
+        if cached is not None:
+            return cached
+
+        response_text = call()
+        self._cache_store(key, response_text)
+        return response_text
+
+    def _cache_lookup(self, prompt: str, model: Optional[str],
+                      generation_config: Optional[Dict[str, Any]]
+                      ) -> tuple[Optional[str], Optional[str]]:
+        """キャッシュキーとキャッシュ済みの応答を返す。キャッシュ無効時は両方None"""
+        if self.response_cache is None:
+            return None, None
+        key = LLMResponseCache.make_key(
+            model, prompt, generation_config, self.mcp_server_name)
+        return key, self.response_cache.get(key)
+
+    def _cache_store(self, key: Optional[str],
+                     response_text: Optional[str]) -> None:
+        """成功した応答をキャッシュに保存する"""
+        if key is None or response_text is None:
+            return
+        if not response_text.startswith("Error:"):
+            self.response_cache.put(key, response_text)
+
+    async def generate_structured_responses_async(
+        self,
+        agent_id: str,
+        context: Message,
+        generation_config: Optional[Dict[str, Any]] = None,
+        model: Optional[str] = None
+    ) -> List[Message]:
+        """
+        generate_structured_responsesの非同期版
+
+        CLIを非同期サブプロセスとして起動するため、応答待ちの間も
+        同じイベントループ上の他のエージェントが処理を進められる。
+        """
+        prompt = self.prompt_injector.build_prompt(agent_id, context)
+        key, response_text = self._cache_lookup(
+            prompt, model, generation_config)
+        if response_text is None:
+            with tracing.span("llm.cli", model=model,
+                              worker_pool=self.worker_pool is not None,
+                              prompt_chars=len(prompt)) as span:
+                started = time.perf_counter()
+                response_text = await self._execute_cli_async(prompt, model)
+                self._record_call(span, model, started, response_text)
+            self._cache_store(key, response_text)
+        if response_text is None:
+            return []
+        return self._parse_responses(response_text)
+
+    async def _execute_cli_async(self, prompt: str,
+                                 model: Optional[str]) -> Optional[str]:
+        """_execute_cliの非同期版"""
+        if self.worker_pool:
+            # ワーカープールは同期APIのため、スレッドで待機する
+            return await asyncio.to_thread(self._execute_cli, prompt, model)
+
+        command = self._build_command(prompt, model)
+        try:
+            logging.info(f"Executing command: {' '.join(command)}")
+            metrics.SUBPROCESS_SPAWNS.inc(kind="llm_cli")
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            try:
+                stdout, stderr = await asyncio.wait_for(
+                    process.communicate(), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                logging.error(
+                    "Gemini CLI timed out after %s seconds", self.timeout)
+                return None
+
+            if process.returncode != 0:
+                logging.error("Gemini CLI execution failed.")
+                logging.error("Return Code: %s", process.returncode)
+                logging.error("Stderr: %s", stderr.decode('utf-8', 'replace'))
+                return None
+            return stdout.decode('utf-8')
+
+        except Exception as e:
+            logging.error(
+                "An unexpected error occurred in GeminiService: %s", e
+            )
+            return None
+
+    def _execute_cli(self, prompt: str,
+                     model: Optional[str]) -> Optional[str]:
+        """構築済みのプロンプトでGemini CLIを実行し、標準出力を返す"""
+        # 常駐ワーカープールが利用可能な場合はプロセスを起動しない
+        if self.worker_pool:
+            try:
+                return self.worker_pool.generate(
+                    prompt, model, mcp_server_name=self.mcp_server_name)
+            except LLMWorkerError as e:
+                logging.error("LLM worker pool request failed: %s", e)
+                return None
+
         # 2. Gemini CLIのコマンドを動的に構築
         command = self._build_command(prompt, model)
 
         try:
             # 3. サブプロセスとしてGemini CLIを実行
             logging.info(f"Executing command: {' '.join(command)}")
+            metrics.SUBPROCESS_SPAWNS.inc(kind="llm_cli")
             process = subprocess.run(
                 command,
                 capture_output=True,
@@ -93,9 +304,7 @@ class GeminiService(ILLMService):
                 check=True,  # エラー時に例外を発生させる
                 encoding='utf-8'  # 文字化け防止
             )
-
-            # 4. 応答テキストをパースしてMessageオブジェクトを返す
-            return self._parse_response(process.stdout)
+            return process.stdout
 
         except subprocess.CalledProcessError as e:
             logging.error("Gemini CLI execution failed.")
@@ -114,26 +323,17 @@ class GeminiService(ILLMService):
         レポートで詳述されている設定オプションを基に、
         gemini-cliのコマンドリストを構築する。
         """
-        command = ["gemini"]
-
-        # --allowed-mcp-server-names: MCPサーバー名を指定
-        if self.mcp_server_name:
-            command.extend([
-                "--allowed-mcp-server-names",
-                self.mcp_server_name
-            ])
-
-        # -m, --model: 使用するモデルを指定 (コマンドライン引数)
-        if model:
-            command.extend(["-m", model])
-
-        # -p, --prompt: プロンプトを指定
-        command.extend(["-p", prompt])
-
-        return command
+        return build_gemini_command(prompt, model, self.mcp_server_name)
 
     def _call_gemini_cli(self, prompt: str) -> str:
         """Gemini CLIを呼び出して応答を取得"""
+        if self.worker_pool:
+            try:
+                return self.worker_pool.generate(
+                    prompt, mcp_server_name=self.mcp_server_name).strip()
+            except LLMWorkerError as e:
+                return f"Error: {str(e)}"
+
         try:
             # gemini-cliコマンドを実行
             result = subprocess.run(
@@ -170,20 +370,7 @@ class GeminiService(ILLMService):
             if json_start != -1 and json_end != -1:
                 json_str = response_text[json_start:json_end+1]
                 response_dict = json.loads(json_str)
-
-                # payloadが文字列化されている場合があるため、再度パースを試みる
-                if isinstance(response_dict.get("payload"), str):
-                    try:
-                        response_dict["payload"] = json.loads(
-                            response_dict["payload"]
-                        )
-                    except json.JSONDecodeError:
-                        logging.warning(
-                            "Payload was a string but not valid JSON. "
-                            "Keeping as is."
-                        )
-
-                return Message(**response_dict)
+                return self._message_from_dict(response_dict)
             else:
                 logging.error(
                     "No JSON object found in response: %s", response_text
@@ -201,6 +388,60 @@ class GeminiService(ILLMService):
                 )
             return None
 
+    def _parse_responses(self, response_text: str) -> List[Message]:
+        """
+        応答テキストから複数のMessageオブジェクトを抽出する
+
+        JSON配列、"messages"キーを持つJSONオブジェクト、
+        単一のJSONオブジェクトのいずれにも対応する。
+        """
+        items = None
+        array_start = response_text.find('[')
+        object_start = response_text.find('{')
+        if array_start != -1 and (object_start == -1
+                                  or array_start < object_start):
+            array_end = response_text.rfind(']')
+            try:
+                items = json.loads(response_text[array_start:array_end+1])
+            except json.JSONDecodeError as e:
+                # "[MODERATOR] {...}" のような前置きの括弧は配列ではない
+                logging.error(f"Failed to parse JSON array from response: {e}")
+                if object_start == -1:
+                    return []
+        if not isinstance(items, list):
+            json_end = response_text.rfind('}')
+            try:
+                response_dict = json.loads(
+                    response_text[object_start:json_end+1])
+            except json.JSONDecodeError:
+                message = self._parse_response(response_text)
+                return [message] if message else []
+            items = response_dict.get("messages", [response_dict])
+
+        messages = []
+        for item in items:
+            try:
+                messages.append(self._message_from_dict(item))
+            except (TypeError, AttributeError) as e:
+                logging.error(f"Skipping invalid message in response: {e}")
+        return messages
+
+    def _message_from_dict(self, response_dict: Dict[str, Any]) -> Message:
+        """パース済みのJSONオブジェクトからMessageオブジェクトを作成"""
+        # payloadが文字列化されている場合があるため、再度パースを試みる
+        if isinstance(response_dict.get("payload"), str):
+            try:
+                response_dict["payload"] = json.loads(
+                    response_dict["payload"]
+                )
+            except json.JSONDecodeError:
+                logging.warning(
+                    "Payload was a string but not valid JSON. "
+                    "Keeping as is."
+                )
+
+        return Message(**response_dict)
+
     def _legacy_parse_fallback(self, response_text: str, sender_id: str,
                                original_context: Message) -> Message:
         """レガシー互換性のためのフォールバック処理"""
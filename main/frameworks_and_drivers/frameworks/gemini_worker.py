@@ -0,0 +1,90 @@
+"""
+llm_worker_poolのプロトコルの参照実装（gemini-cliへの橋渡し）
+
+標準入力から1行1JSONのリクエスト（llm_worker_poolのプロトコル）を読み、
+generateリクエストごとにgemini-cliを実行して標準出力を返す。
+gemini-cliには常駐モードがないため、CLIの起動コストは省けない
+（省けるのはこのワーカーのPythonの起動だけ）。プールの動作確認や
+同時実行数の制限に使い、起動コストを省く場合はCLIやAPIのセッションを
+保持するワーカーをllm.worker_pool.commandで指定する。
+
+起動方法:
+    python -m main.frameworks_and_drivers.frameworks.gemini_worker
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from typing import Any, Callable, Dict, Optional, TextIO
+
+from main.frameworks_and_drivers.frameworks.gemini_service import (
+    build_gemini_command
+)
+
+
+def handle_request(request: Dict[str, Any], timeout: Optional[float] = None,
+                   run: Optional[Callable[..., Any]] = None
+                   ) -> Dict[str, Any]:
+    """
+    1件のリクエストを処理し、応答を返す
+
+    Args:
+        request: {"id", "type", "prompt", "model", "mcp_server_name"}
+        timeout: gemini-cliの最大実行時間（秒）
+        run: コマンドを実行する関数（subprocess.run互換）。
+            Noneの場合はsubprocess.run
+    """
+    request_id = request.get("id")
+    if request.get("type") == "ping":
+        return {"id": request_id, "type": "pong"}
+    if request.get("type") != "generate":
+        return {"id": request_id,
+                "error": f"Unknown request type: {request.get('type')}"}
+
+    command = build_gemini_command(request["prompt"], request.get("model"),
+                                   request.get("mcp_server_name"))
+    try:
+        result = (run or subprocess.run)(
+            command, capture_output=True, text=True, encoding="utf-8",
+            timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"id": request_id,
+                "error": f"Gemini CLI timed out after {timeout} seconds"}
+    except OSError as e:
+        return {"id": request_id, "error": f"Failed to run Gemini CLI: {e}"}
+    if result.returncode != 0:
+        return {"id": request_id,
+                "error": f"Gemini CLI exited with {result.returncode}: "
+                         f"{result.stderr.strip()}"}
+    return {"id": request_id, "output": result.stdout}
+
+
+def serve(stdin: TextIO, stdout: TextIO,
+          timeout: Optional[float] = None) -> None:
+    """標準入力が閉じられるまでリクエストを処理する"""
+    for line in stdin:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            response = {"id": None, "error": f"Invalid request: {e}"}
+        else:
+            response = handle_request(request, timeout)
+        stdout.write(json.dumps(response, ensure_ascii=False) + "\n")
+        stdout.flush()
+
+
+def main():
+    """ワーカーのメイン関数"""
+    parser = argparse.ArgumentParser(
+        description="gemini-cli worker for the LLM worker pool")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="gemini-cliの最大実行時間（秒）")
+    args = parser.parse_args()
+    serve(sys.stdin, sys.stdout, args.timeout)
+
+
+if __name__ == "__main__":
+    main()
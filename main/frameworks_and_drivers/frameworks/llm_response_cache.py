@@ -0,0 +1,274 @@
+"""
+コンテンツアドレス型のLLM応答キャッシュ
+
+(モデル, プロンプト, 生成設定, MCPサーバー名) のハッシュをキーにCLIの出力を
+保存し、シナリオの再生やテストの再実行、同一トランスクリプトに対する判定で
+同じプロンプトを再びCLIへ送らないようにする。
+
+メモリ上のLRUと、プロセスをまたいで共有できるSQLiteの2層構成。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from main.frameworks_and_drivers.frameworks import metrics
+from main.frameworks_and_drivers.frameworks.sqlite_connection_pool import (
+    PragmaValue, open_connection, resolve_pragmas
+)
+
+
+class LLMResponseCache:
+    """メモリLRUとSQLiteの2層からなるLLM応答キャッシュ"""
+
+    def __init__(self, db_path: Optional[str] = None,
+                 max_memory_entries: int = 256,
+                 max_disk_entries: int = 10000,
+                 ttl_sec: Optional[float] = None,
+                 profile: Optional[str] = None,
+                 pragmas: Optional[Dict[str, PragmaValue]] = None,
+                 recount_interval: int = 100):
+        """
+        Args:
+            db_path: ディスク層のSQLiteファイルのパス。Noneの場合はメモリ層のみ
+            max_memory_entries: メモリ層に保持する最大件数
+            max_disk_entries: ディスク層に保持する最大件数
+            ttl_sec: エントリの有効期間（秒）。Noneの場合は無期限
+            profile: ディスク層のSQLite性能プロファイル（performance/durable）
+            pragmas: プロファイルの値を個別に上書きするPRAGMA設定
+            recount_interval: この回数のputごとにディスク層の件数を数え直し、
+                期限切れのエントリを削除する（他のプロセスの書き込みを反映する）
+        """
+        self.db_path = db_path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_sec = ttl_sec
+        self.recount_interval = max(1, recount_interval)
+        self._memory: "OrderedDict[str, tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        # ディスク層の件数の概算。putごとに加算し、定期的に数え直す
+        self._disk_entries = 0
+        self._puts_since_recount = 0
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "errors": 0,
+        }
+        if db_path:
+            self._open_disk_tier(resolve_pragmas(profile, pragmas))
+
+    def _open_disk_tier(self, pragmas: Dict[str, PragmaValue]) -> None:
+        """ディスク層のテーブルを用意する"""
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # 全エージェントプロセスで共有するため、ロック待ちはbusy_timeoutで吸収する
+        self._connection = open_connection(
+            self.db_path, pragmas, check_same_thread=False)
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._connection.execute("""
+            CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access
+            ON llm_cache (last_access)
+        """)
+        self._connection.commit()
+        self._disk_entries = self._count_disk_entries()
+
+    @staticmethod
+    def make_key(model: Optional[str], prompt: str,
+                 generation_config: Optional[Dict[str, Any]] = None,
+                 mcp_server_name: Optional[str] = None) -> str:
+        """応答を一意に決める入力からキャッシュキーを作成する"""
+        material = json.dumps(
+            [model, prompt, generation_config or {}, mcp_server_name],
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """キャッシュ済みの応答を取得する。存在しないか期限切れの場合None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, created_at = entry
+                if not self._is_expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    metrics.LLM_CACHE_LOOKUPS.inc(result="memory_hit")
+                    return response
+                del self._memory[key]
+
+            if self._connection is not None:
+                row = self._get_from_disk(key, now)
+                if row is not None:
+                    self._remember(key, row[0], row[1])
+                    self.stats["disk_hits"] += 1
+                    metrics.LLM_CACHE_LOOKUPS.inc(result="disk_hit")
+                    return row[0]
+
+            self.stats["misses"] += 1
+            metrics.LLM_CACHE_LOOKUPS.inc(result="miss")
+            return None
+
+    def _get_from_disk(self, key: str, now: float) -> Optional[tuple]:
+        """
+        ディスク層から (応答, 作成時刻) を取得する
+
+        ロック待ちのタイムアウトなどの読み書きエラーはミスとして扱う。
+        """
+        try:
+            row = self._connection.execute(
+                "SELECT response, created_at FROM llm_cache WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if not row or self._is_expired(row[1], now):
+                return None
+            self._connection.execute(
+                "UPDATE llm_cache SET last_access = ? WHERE key = ?",
+                (now, key)
+            )
+            self._connection.commit()
+            return row
+        except sqlite3.Error as e:
+            self._disk_error("read", e)
+            return None
+
+    def put(self, key: str, response: str) -> None:
+        """
+        応答をキャッシュに保存する
+
+        ディスク層への書き込みに失敗した場合もメモリ層には保存する。
+        """
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now)
+            if self._connection is None:
+                return
+            try:
+                replaced = self._connection.execute(
+                    "SELECT 1 FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                self._connection.execute(
+                    """INSERT OR REPLACE INTO llm_cache
+                       (key, response, created_at, last_access)
+                       VALUES (?, ?, ?, ?)""",
+                    (key, response, now, now)
+                )
+                if not replaced:
+                    self._disk_entries += 1
+                self._evict_disk(now)
+                self._connection.commit()
+            except sqlite3.Error as e:
+                self._disk_error("write", e)
+
+    def _disk_error(self, operation: str, error: sqlite3.Error) -> None:
+        """ディスク層のエラーを記録し、未確定の書き込みを取り消す"""
+        self.stats["errors"] += 1
+        logging.warning("LLM response cache %s failed: %s", operation, error)
+        try:
+            self._connection.rollback()
+        except sqlite3.Error:
+            pass
+
+    def _count_disk_entries(self) -> int:
+        """ディスク層の件数を数える（全件を走査する）"""
+        return self._connection.execute(
+            "SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def _remember(self, key: str, response: str, created_at: float) -> None:
+        """メモリ層に保存し、上限を超えた古いエントリを追い出す"""
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _evict_disk(self, now: float) -> None:
+        """
+        ディスク層から期限切れと上限超過のエントリを削除する
+
+        件数は書き込みのたびには数えず、概算が上限を超えた場合に
+        超過分だけを削除する。全件を走査する件数の数え直しと期限切れの削除は
+        recount_interval回のputごとに行う。
+        """
+        self._puts_since_recount += 1
+        if self._puts_since_recount >= self.recount_interval:
+            self._puts_since_recount = 0
+            if self.ttl_sec is not None:
+                cursor = self._connection.execute(
+                    "DELETE FROM llm_cache WHERE created_at <= ?",
+                    (now - self.ttl_sec,)
+                )
+                self.stats["evictions"] += max(cursor.rowcount, 0)
+            self._disk_entries = self._count_disk_entries()
+
+        excess = self._disk_entries - self.max_disk_entries
+        if excess > 0:
+            # 最後に参照されてから最も時間が経ったものから削除する
+            self._connection.execute("""
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache
+                    ORDER BY last_access
+                    LIMIT ?
+                )
+            """, (excess,))
+            self._disk_entries -= excess
+            self.stats["evictions"] += excess
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        """エントリが有効期間を過ぎているかチェックする"""
+        return self.ttl_sec is not None and now - created_at >= self.ttl_sec
+
+    def hit_rate(self) -> float:
+        """これまでの参照に対するヒット率"""
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    def close(self) -> None:
+        """ディスク層の接続を閉じる"""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+def create_response_cache_from_config(
+        config: Dict[str, Any]) -> Optional[LLMResponseCache]:
+    """
+    llm.response_cache設定から応答キャッシュを作成する
+
+    Args:
+        config: project.ymlのllmセクション
+
+    Returns:
+        有効化されている場合はLLMResponseCache、それ以外はNone
+    """
+    cache_config = config.get("response_cache", {})
+    if not cache_config.get("enabled", False):
+        return None
+    return LLMResponseCache(
+        db_path=cache_config.get("db_path"),
+        max_memory_entries=cache_config.get("max_memory_entries", 256),
+        max_disk_entries=cache_config.get("max_disk_entries", 10000),
+        ttl_sec=cache_config.get("ttl_sec"),
+        profile=cache_config.get("profile"),
+        pragmas=cache_config.get("pragmas"),
+        recount_interval=cache_config.get("recount_interval", 100)
+    )
@@ -0,0 +1,59 @@
+"""
+llm設定からLLMサービスを作成する
+
+エージェントプロセスと非同期ランタイムが同じ手順でLLMサービスを用意する。
+"""
+
+from typing import Any, Dict, Optional
+
+from main.use_cases.interfaces.interfaces import ILLMService
+
+
+def create_llm_service_from_config(
+        config: Dict[str, Any],
+        prompt_injector: Optional[Any] = None) -> ILLMService:
+    """
+    llm設定からLLMサービスを作成する
+
+    使わないプロバイダーのモジュールは読み込まない。
+    provider: simulated 以外でllm.simulated.recording_fileが指定されている
+    場合は、実際の応答をそのファイルに記録する（simulatedで再生できる）。
+
+    Args:
+        config: project.ymlのllmセクション
+        prompt_injector: GeminiServiceが使うプロンプト構築サービス。
+            Noneの場合は新しく作成する
+
+    Returns:
+        provider: simulated の場合はSimulatedLLMService、
+        それ以外は常駐ワーカープールと応答キャッシュを設定したGeminiService
+        （記録する場合はRecordingLLMServiceで包む）
+    """
+    if config.get("provider") == "simulated":
+        # 負荷試験用: CLIを呼ばずにスクリプト済みの応答を返す
+        from main.frameworks_and_drivers.frameworks import (
+            simulated_llm_service
+        )
+        return simulated_llm_service.create_simulated_llm_service_from_config(
+            config)
+
+    from main.frameworks_and_drivers.frameworks import (
+        gemini_service, llm_response_cache, llm_worker_pool,
+        prompt_injector_service
+    )
+    if prompt_injector is None:
+        prompt_injector = prompt_injector_service.PromptInjectorService()
+    service = gemini_service.GeminiService(
+        prompt_injector=prompt_injector,
+        worker_pool=llm_worker_pool.create_worker_pool_from_config(config),
+        response_cache=llm_response_cache.create_response_cache_from_config(
+            config)
+    )
+    recording_file = config.get("simulated", {}).get("recording_file")
+    if recording_file:
+        from main.frameworks_and_drivers.frameworks import (
+            simulated_llm_service
+        )
+        return simulated_llm_service.RecordingLLMService(
+            service, recording_file)
+    return service
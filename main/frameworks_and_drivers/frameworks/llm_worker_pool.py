@@ -0,0 +1,306 @@
+"""
+常駐型LLMワーカープール
+
+呼び出しごとにCLIプロセスを起動する代わりに、常駐するワーカープロセスへ
+標準入出力経由でリクエストを送り、起動・認証・MCPハンドシェイクのコストを
+ワーカーの生存期間全体で償却する。
+
+ワーカーは1行1JSONのプロトコルを話す任意のコマンド:
+    リクエスト: {"id": 1, "type": "generate", "prompt": "...",
+                 "model": null, "mcp_server_name": null}
+    応答:       {"id": 1, "output": "..."} または {"id": 1, "error": "..."}
+    死活監視:   {"id": 2, "type": "ping"} → {"id": 2, "type": "pong"}
+
+outputはgemini-cliの標準出力と同じテキストを返す。idは要求と同じ値を返し、
+idの一致しない行は読み捨てられる。標準エラー出力は破棄される。
+
+CLIの起動コストが省けるのは、ワーカー自身がCLIやAPIのセッションを
+保持する場合だけである。同梱のgemini_worker（GEMINI_CLI_WORKER_COMMAND）は
+プロトコルの参照実装で、リクエストごとにgemini-cliを実行するため
+CLIの起動コストは残る。そのためプールは既定で無効で、有効にする場合は
+llm.worker_pool.commandでワーカーを明示する。
+"""
+
+import json
+import logging
+import queue
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from main.frameworks_and_drivers.frameworks import metrics
+
+# 同梱のワーカー（リクエストごとにgemini-cliを実行するプロトコルの参照実装）
+GEMINI_CLI_WORKER_COMMAND = [
+    sys.executable, "-m",
+    "main.frameworks_and_drivers.frameworks.gemini_worker"
+]
+
+
+class LLMWorkerError(Exception):
+    """ワーカーとの通信に失敗した場合の例外"""
+    pass
+
+
+class LLMWorker:
+    """標準入出力でJSON行プロトコルを話す常駐ワーカープロセス"""
+
+    def __init__(self, command: List[str],
+                 env: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            command: ワーカーを起動するコマンド
+            env: ワーカープロセスの環境変数
+
+        Raises:
+            LLMWorkerError: コマンドが存在しない、実行できない場合
+        """
+        metrics.SUBPROCESS_SPAWNS.inc(kind="llm_worker")
+        try:
+            self.process = subprocess.Popen(
+                command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                encoding='utf-8',
+                bufsize=1,
+                env=env
+            )
+        except (OSError, ValueError) as e:
+            raise LLMWorkerError(
+                f"Failed to start worker {command}: {e}") from e
+        self.requests_served = 0
+        self.last_used = time.monotonic()
+        self._next_id = 0
+        # タイムアウト付きで応答を待つため、別スレッドで標準出力を読む
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._reader = threading.Thread(target=self._read_stdout, daemon=True)
+        self._reader.start()
+
+    def _read_stdout(self) -> None:
+        """ワーカーの標準出力を1行ずつキューに積む"""
+        for line in self.process.stdout:
+            self._lines.put(line)
+        self._lines.put(None)  # EOF
+
+    def is_alive(self) -> bool:
+        """ワーカープロセスが実行中かチェックする"""
+        return self.process.poll() is None
+
+    def request(self, payload: Dict[str, Any],
+                timeout: Optional[float]) -> Dict[str, Any]:
+        """
+        リクエストを送信し、対応する応答を待つ
+
+        Raises:
+            LLMWorkerError: 送信失敗、タイムアウト、ワーカー終了の場合
+        """
+        self._next_id += 1
+        request_id = self._next_id
+        try:
+            self.process.stdin.write(
+                json.dumps({"id": request_id, **payload}) + "\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError) as e:
+            raise LLMWorkerError(f"Failed to send request: {e}") from e
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = (None if deadline is None
+                         else max(0.0, deadline - time.monotonic()))
+            try:
+                line = self._lines.get(timeout=remaining)
+            except queue.Empty:
+                raise LLMWorkerError(
+                    f"Worker did not respond within {timeout} seconds"
+                ) from None
+            if line is None:
+                raise LLMWorkerError("Worker exited unexpectedly")
+
+            try:
+                response = json.loads(line)
+            except json.JSONDecodeError:
+                logging.warning("Ignoring non-JSON worker output: %s", line)
+                continue
+            # タイムアウトした過去のリクエストへの応答は読み捨てる
+            if response.get("id") == request_id:
+                self.last_used = time.monotonic()
+                return response
+
+    def ping(self, timeout: float) -> bool:
+        """ワーカーが応答可能か確認する"""
+        try:
+            response = self.request({"type": "ping"}, timeout)
+        except LLMWorkerError:
+            return False
+        return response.get("type") == "pong"
+
+    def close(self) -> None:
+        """ワーカープロセスを終了させる"""
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        if self.is_alive():
+            self.process.terminate()
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+class LLMWorkerPool:
+    """同時実行数を制限した常駐LLMワーカーのプール"""
+
+    def __init__(self, command: List[str], size: int = 2,
+                 max_requests_per_worker: int = 100,
+                 request_timeout: Optional[float] = 90,
+                 health_check_interval: float = 30.0,
+                 env: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            command: ワーカーを起動するコマンド
+            size: 同時に稼働するワーカー数の上限
+            max_requests_per_worker: この回数処理したワーカーは入れ替える
+            request_timeout: 1リクエストの最大待機時間（秒）
+            health_check_interval: これ以上アイドルだったワーカーは
+                貸し出し前にpingで死活確認する（秒）
+            env: ワーカープロセスの環境変数
+        """
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.command = command
+        self.size = size
+        self.max_requests_per_worker = max_requests_per_worker
+        self.request_timeout = request_timeout
+        self.health_check_interval = health_check_interval
+        self.env = env
+        self._idle: "queue.LifoQueue[LLMWorker]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = False
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "requests": 0,
+            "workers_started": 0,
+            "workers_recycled": 0,
+            "health_check_failures": 0,
+        }
+
+    def generate(self, prompt: str, model: Optional[str] = None,
+                 mcp_server_name: Optional[str] = None) -> str:
+        """
+        プロンプトをワーカーに送り、CLIの出力テキストを返す
+
+        Args:
+            prompt: プロンプト
+            model: 使用するモデル。Noneの場合はワーカーの既定値
+            mcp_server_name: 接続を許可するMCPサーバー名
+
+        Raises:
+            LLMWorkerError: ワーカーがエラーを返した、または通信に失敗した場合
+        """
+        if self._closed:
+            raise LLMWorkerError("Worker pool is closed")
+
+        with self._slots:
+            worker = self._acquire()
+            healthy = False
+            try:
+                response = worker.request(
+                    {"type": "generate", "prompt": prompt, "model": model,
+                     "mcp_server_name": mcp_server_name},
+                    self.request_timeout
+                )
+                healthy = True
+            finally:
+                self._release(worker, healthy)
+
+        self._count("requests")
+        if "error" in response:
+            raise LLMWorkerError(response["error"])
+        return response.get("output", "")
+
+    def _count(self, key: str) -> None:
+        """統計カウンタを加算する"""
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _acquire(self) -> LLMWorker:
+        """アイドルのワーカーを取得する。なければ新しく起動する"""
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if self._is_healthy(worker):
+                return worker
+            self._count("health_check_failures")
+            worker.close()
+
+        self._count("workers_started")
+        return LLMWorker(self.command, env=self.env)
+
+    def _is_healthy(self, worker: LLMWorker) -> bool:
+        """ワーカーが利用可能か確認する"""
+        if not worker.is_alive():
+            return False
+        idle_for = time.monotonic() - worker.last_used
+        if idle_for < self.health_check_interval:
+            return True
+        return worker.ping(timeout=min(5.0, self.request_timeout or 5.0))
+
+    def _release(self, worker: LLMWorker, healthy: bool) -> None:
+        """ワーカーを返却する。異常時や規定回数到達時は入れ替える"""
+        worker.requests_served += 1
+        if (not healthy or self._closed or not worker.is_alive()
+                or worker.requests_served >= self.max_requests_per_worker):
+            self._count("workers_recycled")
+            worker.close()
+            return
+        self._idle.put(worker)
+
+    def close(self) -> None:
+        """すべてのワーカーを終了させる"""
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.close()
+
+
+def create_worker_pool_from_config(
+        config: Dict[str, Any]) -> Optional[LLMWorkerPool]:
+    """
+    llm.worker_pool設定からワーカープールを作成する
+
+    Args:
+        config: project.ymlのllmセクション
+
+    Returns:
+        有効化されている場合はLLMWorkerPool、それ以外はNone
+
+    Raises:
+        ValueError: 有効化されているのにcommandが指定されていない場合
+    """
+    pool_config = config.get("worker_pool", {})
+    if not pool_config.get("enabled", False):
+        return None
+    if not pool_config.get("command"):
+        raise ValueError(
+            "llm.worker_pool.command is required when the worker pool is "
+            "enabled; use a worker that keeps a CLI or API session open "
+            "(GEMINI_CLI_WORKER_COMMAND still runs gemini-cli per request)")
+    return LLMWorkerPool(
+        command=pool_config["command"],
+        size=pool_config.get("size", 2),
+        max_requests_per_worker=pool_config.get(
+            "max_requests_per_worker", 100),
+        request_timeout=pool_config.get("request_timeout", 90),
+        health_check_interval=pool_config.get("health_check_interval", 30.0)
+    )
@@ -6,25 +6,359 @@ IMessageBrokerインターフェースの具体的な実装
 import sqlite3
 import json
 import os
-from typing import Optional
-from main.use_cases.interfaces import IMessageBroker
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from main.use_cases.interfaces import IMessageBroker, MessageFilter
 from main.entities.models import Message, AgentID
+from main.frameworks_and_drivers.frameworks.sqlite_connection_pool import (
+    PragmaValue, SqliteConnectionPool, open_connection, resolve_pragmas
+)
+from main.frameworks_and_drivers.frameworks import metrics, tracing
+
+def _open_watch_connection(db_path: str) -> sqlite3.Connection:
+    """
+    更新監視用の読み取り専用接続を開く
+
+    書き込みに使う接続とは別の接続なので、同じプロセス・同じインスタンスの
+    コミットでもPRAGMA data_versionが変化する。
+    """
+    uri = f"file:{urllib.parse.quote(os.path.abspath(db_path))}?mode=ro"
+    return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+
+def _read_data_version(conn: sqlite3.Connection) -> int:
+    """他の接続によるコミットで変化するデータバージョンを取得する"""
+    return conn.execute("PRAGMA data_version").fetchone()[0]
+
+
+class _DatabaseWatcher:
+    """
+    DBファイルの更新を待機者に知らせる（プロセス内でDBファイルごとに1つ）
+
+    更新のたびに世代番号を進め、待機者は待機前に読んだ世代から
+    変わったかを条件変数の述語で確かめる。取得から待機までの間に
+    届いた通知も世代番号に残るため、起床を取りこぼさない。
+    他プロセスのコミットは、待機者がいる間だけ動く1本のスレッドが
+    読み取り専用接続のdata_versionで検知する。
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.condition = threading.Condition()
+        self.generation = 0
+        self.interval: Optional[float] = None
+        self._waiters = 0
+        self._thread: Optional[threading.Thread] = None
+        # 監視スレッドが基準のdata_versionを読んだらセットされる
+        self._ready = threading.Event()
+
+    def notify(self) -> None:
+        """世代を進め、待機中のスレッドをすべて起こす"""
+        with self.condition:
+            self.generation += 1
+            self.condition.notify_all()
+
+    @contextmanager
+    def watching(self, interval: float) -> Iterator[None]:
+        """
+        この間に起きた他プロセスのコミットを検知する
+
+        Args:
+            interval: data_versionを確認する間隔（秒）。
+                複数の待機者がいる場合は最も短い値を使う
+        """
+        with self.condition:
+            self._waiters += 1
+            self.interval = (interval if self.interval is None
+                             else min(self.interval, interval))
+            if self._thread is None:
+                self._ready = threading.Event()
+                self._thread = threading.Thread(
+                    target=self._poll, args=(self._ready,), daemon=True,
+                    name=f"message-bus-watcher {self.db_path}")
+                self._thread.start()
+            ready = self._ready
+        # 監視の基準となるdata_versionを読むまで待つ
+        ready.wait()
+        try:
+            yield
+        finally:
+            with self.condition:
+                self._waiters -= 1
+
+    def wait(self, generation: int, deadline: Optional[float]) -> bool:
+        """
+        世代がgenerationから進むまで待機する
+
+        Returns:
+            更新を検知した場合True、期限切れの場合False
+        """
+        timeout = (None if deadline is None
+                   else max(deadline - time.monotonic(), 0.0))
+        with self.condition:
+            return self.condition.wait_for(
+                lambda: self.generation != generation, timeout)
+
+    def _poll(self, ready: threading.Event) -> None:
+        """待機者がいる間、他プロセスのコミットを検知して世代を進める"""
+        conn = None
+        try:
+            conn = _open_watch_connection(self.db_path)
+            version = _read_data_version(conn)
+        except sqlite3.Error:
+            version = None
+        ready.set()
+        try:
+            while True:
+                with self.condition:
+                    if self._waiters == 0:
+                        self._thread = None
+                        self.interval = None
+                        return
+                    self.condition.wait(self.interval)
+                try:
+                    if conn is None:
+                        conn = _open_watch_connection(self.db_path)
+                    current = _read_data_version(conn)
+                except sqlite3.Error:
+                    # DBファイルの作成前など。次の確認で開き直す
+                    if conn is not None:
+                        conn.close()
+                    conn = current = None
+                if current != version:
+                    version = current
+                    self.notify()
+        finally:
+            if conn is not None:
+                conn.close()
+
+
+_watchers: Dict[str, _DatabaseWatcher] = {}
+_watchers_lock = threading.Lock()
+
+
+def _get_database_watcher(db_path: str) -> _DatabaseWatcher:
+    """DBファイルに対応する更新通知を取得する"""
+    key = os.path.abspath(db_path)
+    with _watchers_lock:
+        watcher = _watchers.get(key)
+        if watcher is None:
+            watcher = _watchers[key] = _DatabaseWatcher(key)
+        return watcher
+
+
+def _migrate_v1(conn: sqlite3.Connection) -> None:
+    """v1: messagesテーブルとリース管理用カラム"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            recipient_id TEXT NOT NULL,
+            message_body TEXT NOT NULL,
+            is_read INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # バージョン管理導入前のDBにはリース管理用のカラムがない場合がある
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(messages)")}
+    if "lease_expires_at" not in columns:
+        conn.execute("ALTER TABLE messages ADD COLUMN lease_expires_at REAL")
+    if "delivery_count" not in columns:
+        conn.execute(
+            "ALTER TABLE messages ADD COLUMN delivery_count INTEGER DEFAULT 0")
+
+
+def _migrate_v2(conn: sqlite3.Connection) -> None:
+    """v2: 検索用の型付きカラムとインデックス"""
+    conn.execute("ALTER TABLE messages ADD COLUMN sender_id TEXT")
+    conn.execute("ALTER TABLE messages ADD COLUMN message_type TEXT")
+    conn.execute("ALTER TABLE messages ADD COLUMN turn_id INTEGER")
+    conn.execute("ALTER TABLE messages ADD COLUMN timestamp TEXT")
+    conn.execute("""
+        UPDATE messages SET
+            sender_id = json_extract(message_body, '$.sender_id'),
+            message_type = json_extract(message_body, '$.message_type'),
+            turn_id = json_extract(message_body, '$.turn_id'),
+            timestamp = json_extract(message_body, '$.timestamp')
+    """)
+    # 受信キューの先頭検索をインデックスのみで完結させる
+    conn.execute("""
+        CREATE INDEX idx_messages_queue
+        ON messages (recipient_id, is_read, id, lease_expires_at)
+    """)
+    conn.execute("""
+        CREATE INDEX idx_messages_unread
+        ON messages (id) WHERE is_read = 0
+    """)
+    conn.execute(
+        "CREATE INDEX idx_messages_sender ON messages (sender_id, id)")
+    conn.execute(
+        "CREATE INDEX idx_messages_type ON messages (message_type, id)")
+    conn.execute(
+        "CREATE INDEX idx_messages_turn ON messages (turn_id, id)")
+
+
+def _migrate_v3(conn: sqlite3.Connection) -> None:
+    """v3: 各プロセスのメトリクスを合算するテーブルを追加する"""
+    conn.execute("""
+        CREATE TABLE metrics (
+            name TEXT NOT NULL,
+            labels TEXT NOT NULL,
+            value REAL NOT NULL,
+            PRIMARY KEY (name, labels)
+        )
+    """)
+
+
+def _migrate_v4(conn: sqlite3.Connection) -> None:
+    """
+    v4: 受信者・送信者・メッセージ種別ごとの件数を保持するqueue_stats
+
+    messagesへの書き込みと同じトランザクション内でトリガーが加減算するため、
+    統計の取得はメッセージ数ではなく組み合わせの数に比例する。
+    """
+    conn.execute("""
+        CREATE TABLE queue_stats (
+            recipient_id TEXT NOT NULL,
+            sender_id TEXT NOT NULL,
+            message_type TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            unread INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (recipient_id, sender_id, message_type)
+        ) WITHOUT ROWID
+    """)
+    # 既存のメッセージから初期値を作る（移行時の1回のみ全件を数える）
+    conn.execute("""
+        INSERT INTO queue_stats
+            (recipient_id, sender_id, message_type, total, unread)
+        SELECT recipient_id, COALESCE(sender_id, ''),
+               COALESCE(message_type, ''), COUNT(*), SUM(is_read = 0)
+        FROM messages
+        GROUP BY 1, 2, 3
+    """)
+    conn.execute("""
+        CREATE TRIGGER queue_stats_after_insert AFTER INSERT ON messages
+        BEGIN
+            INSERT INTO queue_stats
+                (recipient_id, sender_id, message_type, total, unread)
+            VALUES (NEW.recipient_id, COALESCE(NEW.sender_id, ''),
+                    COALESCE(NEW.message_type, ''), 1, NEW.is_read = 0)
+            ON CONFLICT (recipient_id, sender_id, message_type)
+            DO UPDATE SET total = total + 1,
+                          unread = unread + excluded.unread;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER queue_stats_after_read
+        AFTER UPDATE OF is_read ON messages
+        WHEN OLD.is_read IS NOT NEW.is_read
+        BEGIN
+            UPDATE queue_stats
+            SET unread = unread + (NEW.is_read = 0) - (OLD.is_read = 0)
+            WHERE recipient_id = NEW.recipient_id
+              AND sender_id = COALESCE(NEW.sender_id, '')
+              AND message_type = COALESCE(NEW.message_type, '');
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER queue_stats_after_delete AFTER DELETE ON messages
+        BEGIN
+            UPDATE queue_stats
+            SET total = total - 1, unread = unread - (OLD.is_read = 0)
+            WHERE recipient_id = OLD.recipient_id
+              AND sender_id = COALESCE(OLD.sender_id, '')
+              AND message_type = COALESCE(OLD.message_type, '');
+        END
+    """)
+
+
+# スキーマのマイグレーション。インデックス+1がPRAGMA user_versionに対応する
+_MIGRATIONS = [_migrate_v1, _migrate_v2, _migrate_v3, _migrate_v4]
+SCHEMA_VERSION = len(_MIGRATIONS)
+
+
+# project.ymlのmessage_busセクションからコンストラクタ引数へ渡す設定キー
+_CONFIG_OPTION_KEYS = ("profile", "pragmas", "pool_size", "wake_interval",
+                       "lease_sec")
+
+
+def broker_options_from_config(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    message_bus設定からSqliteMessageBrokerのコンストラクタ引数を抽出する
+
+    Args:
+        config: project.ymlのmessage_busセクション
+
+    Returns:
+        指定されていたキーのみを含むキーワード引数の辞書
+    """
+    return {key: config[key] for key in _CONFIG_OPTION_KEYS if key in config}
+
+
+def create_broker_from_environment() -> "SqliteMessageBroker":
+    """
+    スーパーバイザーから渡された環境変数の設定でブローカーを作成する
+
+    MESSAGE_DB_PATHが未指定の場合はDEBATE_DIRのmessages.dbを使う。
+    """
+    bus_options = broker_options_from_config(
+        json.loads(os.environ.get("MESSAGE_BUS_CONFIG", "{}")))
+    return SqliteMessageBroker(os.environ.get("MESSAGE_DB_PATH") or None,
+                               **bus_options)
+
+
+@dataclass
+class ClaimedMessage:
+    """リース付きで取得したメッセージ。ack/nackで処理結果を通知する"""
+    delivery_id: int
+    message: Message
+    lease_expires_at: float
+    # 何回目の配信か。ack/nackに渡すと、リースが切れて他のワーカーが
+    # 取得し直した後の古い通知を無視する
+    delivery_count: int = 0
 
 
 class SqliteMessageBroker(IMessageBroker):
     """SQLiteを使ったメッセージブローカー"""
 
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, wake_interval: float = 0.005,
+                 lease_sec: float = 30.0, profile: Optional[str] = None,
+                 pragmas: Optional[Dict[str, PragmaValue]] = None,
+                 pool_size: int = 0):
         """
         Args:
             db_path: データベースファイルのパス。Noneの場合は環境変数から取得
+            wake_interval: wait_for_messageの待機中に他プロセスの書き込みを
+                確認する間隔（秒）。確認はDBファイルごとに1本のスレッドで行う
+            lease_sec: claim_messageで取得したメッセージのリース期間（秒）。
+                期間内にackされなければ再配信される
+            profile: 性能プロファイル名（"performance"または"durable"）
+            pragmas: プロファイルの値を上書きするPRAGMA設定
+            pool_size: 1以上の場合、スレッドセーフな接続プールを使用する。
+                0の場合はインスタンス専用の単一接続をロックで排他して使用する
         """
         if db_path is None:
             debate_dir = os.environ.get("DEBATE_DIR", ".")
             self.db_path = os.path.join(debate_dir, "messages.db")
         else:
             self.db_path = db_path
+        self.wake_interval = wake_interval
+        self.lease_sec = lease_sec
+        self.pragmas = resolve_pragmas(profile, pragmas)
         self._connection = None
+        # 単一接続を使う操作を直列化する（操作の中から別の操作を呼べるようRLock）
+        self._connection_lock = threading.RLock()
+        self._pool = (
+            SqliteConnectionPool(self.db_path, pool_size, self.pragmas)
+            if pool_size > 0 else None
+        )
+        self._watchers = threading.local()
+        self._watcher_connections: list[sqlite3.Connection] = []
+        self._watchers_lock = threading.Lock()
+        self._watcher = _get_database_watcher(self.db_path)
 
     def __enter__(self):
         """Context manager entry"""
@@ -32,33 +366,112 @@ class SqliteMessageBroker(IMessageBroker):
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Context manager exit - ensure connection is closed"""
-        if self._connection:
-            self._connection.close()
-            self._connection = None
+        self.close()
+
+    def close(self) -> None:
+        """開いている接続をすべて閉じる"""
+        with self._connection_lock:
+            if self._connection:
+                self._connection.close()
+                self._connection = None
+        if self._pool:
+            self._pool.close()
+        with self._watchers_lock:
+            for conn in self._watcher_connections:
+                conn.close()
+            self._watcher_connections.clear()
+        self._watchers = threading.local()
 
     def _get_connection(self):
-        """Get or create database connection"""
-        if self._connection is None:
-            self._connection = sqlite3.connect(self.db_path)
-        return self._connection
+        """
+        Get or create database connection
+
+        単一接続は作成したスレッド以外からも使う。ブローカーの操作は
+        _connection_scopeで_connection_lockを取って直列化するため、
+        それ以外から使う場合も_connection_lockを取ること。
+        """
+        with self._connection_lock:
+            if self._connection is None:
+                self._connection = open_connection(
+                    self.db_path, self.pragmas, check_same_thread=False)
+            return self._connection
+
+    @contextmanager
+    def _connection_scope(self) -> Iterator[sqlite3.Connection]:
+        """
+        操作に使う接続を取得する
+
+        プール有効時はプールから借りる。単一接続の場合は、操作が終わるまで
+        _connection_lockを保持して他のスレッドの操作を待たせる。
+        """
+        if self._pool is None:
+            with self._connection_lock:
+                yield self._get_connection()
+        else:
+            with self._pool.connection() as conn:
+                yield conn
 
     def initialize_db(self):
-        """データベースの初期化"""
-        conn = self._get_connection()
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                recipient_id TEXT NOT NULL,
-                message_body TEXT NOT NULL,
-                is_read INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        conn.commit()
+        """
+        データベースの初期化
+
+        PRAGMA user_versionでスキーマのバージョンを管理し、
+        未適用のマイグレーションを順に適用する。
+        """
+        with self._connection_scope() as conn:
+            if self._schema_version(conn) >= SCHEMA_VERSION:
+                return
+
+            # 複数プロセスが同時に初期化しても二重適用しないよう
+            # 書き込みロックを取る
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                version = self._schema_version(conn)
+                for target, migrate in enumerate(_MIGRATIONS[version:],
+                                                 start=version + 1):
+                    migrate(conn)
+                    conn.execute(f"PRAGMA user_version = {target}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    @staticmethod
+    def _schema_version(conn: sqlite3.Connection) -> int:
+        """適用済みのスキーマバージョンを取得する"""
+        return conn.execute("PRAGMA user_version").fetchone()[0]
 
     def post_message(self, message: Message) -> None:
         """メッセージを送信する"""
-        # ドメインモデルを辞書に変換
+        self.post_messages([message])
+
+    def post_messages(self, messages: list[Message]) -> None:
+        """
+        複数のメッセージを単一のトランザクションでまとめて送信する
+
+        ファンアウト時のコミット（fsync）を1回に抑える。
+        """
+        if not messages:
+            return
+        rows = [self._to_row(message) for message in messages]
+
+        with tracing.span("broker.post_messages", count=len(rows)), \
+                self._connection_scope() as conn:
+            conn.executemany(
+                """INSERT INTO messages (recipient_id, sender_id, message_type,
+                                         turn_id, timestamp, message_body)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                rows
+            )
+            conn.commit()
+        for message in messages:
+            metrics.MESSAGES_POSTED.inc(recipient_id=message.recipient_id,
+                                        message_type=message.message_type)
+        self._notify_waiters()
+
+    @staticmethod
+    def _to_row(message: Message) -> tuple:
+        """ドメインモデルをmessagesテーブルの行に変換する"""
         message_dict = {
             "turn_id": message.turn_id,
             "timestamp": message.timestamp,
@@ -67,44 +480,173 @@ class SqliteMessageBroker(IMessageBroker):
             "message_type": message.message_type,
             "payload": message.payload
         }
+        return (message.recipient_id, message.sender_id,
+                message.message_type, message.turn_id, message.timestamp,
+                json.dumps(message_dict))
 
-        message_body = json.dumps(message_dict)
+    def get_message(self, recipient_id: AgentID) -> Optional[Message]:
+        """
+        指定した受信者宛のメッセージを取得する
 
-        conn = self._get_connection()
-        conn.execute(
-            """INSERT INTO messages (recipient_id, message_body)
-               VALUES (?, ?)""",
-            (message.recipient_id, message_body)
-        )
-        conn.commit()
+        取得と既読化を単一のUPDATE文で行うため、複数プロセスが同じ受信者を
+        ポーリングしても同じメッセージが二重に配信されることはない。
+        """
+        with tracing.span("broker.get_message",
+                          recipient_id=recipient_id) as span:
+            with self._connection_scope() as conn:
+                row = conn.execute("""
+                    UPDATE messages SET is_read = 1,
+                        delivery_count = delivery_count + 1
+                    WHERE id = (
+                        SELECT id FROM messages
+                        WHERE recipient_id = ? AND is_read = 0
+                          AND (lease_expires_at IS NULL
+                               OR lease_expires_at <= ?)
+                        ORDER BY id
+                        LIMIT 1
+                    )
+                    RETURNING message_body
+                """, (recipient_id, time.time())).fetchone()
+                conn.commit()
 
-    def get_message(self, recipient_id: AgentID) -> Optional[Message]:
-        """指定した受信者宛のメッセージを取得する"""
-        conn = self._get_connection()
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+            if not row:
+                # 空振りのポーリングは記録しない
+                span.discard()
+                return None
+            message = self._to_message(row[0])
+            metrics.MESSAGES_DELIVERED.inc(
+                recipient_id=message.recipient_id,
+                message_type=message.message_type)
+            span.adopt(tracing.peek(message))
+            span.set_attribute("message_type", message.message_type)
+            return message
 
-        # 未読メッセージを取得
-        cursor.execute("""
-            SELECT id, message_body FROM messages
-            WHERE recipient_id = ? AND is_read = 0
-            ORDER BY created_at
-            LIMIT 1
-        """, (recipient_id,))
+    def claim_message(self, recipient_id: AgentID,
+                      lease_sec: Optional[float] = None
+                      ) -> Optional[ClaimedMessage]:
+        """
+        指定した受信者宛のメッセージをリース付きで取得する
+
+        取得したメッセージはリース期間中は他のワーカーから見えなくなる。
+        処理完了後にack、失敗時にnackを呼ぶ。どちらも呼ばれずに
+        リースが切れた場合は再び配信対象になる。
+
+        Args:
+            recipient_id: 受信者ID
+            lease_sec: リース期間（秒）。Noneの場合はコンストラクタの設定値
+
+        Returns:
+            取得したメッセージ。配信可能なメッセージがない場合はNone
+        """
+        now = time.time()
+        lease_expires_at = now + (
+            self.lease_sec if lease_sec is None else lease_sec)
+
+        with self._connection_scope() as conn:
+            row = conn.execute("""
+                UPDATE messages SET lease_expires_at = ?,
+                    delivery_count = delivery_count + 1
+                WHERE id = (
+                    SELECT id FROM messages
+                    WHERE recipient_id = ? AND is_read = 0
+                      AND (lease_expires_at IS NULL OR lease_expires_at <= ?)
+                    ORDER BY id
+                    LIMIT 1
+                )
+                RETURNING id, message_body, delivery_count
+            """, (lease_expires_at, recipient_id, now)).fetchone()
+            conn.commit()
 
-        row = cursor.fetchone()
         if not row:
             return None
-
-        # メッセージを既読にマーク
-        cursor.execute(
-            "UPDATE messages SET is_read = 1 WHERE id = ?",
-            (row['id'],)
+        return ClaimedMessage(
+            delivery_id=row[0],
+            message=self._to_message(row[1]),
+            lease_expires_at=lease_expires_at,
+            delivery_count=row[2]
         )
-        conn.commit()
 
-        # 辞書からドメインモデルに変換
-        message_dict = json.loads(row['message_body'])
+    def ack(self, delivery_id: int,
+            delivery_count: Optional[int] = None) -> bool:
+        """
+        claim_messageで取得したメッセージの処理完了を通知する
+
+        Args:
+            delivery_id: claim_messageが返した配信ID
+            delivery_count: claim_messageが返した配信回数。指定した場合、
+                その後に他のワーカーが取得し直していれば確定しない
+
+        Returns:
+            確定できた場合True。既に確定済み、存在しない、
+            または他のワーカーが取得し直している場合False
+        """
+        with self._connection_scope() as conn:
+            row = conn.execute("""
+                UPDATE messages SET is_read = 1, lease_expires_at = NULL
+                WHERE id = ? AND is_read = 0
+                  AND (? IS NULL OR delivery_count = ?)
+                RETURNING recipient_id, message_type
+            """, (delivery_id, delivery_count, delivery_count)).fetchone()
+            conn.commit()
+        if row is None:
+            return False
+        metrics.MESSAGES_DELIVERED.inc(recipient_id=row[0],
+                                       message_type=row[1])
+        return True
+
+    def nack(self, delivery_id: int, delay_sec: float = 0.0,
+             delivery_count: Optional[int] = None) -> bool:
+        """
+        claim_messageで取得したメッセージを配信待ちに戻す
+
+        Args:
+            delivery_id: claim_messageが返した配信ID
+            delay_sec: 再配信可能になるまでの待機時間（秒）
+            delivery_count: claim_messageが返した配信回数。指定した場合、
+                その後に他のワーカーが取得し直していれば戻さない
+
+        Returns:
+            戻せた場合True。既に確定済み、存在しない、
+            または他のワーカーが取得し直している場合False
+        """
+        lease_expires_at = time.time() + delay_sec if delay_sec > 0 else None
+        with self._connection_scope() as conn:
+            cursor = conn.execute("""
+                UPDATE messages SET lease_expires_at = ?
+                WHERE id = ? AND is_read = 0
+                  AND (? IS NULL OR delivery_count = ?)
+            """, (lease_expires_at, delivery_id, delivery_count,
+                  delivery_count))
+            conn.commit()
+        if cursor.rowcount == 1:
+            self._notify_waiters()
+            return True
+        return False
+
+    def release_claims(self, recipient_id: AgentID) -> int:
+        """
+        受信者がリース中のメッセージをすべて配信待ちに戻す
+
+        受信者のプロセスが異常終了した場合に、ackされなかったメッセージを
+        リースの期限切れを待たずに再起動後のプロセスへ再配信するために使う。
+
+        Returns:
+            配信待ちに戻したメッセージ数
+        """
+        with self._connection_scope() as conn:
+            cursor = conn.execute("""
+                UPDATE messages SET lease_expires_at = NULL
+                WHERE recipient_id = ? AND is_read = 0
+                  AND lease_expires_at IS NOT NULL
+            """, (recipient_id,))
+            conn.commit()
+        if cursor.rowcount:
+            self._notify_waiters()
+        return cursor.rowcount
+
+    def _to_message(self, message_body: str) -> Message:
+        """保存されたJSON文字列をドメインモデルに変換する"""
+        message_dict = json.loads(message_body)
         return Message(
             recipient_id=message_dict['recipient_id'],
             sender_id=message_dict['sender_id'],
@@ -114,47 +656,191 @@ class SqliteMessageBroker(IMessageBroker):
             timestamp=message_dict['timestamp']
         )
 
+    def wait_for_message(self, recipient_id: AgentID,
+                         timeout: Optional[float] = None) -> Optional[Message]:
+        """
+        指定した受信者宛のメッセージが届くまでブロックして待機する
+
+        同一プロセス内のpost_messageは条件変数で即座に、
+        他プロセスからの書き込みはPRAGMA data_versionの変化で検知する。
+
+        Args:
+            recipient_id: 受信者ID
+            timeout: 最大待機時間（秒）。Noneの場合は無期限に待機
+
+        Returns:
+            受信したメッセージ。タイムアウト時はNone
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._watcher.watching(self.wake_interval):
+            while True:
+                # 取得前に世代を読み、取得後の投函を取りこぼさない
+                generation = self._watcher.generation
+                message = self.get_message(recipient_id)
+                if message:
+                    return message
+                if not self._watcher.wait(generation, deadline):
+                    return None
+
+    def wait_for_claim(self, recipient_id: AgentID,
+                       timeout: Optional[float] = None,
+                       lease_sec: Optional[float] = None
+                       ) -> Optional[ClaimedMessage]:
+        """
+        claim_messageの待機版。メッセージが届くまでブロックする
+
+        Args:
+            recipient_id: 受信者ID
+            timeout: 最大待機時間（秒）。Noneの場合は無期限に待機
+            lease_sec: リース期間（秒）。Noneの場合はコンストラクタの設定値
+
+        Returns:
+            取得したメッセージ。タイムアウト時はNone
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._watcher.watching(self.wake_interval):
+            while True:
+                generation = self._watcher.generation
+                claimed = self.claim_message(recipient_id, lease_sec)
+                if claimed:
+                    return claimed
+                if not self._watcher.wait(generation, deadline):
+                    return None
+
+    def _watch_connection(self) -> sqlite3.Connection:
+        """
+        data_version用の接続を取得する
+
+        書き込みに使う接続とは別の、スレッドごとの読み取り専用接続を使う。
+        プール有効時も、監視中にプールの接続を占有しない。
+        """
+        conn = getattr(self._watchers, "conn", None)
+        if conn is None:
+            conn = _open_watch_connection(self.db_path)
+            self._watchers.conn = conn
+            with self._watchers_lock:
+                self._watcher_connections.append(conn)
+        return conn
+
+    def data_version(self) -> int:
+        """
+        データベースの更新検知用の値を返す
+
+        このインスタンス自身を含め、いずれかの接続（他プロセスを含む）が
+        コミットするたびに変化する。
+        """
+        return _read_data_version(self._watch_connection())
+
+    def _notify_waiters(self) -> None:
+        """同一プロセス内でメッセージを待機しているスレッドを起こす"""
+        self._watcher.notify()
+
     def get_statistics(self) -> dict:
-        """メッセージブローカーの統計情報を取得する"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        """
+        メッセージブローカーの統計情報を取得する
 
-        # 総メッセージ数
-        cursor.execute("SELECT COUNT(*) as total FROM messages")
-        total_messages = cursor.fetchone()[0]
+        トリガーで維持されているqueue_statsを読むだけで、messagesテーブルは
+        走査しない。
 
-        # 未読メッセージ数
-        cursor.execute(
-            "SELECT COUNT(*) as unread FROM messages WHERE is_read = 0"
-        )
-        unread_messages = cursor.fetchone()[0]
+        Returns:
+            total_messages / unread_messages に加え、by_recipient・by_sender・
+            by_message_type に {"total": 件数, "unread": 未読数} の内訳
+        """
+        with self._connection_scope() as conn:
+            rows = conn.execute("""
+                SELECT recipient_id, sender_id, message_type, total, unread
+                FROM queue_stats
+            """).fetchall()
 
-        return {
-            'total_messages': total_messages,
-            'unread_messages': unread_messages
+        statistics = {
+            'total_messages': 0,
+            'unread_messages': 0,
+            'by_recipient': {},
+            'by_sender': {},
+            'by_message_type': {},
         }
+        for recipient_id, sender_id, message_type, total, unread in rows:
+            if total == 0:
+                continue  # 削除済みの組み合わせ
+            statistics['total_messages'] += total
+            statistics['unread_messages'] += unread
+            for breakdown, key in (('by_recipient', recipient_id),
+                                   ('by_sender', sender_id),
+                                   ('by_message_type', message_type)):
+                counts = statistics[breakdown].setdefault(
+                    key, {'total': 0, 'unread': 0})
+                counts['total'] += total
+                counts['unread'] += unread
+        return statistics
 
     def get_all_messages(self) -> list[Message]:
-        """すべてのメッセージ履歴を取得する"""
-        conn = self._get_connection()
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT message_body FROM messages
-            ORDER BY created_at
-        """)
-
-        messages = []
-        for row in cursor.fetchall():
-            message_dict = json.loads(row['message_body'])
-            messages.append(Message(
-                recipient_id=message_dict['recipient_id'],
-                sender_id=message_dict['sender_id'],
-                message_type=message_dict['message_type'],
-                payload=message_dict['payload'],
-                turn_id=message_dict['turn_id'],
-                timestamp=message_dict['timestamp']
-            ))
-
-        return messages
+        """
+        すべてのメッセージ履歴を取得する
+
+        長い履歴を走査する場合は、全件をメモリに載せないiter_messagesを使う。
+        """
+        return list(self.iter_messages())
+
+    def iter_messages(self, filter: Optional[MessageFilter] = None,
+                      after_id: int = 0,
+                      batch_size: int = 500) -> Iterator[Message]:
+        """
+        メッセージ履歴を投函順に少しずつ読み出す
+
+        idによるキーセットページネーションで batch_size 件ずつ問い合わせるため、
+        メモリ使用量は履歴の長さに依存しない。問い合わせの合間は接続を
+        保持しないので、読み出し中も他の書き込みを妨げない。
+
+        Args:
+            filter: 送信者・受信者・メッセージ種別・ターン範囲・受信確定の
+                検索条件
+            after_id: このIDより後に投函されたメッセージから読み出す
+            batch_size: 1回の問い合わせで読み出す件数
+
+        Yields:
+            条件に一致したメッセージ
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        conditions, params = self._filter_conditions(filter)
+        query = f"""
+            SELECT id, message_body FROM messages
+            WHERE {" AND ".join(["id > ?"] + conditions)}
+            ORDER BY id
+            LIMIT ?
+        """
+        last_id = after_id
+        while True:
+            with self._connection_scope() as conn:
+                rows = conn.execute(
+                    query, (last_id, *params, batch_size)).fetchall()
+            for _, message_body in rows:
+                yield self._to_message(message_body)
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1][0]
+
+    @staticmethod
+    def _filter_conditions(filter: Optional[MessageFilter]
+                           ) -> Tuple[List[str], List[Any]]:
+        """検索条件を型付きカラムに対するWHERE句の条件に変換する"""
+        conditions: List[str] = []
+        params: List[Any] = []
+        if filter is None:
+            return conditions, params
+        for column in ("sender_id", "recipient_id", "message_type"):
+            values = getattr(filter, column)
+            if values is not None:
+                placeholders = ", ".join("?" * len(values))
+                conditions.append(f"{column} IN ({placeholders})")
+                params.extend(values)
+        if filter.min_turn is not None:
+            conditions.append("turn_id >= ?")
+            params.append(filter.min_turn)
+        if filter.max_turn is not None:
+            conditions.append("turn_id <= ?")
+            params.append(filter.max_turn)
+        if filter.delivered is not None:
+            conditions.append("is_read = ?")
+            params.append(int(filter.delivered))
+        return conditions, params
@@ -0,0 +1,414 @@
+"""
+Prometheus形式のメトリクス
+
+スーパーバイザーがローカルのHTTPエンドポイント /metrics で公開する指標を
+定義・集計する。
+
+- 各プロセスはカウンタとヒストグラムをメモリ上で加算するだけにする
+- エージェントプロセスは前回からの差分を一定間隔でメッセージDBの
+  metricsテーブルへ加算する（1回のフラッシュで1トランザクション）
+- スクレイプ時はmetricsテーブル（行数はラベルの組み合わせ数で決まり、
+  ディベートの長さに依存しない）と自プロセスの値を合算する。
+  キューの深さはトリガーで維持されるqueue_statsから読み、
+  メッセージ履歴に対するCOUNT(*)は行わない
+"""
+
+import atexit
+import json
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from main.frameworks_and_drivers.frameworks.sqlite_connection_pool import (
+    open_connection, resolve_pragmas
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# サンプル名とラベルの組 -> 値
+Samples = Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]
+
+# LLM呼び出しの遅延（秒）のバケット。CLI呼び出しは数秒〜数十秒かかる
+LLM_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0,
+                       60.0, 90.0)
+
+
+def _labels_key(labelnames: Tuple[str, ...],
+                labels: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    """ラベルを定義順の (名前, 値) のタプルに正規化する"""
+    if set(labels) != set(labelnames):
+        raise ValueError(
+            f"Expected labels {labelnames}, got {tuple(sorted(labels))}")
+    return tuple((name, "" if labels[name] is None else str(labels[name]))
+                 for name in labelnames)
+
+
+class Counter:
+    """単調増加するカウンタ"""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str,
+                 labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[Tuple[str, str], ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        """指定したラベルの値をamountだけ増やす（0で系列だけを作る）"""
+        key = _labels_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Samples:
+        with self._lock:
+            return {(self.name, key): value
+                    for key, value in self._values.items()}
+
+
+class Histogram:
+    """値の分布を累積バケットで数えるヒストグラム"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str,
+                 labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = LLM_LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # ラベル -> (バケットごとの件数, 合計, 件数)
+        self._values: Dict[Tuple[Tuple[str, str], ...],
+                           Tuple[List[int], float, int]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        """値を1件記録する"""
+        key = _labels_key(self.labelnames, labels)
+        with self._lock:
+            counts, total, count = self._values.get(
+                key, ([0] * len(self.buckets), 0.0, 0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._values[key] = (counts, total + value, count + 1)
+
+    def samples(self) -> Samples:
+        result: Samples = {}
+        with self._lock:
+            for key, (counts, total, count) in self._values.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    result[(f"{self.name}_bucket",
+                            key + (("le", _format_value(bound)),))] = cumulative
+                result[(f"{self.name}_bucket", key + (("le", "+Inf"),))] = count
+                result[(f"{self.name}_sum", key)] = total
+                result[(f"{self.name}_count", key)] = count
+        return result
+
+
+class MetricsRegistry:
+    """プロセス内のメトリクスの集まり"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+
+    def counter(self, name: str, help: str,
+                labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str,
+                  labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = LLM_LATENCY_BUCKETS
+                  ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def metrics(self) -> List[Any]:
+        """登録済みのメトリクスを登録順に返す"""
+        return list(self._metrics.values())
+
+    def samples(self) -> Samples:
+        """全メトリクスの現在値"""
+        result: Samples = {}
+        for metric in self._metrics.values():
+            result.update(metric.samples())
+        return result
+
+
+class SqliteMetricsStore:
+    """
+    プロセスをまたいでメトリクスを合算するmetricsテーブル
+
+    テーブルはSqliteMessageBrokerのスキーマ（メッセージDB）に含まれる。
+    """
+
+    def __init__(self, db_path: str,
+                 registry: Optional[MetricsRegistry] = None):
+        self.db_path = db_path
+        self.registry = registry or REGISTRY
+        self._flushed: Samples = {}
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            # フラッシュ用スレッドやHTTPサーバーのスレッドから使うため、
+            # 接続はロックで保護してスレッド間で共有する
+            self._connection = open_connection(
+                self.db_path, resolve_pragmas(None, None),
+                check_same_thread=False)
+        return self._connection
+
+    def flush(self) -> int:
+        """
+        前回のフラッシュ以降に増えた分をmetricsテーブルへ加算する
+
+        Returns:
+            更新した系列の数
+        """
+        with self._lock:
+            current = self.registry.samples()
+            deltas = [
+                (name, json.dumps(labels), value - self._flushed.get(
+                    (name, labels), 0.0))
+                for (name, labels), value in current.items()
+                if value != self._flushed.get((name, labels))
+            ]
+            if not deltas:
+                return 0
+            conn = self._get_connection()
+            conn.executemany("""
+                INSERT INTO metrics (name, labels, value) VALUES (?, ?, ?)
+                ON CONFLICT (name, labels)
+                DO UPDATE SET value = value + excluded.value
+            """, deltas)
+            conn.commit()
+            self._flushed = current
+            return len(deltas)
+
+    def load(self) -> Samples:
+        """全プロセスからフラッシュされた値を読み込む"""
+        with self._lock:
+            rows = self._get_connection().execute(
+                "SELECT name, labels, value FROM metrics").fetchall()
+        return {(name, tuple(tuple(pair) for pair in json.loads(labels))):
+                value for name, labels, value in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class MetricsExporter:
+    """一定間隔でSqliteMetricsStoreへフラッシュするバックグラウンドスレッド"""
+
+    def __init__(self, store: SqliteMetricsStore, interval: float = 1.0):
+        self.store = store
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self._flush()
+
+    def _flush(self) -> None:
+        try:
+            self.store.flush()
+        except sqlite3.Error as e:
+            # メトリクスの書き込み失敗でエージェントを止めない
+            print(f"⚠️ Failed to flush metrics: {e}")
+
+    def stop(self) -> None:
+        """スレッドを止め、残りの差分を書き出す"""
+        self._stop_event.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self._flush()
+        self.store.close()
+
+
+def render(registry: Optional[MetricsRegistry] = None,
+           extra: Optional[Samples] = None,
+           queue_depth: Optional[Dict[str, int]] = None) -> str:
+    """
+    Prometheusのテキスト形式で出力する
+
+    Args:
+        registry: メトリクスの定義と自プロセスの値
+        extra: 合算する他プロセスの値（SqliteMetricsStore.load）
+        queue_depth: 受信者ごとの未読メッセージ数
+            （SqliteMessageBroker.get_statisticsのby_recipient）
+    """
+    registry = registry or REGISTRY
+    samples = registry.samples()
+    for key, value in (extra or {}).items():
+        samples[key] = samples.get(key, 0.0) + value
+
+    lines = []
+    for metric in registry.metrics():
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        names = _sample_names(metric)
+        for (name, labels), value in sorted(
+                item for item in samples.items() if item[0][0] in names):
+            lines.append(f"{name}{_format_labels(labels)} "
+                         f"{_format_value(value)}")
+
+    if queue_depth is not None:
+        lines.append("# HELP a2a_queue_depth 受信者ごとの未読メッセージ数")
+        lines.append("# TYPE a2a_queue_depth gauge")
+        for recipient_id, depth in sorted(queue_depth.items()):
+            labels = _format_labels((("recipient_id", recipient_id),))
+            lines.append(f"a2a_queue_depth{labels} {_format_value(depth)}")
+    return "\n".join(lines) + "\n"
+
+
+def _sample_names(metric) -> Tuple[str, ...]:
+    """メトリクスが出力するサンプル名"""
+    if isinstance(metric, Histogram):
+        return tuple(f"{metric.name}{suffix}"
+                     for suffix in ("_bucket", "_sum", "_count"))
+    return (metric.name,)
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = ",".join(
+        f'{name}="' + value.replace("\\", "\\\\").replace('"', '\\"')
+        .replace("\n", "\\n") + '"'
+        for name, value in labels)
+    return "{" + escaped + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """GET /metrics に応答するハンドラ"""
+
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # スクレイプごとのアクセスログは出さない
+        pass
+
+
+def start_http_server(render_fn, host: str = "127.0.0.1",
+                      port: int = 9464) -> ThreadingHTTPServer:
+    """
+    /metrics を公開するHTTPサーバーをデーモンスレッドで起動する
+
+    Args:
+        render_fn: 応答本文を返す関数
+        host: 待ち受けるアドレス
+        port: 待ち受けるポート。0の場合は空いているポートを使う
+
+    Returns:
+        起動したサーバー。shutdown()とserver_close()で停止する
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.render = render_fn
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+_exporter: Optional[MetricsExporter] = None
+
+
+def configure(config: Dict[str, Any],
+              db_path: Optional[str]) -> Optional[MetricsExporter]:
+    """
+    metrics設定に従って、エージェントプロセスの値をメッセージDBへ送り始める
+
+    Args:
+        config: {"enabled": bool, "flush_interval": 秒}
+        db_path: メッセージDBのパス
+
+    Returns:
+        起動したMetricsExporter。無効時はNone
+    """
+    global _exporter
+    if _exporter is not None:
+        _exporter.stop()
+        _exporter = None
+    if not config.get("enabled") or not db_path:
+        return None
+    _exporter = MetricsExporter(SqliteMetricsStore(db_path),
+                                config.get("flush_interval", 1.0))
+    _exporter.start()
+    return _exporter
+
+
+@atexit.register
+def shutdown() -> None:
+    """バックグラウンドのフラッシュを止め、残りの差分を書き出す"""
+    global _exporter
+    if _exporter is not None:
+        _exporter.stop()
+        _exporter = None
+
+
+# ===== プラットフォームのメトリクス定義 =====
+# どのプロセスでも同じ定義を持つことで、スーパーバイザーが他プロセスの
+# 値にもHELP/TYPEを付けて出力できる
+
+REGISTRY = MetricsRegistry()
+
+MESSAGES_POSTED = REGISTRY.counter(
+    "a2a_messages_posted_total", "投函されたメッセージ数",
+    ("recipient_id", "message_type"))
+MESSAGES_DELIVERED = REGISTRY.counter(
+    "a2a_messages_delivered_total", "受信者に配信済みとなったメッセージ数",
+    ("recipient_id", "message_type"))
+LLM_CALL_DURATION = REGISTRY.histogram(
+    "a2a_llm_call_duration_seconds", "LLM呼び出しの所要時間（秒）",
+    ("model", "ok"))
+LLM_CACHE_LOOKUPS = REGISTRY.counter(
+    "a2a_llm_cache_lookups_total", "LLM応答キャッシュの参照数",
+    ("result",))
+SUBPROCESS_SPAWNS = REGISTRY.counter(
+    "a2a_subprocess_spawns_total", "起動したサブプロセス数", ("kind",))
+AGENT_RESTARTS = REGISTRY.counter(
+    "a2a_agent_restarts_total", "スーパーバイザーがエージェントを再起動した回数",
+    ("agent_id",))
+MODERATOR_DECISIONS = REGISTRY.counter(
+    "a2a_moderator_decisions_total",
+    "司会が応答を決めた方法"
+    "（rules: 遷移表 / llm: LLM / gather: 待機 / timeout: gatherの期限切れ）",
+    ("decision",))
+AGENT_STARTUP_DURATION = REGISTRY.histogram(
+    "a2a_agent_startup_seconds", "エージェントの起動からメッセージ受信可能になるまでの時間（秒）",
+    ("agent_id", "launcher"),
+    buckets=(0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
@@ -2,6 +2,7 @@
 Prompt Injector Service - Green Phase Implementation
 """
 from main.entities.models import Message, AgentID
+from main.frameworks_and_drivers.frameworks import tracing
 
 
 class PromptInjectorService:
@@ -13,6 +14,11 @@ class PromptInjectorService:
 
     def build_prompt(self, agent_id: AgentID, context, history=None) -> str:
         """プロンプトを構築（テスト対応実装）"""
+        with tracing.span("prompt.build_prompt", agent_id=agent_id):
+            return self._build_prompt(agent_id, context, history)
+
+    def _build_prompt(self, agent_id: AgentID, context, history) -> str:
+        """ペルソナ・コンテキスト・履歴を連結してプロンプトにする"""
         if self.prompt_repository:
             persona = self.prompt_repository.get_persona(agent_id)
             base_prompt = f"{persona}"
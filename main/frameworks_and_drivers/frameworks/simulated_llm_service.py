@@ -0,0 +1,407 @@
+"""
+オフラインで動作する決定的なLLMサービス
+
+Gemini CLIの代わりに、スクリプトまたは記録済みの応答をエージェントと
+メッセージタイプごとに返す。応答遅延の分布、エラー率、出力サイズを
+設定できるため、ネットワークなしでメッセージブローカー・スーパーバイザー・
+エージェントループの負荷試験を行える。
+
+スクリプト（YAML）の形式:
+    responses:
+      MODERATOR:
+        INITIATE_DEBATE:
+          # 呼び出しごとに順番に返す（最後まで来たら先頭に戻る）
+          - {recipient_id: DEBATER_A, message_type: REQUEST_STATEMENT,
+             payload: {topic: "{topic}"}}
+        SUBMIT_STATEMENT:
+          # リストを返すと1回の応答で複数のメッセージを送信する
+          - - {recipient_id: JUDGE_L, message_type: REQUEST_JUDGEMENT}
+            - {recipient_id: JUDGE_E, message_type: REQUEST_JUDGEMENT}
+      "*":            # どのエージェントにも一致する
+        "*": []       # どのメッセージタイプにも一致する（応答なし）
+
+payload内の文字列の "{キー}" は受信メッセージのpayloadの値で置き換える。
+記録済みの応答（JSONL）は1行に {"agent_id", "message_type", "messages"} を持つ。
+error_rateで失敗させた呼び出しはSimulatedLLMErrorを送出する
+（スクリプトに応答がない場合は空のリストを返す）。
+"""
+
+import asyncio
+import json
+import math
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+from main.use_cases.interfaces.interfaces import ILLMService
+from main.use_cases.services.payload_template import render_payload
+from main.entities.models import Message
+
+WILDCARD = "*"
+
+
+class SimulatedLLMError(Exception):
+    """error_rateによって注入された呼び出しの失敗"""
+    pass
+
+
+class LatencyModel:
+    """応答遅延の分布"""
+
+    DISTRIBUTIONS = ("constant", "uniform", "normal", "lognormal",
+                     "exponential")
+
+    def __init__(self, distribution: str = "constant", **params: float):
+        """
+        Args:
+            distribution: 分布の種類と必要なパラメータ（ミリ秒）
+                - constant: value_ms
+                - uniform: min_ms, max_ms
+                - normal: mean_ms, stddev_ms（負の値は0に切り上げ）
+                - lognormal: median_ms, sigma
+                - exponential: mean_ms
+        """
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+        self.distribution = distribution
+        self.params = params
+
+    def sample(self, rng: random.Random) -> float:
+        """遅延を1つ抽出する（秒）"""
+        p = self.params
+        if self.distribution == "constant":
+            ms = p.get("value_ms", 0.0)
+        elif self.distribution == "uniform":
+            ms = rng.uniform(p.get("min_ms", 0.0), p.get("max_ms", 0.0))
+        elif self.distribution == "normal":
+            ms = rng.gauss(p.get("mean_ms", 0.0), p.get("stddev_ms", 0.0))
+        elif self.distribution == "lognormal":
+            ms = rng.lognormvariate(
+                math.log(max(p.get("median_ms", 1.0), 1e-9)),
+                p.get("sigma", 0.0))
+        else:
+            mean_ms = p.get("mean_ms", 0.0)
+            ms = rng.expovariate(1.0 / mean_ms) if mean_ms > 0 else 0.0
+        return max(ms, 0.0) / 1000.0
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> "LatencyModel":
+        """latency設定から作成する。未指定の場合は遅延なし"""
+        config = dict(config or {})
+        return cls(config.pop("distribution", "constant"), **config)
+
+
+class SimulatedLLMService(ILLMService):
+    """スクリプト・記録済みの応答を返すオフラインのLLMサービス"""
+
+    def __init__(self, responses: Optional[Dict[str, Dict[str, list]]] = None,
+                 latency: Optional[LatencyModel] = None,
+                 error_rate: float = 0.0,
+                 output_size: Optional[Dict[str, Any]] = None,
+                 seed: int = 0):
+        """
+        Args:
+            responses: エージェントID → メッセージタイプ → 応答のリスト。
+                各応答はメッセージの辞書、またはそのリスト
+            latency: 応答遅延の分布。Noneの場合は遅延なし
+            error_rate: 呼び出しが失敗する確率（0.0〜1.0）
+            output_size: 応答に付加する本文の長さ。
+                {"min_chars": int, "max_chars": int, "field": "content"}
+            seed: 乱数のシード。同じシードなら同じ遅延・エラー・本文になる
+        """
+        if not 0.0 <= error_rate <= 1.0:
+            raise ValueError("error_rate must be between 0.0 and 1.0")
+        self.responses = responses or {}
+        self.latency = latency or LatencyModel()
+        self.error_rate = error_rate
+        self.output_size = output_size
+        self._rng = random.Random(seed)
+        self._cursors: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "errors": 0, "unscripted": 0,
+                      "messages": 0}
+
+    # ===== ILLMService =====
+
+    def generate_response(self, prompt: str) -> str:
+        """プロンプトに対する応答を生成する（レガシーメソッド）"""
+        with self._lock:
+            self.stats["calls"] += 1
+            delay = self.latency.sample(self._rng)
+        time.sleep(delay)
+        return ""
+
+    def generate_structured_response(
+        self,
+        agent_id: str,
+        context: Message,
+        generation_config: Optional[dict] = None,
+        model: Optional[str] = None
+    ) -> Optional[Message]:
+        """
+        スクリプト上の最初の応答メッセージを返す
+
+        Raises:
+            SimulatedLLMError: error_rateにより失敗した場合
+        """
+        messages = self.generate_structured_responses(agent_id, context)
+        return messages[0] if messages else None
+
+    def generate_structured_responses(
+        self,
+        agent_id: str,
+        context: Message,
+        generation_config: Optional[dict] = None,
+        model: Optional[str] = None
+    ) -> List[Message]:
+        """
+        スクリプト上の応答を、設定された遅延の後に返す
+
+        Raises:
+            SimulatedLLMError: error_rateにより失敗した場合（遅延の後）。
+                スクリプトに応答がない場合は例外ではなく空のリストを返す
+        """
+        delay, messages = self._respond(agent_id, context)
+        time.sleep(delay)
+        return self._raise_if_failed(agent_id, context, messages)
+
+    async def generate_structured_responses_async(
+        self,
+        agent_id: str,
+        context: Message,
+        generation_config: Optional[dict] = None,
+        model: Optional[str] = None
+    ) -> List[Message]:
+        """generate_structured_responsesの非同期版。待機中はループを解放する"""
+        delay, messages = self._respond(agent_id, context)
+        await asyncio.sleep(delay)
+        return self._raise_if_failed(agent_id, context, messages)
+
+    # ===== 応答の組み立て =====
+
+    def _respond(self, agent_id: str,
+                 context: Message) -> tuple[float, Optional[List[Message]]]:
+        """遅延と応答メッセージを決定する。失敗させる場合の応答はNone"""
+        delay, failed, template, filler = self._plan(
+            agent_id, context.message_type)
+        if failed:
+            return delay, None
+        if template is None:
+            return delay, []
+
+        entries = template if isinstance(template, list) else [template]
+        messages = [
+            self._build_message(agent_id, context, entry, filler)
+            for entry in entries
+        ]
+        with self._lock:
+            self.stats["messages"] += len(messages)
+        return delay, messages
+
+    @staticmethod
+    def _raise_if_failed(agent_id: str, context: Message,
+                         messages: Optional[List[Message]]) -> List[Message]:
+        """失敗させる呼び出しの場合はSimulatedLLMErrorを送出する"""
+        if messages is None:
+            raise SimulatedLLMError(
+                f"Simulated LLM failure for {agent_id} "
+                f"({context.message_type})")
+        return messages
+
+    def _plan(self, agent_id: str, message_type: str) -> tuple:
+        """
+        乱数に依存する決定をまとめて行う
+
+        並行して呼び出されても、呼び出し順が同じなら結果が同じになるよう
+        ロック内で乱数を引く。
+        """
+        with self._lock:
+            self.stats["calls"] += 1
+            delay = self.latency.sample(self._rng)
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.stats["errors"] += 1
+                return delay, True, None, None
+
+            template = self._next_template(agent_id, message_type)
+            if template is None:
+                self.stats["unscripted"] += 1
+            filler = None
+            if self.output_size:
+                size = self._rng.randint(
+                    self.output_size.get("min_chars", 0),
+                    self.output_size.get("max_chars",
+                                         self.output_size.get("min_chars", 0)))
+                filler = self._filler_text(size)
+            return delay, False, template, filler
+
+    def _next_template(self, agent_id: str, message_type: str):
+        """スクリプトから次の応答を取り出す。該当がなければNone"""
+        for agent_key in (agent_id, WILDCARD):
+            by_type = self.responses.get(agent_key, {})
+            for type_key in (message_type, WILDCARD):
+                candidates = by_type.get(type_key)
+                if candidates is None:
+                    continue
+                if not candidates:
+                    return []
+                cursor_key = (agent_key, type_key)
+                index = self._cursors.get(cursor_key, 0)
+                self._cursors[cursor_key] = index + 1
+                return candidates[index % len(candidates)]
+        return None
+
+    def _filler_text(self, size: int) -> str:
+        """指定した長さの決定的な本文を生成する"""
+        words = []
+        length = 0
+        while length < size:
+            word = f"lorem{self._rng.randrange(1000)} "
+            words.append(word)
+            length += len(word)
+        return "".join(words)[:size]
+
+    def _build_message(self, agent_id: str, context: Message,
+                       entry: Dict[str, Any],
+                       filler: Optional[str]) -> Message:
+        """スクリプトの1件からMessageを作成する"""
+        payload = render_payload(dict(entry.get("payload", {})),
+                                 context.payload)
+        if filler is not None:
+            payload.setdefault(self.output_size.get("field", "content"),
+                               filler)
+        return Message(
+            recipient_id=entry.get("recipient_id", context.sender_id),
+            sender_id=entry.get("sender_id", agent_id),
+            message_type=entry.get("message_type", "RESPONSE"),
+            payload=payload,
+            turn_id=context.turn_id + 1
+        )
+
+
+class RecordingLLMService(ILLMService):
+    """
+    実際のLLMサービスの応答をJSONLに記録するラッパー
+
+    記録したファイルはSimulatedLLMServiceのrecording_fileとして再生できる。
+    """
+
+    def __init__(self, inner: ILLMService, recording_file: str):
+        """
+        Args:
+            inner: 応答を生成する実際のLLMサービス
+            recording_file: 応答を追記するJSONLファイルのパス
+        """
+        self.inner = inner
+        self.recording_file = recording_file
+        # GeminiServiceと同じくプロンプト構築サービスを公開する
+        self.prompt_injector = getattr(inner, "prompt_injector", None)
+        self._lock = threading.Lock()
+        directory = os.path.dirname(recording_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def generate_response(self, prompt: str) -> str:
+        """プロンプトに対する応答を生成する（記録しない）"""
+        return self.inner.generate_response(prompt)
+
+    def generate_structured_response(
+        self,
+        agent_id: str,
+        context: Message,
+        generation_config: Optional[dict] = None,
+        model: Optional[str] = None
+    ) -> Optional[Message]:
+        """最初の応答メッセージを返す"""
+        messages = self.generate_structured_responses(
+            agent_id, context, generation_config, model)
+        return messages[0] if messages else None
+
+    def generate_structured_responses(
+        self,
+        agent_id: str,
+        context: Message,
+        generation_config: Optional[dict] = None,
+        model: Optional[str] = None
+    ) -> List[Message]:
+        """実際のLLMサービスの応答を記録してから返す"""
+        messages = self.inner.generate_structured_responses(
+            agent_id, context, generation_config, model)
+        self._record(agent_id, context, messages)
+        return messages
+
+    async def generate_structured_responses_async(
+        self,
+        agent_id: str,
+        context: Message,
+        generation_config: Optional[dict] = None,
+        model: Optional[str] = None
+    ) -> List[Message]:
+        """generate_structured_responsesの非同期版"""
+        messages = await self.inner.generate_structured_responses_async(
+            agent_id, context, generation_config, model)
+        self._record(agent_id, context, messages)
+        return messages
+
+    def _record(self, agent_id: str, context: Message,
+                messages: List[Message]) -> None:
+        """1回分の応答を追記する"""
+        line = json.dumps({
+            "agent_id": agent_id,
+            "message_type": context.message_type,
+            "messages": [{
+                "recipient_id": m.recipient_id,
+                "sender_id": m.sender_id,
+                "message_type": m.message_type,
+                "payload": m.payload,
+            } for m in messages],
+        }, ensure_ascii=False)
+        with self._lock:
+            with open(self.recording_file, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def load_recording(recording_file: str) -> Dict[str, Dict[str, list]]:
+    """記録済みの応答（JSONL）をスクリプトと同じ形式に変換する"""
+    responses: Dict[str, Dict[str, list]] = {}
+    with open(recording_file, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            responses.setdefault(record["agent_id"], {}).setdefault(
+                record["message_type"], []).append(record["messages"])
+    return responses
+
+
+def create_simulated_llm_service_from_config(
+        config: Dict[str, Any]) -> SimulatedLLMService:
+    """
+    llm.simulated設定からSimulatedLLMServiceを作成する
+
+    Args:
+        config: project.ymlのllmセクション
+    """
+    sim_config = config.get("simulated", {})
+    responses: Dict[str, Dict[str, list]] = {}
+    if sim_config.get("script_file"):
+        with open(sim_config["script_file"], "r", encoding="utf-8") as f:
+            responses.update((yaml.safe_load(f) or {}).get("responses", {}))
+    if sim_config.get("recording_file"):
+        # 記録済みの応答はスクリプトより優先する
+        for agent_id, by_type in load_recording(
+                sim_config["recording_file"]).items():
+            responses.setdefault(agent_id, {}).update(by_type)
+    responses.update(sim_config.get("responses", {}))
+
+    return SimulatedLLMService(
+        responses=responses,
+        latency=LatencyModel.from_config(sim_config.get("latency")),
+        error_rate=sim_config.get("error_rate", 0.0),
+        output_size=sim_config.get("output_size"),
+        seed=sim_config.get("seed", 0)
+    )
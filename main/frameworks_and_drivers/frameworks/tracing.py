@@ -0,0 +1,260 @@
+"""
+軽量なスパントレーシング
+
+1回のディベートでLLM呼び出し・メッセージ待機・プロンプト構築・
+SQLiteへの書き込みにどれだけ時間を使ったかを記録する。
+
+- トレースIDはMessage.payloadの "_trace" に入れてエージェント間で引き継ぐ
+- 各プロセスは同じ実行ごとのファイルにスパンを1行ずつ追記する
+    - jsonl: 1行1スパンのJSON
+    - chrome: Chromeのトレースイベント形式（chrome://tracing, Perfetto）。
+      配列の閉じ括弧は省略可能な形式なので、複数プロセスから追記できる
+- configure()されるまでは何も記録せず、span()はほぼコストなしで返る
+"""
+
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from main.entities.models import Message
+
+# Message.payload内でトレースコンテキストを運ぶキー
+TRACE_KEY = "_trace"
+
+FORMATS = ("jsonl", "chrome")
+
+# 現在のスパンの (trace_id, span_id)
+_current: contextvars.ContextVar[Optional[tuple]] = contextvars.ContextVar(
+    "current_span", default=None)
+
+
+class Tracer:
+    """スパンをファイルに追記するトレーサー"""
+
+    def __init__(self, output: str, format: str = "jsonl",
+                 process_name: Optional[str] = None):
+        """
+        Args:
+            output: 出力ファイルのパス。複数プロセスで共有してよい
+            format: "jsonl" または "chrome"
+            process_name: トレースビューアに表示するプロセス名
+        """
+        if format not in FORMATS:
+            raise ValueError(f"Unknown trace format: {format}")
+        self.output = output
+        self.format = format
+        self.pid = os.getpid()
+        directory = os.path.dirname(output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # 1回のwriteで1行を追記し、プロセス間で行が混ざらないようにする
+        self._fd = os.open(output, os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+                           0o644)
+        self._lock = threading.Lock()
+        if format == "chrome":
+            if os.fstat(self._fd).st_size == 0:
+                self._write("[\n")
+            if process_name:
+                self._write_event({
+                    "name": "process_name", "ph": "M", "pid": self.pid,
+                    "args": {"name": process_name},
+                })
+
+    def emit(self, name: str, trace_id: Optional[str], span_id: str,
+             parent_id: Optional[str], start_us: int, duration_us: int,
+             attributes: Dict[str, Any]) -> None:
+        """終了したスパンを1件書き出す"""
+        tid = threading.get_ident()
+        if self.format == "jsonl":
+            self._write(json.dumps({
+                "name": name, "trace_id": trace_id, "span_id": span_id,
+                "parent_id": parent_id, "start_us": start_us,
+                "duration_us": duration_us, "pid": self.pid, "tid": tid,
+                "attributes": attributes,
+            }, ensure_ascii=False, default=str) + "\n")
+        else:
+            self._write_event({
+                "name": name, "cat": name.split(".", 1)[0], "ph": "X",
+                "ts": start_us, "dur": duration_us, "pid": self.pid,
+                "tid": tid,
+                "args": {"trace_id": trace_id, "span_id": span_id,
+                         "parent_id": parent_id, **attributes},
+            })
+
+    def _write_event(self, event: Dict[str, Any]) -> None:
+        self._write(json.dumps(event, ensure_ascii=False, default=str)
+                    + ",\n")
+
+    def _write(self, text: str) -> None:
+        with self._lock:
+            os.write(self._fd, text.encode("utf-8"))
+
+    def close(self) -> None:
+        """出力ファイルを閉じる"""
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+class Span:
+    """計測中のスパン。with文で使う"""
+
+    def __init__(self, tracer: Tracer, name: str,
+                 trace_context: Optional[Dict[str, str]], root: bool,
+                 attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.span_id = secrets.token_hex(8)
+        current = _current.get()
+        if trace_context:
+            self.trace_id = trace_context.get("trace_id")
+            self.parent_id = trace_context.get("span_id")
+        elif current:
+            self.trace_id, self.parent_id = current
+        else:
+            self.trace_id = secrets.token_hex(16) if root else None
+            self.parent_id = None
+        self._discarded = False
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set((self.trace_id, self.span_id))
+        self._start_us = time.time_ns() // 1000
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        duration_us = int((time.perf_counter() - self._start) * 1_000_000)
+        _current.reset(self._token)
+        if self._discarded:
+            return
+        if exc_type is not None:
+            self.attributes["error"] = repr(exc_val)
+        self.tracer.emit(self.name, self.trace_id, self.span_id,
+                         self.parent_id, self._start_us, duration_us,
+                         self.attributes)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """スパンに属性を追加する"""
+        self.attributes[key] = value
+
+    def adopt(self, trace_context: Optional[Dict[str, str]]) -> None:
+        """
+        開始後に判明したトレースに所属させる
+
+        メッセージを受信するまでトレースIDが分からない待機スパンで使う。
+        """
+        if trace_context and self.trace_id is None:
+            self.trace_id = trace_context.get("trace_id")
+            if self.parent_id is None:
+                self.parent_id = trace_context.get("span_id")
+
+    def discard(self) -> None:
+        """このスパンを記録しない（何も起きなかった待機など）"""
+        self._discarded = True
+
+
+class _NoopSpan:
+    """トレース無効時のスパン"""
+
+    trace_id = None
+    span_id = None
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        return None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def adopt(self, trace_context: Optional[Dict[str, str]]) -> None:
+        pass
+
+    def discard(self) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+_tracer: Optional[Tracer] = None
+
+
+def span(name: str, trace_context: Optional[Dict[str, str]] = None,
+         root: bool = False, **attributes: Any):
+    """
+    スパンを開始する
+
+    Args:
+        name: スパン名（"agent.process_message" のように "領域.操作"）
+        trace_context: 受信メッセージから取り出したトレースコンテキスト。
+            指定時はそのトレースの子スパンになる
+        root: 親がない場合に新しいトレースを開始する
+        attributes: スパンに付ける属性
+    """
+    if _tracer is None:
+        return _NOOP_SPAN
+    return Span(_tracer, name, trace_context, root, attributes)
+
+
+def inject(message: Message) -> None:
+    """現在のスパンのトレースコンテキストをメッセージに埋め込む"""
+    current = _current.get()
+    if _tracer is None or current is None or current[0] is None:
+        return
+    message.payload[TRACE_KEY] = {"trace_id": current[0],
+                                  "span_id": current[1]}
+
+
+def extract(message: Message) -> Optional[Dict[str, str]]:
+    """
+    メッセージからトレースコンテキストを取り出し、payloadから取り除く
+
+    LLMへのプロンプトやキャッシュキーにトレースIDが混ざらないよう、
+    処理の前に取り除く。
+    """
+    return message.payload.pop(TRACE_KEY, None)
+
+
+def peek(message: Message) -> Optional[Dict[str, str]]:
+    """メッセージのトレースコンテキストを取り除かずに参照する"""
+    return message.payload.get(TRACE_KEY)
+
+
+def configure(config: Dict[str, Any],
+              process_name: Optional[str] = None) -> Optional[Tracer]:
+    """
+    tracing設定に従ってトレーサーを有効化する
+
+    Args:
+        config: {"enabled": bool, "format": "jsonl"|"chrome", "output": path}
+        process_name: トレースビューアに表示するプロセス名
+
+    Returns:
+        有効化した場合はTracer、それ以外はNone
+    """
+    global _tracer
+    shutdown()
+    if not config.get("enabled") or not config.get("output"):
+        return None
+    _tracer = Tracer(config["output"], config.get("format", "jsonl"),
+                     process_name)
+    return _tracer
+
+
+def shutdown() -> None:
+    """トレーサーを無効化してファイルを閉じる"""
+    global _tracer
+    if _tracer is not None:
+        _tracer.close()
+        _tracer = None
+
+
+def is_enabled() -> bool:
+    """トレースが有効かどうか"""
+    return _tracer is not None
@@ -2,10 +2,33 @@
 Agent Controller - Clean Architecture Refactored
 エージェントのメインループ実装（クリーンアーキテクチャ対応）
 """
+import json
 import os
-import time
+from contextlib import nullcontext
 from main.entities.models import Message
-from typing import Optional
+from main.use_cases.interfaces import MessageFilter
+from main.use_cases.services.debate_transcript import (
+    TRANSCRIPT_MESSAGE_TYPES, TranscriptHistoryService
+)
+from main.use_cases.services.moderator_rules import (
+    ModeratorRuleEngine, RoutingDecision
+)
+from typing import (
+    Any, AsyncContextManager, Awaitable, Callable, Optional
+)
+
+
+def _tracing():
+    """フレームワーク層のトレーシングを実行時に読み込む"""
+    from main.frameworks_and_drivers.frameworks import tracing
+    return tracing
+
+
+def _metrics():
+    """フレームワーク層のメトリクスを実行時に読み込む"""
+    from main.frameworks_and_drivers.frameworks import metrics
+    return metrics
+
 
 class AgentController:
     """
@@ -13,91 +36,409 @@ class AgentController:
     旧 AgentLoop からリファクタリング
     """
 
-    def __init__(self, agent_id: str):
+    # メッセージ待機の最大時間（秒）。1イテレーションの上限となる
+    WAIT_TIMEOUT_SEC = 2.0
+    # 処理中のメッセージのリース期間（秒）。LLM呼び出しを含む処理時間より長くする。
+    # プロセスが異常終了した場合はスーパーバイザーがリースを解放して再配信する
+    CLAIM_LEASE_SEC = 600.0
+    # 司会のルールエンジン。Noneの場合はすべての応答をLLMで生成する
+    rule_engine = None
+    # 受信した発言（*_FOR_REVIEWと提出）から逐次構築するトランスクリプト。
+    # Noneの場合は記録せず、LLMにも渡さない
+    history_service = None
+
+    def __init__(self, agent_id: str, message_bus=None, llm_service=None,
+                 debate_service=None):
         """
         エージェントコントローラーを初期化
 
         Args:
             agent_id: エージェントID
+            message_bus: 共有するメッセージバス。指定時は新たに接続しない
+            llm_service: 共有するLLMサービス。指定時は新たに作成しない
+            debate_service: 司会の遷移表を持つDebateService。遷移表で
+                決まる応答はLLMを呼ばずに作成する（ルールエンジンモード）
         """
         self.agent_id = agent_id
-        
+        self._use_debate_service(debate_service)
+        self.history_service = TranscriptHistoryService()
+
+        # 非同期ランタイムなど、1プロセス内で複数のエージェントを動かす場合は
+        # 呼び出し側が作成したサービスを共有する
+        if message_bus is not None or llm_service is not None:
+            self.message_bus = message_bus
+            self.prompt_injector = getattr(
+                llm_service, "prompt_injector", None)
+            self.gemini_service = llm_service
+            return
+
         # 依存性注入: アプリケーションの実行に必要なサービスを初期化
         # このtry-exceptブロックは、テスト時に依存関係をモックするためのものです
         try:
-            from main.frameworks_and_drivers.frameworks.message_broker import SqliteMessageBroker
+            from main.frameworks_and_drivers.frameworks.message_broker import (
+                create_broker_from_environment
+            )
             from main.frameworks_and_drivers.frameworks.prompt_injector_service import PromptInjectorService
-            from main.frameworks_and_drivers.frameworks.gemini_service import GeminiService
+            from main.frameworks_and_drivers.frameworks.llm_service_factory import (
+                create_llm_service_from_config
+            )
+            from main.frameworks_and_drivers.frameworks.debate_transitions import (
+                create_debate_service_from_config
+            )
 
-            message_db_path = os.environ.get("MESSAGE_DB_PATH")
-            if message_db_path:
-                self.message_bus = SqliteMessageBroker(message_db_path)
-            else:
-                self.message_bus = SqliteMessageBroker()
+            # スーパーバイザーから渡されたmessage_bus設定を適用する
+            self.message_bus = create_broker_from_environment()
             
             self.prompt_injector = PromptInjectorService()
-            self.gemini_service = GeminiService(prompt_injector=self.prompt_injector)
+            # スーパーバイザーから渡されたllm設定で、常駐ワーカープールと
+            # 応答キャッシュを持つGeminiService（またはシミュレーター）を作成する
+            self.gemini_service = create_llm_service_from_config(
+                json.loads(os.environ.get("LLM_CONFIG", "{}")),
+                self.prompt_injector)
+            # 司会の場合、project.ymlのmoderator.transitions_fileの遷移表を使う
+            moderator_config = json.loads(
+                os.environ.get("MODERATOR_CONFIG", "{}"))
+            self._use_debate_service(
+                create_debate_service_from_config(agent_id, moderator_config))
         except ImportError:
             # テスト環境用のフォールバック
             self.message_bus = None
             self.prompt_injector = None
             self.gemini_service = None
 
+    def _use_debate_service(self, debate_service) -> None:
+        """DebateServiceがあればルールエンジンモードで動作する"""
+        self.rule_engine = (None if debate_service is None
+                            else ModeratorRuleEngine(debate_service))
+
     def run(self) -> None:
-        """エージェントのメインループを開始"""
+        """
+        エージェントのメインループを開始
+
+        Raises:
+            Exception: メッセージの受信や受信確定に失敗した場合（メッセージの
+                処理中の例外はループ内で記録し、ループを続ける）
+        """
         print(f"[{self.agent_id}] Starting agent controller...")
 
         max_iterations = 100  # 無限ループを防ぐためのカウンター
         iteration = 0
+        tracing = _tracing()
 
         while iteration < max_iterations:
             try:
                 if self.message_bus:
-                    message = self.message_bus.get_message(self.agent_id)
-                    if message:
-                        self._process_message(message)
-                        time.sleep(1) # メッセージ処理後、少し待機
-                    else:
-                        time.sleep(2) # メッセージがない場合は少し長く待機
+                    # メッセージが届いた時点で即座に起床する
+                    with tracing.span("agent.wait_for_message",
+                                      agent_id=self.agent_id) as span:
+                        message, claimed = self._receive()
+                        if message:
+                            span.adopt(tracing.peek(message))
+                        else:
+                            span.discard()
+                    receipts = (self._process_message(message, claimed)
+                                if message else [])
+                    # 期限を過ぎたgatherは新しいメッセージがなくても終える
+                    receipts.extend(self._expire_gathers())
+                    # 処理を終えてから受信を確定する。gather中のメッセージは
+                    # 揃うまで確定せず、異常終了時は再配信される
+                    for receipt in receipts:
+                        self.message_bus.ack(receipt.delivery_id,
+                                             receipt.delivery_count)
                 else:
                     # 依存関係が注入されていない場合はループを抜ける
                     break
                 iteration += 1
             except Exception as e:
+                # プロセスを異常終了させ、スーパーバイザーに再起動させる。
+                # ackしていないメッセージは再起動後に再配信される
                 print(f"[{self.agent_id}] Error in message loop: {e}")
-                break
+                raise
 
-    def _process_message(self, message: Message) -> None:
+    def announce_ready(self, startup_sec: Optional[float] = None) -> None:
+        """
+        ペルソナとトランスクリプトを読み込み、受信を始められることを
+        スーパーバイザーに通知する
+
+        Args:
+            startup_sec: プロセスの起動からここまでにかかった秒数
+        """
+        if self.message_bus is None:
+            return
+        if self.prompt_injector is not None:
+            # 最初のメッセージの処理でペルソナの読み込みを待たないようにする
+            self.prompt_injector.get_persona(self.agent_id)
+        self.restore_transcript()
+        self.message_bus.post_message(Message(
+            sender_id=self.agent_id,
+            recipient_id="SUPERVISOR",
+            message_type="AGENT_READY",
+            payload={"pid": os.getpid(), "startup_sec": startup_sec},
+            turn_id=0
+        ))
+
+    def restore_transcript(self) -> int:
+        """
+        再起動前に受信を確定した発言から、トランスクリプトを復元する
+
+        履歴を保存するメッセージバス（iter_messagesを持つもの）の場合だけ、
+        このエージェント宛ての発言を少しずつ読み出して追記する。
+        確定していない発言は再配信され、処理するときに記録される。
+
+        Returns:
+            復元した発言の数
+        """
+        iter_messages = getattr(type(self.message_bus), "iter_messages",
+                                None)
+        if iter_messages is None or self.history_service is None:
+            return 0
+        restored = self.history_service.restore(
+            self.message_bus.iter_messages(filter=MessageFilter(
+                recipient_id=self.agent_id,
+                message_type=TRANSCRIPT_MESSAGE_TYPES,
+                delivered=True)))
+        if restored:
+            print(f"[{self.agent_id}] Restored {restored} statement(s) "
+                  f"into the transcript")
+        return restored
+
+    def _receive(self) -> tuple[Optional[Message], Optional[Any]]:
+        """
+        次のメッセージを受信する
+
+        リース付きの受信に対応したメッセージバスでは、処理が終わるまで
+        受信を確定しない。処理中にプロセスが終了しても、メッセージは
+        再起動後に再配信される。
+
+        Returns:
+            (メッセージ, ackに使うClaimedMessage)。リースを使わない場合、
+            ClaimedMessageはNone
+        """
+        wait_for_claim = getattr(type(self.message_bus), "wait_for_claim",
+                                 None)
+        if wait_for_claim is None:
+            return self.message_bus.wait_for_message(
+                self.agent_id, timeout=self.WAIT_TIMEOUT_SEC), None
+        claimed = self.message_bus.wait_for_claim(
+            self.agent_id, timeout=self.WAIT_TIMEOUT_SEC,
+            lease_sec=self.CLAIM_LEASE_SEC)
+        if claimed is None:
+            return None, None
+        return claimed.message, claimed
+
+    def _process_message(self, message: Message,
+                         receipt: Any = None) -> list[Any]:
         """
         受け取ったメッセージを処理し、応答を生成して送信する
+
+        Args:
+            message: 受信したメッセージ
+            receipt: 受信確定に使うClaimedMessage
+
+        Returns:
+            処理を終えて受信を確定してよいreceipt。司会がgather中の
+            メッセージは揃うまで返さない
         """
         print(f"[{self.agent_id}] Processing message: {message.message_type}")
+        receipts = [] if receipt is None else [receipt]
         try:
-            response_message: Optional[Message] = None
+            with self._process_span(message):
+                self._record(message)
+                # 遷移表で決まる応答はLLMを呼ばずに作成する
+                decision = self._route_locally(message, receipt)
+                receipts = decision.receipts
+                self._respond(message, decision)
+
+        except Exception as e:
+            print(f"[{self.agent_id}] Error processing message: {e}")
+        return receipts
 
-            # GeminiServiceが利用可能な場合は、LLMを使って応答を生成する
-            if self.gemini_service:
-                llm_response = self.gemini_service.generate_structured_response(
-                    agent_id=self.agent_id,
-                    context=message
+    def _expire_gathers(self) -> list[Any]:
+        """
+        期限を過ぎたgatherを届いた分で処理する
+
+        Returns:
+            受信を確定してよいreceipt
+        """
+        receipts: list[Any] = []
+        for message, decision in self._expired_decisions():
+            receipts.extend(decision.receipts)
+            try:
+                with self._process_span(message):
+                    self._respond(message, decision)
+            except Exception as e:
+                print(f"[{self.agent_id}] Error processing message: {e}")
+        return receipts
+
+    def _respond(self, message: Message,
+                 decision: RoutingDecision) -> None:
+        """応答の決め方に従って応答を作成し、送信する"""
+        llm_responses = self._local_responses(decision)
+        # GeminiServiceが利用可能な場合は、LLMを使って応答を生成する
+        if decision.kind == "llm" and self.gemini_service:
+            # 1回の応答に複数のメッセージ（ファンアウト）が含まれる場合がある
+            llm_responses = self.gemini_service.generate_structured_responses(
+                agent_id=self.agent_id,
+                context=self._llm_context(decision)
+            )
+        self._post_responses(self._build_responses(message, llm_responses))
+
+    async def process_message_async(
+        self, message: Message,
+        llm_slots: Optional[AsyncContextManager] = None,
+        post: Optional[Callable[[list[Message]], Awaitable[None]]] = None
+    ) -> None:
+        """
+        _process_messageの非同期版。LLM呼び出しの間はイベントループを解放する
+
+        Args:
+            message: 受信したメッセージ
+            llm_slots: LLM呼び出しの間だけ保持する同時実行数の制限
+                （asyncio.Semaphoreなど）。遷移表で決まる応答には使わない
+            post: 応答をメッセージバスへ投函するコルーチン関数。
+                Noneの場合はこのスレッドで投函する
+        """
+        print(f"[{self.agent_id}] Processing message: {message.message_type}")
+        try:
+            with self._process_span(message):
+                self._record(message)
+                await self._respond_async(
+                    message, self._route_locally(message), llm_slots, post)
+
+        except Exception as e:
+            print(f"[{self.agent_id}] Error processing message: {e}")
+
+    async def expire_gathers_async(
+        self, llm_slots: Optional[AsyncContextManager] = None,
+        post: Optional[Callable[[list[Message]], Awaitable[None]]] = None
+    ) -> None:
+        """_expire_gathersの非同期版（引数はprocess_message_asyncと同じ）"""
+        for message, decision in self._expired_decisions():
+            try:
+                with self._process_span(message):
+                    await self._respond_async(message, decision, llm_slots,
+                                              post)
+            except Exception as e:
+                print(f"[{self.agent_id}] Error processing message: {e}")
+
+    async def _respond_async(
+        self, message: Message, decision: RoutingDecision,
+        llm_slots: Optional[AsyncContextManager],
+        post: Optional[Callable[[list[Message]], Awaitable[None]]]
+    ) -> None:
+        """_respondの非同期版。LLM呼び出しの間だけllm_slotsを保持する"""
+        llm_responses = self._local_responses(decision)
+        if decision.kind == "llm" and self.gemini_service:
+            async with llm_slots or nullcontext():
+                llm_responses = (
+                    await self.gemini_service.generate_structured_responses_async(
+                        agent_id=self.agent_id,
+                        context=self._llm_context(decision)
+                    )
                 )
-                
-                # LLMの応答から次のメッセージを作成
-                if llm_response:
-                    response_message = self._create_response_message(message, llm_response)
-            else:
-                # フォールバック: シナリオテスト用の簡易レスポンス生成
-                response_message = self._generate_scenario_response(message)
-
-            # 生成された応答メッセージをメッセージバスに投函
-            if response_message and self.message_bus:
-                self.message_bus.post_message(response_message)
+        responses = self._build_responses(message, llm_responses)
+        if post is None:
+            self._post_responses(responses)
+        else:
+            await post(responses)
+
+    def _route_locally(self, message: Message,
+                       receipt: Any = None) -> RoutingDecision:
+        """
+        ルールエンジンで応答の決め方を選ぶ
+
+        ルールエンジンがない場合は、すべてLLMに任せる決定を返す。
+        """
+        if self.rule_engine is None:
+            return RoutingDecision(
+                "llm", llm_context=message,
+                receipts=[] if receipt is None else [receipt])
+        tracing = _tracing()
+        with tracing.span("agent.route_locally", agent_id=self.agent_id,
+                          message_type=message.message_type) as span:
+            decision = self.rule_engine.decide(message, receipt)
+            span.set_attribute("decision", decision.kind)
+        _metrics().MODERATOR_DECISIONS.inc(decision=decision.kind)
+        return decision
+
+    def _expired_decisions(self) -> list[tuple[Message, RoutingDecision]]:
+        """ルールエンジンから期限を過ぎたgatherの決定を取り出す"""
+        if self.rule_engine is None:
+            return []
+        expired = self.rule_engine.expire()
+        for message, decision in expired:
+            _metrics().MODERATOR_DECISIONS.inc(decision=decision.kind)
+            missing = decision.gathered.timed_out
+            print(f"[{self.agent_id}] Gather deadline passed for "
+                  f"{message.message_type} (missing: {missing}); "
+                  f"decision: {decision.kind}")
+        return expired
+
+    def _record(self, message: Message) -> None:
+        """受信した発言をトランスクリプトに追記する"""
+        if self.history_service is not None:
+            self.history_service.record(message)
+
+    def _llm_context(self, decision: RoutingDecision) -> Message:
+        """LLMに渡すメッセージ。反駁・判定の依頼にはトランスクリプトを付ける"""
+        if self.history_service is None:
+            return decision.llm_context
+        return self.history_service.with_transcript(decision.llm_context)
+
+    @staticmethod
+    def _local_responses(
+            decision: RoutingDecision) -> Optional[list[Message]]:
+        """
+        LLMを呼ばずに決まる応答
+
+        Returns:
+            遷移表で作成した応答。gather中・timeoutは空のリスト、
+            LLMに任せる場合はNone
+        """
+        return None if decision.kind == "llm" else decision.messages
+
+    def _process_span(self, message: Message):
+        """
+        メッセージ処理のスパンを開始する
+
+        送信元から引き継いだトレースコンテキストはpayloadから取り除き、
+        LLMへのプロンプトに含まれないようにする。
+        """
+        tracing = _tracing()
+        return tracing.span("agent.process_message",
+                            trace_context=tracing.extract(message),
+                            agent_id=self.agent_id,
+                            message_type=message.message_type)
+
+    def _build_responses(
+        self, message: Message, llm_responses: Optional[list[Message]]
+    ) -> list[Message]:
+        """LLMの応答から送信するメッセージのリストを作成する"""
+        if llm_responses is not None:
+            # LLMの応答から次のメッセージを作成
+            responses = [
+                self._create_response_message(message, llm_response)
+                for llm_response in llm_responses
+            ]
+        else:
+            # フォールバック: シナリオテスト用の簡易レスポンス生成
+            scenario_response = self._generate_scenario_response(message)
+            responses = [scenario_response] if scenario_response else []
+
+        # 受信側が同じトレースの続きとして記録できるようにする
+        tracing = _tracing()
+        for response in responses:
+            tracing.inject(response)
+        return responses
+
+    def _post_responses(self, response_messages: list[Message]) -> None:
+        """生成された応答メッセージを1回の書き込みでメッセージバスに投函"""
+        if response_messages and self.message_bus:
+            self.message_bus.post_messages(response_messages)
+            for response_message in response_messages:
                 print(f"[{self.agent_id}] Sent response: "
                       f"{response_message.message_type} to "
                       f"{response_message.recipient_id}")
-                      
-        except Exception as e:
-            print(f"[{self.agent_id}] Error processing message: {e}")
 
     def _create_response_message(
         self, original_message: Message, llm_response_message: Message
@@ -22,6 +22,9 @@ from main.entities.models import Message
 
 
 class AgentOrchestrator:
+    # clean モードで読み込むペルソナファイルのディレクトリ
+    PERSONA_CONFIG_DIR = "/app/config"
+
     def __init__(self, agent_id: str, mode: str = 'clean'):
         self.agent_id = agent_id
         self.mode = mode
@@ -39,10 +42,15 @@ class AgentOrchestrator:
             self.prompt_repository = FileBasedPromptRepository()
             self.prompt_injector = PromptInjectorService(
                 self.prompt_repository)
+            # メッセージごとにファイルを読まないよう、起動時に読み込んでおく
+            self.persona_repository = FileBasedPromptRepository(
+                self.PERSONA_CONFIG_DIR)
+            self.persona_repository.preload([self.agent_id])
         except Exception as e:
             print(f"Prompt services initialization failed: {e}")
             self.prompt_repository = None
             self.prompt_injector = None
+            self.persona_repository = None
 
         # LLMサービスの初期化（依存性注入）
         try:
@@ -66,7 +74,8 @@ class AgentOrchestrator:
 
         while True:
             try:
-                message = self.message_broker.get_message(self.agent_id)
+                message = self.message_broker.wait_for_message(
+                    self.agent_id, timeout=3)
                 if message:
                     msg_type = message.message_type
                     print(f"[{self.agent_id}] Received message: {msg_type}")
@@ -75,7 +84,6 @@ class AgentOrchestrator:
                         break
                 else:
                     print(f"[{self.agent_id}] No messages, waiting...")
-                time.sleep(3)
             except Exception as e:
                 print(f"[{self.agent_id}] Error in main loop: {e}")
                 import traceback
@@ -97,22 +105,12 @@ class AgentOrchestrator:
     def _handle_message_clean(self, message: Message) -> Optional[str]:
         """クリーンアーキテクチャでメッセージを処理"""
         try:
-            # エージェントのペルソナを読み込む
-            # エージェントIDから設定ファイル名への変換
-            agent_file_map = {
-                'DEBATER_A': 'debater_a',
-                'DEBATER_N': 'debater_n',
-                'MODERATOR': 'moderator',
-                'JUDGE_L': 'judge_l',
-                'JUDGE_E': 'judge_e',
-                'JUDGE_R': 'judge_r',
-                'ANALYST': 'analyst'
-            }
-            agent_name = agent_file_map.get(self.agent_id,
-                                            self.agent_id.lower())
-            config_file = f"/app/config/{agent_name}.md"
-            with open(config_file, 'r') as f:
-                persona = f.read()
+            # エージェントのペルソナを取得する（更新されていなければキャッシュ）
+            persona = self.persona_repository.get_persona(self.agent_id)
+            if not persona:
+                raise FileNotFoundError(
+                    f"Persona not found for {self.agent_id} in "
+                    f"{self.PERSONA_CONFIG_DIR}")
 
             # ReActServiceを使用してメッセージを処理
             response = self.react_service.think_and_act(
@@ -4,12 +4,23 @@
 """
 
 import re
+from typing import Optional
 from main.use_cases.interfaces import (
     IMessageBroker, ILLMService, IPromptRepository,
     IDebateHistoryService
 )
+from main.use_cases.services.history_window import (
+    HistoryWindow, LastNWindow, PhaseSummaryWindow, TokenBudgetWindow,
+    extractive_summarizer
+)
 from main.entities.models import Message, AgentID
 
+# 反駁では直近のやり取りのみを参照する
+REBUTTAL_HISTORY_TURNS = 6
+REBUTTAL_HISTORY_MAX_TOKENS = 3000
+# 判定では全体を参照し、収まらない場合は完了したフェーズを要約する
+JUDGEMENT_HISTORY_MAX_TOKENS = 12000
+
 
 class SubmitStatementUseCase:
     """立論提出のユースケース"""
@@ -75,11 +86,15 @@ class SubmitRebuttalUseCase:
     def __init__(self, llm_service: ILLMService,
                  message_broker: IMessageBroker,
                  prompt_repository: IPromptRepository,
-                 history_service: IDebateHistoryService):
+                 history_service: IDebateHistoryService,
+                 history_window: Optional[HistoryWindow] = None):
         self.llm_service = llm_service
         self.message_broker = message_broker
         self.prompt_repository = prompt_repository
         self.history_service = history_service
+        self.history_window = history_window or TokenBudgetWindow(
+            REBUTTAL_HISTORY_MAX_TOKENS,
+            inner=LastNWindow(REBUTTAL_HISTORY_TURNS))
 
     def execute(self, topic: str, sender_id: AgentID, turn_id: int) -> None:
         """反駁を生成して提出する"""
@@ -109,9 +124,7 @@ class SubmitRebuttalUseCase:
     def _build_rebuttal_prompt(self, persona: str, topic: str,
                                history: list, sender_id: AgentID) -> str:
         """反駁用のプロンプトを構築"""
-        history_text = "\n\n".join(
-            [f"{h['sender']}: {h['content']}" for h in history]
-        )
+        history_text = self.history_window.render(history)
 
         return f"""あなたは{sender_id}として討論を続けます。
 
@@ -132,11 +145,15 @@ class SubmitJudgementUseCase:
     def __init__(self, llm_service: ILLMService,
                  message_broker: IMessageBroker,
                  prompt_repository: IPromptRepository,
-                 history_service: IDebateHistoryService):
+                 history_service: IDebateHistoryService,
+                 history_window: Optional[HistoryWindow] = None):
         self.llm_service = llm_service
         self.message_broker = message_broker
         self.prompt_repository = prompt_repository
         self.history_service = history_service
+        self.history_window = history_window or TokenBudgetWindow(
+            JUDGEMENT_HISTORY_MAX_TOKENS,
+            fallback=PhaseSummaryWindow(extractive_summarizer()))
 
     def execute(self, topic: str, sender_id: AgentID, turn_id: int) -> None:
         """判定を生成して提出する"""
@@ -172,9 +189,7 @@ class SubmitJudgementUseCase:
     def _build_judgement_prompt(self, persona: str, topic: str,
                                 history: list, sender_id: AgentID) -> str:
         """判定用のプロンプトを構築"""
-        history_text = "\n\n".join(
-            [f"{h['sender']}: {h['content']}" for h in history]
-        )
+        history_text = self.history_window.render(history)
 
         return f"""あなたは{sender_id}として討論の判定を行います。
 
@@ -233,3 +248,4 @@ DEBATER_A（有益派）とDEBATER_N（有害派）の討論を以下の観点
             "debater_a": a_score,
             "debater_n": n_score
         }
+
@@ -1,6 +1,7 @@
 # Use Cases Interfaces
 from .interfaces import (
     IMessageBroker,
+    MessageFilter,
     ILLMService,
     IPromptRepository,
     IDebateHistoryService,
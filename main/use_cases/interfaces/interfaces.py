@@ -3,11 +3,46 @@
 依存性逆転の原則により外部サービスとの窓口を抽象化
 """
 
+import asyncio
+import time
 from abc import ABC, abstractmethod
-from typing import Optional
+from dataclasses import dataclass, replace
+from typing import Iterable, Optional, Tuple, Union
 from main.entities.models import Message, AgentID
 
 
+def _as_tuple(value: Union[None, str, Iterable[str]]
+              ) -> Optional[Tuple[str, ...]]:
+    """単一の値または値の並びをタプルに正規化する"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return (value,)
+    return tuple(value)
+
+
+@dataclass(frozen=True)
+class MessageFilter:
+    """
+    メッセージ履歴の検索条件
+
+    sender_id・recipient_id・message_typeは単一の値または値の並びで指定し、
+    並びの場合はいずれかに一致すればよい。min_turn/max_turnは両端を含む。
+    deliveredは受信者が受信を確定した（True）か、まだ確定していない（False）か。
+    Noneの条件は絞り込みに使わない。
+    """
+    sender_id: Union[None, AgentID, Iterable[AgentID]] = None
+    recipient_id: Union[None, AgentID, Iterable[AgentID]] = None
+    message_type: Union[None, str, Iterable[str]] = None
+    min_turn: Optional[int] = None
+    max_turn: Optional[int] = None
+    delivered: Optional[bool] = None
+
+    def __post_init__(self):
+        for name in ("sender_id", "recipient_id", "message_type"):
+            object.__setattr__(self, name, _as_tuple(getattr(self, name)))
+
+
 class IMessageBroker(ABC):
     """メッセージブローカーのインターフェース"""
 
@@ -21,6 +56,49 @@ class IMessageBroker(ABC):
         """指定した受信者宛のメッセージを取得する"""
         pass
 
+    def post_messages(self, messages: list[Message]) -> None:
+        """
+        複数のメッセージをまとめて送信する
+
+        デフォルト実装は1件ずつpost_messageを呼ぶ。
+        一括書き込みに対応したブローカーはこのメソッドをオーバーライドする。
+        """
+        for message in messages:
+            self.post_message(message)
+
+    def broadcast(self, message: Message,
+                  recipients: Iterable[AgentID]) -> None:
+        """同じ内容のメッセージを複数の受信者へまとめて送信する"""
+        self.post_messages([
+            replace(message, recipient_id=recipient_id,
+                    payload=dict(message.payload))
+            for recipient_id in recipients
+        ])
+
+    def wait_for_message(self, recipient_id: AgentID,
+                         timeout: Optional[float] = None) -> Optional[Message]:
+        """
+        指定した受信者宛のメッセージが届くまでブロックして待機する
+
+        デフォルト実装は短い間隔でget_messageをポーリングする。
+        起床通知を持つブローカーはこのメソッドをオーバーライドする。
+
+        Args:
+            recipient_id: 受信者ID
+            timeout: 最大待機時間（秒）。Noneの場合は無期限に待機
+
+        Returns:
+            受信したメッセージ。タイムアウト時はNone
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            message = self.get_message(recipient_id)
+            if message:
+                return message
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(0.05)
+
 
 class ILLMService(ABC):
     """LLM（大規模言語モデル）サービスのインターフェース"""
@@ -41,6 +119,41 @@ class ILLMService(ABC):
         """構造化されたMessage応答を生成する（新しいメソッド）"""
         pass
 
+    def generate_structured_responses(
+        self,
+        agent_id: str,
+        context: Message,
+        generation_config: Optional[dict] = None,
+        model: Optional[str] = None
+    ) -> list[Message]:
+        """
+        1回の応答に含まれる複数のMessageを生成する
+
+        デフォルト実装はgenerate_structured_responseの結果を1件のリストにする。
+        """
+        response = self.generate_structured_response(
+            agent_id, context, generation_config=generation_config,
+            model=model
+        )
+        return [response] if response else []
+
+    async def generate_structured_responses_async(
+        self,
+        agent_id: str,
+        context: Message,
+        generation_config: Optional[dict] = None,
+        model: Optional[str] = None
+    ) -> list[Message]:
+        """
+        generate_structured_responsesの非同期版
+
+        デフォルト実装は同期メソッドをスレッドで実行する。
+        """
+        return await asyncio.to_thread(
+            self.generate_structured_responses, agent_id, context,
+            generation_config, model
+        )
+
 
 class IPromptRepository(ABC):
     """プロンプト・ペルソナ管理のインターフェース"""
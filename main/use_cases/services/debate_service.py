@@ -3,54 +3,268 @@
 
 TDD Green段階：ディベートのビジネスロジックをアプリケーション層で実装
 ドメイン層の汎用モデルを使ってディベート機能を提供
+
+司会の状態遷移は宣言的な遷移表（YAMLなどから読み込んだ辞書）で定義し、
+compile_transitionsで (message_type, sender_id) をキーとする辞書に
+変換してから使う。遷移表の形式:
+
+    groups:                        # 宛先をまとめて指定するための名前
+      judges: [JUDGE_L, JUDGE_E, JUDGE_R]
+    transitions:
+      - receive: SUBMIT_STATEMENT  # 受信したメッセージの種類
+        from: DEBATER_A            # 送信者（省略時は任意の送信者）
+        when: {phase: opening}     # payloadの値の条件（省略可）
+        send:                      # 送るメッセージ（この順に配信する）
+          - message_type: STATEMENT_FOR_REVIEW
+            to: [DEBATER_N, judges]
+            forward_payload: true  # 受信したpayloadを引き継ぐ
+          - message_type: PROMPT_FOR_STATEMENT
+            to: DEBATER_N
+            payload: {topic: "{topic}"}  # "{キー}" は受信payloadの値
+      - receive: INITIATE_DEBATE
+        llm: true                  # 内容の生成が必要なためLLMに任せる
+      - receive: SUBMIT_JUDGEMENT
+        gather: judges             # 全員から届いてから1回だけ遷移する
+        deadline: 180              # 最初の1通から待つ最大秒数（省略可）
+        quorum: 2                  # 期限に届いていれば遷移する数（省略可）
+        grace: 10                  # quorumに達した後に残りを待つ秒数（省略可）
+        llm: true
+
+gatherはModeratorRuleEngineが処理する（DebateService.routeは扱わない）。
+deadline/quorum/graceはscatter_gatherと同じ意味で、省略時の値は
+ModeratorRuleEngineが決める。
 """
 
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
 from main.entities.models import Message
+from main.use_cases.services.payload_template import render_payload
+
+# fromを省略した遷移のキーに使う送信者
+ANY_SENDER = "*"
+
+TransitionKey = Tuple[str, str]
+
+# 汎用セッションの遷移（遷移表を指定しない場合に使う）
+DEFAULT_TRANSITIONS: Dict[str, Any] = {
+    "transitions": [
+        {
+            "receive": "START_SESSION",
+            "when": {"session_type": "debate"},
+            "send": [{
+                "message_type": "PROMPT_FOR_STATEMENT",
+                "to": "DEBATER_A",
+                "payload": {"topic": "{topic}", "phase": "statement",
+                            "turn": 1},
+            }],
+        },
+        {
+            "receive": "SUBMIT_RESPONSE",
+            "from": "DEBATER_A",
+            "when": {"response_type": "statement"},
+            # DEBATER_Aの発言後はDEBATER_Nの番
+            "send": [{
+                "message_type": "PROMPT_FOR_STATEMENT",
+                "to": "DEBATER_N",
+                "payload": {"phase": "statement", "turn": 2},
+            }],
+        },
+    ],
+}
+
+
+@dataclass(frozen=True)
+class OutgoingMessage:
+    """遷移で送るメッセージ（宛先ごとに1通ずつ送る）"""
+    message_type: str
+    recipients: Tuple[str, ...]
+    payload: Dict[str, Any] = field(default_factory=dict)
+    forward_payload: bool = False
+
+
+@dataclass(frozen=True)
+class Transition:
+    """1つの状態遷移"""
+    message_type: str
+    sender_id: str = ANY_SENDER
+    when: Dict[str, Any] = field(default_factory=dict)
+    send: Tuple[OutgoingMessage, ...] = ()
+    # Trueの場合、内容の生成が必要なためLLMに任せる
+    llm: bool = False
+    # 空でない場合、これらの送信者全員から届くまで遷移を待つ
+    gather: Tuple[str, ...] = ()
+    # gatherを待つ最大秒数・期限に必要な数・quorum後の猶予（Noneは既定値）
+    deadline: Optional[float] = None
+    quorum: Optional[int] = None
+    grace: Optional[float] = None
+
+    def matches(self, message: Message) -> bool:
+        """payloadがwhenの条件を満たすか"""
+        return all(message.payload.get(key) == value
+                   for key, value in self.when.items())
+
+
+TransitionTable = Dict[TransitionKey, Tuple[Transition, ...]]
+
+
+def compile_transitions(definition: Dict[str, Any]) -> TransitionTable:
+    """
+    宣言的な遷移表を (message_type, sender_id) をキーとする辞書に変換する
+
+    宛先のグループ名はここで展開し、実行時には辞書を1回引くだけで
+    遷移が決まるようにする。
+
+    Raises:
+        ValueError: 遷移表の形式が正しくない場合
+    """
+    groups = {name: _as_list(members)
+              for name, members in (definition.get("groups") or {}).items()}
+    table: Dict[TransitionKey, List[Transition]] = {}
+    for index, entry in enumerate(definition.get("transitions") or []):
+        if not entry.get("receive"):
+            raise ValueError(f"transition #{index} has no 'receive'")
+        send = tuple(_compile_outgoing(item, groups, index)
+                     for item in entry.get("send") or [])
+        llm = bool(entry.get("llm", False))
+        if not send and not llm:
+            raise ValueError(
+                f"transition #{index} ({entry['receive']}) sends nothing; "
+                f"use 'llm: true' to leave it to the LLM")
+        transition = Transition(
+            message_type=entry["receive"],
+            sender_id=entry.get("from", ANY_SENDER),
+            when=dict(entry.get("when") or {}),
+            send=send,
+            llm=llm,
+            gather=tuple(_expand(entry.get("gather") or [], groups)),
+            deadline=entry.get("deadline"),
+            quorum=entry.get("quorum"),
+            grace=entry.get("grace"))
+        _check_gather_options(transition, index)
+        key = (transition.message_type, transition.sender_id)
+        if any(existing.when == transition.when
+               for existing in table.get(key, [])):
+            raise ValueError(f"duplicate transition for {key}")
+        table.setdefault(key, []).append(transition)
+    return {key: tuple(transitions) for key, transitions in table.items()}
+
+
+def _compile_outgoing(item: Dict[str, Any], groups: Dict[str, List[str]],
+                      index: int) -> OutgoingMessage:
+    if not item.get("message_type") or not item.get("to"):
+        raise ValueError(
+            f"transition #{index}: each message needs 'message_type' "
+            f"and 'to'")
+    return OutgoingMessage(
+        message_type=item["message_type"],
+        recipients=tuple(_expand(item["to"], groups)),
+        payload=dict(item.get("payload") or {}),
+        forward_payload=bool(item.get("forward_payload", False)))
+
+
+def _check_gather_options(transition: Transition, index: int) -> None:
+    """deadline/quorum/graceの値を検証する"""
+    options = {"deadline": transition.deadline, "quorum": transition.quorum,
+               "grace": transition.grace}
+    if not transition.gather:
+        given = sorted(name for name, value in options.items()
+                       if value is not None)
+        if given:
+            raise ValueError(
+                f"transition #{index}: {', '.join(given)} requires 'gather'")
+        return
+    if transition.deadline is not None and transition.deadline <= 0:
+        raise ValueError(f"transition #{index}: deadline must be positive")
+    if transition.quorum is not None and not (
+            1 <= transition.quorum <= len(transition.gather)):
+        raise ValueError(
+            f"transition #{index}: quorum must be between 1 and "
+            f"the number of gathered senders")
+    if transition.grace is not None and transition.grace < 0:
+        raise ValueError(f"transition #{index}: grace must not be negative")
+
+
+def _as_list(value) -> List[str]:
+    return [value] if isinstance(value, str) else list(value)
+
+
+def _expand(names, groups: Dict[str, List[str]]) -> List[str]:
+    """グループ名をメンバーに展開する"""
+    expanded: List[str] = []
+    for name in _as_list(names):
+        expanded.extend(groups.get(name, [name]))
+    return expanded
 
 
 class DebateService:
     """ディベートの進行管理を行うサービス"""
 
+    def __init__(self, transitions: Optional[TransitionTable] = None,
+                 agent_id: str = "MODERATOR"):
+        """
+        Args:
+            transitions: compile_transitionsで変換した遷移表。
+                Noneの場合はDEFAULT_TRANSITIONS
+            agent_id: 送信するメッセージのsender_id
+        """
+        self.transitions = (compile_transitions(DEFAULT_TRANSITIONS)
+                            if transitions is None else transitions)
+        self.agent_id = agent_id
+
+    def find_transition(self, message: Message) -> Optional[Transition]:
+        """受信したメッセージに対応する遷移を探す（送信者の指定を優先）"""
+        for sender_id in (message.sender_id, ANY_SENDER):
+            for transition in self.transitions.get(
+                    (message.message_type, sender_id), ()):
+                if transition.matches(message):
+                    return transition
+        return None
+
+    def route(self, message: Message) -> Optional[List[Message]]:
+        """
+        遷移表だけで決まる次のメッセージを作成する
+
+        Returns:
+            送信するメッセージ（配信する順）。遷移がLLMに任されている場合、
+            他の送信者を待つ場合、遷移表にない場合はNone
+        """
+        transition = self.find_transition(message)
+        if transition is None or transition.llm or transition.gather:
+            return None
+        return self.apply(transition, message)
+
+    def apply(self, transition: Transition,
+              message: Message) -> List[Message]:
+        """遷移のsendから、messageへの応答を作成する"""
+        messages = []
+        for outgoing in transition.send:
+            payload = dict(message.payload) if outgoing.forward_payload else {}
+            payload.update(render_payload(outgoing.payload, message.payload))
+            messages.extend(
+                Message(sender_id=self.agent_id,
+                        recipient_id=recipient_id,
+                        message_type=outgoing.message_type,
+                        payload=dict(payload),
+                        turn_id=message.turn_id + 1)
+                for recipient_id in outgoing.recipients)
+        return messages
+
     def determine_next_action(self, last_message: Message) -> Message:
         """
         ディベートのステートマシンに基づき、次のメッセージを決定する
-        （旧moderator.mdのロジックがここに入る）
+
+        複数のメッセージを送る遷移では最初のメッセージを返す。
+        すべてのメッセージが必要な場合はrouteを使う。
         """
-        if last_message.message_type == "START_SESSION":
-            # セッション開始時の処理
-            if last_message.payload.get("session_type") == "debate":
-                return Message(
-                    recipient_id="DEBATER_A",
-                    sender_id="MODERATOR",
-                    message_type="PROMPT_FOR_STATEMENT",
-                    payload={
-                        "topic": last_message.payload.get("topic"),
-                        "phase": "statement",
-                        "turn": 1
-                    },
-                    turn_id=last_message.turn_id + 1
-                )
-
-        elif last_message.message_type == "SUBMIT_RESPONSE":
-            # 応答提出時の処理
-            if last_message.payload.get("response_type") == "statement":
-                if last_message.sender_id == "DEBATER_A":
-                    # DEBATER_Aの発言後はDEBATER_Nの番
-                    return Message(
-                        recipient_id="DEBATER_N",
-                        sender_id="MODERATOR",
-                        message_type="PROMPT_FOR_STATEMENT",
-                        payload={
-                            "phase": "statement",
-                            "turn": 2
-                        },
-                        turn_id=last_message.turn_id + 1
-                    )
+        messages = self.route(last_message)
+        if messages:
+            return messages[0]
 
         # デフォルトの応答
         return Message(
             recipient_id="SYSTEM",
-            sender_id="MODERATOR",
+            sender_id=self.agent_id,
             message_type="SYSTEM_ERROR",
             payload={"error": "Unknown message type or state"},
             turn_id=last_message.turn_id + 1
@@ -0,0 +1,188 @@
+"""
+逐次構築する討論のトランスクリプト
+
+反駁や判定のたびに履歴全体を整形し直すのではなく、発言が届くたびに
+1件分だけ整形して追記する。整形済みの段落と、形式ごとの連結結果を
+保持するため、プロンプトの構築にかかる処理は新しく届いた発言の分だけになる。
+"""
+
+import json
+from dataclasses import replace
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from main.entities.models import Message
+from main.use_cases.interfaces import IDebateHistoryService
+from main.use_cases.services.history_window import (
+    HistoryEntry, estimate_tokens, format_entry
+)
+
+# 発言を共有するメッセージ種別 -> フェーズ名（DebateSession.current_phaseと同じ）
+REVIEW_PHASES = {
+    "STATEMENT_FOR_REVIEW": "statement",
+    "REBUTTAL_FOR_REVIEW": "rebuttal",
+    "CLOSING_STATEMENT_FOR_REVIEW": "closing_statement",
+}
+# MODERATORが直接受け取る発言の提出
+SUBMISSION_PHASES = {
+    "SUBMIT_STATEMENT": "statement",
+    "SUBMIT_REBUTTAL": "rebuttal",
+    "SUBMIT_CLOSING_STATEMENT": "closing_statement",
+}
+
+# トランスクリプトに記録するメッセージ種別
+TRANSCRIPT_MESSAGE_TYPES = tuple(REVIEW_PHASES) + tuple(SUBMISSION_PHASES)
+
+# 討論全体を踏まえて応答するメッセージ種別。LLMに渡す前にトランスクリプトを付ける
+TRANSCRIPT_REQUESTS = (
+    "PROMPT_FOR_REBUTTAL",
+    "PROMPT_FOR_CLOSING_STATEMENT",
+    "REQUEST_JUDGEMENT",
+)
+
+# payloadの中で発言者・発言内容を表すキー（先に見つかったものを使う）
+_SPEAKER_KEYS = ("speaker", "author_id", "debater_id")
+_CONTENT_KEYS = ("content", "statement", "rebuttal", "closing_statement",
+                 "text", "message")
+
+
+def _format_markdown(entry: HistoryEntry) -> str:
+    phase = f"（{entry['phase']}）" if entry.get("phase") else ""
+    return f"### {entry['sender']}{phase}\n\n{entry['content']}"
+
+
+# 形式名 -> (1件の整形関数, 区切り)
+FORMATS = {
+    "text": (format_entry, "\n\n"),
+    "markdown": (_format_markdown, "\n\n"),
+}
+
+
+class DebateTranscript:
+    """
+    追記のみのトランスクリプト
+
+    HistoryWindowにそのまま渡せるよう、履歴の要素（辞書）の列として振る舞う。
+    """
+
+    def __init__(self):
+        self._entries: List[HistoryEntry] = []
+        self._tokens = 0
+        # 形式 -> (連結済みの件数, 連結済みのテキスト)
+        self._rendered: Dict[str, Tuple[int, str]] = {}
+
+    def append(self, sender: str, content: str,
+               phase: Optional[str] = None) -> HistoryEntry:
+        """発言を1件追記する"""
+        entry: HistoryEntry = {"sender": sender, "content": content}
+        if phase:
+            entry["phase"] = phase
+        self._entries.append(entry)
+        # TokenBudgetWindowと同じく段落区切りの分として1トークンを加える
+        self._tokens += estimate_tokens(format_entry(entry)) + 1
+        return entry
+
+    def render(self, format: str = "text") -> str:
+        """
+        トランスクリプト全体を指定した形式のテキストにする
+
+        前回の呼び出し以降に追記された発言だけを整形して連結する。
+        """
+        if format not in FORMATS:
+            raise ValueError(f"Unknown transcript format: {format}")
+        formatter, separator = FORMATS[format]
+        count, text = self._rendered.get(format, (0, ""))
+        if count < len(self._entries):
+            segments = separator.join(
+                formatter(entry) for entry in self._entries[count:])
+            text = f"{text}{separator}{segments}" if text else segments
+            self._rendered[format] = (len(self._entries), text)
+        return text
+
+    def estimated_tokens(self) -> int:
+        """"text"形式で連結した場合の推定トークン数（逐次集計済み）"""
+        return self._tokens
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[HistoryEntry]:
+        return iter(self._entries)
+
+    def __getitem__(self, index: Union[int, slice]):
+        return self._entries[index]
+
+
+class TranscriptHistoryService(IDebateHistoryService):
+    """
+    受信した発言からトランスクリプトを逐次構築する履歴サービス
+
+    エージェントは受信したメッセージをrecordに渡すだけでよく、
+    get_debate_historyは同じDebateTranscriptを返し続ける。
+    反駁・判定を求めるメッセージは、with_transcriptで整形済みの
+    トランスクリプトを付けてからLLMに渡す。
+    """
+
+    def __init__(self, transcript: Optional[DebateTranscript] = None):
+        self.transcript = transcript or DebateTranscript()
+
+    def record(self, message: Message) -> bool:
+        """
+        発言を含むメッセージであればトランスクリプトに追記する
+
+        Returns:
+            追記した場合True
+        """
+        if message.message_type in REVIEW_PHASES:
+            phase = REVIEW_PHASES[message.message_type]
+            sender = self._speaker(message.payload) or message.sender_id
+        elif message.message_type in SUBMISSION_PHASES:
+            phase = SUBMISSION_PHASES[message.message_type]
+            sender = message.sender_id
+        else:
+            return False
+        self.transcript.append(sender, self._content(message.payload), phase)
+        return True
+
+    def restore(self, messages: Iterable[Message]) -> int:
+        """
+        再起動前に受信した発言をトランスクリプトに追記し直す
+
+        Args:
+            messages: 受信を確定済みのメッセージ（投函順）
+
+        Returns:
+            追記した発言の数
+        """
+        return sum(self.record(message) for message in messages)
+
+    def with_transcript(self, message: Message) -> Message:
+        """
+        反駁・判定を求めるメッセージに、これまでのトランスクリプトを付ける
+
+        Returns:
+            payloadのtranscriptに全体を整形したテキストを入れたコピー。
+            TRANSCRIPT_REQUESTS以外、または発言がまだない場合はmessageのまま
+        """
+        if (message.message_type not in TRANSCRIPT_REQUESTS
+                or not len(self.transcript)):
+            return message
+        return replace(message, payload=dict(
+            message.payload, transcript=self.transcript.render()))
+
+    def get_debate_history(self) -> DebateTranscript:
+        """これまでの討論履歴（トランスクリプト）を取得する"""
+        return self.transcript
+
+    @staticmethod
+    def _speaker(payload: dict) -> Optional[str]:
+        for key in _SPEAKER_KEYS:
+            if payload.get(key):
+                return str(payload[key])
+        return None
+
+    @staticmethod
+    def _content(payload: dict) -> str:
+        for key in _CONTENT_KEYS:
+            if payload.get(key):
+                return str(payload[key])
+        return json.dumps(payload, ensure_ascii=False)
@@ -0,0 +1,268 @@
+"""
+プロンプトに含める討論履歴の窓掛けと圧縮
+
+反駁・判定のたびに履歴全体をプロンプトへ連結すると、ディベート全体で
+送信するプロンプトの総量がターン数の2乗で増える。ここでは履歴の
+どの部分をどの形でプロンプトに含めるかを戦略として切り替えられるようにする。
+
+- FullHistory: 履歴をそのまま使う
+- LastNWindow: 直近N件の発言のみ
+- PhaseSummaryWindow: 完了したフェーズを要約に置き換える（要約はキャッシュ）
+- TokenBudgetWindow: 推定トークン数の上限を必ず守る
+
+履歴の各要素は {"sender": 発言者, "content": 内容, "phase": フェーズ} の
+辞書で、"phase" は省略できる。履歴にはリストのほか、逐次構築された
+DebateTranscript（debate_transcript.py）も渡せる。
+"""
+
+import math
+import re
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Tuple
+
+HistoryEntry = Dict[str, object]
+# (フェーズ名, そのフェーズの発言) -> 要約文
+Summarizer = Callable[[str, List[HistoryEntry]], str]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    トークン数をローカルで高速に見積もる
+
+    ASCII文字は4文字で1トークン、それ以外（日本語など）は1文字で
+    1トークンとみなす。UTF-8のバイト数との差から非ASCII文字数を求めるため、
+    文字ごとのループを回さない。
+    """
+    characters = len(text)
+    # 日本語の文字はUTF-8で3バイトなので、余分なバイト数の半分を非ASCIIとみなす
+    non_ascii = min((len(text.encode("utf-8")) - characters) // 2, characters)
+    return non_ascii + math.ceil((characters - non_ascii) / 4)
+
+
+def format_entry(entry: HistoryEntry) -> str:
+    """履歴の1要素をプロンプト用の1段落に整形する"""
+    if entry.get("summary"):
+        return f"（{entry.get('phase') or '以前'}の要約）{entry['content']}"
+    return f"{entry['sender']}: {entry['content']}"
+
+
+def render_history(entries: List[HistoryEntry]) -> str:
+    """履歴をプロンプトに埋め込むテキストにする"""
+    return "\n\n".join(format_entry(entry) for entry in entries)
+
+
+def _omission(count: int) -> HistoryEntry:
+    return {"sender": "SYSTEM",
+            "content": f"（これより前の{count}件の発言は省略）"}
+
+
+class HistoryWindow(ABC):
+    """履歴からプロンプトに含める部分を選ぶ戦略"""
+
+    @abstractmethod
+    def select(self, history: List[HistoryEntry]) -> List[HistoryEntry]:
+        """プロンプトに含める履歴の要素を返す"""
+        pass
+
+    def render(self, history: List[HistoryEntry]) -> str:
+        """選んだ履歴をプロンプト用のテキストにする"""
+        return render_history(self.select(history))
+
+
+class FullHistory(HistoryWindow):
+    """履歴をすべてそのまま使う"""
+
+    def select(self, history: List[HistoryEntry]) -> List[HistoryEntry]:
+        return list(history)
+
+    def render(self, history: List[HistoryEntry]) -> str:
+        # 逐次構築済みのトランスクリプトは連結済みのテキストを使う
+        render_transcript = getattr(history, "render", None)
+        if callable(render_transcript):
+            return render_transcript("text")
+        return super().render(history)
+
+
+class LastNWindow(HistoryWindow):
+    """直近N件の発言のみを使う"""
+
+    def __init__(self, n: int):
+        if n < 1:
+            raise ValueError("n must be at least 1")
+        self.n = n
+
+    def select(self, history: List[HistoryEntry]) -> List[HistoryEntry]:
+        if len(history) <= self.n:
+            return list(history)
+        return [_omission(len(history) - self.n)] + list(history[-self.n:])
+
+
+class PhaseSummaryWindow(HistoryWindow):
+    """
+    完了したフェーズを要約に置き換える
+
+    直近keep_recent_phases個のフェーズは発言をそのまま残す。
+    完了したフェーズの内容は変わらないため、要約は一度作れば再利用する。
+    """
+
+    def __init__(self, summarizer: Summarizer,
+                 keep_recent_phases: int = 1):
+        self.summarizer = summarizer
+        self.keep_recent_phases = keep_recent_phases
+        self._summaries: Dict[Tuple, str] = {}
+
+    def select(self, history: List[HistoryEntry]) -> List[HistoryEntry]:
+        phases = self._group_by_phase(history)
+        split = max(len(phases) - self.keep_recent_phases, 0)
+        selected: List[HistoryEntry] = []
+        for phase, entries in phases[:split]:
+            selected.append({"sender": "SUMMARY", "phase": phase,
+                             "summary": True,
+                             "content": self._summary(phase, entries)})
+        for _, entries in phases[split:]:
+            selected.extend(entries)
+        return selected
+
+    def _summary(self, phase: str, entries: List[HistoryEntry]) -> str:
+        """フェーズの要約を返す。作成済みであればキャッシュを使う"""
+        key = (phase, len(entries), entries[0]["content"],
+               entries[-1]["content"])
+        summary = self._summaries.get(key)
+        if summary is None:
+            summary = self.summarizer(phase, entries)
+            self._summaries[key] = summary
+        return summary
+
+    @staticmethod
+    def _group_by_phase(history: List[HistoryEntry]
+                        ) -> List[Tuple[str, List[HistoryEntry]]]:
+        """連続する同じフェーズの発言をまとめる"""
+        phases: List[Tuple[str, List[HistoryEntry]]] = []
+        for entry in history:
+            phase = entry.get("phase") or ""
+            if phases and phases[-1][0] == phase:
+                phases[-1][1].append(entry)
+            else:
+                phases.append((phase, [entry]))
+        return phases
+
+
+class TokenBudgetWindow(HistoryWindow):
+    """
+    推定トークン数の上限を必ず守る
+
+    1. inner（既定は履歴全体）が上限に収まればそのまま使う
+    2. 収まらずfallbackがあれば、fallback（例: フェーズ要約）で圧縮する
+    3. それでも収まらなければ古い発言から省略し、最新の発言が単独で
+       上限を超える場合は末尾を切り詰める
+    """
+
+    def __init__(self, max_tokens: int,
+                 inner: Optional[HistoryWindow] = None,
+                 fallback: Optional[HistoryWindow] = None,
+                 estimator: Callable[[str], int] = estimate_tokens):
+        if max_tokens < 1:
+            raise ValueError("max_tokens must be at least 1")
+        self.max_tokens = max_tokens
+        self.inner = inner or FullHistory()
+        self.fallback = fallback
+        self.estimator = estimator
+
+    def render(self, history: List[HistoryEntry]) -> str:
+        # トランスクリプトが全体で上限に収まる場合は、発言ごとの見積もりを省く
+        if (isinstance(self.inner, FullHistory)
+                and self.estimator is estimate_tokens
+                and hasattr(history, "estimated_tokens")
+                and history.estimated_tokens() <= self.max_tokens):
+            return self.inner.render(history)
+        return super().render(history)
+
+    def select(self, history: List[HistoryEntry]) -> List[HistoryEntry]:
+        selected = self.inner.select(history)
+        costs = self._costs(selected)
+        if sum(costs) <= self.max_tokens:
+            return selected
+        if self.fallback is not None:
+            selected = self.fallback.select(selected)
+            costs = self._costs(selected)
+            if sum(costs) <= self.max_tokens:
+                return selected
+        return self._trim(selected, costs)
+
+    def _costs(self, entries: List[HistoryEntry]) -> List[int]:
+        # 段落区切りの分として1トークンを加える
+        return [self.estimator(format_entry(entry)) + 1 for entry in entries]
+
+    def _trim(self, entries: List[HistoryEntry],
+              costs: List[int]) -> List[HistoryEntry]:
+        """新しい発言から上限まで残し、残りは省略の注記にまとめる"""
+        marker_cost = self.estimator(format_entry(_omission(len(entries)))) + 1
+        budget = self.max_tokens - marker_cost
+        kept = 0
+        used = 0
+        for cost in reversed(costs):
+            if used + cost > budget:
+                break
+            used += cost
+            kept += 1
+
+        if kept == 0:
+            return [self._truncate(entries[-1], budget)]
+        result = list(entries[len(entries) - kept:])
+        if kept < len(entries):
+            result.insert(0, _omission(len(entries) - kept))
+        return result
+
+    def _truncate(self, entry: HistoryEntry, budget: int) -> HistoryEntry:
+        """1件の発言を上限に収まるよう末尾から切り詰める"""
+        content = str(entry["content"])
+        while content:
+            truncated = dict(entry, content=content + "…")
+            if self.estimator(format_entry(truncated)) + 1 <= budget:
+                return truncated
+            # 超過分に比例して縮め、最低でも1文字は減らす
+            over = self.estimator(format_entry(truncated)) + 1 - budget
+            content = content[:max(len(content) - max(over, 1) * 2, 0)]
+        return dict(entry, content="…")
+
+
+_SENTENCE_END = re.compile(r"(?<=[。．.!?！？])\s*")
+
+
+def extractive_summarizer(max_chars_per_entry: int = 120) -> Summarizer:
+    """
+    LLMを使わずに各発言の冒頭の文を抜き出して要約とする
+
+    Args:
+        max_chars_per_entry: 1件の発言から抜き出す最大文字数
+    """
+    def summarize(phase: str, entries: List[HistoryEntry]) -> str:
+        parts = []
+        for entry in entries:
+            content = str(entry["content"]).strip()
+            first = _SENTENCE_END.split(content, maxsplit=1)[0] or content
+            if len(first) > max_chars_per_entry:
+                first = first[:max_chars_per_entry] + "…"
+            parts.append(f"{entry['sender']}: {first}")
+        return " / ".join(parts)
+
+    return summarize
+
+
+def llm_summarizer(llm_service, max_chars: int = 400) -> Summarizer:
+    """
+    LLMにフェーズの要約を作成させる
+
+    Args:
+        llm_service: generate_response(prompt) を持つILLMService
+        max_chars: 要約の目安の文字数
+    """
+    def summarize(phase: str, entries: List[HistoryEntry]) -> str:
+        prompt = (
+            f"以下は討論の{phase or '一部'}フェーズの発言です。"
+            f"各発言者の主張と根拠が分かるように{max_chars}文字以内で"
+            f"要約してください。\n\n{render_history(entries)}"
+        )
+        return llm_service.generate_response(prompt).strip()
+
+    return summarize
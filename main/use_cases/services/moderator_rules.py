@@ -0,0 +1,228 @@
+"""
+司会のルールエンジン
+
+DebateServiceの遷移表で、受信したメッセージごとに応答の決め方を選ぶ。
+
+- rules:   遷移表だけで応答が決まる（発言の転送と次の発言者への指示）
+- llm:     内容の生成が必要なためLLMに任せる（ブリーフィングと結果）。
+           遷移表にないメッセージも従来どおりLLMに任せる
+- gather:  gatherの送信者全員から届くまで待つ（応答しない）。
+           全員分が揃った時点で1通にまとめ、その遷移をrules/llmで処理する
+- timeout: gatherの期限までにquorumに届かなかった（応答しない）
+
+審査員3人の判定を1回のLLM呼び出しにまとめるため、1回のディベートで
+司会がLLMを呼ぶのはブリーフィングと結果の2回になる。
+
+gatherの期限・quorum・猶予はscatter_gatherと同じ意味を持つ。最初の1通から
+deadline秒が過ぎた時点でquorum件が届いていれば、届いた分で遷移する。
+graceを指定した場合は、quorumに達してからgrace秒で残りを待つのをやめる。
+集めている間のメッセージの受信確定（receipt）は遷移するまで保留するため、
+プロセスが異常終了しても再配信されたメッセージから集め直せる。
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from main.entities.models import Message
+from main.use_cases.services.debate_service import DebateService, Transition
+from main.use_cases.services.scatter_gather import GatherResult
+
+# 遷移表でdeadlineを省略したgatherを待つ最大秒数
+GATHER_DEADLINE_SECONDS = 180.0
+
+
+@dataclass
+class RoutingDecision:
+    """受信したメッセージへの応答の決め方"""
+    # rules / llm / gather / timeout
+    kind: str
+    # kind == "rules" の場合に送るメッセージ
+    messages: List[Message] = field(default_factory=list)
+    # kind == "llm" の場合にLLMへ渡すメッセージ
+    llm_context: Optional[Message] = None
+    # 処理を終えたら受信を確定してよいreceipt。gather中のものは
+    # 遷移するまで含まれない
+    receipts: List[Any] = field(default_factory=list)
+    # gatherが終わった場合の集計（届いたpayloadと届かなかった送信者）
+    gathered: Optional[GatherResult] = None
+
+
+@dataclass
+class _Gathering:
+    """1つのgatherで集めている途中のメッセージ"""
+    started: float
+    # 送信者ID -> 受信したpayload
+    payloads: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    receipts: List[Any] = field(default_factory=list)
+    # まとめたメッセージの送信者・宛先・ターンに使う最後のメッセージ
+    last: Optional[Message] = None
+    # quorumに達した時刻（graceの起点）
+    quorum_reached: Optional[float] = None
+
+
+class ModeratorRuleEngine:
+    """遷移表で司会の応答を決め、LLMを呼ぶ回数を減らす"""
+
+    def __init__(self, debate_service: DebateService,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            debate_service: 遷移表を持つDebateService
+            clock: gatherの期限に使う時計（秒）
+        """
+        self.debate_service = debate_service
+        self.clock = clock
+        # gatherする遷移のid -> 集めている途中のメッセージ
+        # （遷移はpayloadの辞書を持つためハッシュできない）
+        self._gathered: Dict[int, _Gathering] = {}
+        self._transitions: Dict[int, Transition] = {}
+
+    def decide(self, message: Message,
+               receipt: Any = None) -> RoutingDecision:
+        """
+        受信したメッセージへの応答の決め方を返す
+
+        Args:
+            message: 受信したメッセージ
+            receipt: メッセージの受信確定に使う値（ClaimedMessageなど）。
+                gather中は保留し、遷移した時点の決定のreceiptsで返す
+        """
+        receipts = [] if receipt is None else [receipt]
+        transition = self.debate_service.find_transition(message)
+        if transition is None:
+            return RoutingDecision("llm", llm_context=message,
+                                   receipts=receipts)
+        if not transition.gather:
+            return self._apply(transition, message, receipts)
+        gathering = self._gather(transition, message, receipt)
+        if self.pending(transition):
+            return RoutingDecision("gather")
+        return self._complete(transition, gathering)[1]
+
+    def expire(self) -> List[Tuple[Message, RoutingDecision]]:
+        """
+        期限（またはquorum後の猶予）を過ぎたgatherを終える
+
+        Returns:
+            (まとめたメッセージ, 応答の決め方) のリスト。quorumに届いて
+            いればその遷移をrules/llmで処理し、届いていなければtimeout
+        """
+        now = self.clock()
+        expired = []
+        for key, gathering in list(self._gathered.items()):
+            transition = self._transitions[key]
+            if now < self._stop_at(transition, gathering):
+                continue
+            expired.append(self._complete(transition, gathering))
+        return expired
+
+    def pending(self, transition: Transition) -> List[str]:
+        """gatherする遷移で、まだ届いていない送信者"""
+        gathering = self._gathered.get(id(transition))
+        received = gathering.payloads if gathering else {}
+        return [sender_id for sender_id in transition.gather
+                if sender_id not in received]
+
+    def _apply(self, transition: Transition, message: Message,
+               receipts: List[Any]) -> RoutingDecision:
+        """遷移をrules/llmで処理する"""
+        if transition.llm:
+            return RoutingDecision("llm", llm_context=message,
+                                   receipts=receipts)
+        return RoutingDecision(
+            "rules", messages=self.debate_service.apply(transition, message),
+            receipts=receipts)
+
+    def _gather(self, transition: Transition, message: Message,
+                receipt: Any) -> _Gathering:
+        """メッセージを集めている途中のgatherに加える"""
+        key = id(transition)
+        gathering = self._gathered.get(key)
+        if gathering is None:
+            gathering = self._gathered[key] = _Gathering(self.clock())
+            self._transitions[key] = transition
+        # 同じ送信者の再送（再配信を含む）は新しいpayloadで置き換える
+        gathering.payloads[message.sender_id] = message.payload
+        if receipt is not None:
+            gathering.receipts.append(receipt)
+        gathering.last = message
+        if (gathering.quorum_reached is None
+                and len(gathering.payloads) >= self._quorum(transition)):
+            gathering.quorum_reached = self.clock()
+        return gathering
+
+    def _complete(self, transition: Transition, gathering: _Gathering
+                  ) -> Tuple[Message, RoutingDecision]:
+        """
+        gatherを終え、届いた分で遷移する（quorumに届かなければtimeout）
+
+        Returns:
+            (まとめたメッセージ, 応答の決め方)
+        """
+        key = id(transition)
+        del self._gathered[key]
+        del self._transitions[key]
+        gathered: GatherResult = GatherResult(
+            results=dict(gathering.payloads),
+            timed_out=[sender_id for sender_id in transition.gather
+                       if sender_id not in gathering.payloads],
+            elapsed=self.clock() - gathering.started)
+        message = self._combine(transition, gathering)
+        if not gathered.has_quorum(self._quorum(transition)):
+            return message, RoutingDecision(
+                "timeout", receipts=gathering.receipts, gathered=gathered)
+        decision = self._apply(transition, message, gathering.receipts)
+        decision.gathered = gathered
+        return message, decision
+
+    @staticmethod
+    def _combine(transition: Transition, gathering: _Gathering) -> Message:
+        """
+        集めたメッセージを1通にまとめる
+
+        まとめたメッセージのpayloadは {"<payload_key>": {送信者ID: payload}}。
+        payload_keyはメッセージの種類から作る（SUBMIT_JUDGEMENT -> judgements）。
+        期限で打ち切った場合は、届かなかった送信者をmissingに入れる。
+        """
+        last = gathering.last
+        payload: Dict[str, Any] = {_payload_key(last.message_type): {
+            sender_id: gathering.payloads[sender_id]
+            for sender_id in transition.gather
+            if sender_id in gathering.payloads}}
+        missing = [sender_id for sender_id in transition.gather
+                   if sender_id not in gathering.payloads]
+        if missing:
+            payload["missing"] = missing
+        return Message(
+            sender_id=last.sender_id,
+            recipient_id=last.recipient_id,
+            message_type=last.message_type,
+            payload=payload,
+            turn_id=last.turn_id
+        )
+
+    def _stop_at(self, transition: Transition,
+                 gathering: _Gathering) -> float:
+        """gatherを打ち切る時刻"""
+        deadline = (GATHER_DEADLINE_SECONDS if transition.deadline is None
+                    else transition.deadline)
+        stop_at = gathering.started + deadline
+        if (transition.grace is not None
+                and gathering.quorum_reached is not None):
+            stop_at = min(stop_at,
+                          gathering.quorum_reached + transition.grace)
+        return stop_at
+
+    @staticmethod
+    def _quorum(transition: Transition) -> int:
+        """期限までに必要な数（省略時は過半数）"""
+        if transition.quorum is not None:
+            return transition.quorum
+        return len(transition.gather) // 2 + 1
+
+
+def _payload_key(message_type: str) -> str:
+    """SUBMIT_JUDGEMENT -> judgements"""
+    noun = message_type.lower().split("_", 1)[-1]
+    return noun if noun.endswith("s") else noun + "s"
@@ -0,0 +1,30 @@
+"""
+payloadのテンプレート
+
+文字列中の "{キー}" を受信メッセージのpayloadの値で置き換える。
+シミュレーションの応答スクリプトと司会の遷移表で共通に使う。
+"""
+
+from typing import Any, Dict
+
+
+def render_payload(value, variables: Dict[str, Any]):
+    """payload内の文字列の "{キー}" を受信メッセージの値で置き換える"""
+    if isinstance(value, str):
+        try:
+            return value.format_map(_KeepMissing(variables))
+        except (ValueError, IndexError):
+            return value
+    if isinstance(value, dict):
+        return {key: render_payload(item, variables)
+                for key, item in value.items()}
+    if isinstance(value, list):
+        return [render_payload(item, variables) for item in value]
+    return value
+
+
+class _KeepMissing(dict):
+    """存在しないキーは "{キー}" のまま残す"""
+
+    def __missing__(self, key):
+        return "{" + key + "}"
@@ -0,0 +1,95 @@
+"""
+複数の処理を並行して実行し、期限までに揃った結果を集める
+
+審査員の判定のように、独立した複数のLLM呼び出しを順番に待つと
+全体の所要時間は各呼び出しの合計になる。ここではそれらを同時に発行し、
+期限（deadline）までに完了したものだけを集める。期限を過ぎた処理の
+結果は待たずに打ち切る。quorum_graceを指定すると、quorum件の結果が
+揃った後は残りの処理をその秒数だけ待ち、期限より前に返す。
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Generic, Hashable, List, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+T = TypeVar("T")
+
+
+@dataclass
+class GatherResult(Generic[K, T]):
+    """scatter_gatherの結果"""
+    results: Dict[K, T] = field(default_factory=dict)
+    errors: Dict[K, BaseException] = field(default_factory=dict)
+    # 期限までに完了しなかった処理
+    timed_out: List[K] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def has_quorum(self, quorum: int) -> bool:
+        """成功した結果がquorum件以上あるか"""
+        return len(self.results) >= quorum
+
+
+def scatter_gather(tasks: Dict[K, Callable[[], T]], deadline: float,
+                   quorum: Optional[int] = None,
+                   max_workers: Optional[int] = None,
+                   quorum_grace: Optional[float] = None) -> GatherResult:
+    """
+    tasksを並行して実行し、期限までに完了した結果を集める
+
+    Args:
+        tasks: キー -> 引数なしで呼び出す処理
+        deadline: 待つ最大秒数
+        quorum: 必要な成功件数。失敗が増えて到達できなくなった時点で
+            期限を待たずに返す（省略時は全件）
+        max_workers: 同時に実行する最大数（省略時はtasksの件数）
+        quorum_grace: quorum件の結果が揃った後、残りの処理を待つ秒数。
+            0ならその時点で返す（省略時は期限まで全件を待つ）
+
+    Returns:
+        GatherResult。期限を過ぎた処理はバックグラウンドで走り続けるが、
+        その結果は使わない
+    """
+    if deadline <= 0:
+        raise ValueError("deadline must be positive")
+    if quorum_grace is not None and quorum_grace < 0:
+        raise ValueError("quorum_grace must not be negative")
+    quorum = len(tasks) if quorum is None else quorum
+    gathered: GatherResult = GatherResult()
+    if not tasks:
+        return gathered
+
+    started = time.monotonic()
+    executor = ThreadPoolExecutor(max_workers=max_workers or len(tasks),
+                                  thread_name_prefix="scatter-gather")
+    try:
+        pending = {executor.submit(task): key for key, task in tasks.items()}
+        stop_at = deadline
+        quorum_reached = False
+        while pending:
+            remaining = stop_at - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            done, _ = wait(pending, timeout=remaining,
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                key = pending.pop(future)
+                try:
+                    gathered.results[key] = future.result()
+                except Exception as e:
+                    gathered.errors[key] = e
+            if len(gathered.results) + len(pending) < quorum:
+                break
+            if (quorum_grace is not None and not quorum_reached
+                    and gathered.has_quorum(quorum)):
+                # quorumに達したら、残りは猶予の間だけ待つ
+                quorum_reached = True
+                stop_at = min(deadline,
+                              time.monotonic() - started + quorum_grace)
+        gathered.timed_out = list(pending.values())
+    finally:
+        # 期限を過ぎた処理の完了は待たない
+        executor.shutdown(wait=False, cancel_futures=True)
+    gathered.elapsed = time.monotonic() - started
+    return gathered
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+バッチシナリオ実行スクリプト
+
+議題ファイル（YAMLまたはJSONL）の各議題について、ディベートを並行実行する。
+各ディベートは専用のディレクトリとメッセージDBで実行され、
+結果と所要時間のサマリーが出力ディレクトリのsummary.jsonに書き出される。
+
+使用方法:
+    python run_batch.py topics.yml --workers 8
+    python run_batch.py topics.jsonl --project_file project.yml --timeout 300
+"""
+
+from main.frameworks_and_drivers.drivers.batch_runner import (
+    BatchDebateRunner, load_topics
+)
+from main.frameworks_and_drivers.frameworks.platform_config import PlatformConfig
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# プロジェクトルートを最初に追加
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def main():
+    """メイン実行関数"""
+    parser = argparse.ArgumentParser(
+        description="複数の議題のディベートを並行実行するスクリプト"
+    )
+    parser.add_argument(
+        "topics_file",
+        help="議題ファイルのパス（.yml/.yamlまたは.jsonl）"
+    )
+    parser.add_argument(
+        "--project_file",
+        default="project.yml",
+        help="プロジェクト定義ファイルのパス (デフォルト: project.yml)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="同時に実行するディベート数 (デフォルト: scenario_config.batch.workers または 4)"
+    )
+    parser.add_argument(
+        "--timeout",
+        type=int,
+        default=180,
+        help="1件のディベートのタイムアウト時間（秒）(デフォルト: 180)"
+    )
+    parser.add_argument(
+        "--output_dir",
+        help="出力ディレクトリ (デフォルト: runs_base_dir配下のbatch-タイムスタンプ)"
+    )
+
+    args = parser.parse_args()
+
+    try:
+        platform_config = PlatformConfig(args.project_file)
+        scenario_config = platform_config.project_definition.get(
+            'scenario_config', {}
+        )
+        workers = args.workers or scenario_config.get(
+            'batch', {}).get('workers', 4)
+        runs_base_dir = scenario_config.get('runs_base_dir', 'scenario_runs')
+        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output_dir = args.output_dir or f"{runs_base_dir}/batch-{timestamp}"
+
+        tasks = load_topics(args.topics_file)
+
+        print("=" * 60)
+        print("🎯 バッチシナリオ実行開始")
+        print("=" * 60)
+        print(f"📋 議題数: {len(tasks)}")
+        print(f"👷 並行数: {workers}")
+        print(f"📁 出力ディレクトリ: {output_dir}")
+        print()
+
+        runner = BatchDebateRunner(
+            args.project_file, output_dir, workers=workers,
+            timeout_sec=args.timeout)
+        summary = runner.run(tasks)
+
+        print("\n" + "=" * 60)
+        for outcome, count in summary['outcomes'].items():
+            print(f"{outcome}: {count}")
+        print(f"⏱️  総所要時間: {summary['wall_time_sec']:.1f}秒")
+        print(f"📝 サマリー: {output_dir}/summary.json")
+        print("=" * 60)
+
+        completed = summary['outcomes']['completed']
+        return 0 if completed == summary['total'] else 1
+
+    except (FileNotFoundError, ValueError) as e:
+        print(f"❌ Configuration Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,13 +6,17 @@ Kent BeckのTDD思想に従って実装された2エージェント構成のシ
 
 使用方法:
     python run_scenario.py --project_file project.yml
+    python run_scenario.py --topic "議題" --run_dir debate_runs/batch/001 \
+        --result_file debate_runs/batch/001/result.json
 """
 
 from main.frameworks_and_drivers.drivers.supervisor import Supervisor
 from main.frameworks_and_drivers.frameworks.platform_config import PlatformConfig
 import argparse
+import json
 import sys
 import os
+import time
 from pathlib import Path
 
 # プロジェクトルートを最初に追加
@@ -36,6 +40,19 @@ def main():
         help="シナリオのタイムアウト時間（秒）(デフォルト: 180)"
     )
 
+    parser.add_argument(
+        "--topic",
+        help="project.ymlのinitial_task.topicの代わりに使う議題"
+    )
+    parser.add_argument(
+        "--run_dir",
+        help="シナリオ実行ディレクトリ (デフォルト: runs_base_dir配下のタイムスタンプ)"
+    )
+    parser.add_argument(
+        "--result_file",
+        help="実行結果をJSONで書き出すファイルのパス"
+    )
+
     args = parser.parse_args()
 
     print("=" * 60)
@@ -60,7 +77,7 @@ def main():
             'scenario_config', {}
         )
         runs_base_dir = scenario_config.get('runs_base_dir', 'scenario_runs')
-        scenario_dir = f"{runs_base_dir}/{timestamp}"
+        scenario_dir = args.run_dir or f"{runs_base_dir}/{timestamp}"
 
         os.makedirs(scenario_dir, exist_ok=True)
 
@@ -82,6 +99,9 @@ def main():
         # 2. スーパーバイザーを初期化（PlatformConfigオブジェクトを渡す）
         print("🚀 Initializing Supervisor...")
         supervisor = Supervisor(platform_config)
+        if args.topic:
+            supervisor.project_def.setdefault('initial_task', {})[
+                'topic'] = args.topic
 
         # 3. メッセージバスを初期化
         print("📬 Initializing A2A Message Bus...")
@@ -93,7 +113,12 @@ def main():
         print("🎬 シナリオ実行開始")
         print("=" * 60)
 
+        started = time.monotonic()
         success = supervisor.run_scenario(timeout_sec=args.timeout)
+        if args.result_file:
+            _write_result(args.result_file, success,
+                          time.monotonic() - started, message_db_path,
+                          supervisor.message_bus.get_statistics())
 
         print("\n" + "=" * 60)
         if success:
@@ -115,5 +140,17 @@ def main():
         return 1
 
 
+def _write_result(result_file: str, success: bool, duration_sec: float,
+                  message_db_path: str, statistics: dict) -> None:
+    """バッチ実行で集計するための実行結果をJSONで書き出す"""
+    with open(result_file, "w", encoding="utf-8") as f:
+        json.dump({
+            "success": success,
+            "duration_sec": duration_sec,
+            "message_db_path": message_db_path,
+            "statistics": statistics,
+        }, f, ensure_ascii=False, indent=2)
+
+
 if __name__ == "__main__":
     sys.exit(main())
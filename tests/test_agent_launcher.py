@@ -0,0 +1,263 @@
+"""
+エージェントの起動方式のテスト
+TDD: 読み込み済みのフォークサーバーからエージェントを起動し、
+起動から受信可能になるまでの時間を計測できることと、
+全エージェントのAGENT_READYが揃った時点でキックオフできることを定義する
+"""
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+import yaml
+from main.agent_entrypoint import run_agent
+from main.entities.models import Message
+from main.frameworks_and_drivers.drivers.agent_launcher import (
+    AgentLauncher, ForkServerLauncher, SubprocessLauncher, create_launcher
+)
+from main.frameworks_and_drivers.drivers.supervisor import Supervisor
+from main.frameworks_and_drivers.frameworks import metrics
+from main.frameworks_and_drivers.frameworks.message_broker import (
+    SqliteMessageBroker
+)
+
+
+class TestForkServerLauncher(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "messages.db")
+        self.broker = SqliteMessageBroker(self.db_path)
+        self.broker.initialize_db()
+        self.launcher = ForkServerLauncher()
+        self.processes = []
+
+    def tearDown(self):
+        for process in self.processes:
+            if process.poll() is None:
+                process.terminate()
+            process.wait(5)
+        self.launcher.close()
+        self.broker.close()
+        self.temp_dir.cleanup()
+
+    def _env(self):
+        env = dict(os.environ)
+        env["MESSAGE_DB_PATH"] = self.db_path
+        env["LLM_CONFIG"] = json.dumps({
+            "provider": "simulated",
+            "simulated": {"responses": {"*": {"PING": [
+                {"recipient_id": "SUPERVISOR", "message_type": "PONG"}]}}}
+        })
+        return env
+
+    def test_forked_agent_reports_ready_and_processes_messages(self):
+        """forkされたエージェントは準備完了を通知し、渡した環境で動作する"""
+        process = self.launcher.launch("DEBATER_A", self._env())
+        self.processes.append(process)
+
+        ready = self.broker.wait_for_message("SUPERVISOR", timeout=30)
+        self.assertEqual((ready.message_type, ready.sender_id),
+                         ("AGENT_READY", "DEBATER_A"))
+        self.assertEqual(ready.payload["pid"], process.pid)
+        self.assertGreater(ready.payload["startup_sec"], 0)
+        self.assertIsNone(process.poll())
+
+        self.broker.post_message(Message(
+            sender_id="SYSTEM", recipient_id="DEBATER_A",
+            message_type="PING", payload={}, turn_id=1))
+        reply = self.broker.wait_for_message("SUPERVISOR", timeout=30)
+        self.assertIsNotNone(reply)
+        self.assertEqual(reply.message_type, "PONG")
+
+        process.terminate()
+        self.assertIsNotNone(process.wait(5))
+
+
+class TestLauncherSelection(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.project_file = os.path.join(self.temp_dir.name, 'project.yml')
+        self._write_project({})
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write_project(self, runtime):
+        with open(self.project_file, 'w') as f:
+            yaml.dump({
+                'agents': [{'id': 'MODERATOR'}, {'id': 'DEBATER_A'}],
+                'message_bus': {'db_path': os.path.join(
+                    self.temp_dir.name, 'messages.db')},
+                'runtime': runtime,
+            }, f)
+
+    def test_create_launcher_from_runtime_config(self):
+        """runtime.launcherで起動方式を選び、未指定ならsubprocess"""
+        self.assertIsInstance(create_launcher({}), SubprocessLauncher)
+        self.assertIsInstance(create_launcher({"launcher": "forkserver"}),
+                              ForkServerLauncher)
+        with self.assertRaises(ValueError):
+            create_launcher({"launcher": "thread"})
+
+    def test_launcher_without_spawn_cannot_be_created(self):
+        """_spawnを実装しない起動方式はインスタンス化できない"""
+        class IncompleteLauncher(AgentLauncher):
+            name = "incomplete"
+
+        with self.assertRaises(TypeError):
+            IncompleteLauncher()
+
+    @patch('subprocess.Popen')
+    def test_subprocess_launcher_passes_spawn_time(self, mock_popen):
+        """エージェントに起動方式と起動時刻を渡す"""
+        supervisor = Supervisor(self.project_file)
+        before = time.time()
+        supervisor.start()
+
+        cmd = mock_popen.call_args[0][0]
+        env = mock_popen.call_args[1]['env']
+        self.assertEqual(cmd, ["python3", "-m", "main.agent_entrypoint",
+                               "DEBATER_A"])
+        self.assertEqual(env['AGENT_LAUNCHER'], "subprocess")
+        self.assertGreaterEqual(float(env['AGENT_SPAWNED_AT']), before)
+        supervisor.shutdown()
+        supervisor.message_bus.close()
+
+
+def _ready(agent_id, startup_sec=0.05):
+    return Message(sender_id=agent_id, recipient_id="SUPERVISOR",
+                   message_type="AGENT_READY",
+                   payload={"pid": 1, "startup_sec": startup_sec}, turn_id=0)
+
+
+class TestReadinessHandshake(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        project_file = os.path.join(self.temp_dir.name, 'project.yml')
+        with open(project_file, 'w') as f:
+            yaml.dump({
+                'agents': [{'id': 'MODERATOR'}, {'id': 'DEBATER_A'}],
+                'message_bus': {'db_path': os.path.join(
+                    self.temp_dir.name, 'messages.db')},
+            }, f)
+        self.supervisor = Supervisor(project_file)
+        self.supervisor.initialize_message_bus()
+        self.bus = self.supervisor.message_bus
+
+    def tearDown(self):
+        self.supervisor.shutdown()
+        self.bus.close()
+        self.temp_dir.cleanup()
+
+    def test_ready_as_soon_as_all_agents_report(self):
+        """全エージェントのAGENT_READYが揃った時点で待機を終える"""
+        self.bus.post_messages([_ready("DEBATER_A", 0.2),
+                                _ready("MODERATOR", 0.1)])
+        self.assertFalse(self.supervisor.are_agents_ready())
+
+        with patch('time.sleep') as mock_sleep:
+            self.assertTrue(self.supervisor.wait_for_agents_ready(
+                timeout_sec=5))
+        mock_sleep.assert_not_called()
+        self.assertTrue(self.supervisor.are_agents_ready())
+        self.assertEqual(self.supervisor.agent_startup_times,
+                         {'DEBATER_A': 0.2, 'MODERATOR': 0.1})
+
+    def test_missing_agent_times_out(self):
+        """AGENT_READYを送らないエージェントがいれば期限で打ち切る"""
+        self.bus.post_message(_ready("MODERATOR"))
+        started = time.monotonic()
+        self.assertFalse(self.supervisor.wait_for_agents_ready(
+            timeout_sec=0.2))
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(list(self.supervisor.ready_agents), ["MODERATOR"])
+
+    def test_agent_failure_during_startup_fails_the_scenario(self):
+        """起動中にエージェントが失敗したら待機をやめ、監視の結果とする"""
+        self.bus.post_message(Message(
+            sender_id="SUPERVISOR", recipient_id="SUPERVISOR",
+            message_type="AGENT_FAILED", payload={"agent_id": "DEBATER_A"},
+            turn_id=0))
+        self.assertFalse(self.supervisor.wait_for_agents_ready(
+            timeout_sec=5))
+
+        started = time.monotonic()
+        self.assertFalse(self.supervisor.monitor_for_shutdown(timeout_sec=5))
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_scenario_is_not_kicked_off_when_agents_are_not_ready(self):
+        """準備ができないまま期限を過ぎたらキックオフせずに失敗する"""
+        self.supervisor.AGENT_STARTUP_TIMEOUT_SEC = 0.2
+        with patch.object(self.supervisor, 'start'), \
+                patch.object(self.supervisor, 'start_monitoring'), \
+                patch.object(self.supervisor, 'kickoff_scenario') as kickoff, \
+                patch.object(self.supervisor, 'shutdown') as shutdown:
+            self.assertFalse(self.supervisor.run_scenario(timeout_sec=5))
+        kickoff.assert_not_called()
+        shutdown.assert_called_once()
+
+    def test_agent_failure_during_startup_skips_the_kickoff(self):
+        """起動中のAGENT_FAILEDはキックオフせずにシナリオの結果とする"""
+        self.bus.post_message(Message(
+            sender_id="SUPERVISOR", recipient_id="SUPERVISOR",
+            message_type="AGENT_FAILED", payload={"agent_id": "DEBATER_A"},
+            turn_id=0))
+        with patch.object(self.supervisor, 'start'), \
+                patch.object(self.supervisor, 'start_monitoring'), \
+                patch.object(self.supervisor, 'kickoff_scenario') as kickoff, \
+                patch.object(self.supervisor, 'monitor_for_shutdown') \
+                as monitor:
+            self.assertFalse(self.supervisor.run_scenario(timeout_sec=5))
+        kickoff.assert_not_called()
+        monitor.assert_not_called()
+        self.assertIsNone(self.supervisor._control_result)
+
+    def test_shutdown_during_startup_is_not_a_success(self):
+        """起動中にSHUTDOWN_SYSTEMが届いても、キックオフしていなければ失敗"""
+        self.bus.post_message(Message(
+            sender_id="MODERATOR", recipient_id="SUPERVISOR",
+            message_type="SHUTDOWN_SYSTEM", payload={}, turn_id=0))
+        with patch.object(self.supervisor, 'start'), \
+                patch.object(self.supervisor, 'start_monitoring'), \
+                patch.object(self.supervisor, 'kickoff_scenario') as kickoff:
+            self.assertIs(self.supervisor.run_scenario(timeout_sec=5), False)
+        kickoff.assert_not_called()
+        self.assertIsNone(self.supervisor._control_result)
+
+    def test_subprocess_agents_report_ready(self):
+        """subprocessで起動したエージェントも受信の準備ができたら通知する"""
+        started = time.monotonic()
+        self.supervisor.start()
+        self.assertTrue(self.supervisor.wait_for_agents_ready(
+            timeout_sec=30))
+        self.assertLess(time.monotonic() - started,
+                        Supervisor.AGENT_STARTUP_TIMEOUT_SEC)
+        self.assertEqual(
+            {agent_id: payload["pid"]
+             for agent_id, payload in self.supervisor.ready_agents.items()},
+            {'MODERATOR': self.supervisor.agent_processes[0].pid,
+             'DEBATER_A': self.supervisor.agent_processes[1].pid})
+
+
+class TestStartupMeasurement(unittest.TestCase):
+    @patch('main.agent_entrypoint.AgentLoop')
+    def test_run_agent_records_startup_time(self, mock_agent_loop_class):
+        """起動時刻からの経過時間を記録し、準備完了を通知してから受信を始める"""
+        agent_loop = mock_agent_loop_class.return_value
+        labels = (("agent_id", "JUDGE_STARTUP"), ("launcher", "forkserver"))
+        key = ("a2a_agent_startup_seconds_count", labels)
+        before = metrics.REGISTRY.samples().get(key, 0)
+        with patch.dict(os.environ, {
+                "AGENT_SPAWNED_AT": repr(time.time() - 0.5),
+                "AGENT_LAUNCHER": "forkserver"}):
+            run_agent("JUDGE_STARTUP")
+
+        startup_sec, = agent_loop.announce_ready.call_args[0]
+        self.assertGreaterEqual(startup_sec, 0.5)
+        self.assertEqual(metrics.REGISTRY.samples()[key], before + 1)
+        agent_loop.run.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
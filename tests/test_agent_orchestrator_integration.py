@@ -2,6 +2,8 @@
 AgentOrchestratorの統合テスト
 TDD: agent_main.pyの機能をAgentOrchestratorに移植するためのテスト
 """
+import os
+import tempfile
 import unittest
 from unittest.mock import Mock, patch
 from main.interface_adapters.controllers.agent_orchestrator import AgentOrchestrator
@@ -15,6 +17,15 @@ class TestAgentOrchestratorIntegration(unittest.TestCase):
         """テストの前準備"""
         self.mock_message_broker = Mock(spec=IMessageBroker)
         self.mock_llm_service = Mock(spec=ILLMService)
+        # 既定のmessages.db（とWALファイル）を一時ディレクトリに作成する
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {"DEBATE_DIR": self.temp_dir.name})
+        self.env.start()
+
+    def tearDown(self):
+        """テストの後処理"""
+        self.env.stop()
+        self.temp_dir.cleanup()
 
     def test_orchestrator_should_integrate_clean_architecture_services(self):
         """
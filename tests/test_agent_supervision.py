@@ -0,0 +1,341 @@
+"""
+エージェントの監視と自動再起動のテスト
+TDD: 異常終了したエージェントを数秒で復旧し、処理中のメッセージを
+失わないことを定義する
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+import yaml
+from main.entities.models import Message
+from main.frameworks_and_drivers.drivers.agent_launcher import AgentLauncher
+from main.frameworks_and_drivers.drivers.agent_supervision import (
+    AgentSupervisor, RestartPolicy
+)
+from main.frameworks_and_drivers.drivers.supervisor import Supervisor
+from main.frameworks_and_drivers.frameworks import metrics
+from main.frameworks_and_drivers.frameworks.message_broker import (
+    SqliteMessageBroker
+)
+from main.interface_adapters.controllers.agent_controller import (
+    AgentController
+)
+
+
+class FakeProcess:
+    def __init__(self, pid):
+        self.pid = pid
+        self.returncode = None
+
+    def poll(self):
+        return self.returncode
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _message(recipient_id="DEBATER_A", message_type="REQUEST_STATEMENT"):
+    return Message(sender_id="MODERATOR", recipient_id=recipient_id,
+                   message_type=message_type, payload={"topic": "AI"},
+                   turn_id=1)
+
+
+class TestAgentSupervisor(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.spawned = []
+        self.replayed = []
+
+    def _supervisor(self, **policy):
+        def spawn(agent_id):
+            process = FakeProcess(1000 + len(self.spawned))
+            self.spawned.append(agent_id)
+            return process
+
+        def replay(agent_id):
+            self.replayed.append(agent_id)
+            return 2
+
+        supervisor = AgentSupervisor(
+            spawn, RestartPolicy(**policy), replay=replay, clock=self.clock)
+        self.addCleanup(supervisor.close)
+        self.process = FakeProcess(1)
+        supervisor.watch("JUDGE_L", self.process)
+        return supervisor
+
+    def _crash(self, supervisor, returncode=1):
+        supervisor._agents["JUDGE_L"].process.returncode = returncode
+        return supervisor.poll()
+
+    def test_crashed_agent_is_restarted_after_backoff(self):
+        """異常終了を検知し、バックオフの後に再起動して未ackを再配信する"""
+        supervisor = self._supervisor(backoff_initial_sec=0.5)
+
+        exited, = self._crash(supervisor)
+        self.assertEqual((exited.kind, exited.returncode, exited.delay_sec),
+                         ("exited", 1, 0.5))
+        self.assertEqual(supervisor.poll(), [])
+
+        self.clock.now += 0.5
+        restarted, = supervisor.poll()
+        self.assertEqual((restarted.kind, restarted.pid, restarted.replayed),
+                         ("restarted", 1000, 2))
+        self.assertEqual(self.spawned, ["JUDGE_L"])
+        self.assertEqual(self.replayed, ["JUDGE_L"])
+        self.assertEqual(supervisor.restart_count("JUDGE_L"), 1)
+
+    def test_clean_exit_is_not_restarted(self):
+        """正常終了したエージェントは再起動しない"""
+        supervisor = self._supervisor()
+        self._crash(supervisor, returncode=0)
+        self.clock.now += 60
+        self.assertEqual(supervisor.poll(), [])
+        self.assertEqual(self.spawned, [])
+        self.assertFalse(supervisor.has_active_agents())
+
+    def test_backoff_grows_and_intensity_is_capped(self):
+        """期間内の再起動ごとに待機が倍になり、上限に達すると再起動をあきらめる"""
+        supervisor = self._supervisor(max_restarts=3, window_sec=60,
+                                      backoff_initial_sec=1,
+                                      backoff_max_sec=3)
+        delays = []
+        for _ in range(3):
+            delays.append(self._crash(supervisor)[0].delay_sec)
+            self.clock.now += delays[-1]
+            supervisor.poll()
+
+        events = self._crash(supervisor)
+        self.assertEqual(delays, [1, 2, 3])
+        self.assertEqual([event.kind for event in events],
+                         ["exited", "gave_up"])
+        self.assertEqual(supervisor.failed_agents, ["JUDGE_L"])
+        self.assertFalse(supervisor.has_active_agents())
+
+    def test_restarts_outside_window_are_forgotten(self):
+        """期間より前の再起動は回数に数えない"""
+        supervisor = self._supervisor(max_restarts=1, window_sec=10,
+                                      backoff_initial_sec=0)
+        self._crash(supervisor)
+        supervisor.poll()
+        self.clock.now += 11
+        self.assertEqual(self._crash(supervisor)[0].delay_sec, 0)
+        self.assertEqual(supervisor.failed_agents, [])
+
+    def test_poll_wakes_when_real_process_exits(self):
+        """実プロセスの終了で待機中のpollが即座に起床する"""
+        supervisor = AgentSupervisor(
+            lambda agent_id: FakeProcess(2), RestartPolicy(max_restarts=0))
+        self.addCleanup(supervisor.close)
+        process = subprocess.Popen(
+            [sys.executable, "-c", "import time, sys; time.sleep(0.2); "
+                                   "sys.exit(3)"])
+        supervisor.watch("JUDGE_E", process)
+
+        started = time.monotonic()
+        events = supervisor.poll(timeout=10)
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual([(event.kind, event.returncode) for event in events],
+                         [("exited", 3), ("gave_up", None)])
+
+    def test_close_wakes_a_blocked_poll_before_closing(self):
+        """close()は待機中のpollを起こし、終わってから記述子を閉じる"""
+        supervisor = AgentSupervisor(lambda agent_id: FakeProcess(2))
+        process = subprocess.Popen(
+            [sys.executable, "-c", "import time; time.sleep(30)"])
+        self.addCleanup(process.wait)
+        self.addCleanup(process.kill)
+        supervisor.watch("JUDGE_E", process)
+        poller = threading.Thread(target=supervisor.poll,
+                                  kwargs={"timeout": 30})
+        poller.start()
+        time.sleep(0.1)
+
+        started = time.monotonic()
+        self.assertTrue(supervisor.close(timeout=5))
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertFalse(poller.is_alive())
+        poller.join()
+
+    def test_close_leaves_descriptors_open_while_poll_is_busy(self):
+        """再起動中で終わらないpollがあれば、記述子を閉じずにFalse"""
+        release = threading.Event()
+
+        def spawn(agent_id):
+            release.wait(5)
+            return FakeProcess(2)
+
+        supervisor = AgentSupervisor(spawn, RestartPolicy(
+            backoff_initial_sec=0))
+        process = FakeProcess(1)
+        process.returncode = 1
+        supervisor.watch("JUDGE_E", process)
+        # 異常終了を検知したpollがspawnの途中で止まる
+        poller = threading.Thread(target=supervisor.poll)
+        poller.start()
+        time.sleep(0.1)
+
+        self.assertFalse(supervisor.close(timeout=0.1))
+        os.fstat(supervisor._wake_r)
+        release.set()
+        poller.join()
+        self.assertTrue(supervisor.close(timeout=5))
+        with self.assertRaises(OSError):
+            os.fstat(supervisor._wake_r)
+
+
+class TestAgentCrash(unittest.TestCase):
+    def test_loop_failure_propagates_for_a_non_zero_exit(self):
+        """受信に失敗したエージェントは例外で終わり、再起動の対象になる"""
+        bus = Mock()
+        bus.wait_for_message.side_effect = RuntimeError("database is gone")
+        agent = AgentController("DEBATER_A", message_bus=bus)
+        with self.assertRaises(RuntimeError):
+            agent.run()
+
+    def test_crashed_agent_process_exits_non_zero(self):
+        """ループの例外でエージェントのプロセスは0以外の終了コードになる"""
+        code = (
+            "from unittest.mock import Mock\n"
+            "from main.interface_adapters.controllers.agent_controller "
+            "import AgentController\n"
+            "bus = Mock()\n"
+            "bus.wait_for_message.side_effect = RuntimeError('boom')\n"
+            "AgentController('DEBATER_A', message_bus=bus).run()\n")
+        result = subprocess.run([sys.executable, "-c", code],
+                                capture_output=True)
+        self.assertNotEqual(result.returncode, 0)
+
+
+class TestUnackedMessageReplay(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.broker = SqliteMessageBroker(
+            os.path.join(self.temp_dir.name, "messages.db"))
+        self.broker.initialize_db()
+
+    def tearDown(self):
+        self.broker.close()
+        self.temp_dir.cleanup()
+
+    def test_release_claims_makes_in_flight_messages_deliverable(self):
+        """リース中のメッセージを期限切れを待たずに配信待ちへ戻す"""
+        self.broker.post_messages([_message(), _message("DEBATER_N")])
+        self.broker.wait_for_claim("DEBATER_A", timeout=1, lease_sec=600)
+        self.broker.wait_for_claim("DEBATER_N", timeout=1, lease_sec=600)
+        self.assertIsNone(self.broker.claim_message("DEBATER_A"))
+
+        self.assertEqual(self.broker.release_claims("DEBATER_A"), 1)
+        self.assertIsNotNone(self.broker.claim_message("DEBATER_A"))
+        self.assertIsNone(self.broker.claim_message("DEBATER_N"))
+
+    def test_agent_acks_only_after_processing(self):
+        """エージェントは処理を終えてから受信を確定する"""
+        self.broker.post_message(_message())
+        agent = AgentController("DEBATER_A", message_bus=self.broker)
+        agent.WAIT_TIMEOUT_SEC = 0.001
+        agent.run()
+
+        self.assertEqual(
+            self.broker.get_statistics()["by_recipient"]["DEBATER_A"]
+            ["unread"], 0)
+        reply = self.broker.get_message("MODERATOR")
+        self.assertEqual(reply.message_type, "SUBMIT_STATEMENT")
+        self.assertEqual(self.broker.release_claims("DEBATER_A"), 0)
+
+
+class ScriptLauncher(AgentLauncher):
+    """最初の起動は異常終了し、再起動後は動き続けるプロセスを起動する"""
+
+    name = "script"
+
+    def __init__(self, crashing=("DEBATER_A",), always_crash=False):
+        self.crashing = set(crashing)
+        self.always_crash = always_crash
+        self.launched = []
+
+    def _spawn(self, agent_id, env):
+        crash = agent_id in self.crashing and (
+            self.always_crash or agent_id not in self.launched)
+        self.launched.append(agent_id)
+        code = ("import sys, time; time.sleep(0.1); sys.exit(1)" if crash
+                else "import time; time.sleep(30)")
+        return subprocess.Popen([sys.executable, "-c", code])
+
+
+class TestSupervisorRestarts(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.project_file = os.path.join(self.temp_dir.name, 'project.yml')
+
+    def tearDown(self):
+        self.supervisor.shutdown()
+        self.supervisor.message_bus.close()
+        self.temp_dir.cleanup()
+
+    def _start(self, launcher, **supervision):
+        with open(self.project_file, 'w') as f:
+            yaml.dump({
+                'agents': [{'id': 'MODERATOR'}, {'id': 'DEBATER_A'}],
+                'message_bus': {'db_path': os.path.join(
+                    self.temp_dir.name, 'messages.db')},
+                'supervision': dict({'backoff_initial_sec': 0.05},
+                                    **supervision),
+            }, f)
+        self.supervisor = Supervisor(self.project_file)
+        self.supervisor.launcher = launcher
+        self.supervisor.start()
+
+    def _wait_for(self, condition, timeout=10):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail("condition not met")
+            time.sleep(0.02)
+
+    def test_crashed_agent_recovers_and_gets_its_message_back(self):
+        """異常終了したエージェントを再起動し、処理中だったメッセージを戻す"""
+        restarts = ("a2a_agent_restarts_total", (("agent_id", "DEBATER_A"),))
+        before = metrics.REGISTRY.samples()[restarts]
+        self._start(ScriptLauncher())
+        bus = self.supervisor.message_bus
+        bus.post_message(_message())
+        self.assertIsNotNone(bus.claim_message("DEBATER_A", lease_sec=600))
+        first_pid = self.supervisor.agent_processes[1].pid
+
+        self.supervisor.start_monitoring()
+        self._wait_for(lambda: any(
+            event.kind == "restarted"
+            for event in self.supervisor.supervision_events))
+
+        restarted = self.supervisor.supervision_events[-1]
+        self.assertEqual(restarted.replayed, 1)
+        self.assertNotEqual(self.supervisor.agent_processes[1].pid, first_pid)
+        self.assertTrue(self.supervisor.are_agents_running())
+        self.assertIsNotNone(bus.claim_message("DEBATER_A"))
+        self.assertEqual(metrics.REGISTRY.samples()[restarts], before + 1)
+
+    def test_agent_over_restart_limit_fails_the_scenario_fast(self):
+        """再起動の上限を超えたらタイムアウトを待たずに失敗とする"""
+        self._start(ScriptLauncher(always_crash=True), max_restarts=1)
+        self.supervisor.start_monitoring()
+
+        started = time.monotonic()
+        self.assertFalse(self.supervisor.monitor_for_shutdown(timeout_sec=30))
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertFalse(self.supervisor.are_agents_running())
+        self.assertEqual(self.supervisor.agent_supervisor.failed_agents,
+                         ["DEBATER_A"])
+
+
+if __name__ == '__main__':
+    unittest.main()
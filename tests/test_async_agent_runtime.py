@@ -0,0 +1,326 @@
+"""
+非同期エージェントランタイムのテスト
+TDD: 1プロセスのイベントループ上で複数のエージェントが並行して動くことを定義する
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import Mock, patch
+import yaml
+from main.frameworks_and_drivers.drivers.async_agent_runtime import (
+    AsyncAgentRuntime, runtime_options_from_config
+)
+from main.frameworks_and_drivers.drivers.supervisor import Supervisor
+from main.frameworks_and_drivers.frameworks.debate_transitions import (
+    create_debate_service_from_config
+)
+from main.frameworks_and_drivers.frameworks.gemini_service import GeminiService
+from main.frameworks_and_drivers.frameworks.message_broker import (
+    SqliteMessageBroker
+)
+from main.use_cases.interfaces.interfaces import ILLMService
+from main.entities.models import Message
+
+
+class SlowEchoLLMService(ILLMService):
+    """一定時間待ってから送信者に応答を返すLLMのスタブ"""
+
+    def __init__(self, delay_sec: float):
+        self.delay_sec = delay_sec
+
+    def generate_response(self, prompt: str) -> str:
+        return ""
+
+    def generate_structured_response(self, agent_id, context,
+                                     generation_config=None, model=None):
+        return None
+
+    async def generate_structured_responses_async(
+            self, agent_id, context, generation_config=None, model=None):
+        await asyncio.sleep(self.delay_sec)
+        return [Message(
+            sender_id=agent_id,
+            recipient_id="SUPERVISOR",
+            message_type="DONE",
+            payload={},
+            turn_id=0
+        )]
+
+
+class TestAsyncAgentRuntime(unittest.TestCase):
+    def setUp(self):
+        """テスト用の一時データベースを作成"""
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False)
+        self.temp_db.close()
+        self.db_path = self.temp_db.name
+        SqliteMessageBroker(self.db_path).initialize_db()
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.db_path + suffix):
+                os.unlink(self.db_path + suffix)
+
+    def _collect(self, runtime, recipient_id, count, timeout=5.0):
+        """runtimeを実行しながらrecipient_id宛のメッセージをcount件集める"""
+        async def scenario():
+            task = asyncio.create_task(runtime.run())
+            received = []
+            deadline = time.monotonic() + timeout
+            while len(received) < count and time.monotonic() < deadline:
+                message = await runtime.wait_for_message(
+                    recipient_id, timeout=deadline - time.monotonic())
+                if message:
+                    received.append(message)
+            runtime.stop()
+            await asyncio.wait_for(task, timeout=5)
+            return received
+
+        return asyncio.run(scenario())
+
+    def test_runs_scenario_between_agents_in_one_loop(self):
+        """同じイベントループ上のエージェント間でシナリオが完走する"""
+        broker = SqliteMessageBroker(self.db_path)
+        broker.post_message(Message(
+            sender_id="SYSTEM", recipient_id="MODERATOR",
+            message_type="INITIATE_DEBATE", payload={"topic": "t"},
+            turn_id=1
+        ))
+        runtime = AsyncAgentRuntime(["MODERATOR", "DEBATER_A"], broker)
+
+        received = self._collect(runtime, "SUPERVISOR", 1)
+
+        self.assertEqual([m.message_type for m in received],
+                         ["SHUTDOWN_SYSTEM"])
+        self.assertEqual(runtime.stats["messages_processed"], 3)
+
+    def test_llm_calls_overlap_across_agents(self):
+        """LLMの応答待ちの間も他のエージェントの処理が進む"""
+        agent_ids = [f"AGENT_{i}" for i in range(20)]
+        broker = SqliteMessageBroker(self.db_path)
+        broker.post_messages([
+            Message(sender_id="SYSTEM", recipient_id=agent_id,
+                    message_type="PING", payload={}, turn_id=1)
+            for agent_id in agent_ids
+        ])
+        runtime = AsyncAgentRuntime(
+            agent_ids, broker, llm_service=SlowEchoLLMService(0.2),
+            max_concurrent_llm_calls=20)
+
+        start = time.monotonic()
+        received = self._collect(runtime, "SUPERVISOR", len(agent_ids))
+        elapsed = time.monotonic() - start
+
+        self.assertEqual({m.sender_id for m in received}, set(agent_ids))
+        # 逐次実行なら20 * 0.2 = 4秒かかる
+        self.assertLess(elapsed, 2.0)
+
+    def test_wakes_on_write_from_another_connection(self):
+        """別の接続（他プロセス相当）からの書き込みで待機中のエージェントが起きる"""
+        runtime_broker = SqliteMessageBroker(self.db_path)
+        runtime = AsyncAgentRuntime(["DEBATER_A"], runtime_broker,
+                                    wait_timeout=10.0)
+
+        async def scenario():
+            task = asyncio.create_task(runtime.run())
+            await asyncio.sleep(0.1)
+            with SqliteMessageBroker(self.db_path) as other:
+                other.post_message(Message(
+                    sender_id="MODERATOR", recipient_id="DEBATER_A",
+                    message_type="REQUEST_STATEMENT", payload={},
+                    turn_id=1
+                ))
+            start = time.monotonic()
+            reply = await runtime.wait_for_message("MODERATOR", timeout=5)
+            latency = time.monotonic() - start
+            runtime.stop()
+            await asyncio.wait_for(task, timeout=5)
+            return reply, latency
+
+        reply, latency = asyncio.run(scenario())
+        self.assertEqual(reply.message_type, "SUBMIT_STATEMENT")
+        self.assertLess(latency, 1.0)
+
+    def test_local_routing_does_not_wait_for_llm_slots(self):
+        """LLMの同時実行数の上限は、遷移表で決まる応答の処理を待たせない"""
+        broker = SqliteMessageBroker(self.db_path)
+        broker.post_messages([
+            Message(sender_id="SYSTEM", recipient_id="AGENT_SLOW",
+                    message_type="PING", payload={}, turn_id=1),
+            Message(sender_id="DEBATER_N", recipient_id="MODERATOR",
+                    message_type="SUBMIT_REBUTTAL", payload={}, turn_id=1),
+        ])
+        runtime = AsyncAgentRuntime(
+            ["AGENT_SLOW", "MODERATOR"], broker,
+            llm_service=SlowEchoLLMService(2.0), max_concurrent_llm_calls=1,
+            debate_services={"MODERATOR": create_debate_service_from_config(
+                "MODERATOR",
+                {"transitions_file": "debate_transitions.yml"})})
+
+        arrivals = []
+        wait_for_message = runtime.wait_for_message
+
+        async def timed_wait_for_message(recipient_id, timeout=None):
+            message = await wait_for_message(recipient_id, timeout)
+            if message and recipient_id == "DEBATER_A":
+                arrivals.append(time.monotonic())
+            return message
+
+        runtime.wait_for_message = timed_wait_for_message
+        start = time.monotonic()
+        received = self._collect(runtime, "DEBATER_A", 2)
+
+        self.assertEqual(received[-1].message_type,
+                         "PROMPT_FOR_CLOSING_STATEMENT")
+        # 低速なLLM呼び出し（2秒）の完了を待たずに応答している
+        self.assertLess(arrivals[-1] - start, 1.0)
+
+    def test_message_bus_is_called_off_the_event_loop_thread(self):
+        """メッセージバスの同期APIはイベントループのスレッドで呼ばない"""
+        broker = SqliteMessageBroker(self.db_path)
+        broker.post_message(Message(
+            sender_id="SYSTEM", recipient_id="MODERATOR",
+            message_type="INITIATE_DEBATE", payload={"topic": "t"},
+            turn_id=1
+        ))
+        threads = set()
+        get_message = broker.get_message
+
+        def recording_get_message(recipient_id):
+            threads.add(threading.current_thread().name)
+            return get_message(recipient_id)
+
+        broker.get_message = recording_get_message
+        runtime = AsyncAgentRuntime(["MODERATOR", "DEBATER_A"], broker)
+        self._collect(runtime, "SUPERVISOR", 1)
+
+        self.assertTrue(threads)
+        self.assertNotIn(threading.main_thread().name, threads)
+
+    def test_stop_wakes_idle_agents(self):
+        """stop()で待機中のエージェントがタイムアウトを待たずに終了する"""
+        runtime = AsyncAgentRuntime(
+            ["MODERATOR"], SqliteMessageBroker(self.db_path),
+            wait_timeout=30.0)
+
+        async def scenario():
+            task = asyncio.create_task(runtime.run())
+            await asyncio.sleep(0.05)
+            start = time.monotonic()
+            runtime.stop()
+            await asyncio.wait_for(task, timeout=5)
+            return time.monotonic() - start
+
+        self.assertLess(asyncio.run(scenario()), 1.0)
+
+    def test_loop_failure_ends_the_runtime_with_the_error(self):
+        """受信に失敗したら例外で終わり、プロセスを異常終了させる"""
+        bus = SqliteMessageBroker(self.db_path)
+        runtime = AsyncAgentRuntime(["MODERATOR"], bus, wait_timeout=30.0)
+        with patch.object(bus, "get_message",
+                          side_effect=RuntimeError("database is gone")):
+            with self.assertRaises(RuntimeError):
+                asyncio.run(asyncio.wait_for(runtime.run(), timeout=5))
+
+    def test_runtime_options_from_config(self):
+        """runtime設定からはコンストラクタ引数のみを抽出する"""
+        options = runtime_options_from_config(
+            {"mode": "async", "max_concurrent_llm_calls": 4})
+        self.assertEqual(options, {"max_concurrent_llm_calls": 4})
+
+
+class TestGeminiServiceAsync(unittest.TestCase):
+    def test_async_cli_call_parses_messages(self):
+        """非同期サブプロセスで実行したCLIの出力をパースする"""
+        output = json.dumps([
+            {"recipient_id": "DEBATER_A", "sender_id": "MODERATOR",
+             "message_type": "REQUEST_STATEMENT", "payload": {},
+             "turn_id": 2},
+            {"recipient_id": "DEBATER_B", "sender_id": "MODERATOR",
+             "message_type": "REQUEST_STATEMENT", "payload": {},
+             "turn_id": 2},
+        ])
+        injector = Mock()
+        injector.build_prompt.return_value = "prompt"
+        service = GeminiService(prompt_injector=injector)
+        context = Message(sender_id="SYSTEM", recipient_id="MODERATOR",
+                          message_type="INITIATE_DEBATE", payload={},
+                          turn_id=1)
+
+        with patch.object(service, "_build_command", return_value=[
+                sys.executable, "-c", f"print({output!r})"]):
+            messages = asyncio.run(
+                service.generate_structured_responses_async(
+                    "MODERATOR", context))
+
+        self.assertEqual([m.recipient_id for m in messages],
+                         ["DEBATER_A", "DEBATER_B"])
+
+    def test_async_cli_failure_returns_empty_list(self):
+        """CLIが失敗した場合は空のリストを返す"""
+        injector = Mock()
+        injector.build_prompt.return_value = "prompt"
+        service = GeminiService(prompt_injector=injector)
+        context = Message(sender_id="SYSTEM", recipient_id="MODERATOR",
+                          message_type="INITIATE_DEBATE", payload={},
+                          turn_id=1)
+
+        with patch.object(service, "_build_command", return_value=[
+                sys.executable, "-c", "import sys; sys.exit(1)"]):
+            messages = asyncio.run(
+                service.generate_structured_responses_async(
+                    "MODERATOR", context))
+
+        self.assertEqual(messages, [])
+
+
+class TestSupervisorRuntimeMode(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.project_def = {
+            'agents': [{'id': 'MODERATOR'}, {'id': 'DEBATER_A'}],
+            'message_bus': {
+                'db_path': os.path.join(self.temp_dir.name, 'messages.db')
+            },
+            'runtime': {'mode': 'async', 'max_concurrent_llm_calls': 4},
+        }
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _supervisor(self):
+        project_file = os.path.join(self.temp_dir.name, 'project.yml')
+        with open(project_file, 'w') as f:
+            yaml.dump(self.project_def, f)
+        return Supervisor(project_file)
+
+    @patch('subprocess.Popen')
+    def test_async_mode_launches_single_runtime_process(self, mock_popen):
+        """asyncモードでは全エージェントを1つのプロセスで起動する"""
+        supervisor = self._supervisor()
+        supervisor.start()
+
+        mock_popen.assert_called_once()
+        cmd = mock_popen.call_args[0][0]
+        env = mock_popen.call_args[1]['env']
+        self.assertEqual(cmd, ["python3", "-m", "main.async_agent_entrypoint",
+                               "MODERATOR", "DEBATER_A"])
+        self.assertEqual(json.loads(env['RUNTIME_CONFIG'])
+                         ['max_concurrent_llm_calls'], 4)
+
+    @patch('subprocess.Popen')
+    def test_unknown_runtime_mode_is_rejected(self, mock_popen):
+        """未知の実行方式はエラーにする"""
+        self.project_def['runtime'] = {'mode': 'threads'}
+        with self.assertRaises(ValueError):
+            self._supervisor().start()
+        mock_popen.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
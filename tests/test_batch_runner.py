@@ -0,0 +1,133 @@
+"""
+バッチシナリオ実行のテスト
+TDD: 議題ごとに分離されたディベートが並行実行され、結果が集計されることを定義する
+"""
+import json
+import os
+import sys
+import tempfile
+import textwrap
+import unittest
+from main.frameworks_and_drivers.drivers.batch_runner import (
+    BatchDebateRunner, DebateTask, load_topics
+)
+
+# run_scenario.pyと同じ引数を受け取る偽のシナリオスクリプト
+FAKE_SCENARIO = textwrap.dedent("""
+    import argparse, json, os, sys, time
+    parser = argparse.ArgumentParser()
+    for name in ("--project_file", "--timeout", "--topic", "--run_dir",
+                 "--result_file"):
+        parser.add_argument(name)
+    args = parser.parse_args()
+    if "hang" in args.topic:
+        time.sleep(60)
+    time.sleep(0.3)
+    with open(args.result_file, "w") as f:
+        json.dump({"success": True, "statistics": {
+            "total_messages": 3, "debate_dir": os.environ["DEBATE_DIR"]}}, f)
+    sys.exit(1 if "fail" in args.topic else 0)
+""")
+
+
+class TestLoadTopics(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write(self, name, content):
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+
+    def test_yaml_list_and_mapping(self):
+        """YAMLのリストとtopicsキーのマッピングを読み込める"""
+        tasks = load_topics(self._write(
+            "topics.yml", "- 議題1\n- {id: custom, topic: 議題2}\n"))
+        self.assertEqual(tasks, [DebateTask("0001", "議題1"),
+                                 DebateTask("custom", "議題2")])
+
+        tasks = load_topics(self._write("mapping.yaml", "topics: [議題]\n"))
+        self.assertEqual(tasks, [DebateTask("0001", "議題")])
+
+    def test_jsonl(self):
+        """JSONLの文字列とオブジェクトを読み込める"""
+        tasks = load_topics(self._write(
+            "topics.jsonl", '"議題1"\n\n{"id": "b", "topic": "議題2"}\n'))
+        self.assertEqual(tasks, [DebateTask("0001", "議題1"),
+                                 DebateTask("b", "議題2")])
+
+    def test_invalid_files_are_rejected(self):
+        """議題が空、不正な要素、IDの重複はエラーにする"""
+        for content in ("[]\n", "- {id: a}\n",
+                        "- {id: a, topic: x}\n- {id: a, topic: y}\n"):
+            with self.assertRaises(ValueError):
+                load_topics(self._write("bad.yml", content))
+
+
+class TestBatchDebateRunner(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.script = os.path.join(self.temp_dir.name, "fake_scenario.py")
+        with open(self.script, "w") as f:
+            f.write(FAKE_SCENARIO)
+        self.output_dir = os.path.join(self.temp_dir.name, "batch")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _runner(self, workers, timeout_sec=180):
+        return BatchDebateRunner(
+            "project.yml", self.output_dir, workers=workers,
+            timeout_sec=timeout_sec,
+            scenario_command=[sys.executable, self.script])
+
+    def test_runs_debates_concurrently_in_isolated_dirs(self):
+        """各ディベートは専用のDEBATE_DIRで並行実行される"""
+        tasks = [DebateTask(f"t{i}", f"議題{i}") for i in range(6)]
+
+        summary = self._runner(workers=6).run(tasks)
+
+        # 逐次実行なら各ディベートの所要時間の合計以上かかる
+        serial_time = sum(r["duration_sec"] for r in summary["results"])
+        self.assertLess(summary["wall_time_sec"], serial_time / 2)
+        self.assertEqual(summary["outcomes"]["completed"], 6)
+        self.assertEqual(summary["total_messages"], 18)
+        run_dirs = [result["run_dir"] for result in summary["results"]]
+        self.assertEqual(len(set(run_dirs)), 6)
+        for result in summary["results"]:
+            self.assertEqual(result["statistics"]["debate_dir"],
+                             result["run_dir"])
+
+    def test_summary_records_failures_in_input_order(self):
+        """失敗した議題も入力順にサマリーへ記録され、ファイルに書き出される"""
+        tasks = [DebateTask("a", "ok"), DebateTask("b", "will fail"),
+                 DebateTask("c", "ok")]
+
+        self._runner(workers=2).run(tasks)
+
+        with open(os.path.join(self.output_dir, "summary.json")) as f:
+            summary = json.load(f)
+        self.assertEqual([r["task_id"] for r in summary["results"]],
+                         ["a", "b", "c"])
+        self.assertEqual([r["outcome"] for r in summary["results"]],
+                         ["completed", "failed", "completed"])
+        self.assertEqual(summary["outcomes"]["failed"], 1)
+        self.assertEqual(summary["workers"], 2)
+
+    def test_hung_debate_is_killed_after_timeout(self):
+        """タイムアウトを過ぎたディベートは終了させてtimeoutとして記録する"""
+        runner = self._runner(workers=1, timeout_sec=0)
+        runner.SHUTDOWN_GRACE_SEC = 0.5
+
+        summary = runner.run([DebateTask("h", "hang")])
+
+        self.assertEqual(summary["results"][0]["outcome"], "timeout")
+        self.assertLess(summary["wall_time_sec"], 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+"""
+ベンチマーク共通処理のテスト
+TDD: パーセンタイルの算出とベースラインとの比較で回帰を検出できることを定義する
+"""
+import unittest
+from benchmarks.harness import compare, measure, percentiles
+
+
+class TestBenchmarkHarness(unittest.TestCase):
+    def test_percentiles_in_milliseconds(self):
+        """秒単位のサンプルからミリ秒単位のパーセンタイルを求める"""
+        samples = [i / 1000.0 for i in range(1, 101)]  # 1ms〜100ms
+
+        result = percentiles(samples)
+
+        self.assertAlmostEqual(result["p50_ms"], 50.5)
+        self.assertAlmostEqual(result["p95_ms"], 95.05)
+        self.assertAlmostEqual(result["p99_ms"], 99.01)
+        self.assertEqual(percentiles([])["p99_ms"], 0.0)
+        self.assertEqual(percentiles([0.002])["p50_ms"], 2.0)
+
+    def test_measure_reports_throughput(self):
+        """measureは遅延分布とスループットを返す"""
+        calls = []
+        result = measure(lambda: calls.append(1), iterations=50, warmup=5)
+
+        self.assertEqual(len(calls), 55)
+        self.assertGreater(result["ops_per_sec"], 0)
+        self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+
+    def test_compare_detects_regressions_by_direction(self):
+        """遅延の増加とスループットの低下のみを回帰として報告する"""
+        baseline = {"broker": {"post_message": {
+            "p99_ms": 1.0, "ops_per_sec": 1000.0, "runs": 3}}}
+        current = {"broker": {"post_message": {
+            "p99_ms": 1.5, "ops_per_sec": 700.0, "runs": 1}}}
+        improved = {"broker": {"post_message": {
+            "p99_ms": 0.5, "ops_per_sec": 2000.0, "runs": 3}}}
+
+        regressions = compare(current, baseline, tolerance=0.2)
+
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith(
+            "broker.post_message.p99_ms"))
+        self.assertEqual(compare(improved, baseline, tolerance=0.2), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,6 +4,9 @@ Kent BeckのTDD思想に基づくクリーンアーキテクチャリファク
 Red-Green-Refactorサイクルで新しいディレクトリ構造をテスト駆動で実装
 """
 
+import subprocess
+import sys
+
 import pytest
 from pathlib import Path
 
@@ -188,6 +191,18 @@ class TestImportIntegrity:
             msg = f"Could not import from controllers.agent_controller: {e}"
             pytest.fail(msg)
 
+    def test_controller_import_does_not_load_frameworks(self):
+        """コントローラーのimportだけではフレームワーク層を読み込まない"""
+        code = (
+            "import sys\n"
+            "import main.interface_adapters.controllers.agent_controller\n"
+            "print([m for m in sys.modules\n"
+            "       if m.startswith('main.frameworks_and_drivers')])\n"
+        )
+        result = subprocess.run([sys.executable, "-c", code],
+                                capture_output=True, text=True, check=True)
+        assert result.stdout.strip() == "[]"
+
     def test_frameworks_can_be_imported(self):
         """🔴 RED: frameworks からフレームワークコンポーネントをインポートできる"""
         try:
@@ -0,0 +1,225 @@
+"""
+逐次構築する討論トランスクリプトのテスト
+TDD: プロンプトの構築が新しく届いた発言の分だけで済むことを定義する
+"""
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+from main.entities.models import Message
+from main.frameworks_and_drivers.frameworks.debate_transitions import (
+    load_transition_table
+)
+from main.frameworks_and_drivers.frameworks.message_broker import (
+    SqliteMessageBroker
+)
+from main.interface_adapters.controllers.agent_controller import (
+    AgentController
+)
+from main.use_cases.debate_use_cases import SubmitJudgementUseCase
+from main.use_cases.services.debate_service import DebateService
+from main.use_cases.services import debate_transcript
+from main.use_cases.services.debate_transcript import (
+    DebateTranscript, TranscriptHistoryService
+)
+from main.use_cases.services.history_window import (
+    TokenBudgetWindow, format_entry, render_history
+)
+
+
+def _transcript(count=6):
+    transcript = DebateTranscript()
+    for turn in range(count):
+        transcript.append("DEBATER_A" if turn % 2 == 0 else "DEBATER_N",
+                          f"主張{turn}です。" + "根拠" * 50, "statement")
+    return transcript
+
+
+def _message(message_type, sender_id="MODERATOR", **payload):
+    return Message(sender_id=sender_id, recipient_id="JUDGE_L",
+                   message_type=message_type, payload=payload, turn_id=1)
+
+
+class TestDebateTranscript(unittest.TestCase):
+    def test_render_matches_render_history(self):
+        """追記の途中で描画しても、全体を整形し直した結果と一致する"""
+        transcript = _transcript(3)
+        transcript.render()
+        transcript.append("DEBATER_N", "追加の反駁", "rebuttal")
+        self.assertEqual(transcript.render(), render_history(list(transcript)))
+
+    def test_only_new_entries_are_formatted(self):
+        """2回目以降は前回以降に追記された発言だけを整形する"""
+        transcript = _transcript(5)
+        counting = Mock(side_effect=format_entry)
+        with patch.dict(debate_transcript.FORMATS,
+                        {"text": (counting, "\n\n")}):
+            first = transcript.render()
+            self.assertIs(transcript.render(), first)
+            transcript.append("DEBATER_A", "最新の発言")
+            transcript.render()
+        self.assertEqual(counting.call_count, 6)
+
+    def test_markdown_format(self):
+        """Markdown形式では発言者とフェーズを見出しにする"""
+        transcript = DebateTranscript()
+        transcript.append("DEBATER_A", "賛成です", "statement")
+        transcript.append("DEBATER_N", "反対です")
+        self.assertEqual(
+            transcript.render("markdown"),
+            "### DEBATER_A（statement）\n\n賛成です\n\n"
+            "### DEBATER_N\n\n反対です")
+
+    def test_unknown_format_is_rejected(self):
+        """未知の形式はValueError"""
+        with self.assertRaises(ValueError):
+            DebateTranscript().render("html")
+
+    def test_estimated_tokens_match_token_budget(self):
+        """逐次集計したトークン数はTokenBudgetWindowの見積もりと一致する"""
+        transcript = _transcript()
+        self.assertEqual(transcript.estimated_tokens(),
+                         sum(TokenBudgetWindow(1)._costs(list(transcript))))
+
+    def test_token_budget_skips_per_entry_estimation_when_it_fits(self):
+        """上限に収まる場合は発言ごとの見積もりをせずに連結済みの全文を返す"""
+        transcript = _transcript()
+        window = TokenBudgetWindow(100000)
+        with patch.object(TokenBudgetWindow, "_costs") as costs:
+            self.assertIs(window.render(transcript), transcript.render())
+        costs.assert_not_called()
+        self.assertLessEqual(
+            len(TokenBudgetWindow(100).render(transcript)),
+            len(transcript.render()))
+
+
+class TestTranscriptHistoryService(unittest.TestCase):
+    def test_records_shared_and_submitted_statements(self):
+        """共有された発言は発言者をpayloadから、提出は送信者を使う"""
+        service = TranscriptHistoryService()
+        self.assertTrue(service.record(_message(
+            "STATEMENT_FOR_REVIEW", speaker="DEBATER_A", content="賛成")))
+        self.assertTrue(service.record(_message(
+            "SUBMIT_REBUTTAL", sender_id="DEBATER_N", content="反対")))
+        self.assertFalse(service.record(_message("REQUEST_STATEMENT")))
+
+        history = list(service.get_debate_history())
+        self.assertEqual(history, [
+            {"sender": "DEBATER_A", "content": "賛成", "phase": "statement"},
+            {"sender": "DEBATER_N", "content": "反対", "phase": "rebuttal"},
+        ])
+
+    def test_judgement_prompt_matches_list_history(self):
+        """トランスクリプトを使っても判定のプロンプトは従来と同じになる"""
+        transcript = _transcript(8)
+        prompts = []
+        for history in (transcript, list(transcript)):
+            history_service = Mock()
+            history_service.get_debate_history.return_value = history
+            llm_service = Mock()
+            llm_service.generate_response.return_value = "DEBATER_A 合計: 40"
+            prompt_repository = Mock()
+            prompt_repository.get_persona.return_value = "persona"
+            SubmitJudgementUseCase(llm_service, Mock(), prompt_repository,
+                                   history_service).execute("AI", "JUDGE_L", 10)
+            prompts.append(llm_service.generate_response.call_args[0][0])
+        self.assertEqual(prompts[0], prompts[1])
+
+
+class _RecordingLLM:
+    """受け取ったコンテキストを記録し、応答は返さないLLMのスタブ"""
+
+    def __init__(self):
+        self.contexts = []
+
+    def generate_structured_responses(self, agent_id, context):
+        self.contexts.append(context)
+        return []
+
+
+class TestControllerTranscript(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.broker = SqliteMessageBroker(
+            os.path.join(self.temp_dir.name, "messages.db"))
+        self.broker.initialize_db()
+
+    def tearDown(self):
+        self.broker.close()
+        self.temp_dir.cleanup()
+
+    def _run(self, agent_id, llm_service=None, debate_service=None):
+        agent = AgentController(agent_id, message_bus=self.broker,
+                                llm_service=llm_service or _RecordingLLM(),
+                                debate_service=debate_service)
+        agent.WAIT_TIMEOUT_SEC = 0.001
+        agent.run()
+        return agent
+
+    def test_judge_receives_the_forwarded_debate_as_a_transcript(self):
+        """司会が転送した発言を記録し、判定の依頼にトランスクリプトを付ける"""
+        moderator = DebateService(
+            load_transition_table("debate_transitions.yml"))
+        self.broker.post_messages([
+            Message(sender_id="DEBATER_A", recipient_id="MODERATOR",
+                    message_type="SUBMIT_STATEMENT",
+                    payload={"statement": "AIは創造性を広げる"}, turn_id=1),
+            Message(sender_id="DEBATER_N", recipient_id="MODERATOR",
+                    message_type="SUBMIT_STATEMENT",
+                    payload={"statement": "AIは雇用を奪う"}, turn_id=3),
+        ])
+        self._run("MODERATOR", debate_service=moderator)
+        self.broker.post_message(Message(
+            sender_id="MODERATOR", recipient_id="JUDGE_L",
+            message_type="REQUEST_JUDGEMENT", payload={}, turn_id=9))
+
+        llm = _RecordingLLM()
+        judge = self._run("JUDGE_L", llm)
+
+        self.assertEqual([entry["sender"] for entry in
+                          judge.history_service.get_debate_history()],
+                         ["DEBATER_A", "DEBATER_N"])
+        reviews, request = llm.contexts[:-1], llm.contexts[-1]
+        self.assertTrue(all("transcript" not in context.payload
+                            for context in reviews))
+        self.assertEqual(request.message_type, "REQUEST_JUDGEMENT")
+        self.assertEqual(
+            request.payload["transcript"],
+            "DEBATER_A: AIは創造性を広げる\n\nDEBATER_N: AIは雇用を奪う")
+
+    def test_restarted_agent_restores_delivered_statements(self):
+        """再起動したエージェントは確定済みの発言だけを履歴から復元する"""
+        self.broker.post_messages([
+            Message(sender_id="MODERATOR", recipient_id="JUDGE_L",
+                    message_type="STATEMENT_FOR_REVIEW",
+                    payload={"speaker": speaker, "statement": statement},
+                    turn_id=turn)
+            for turn, (speaker, statement) in enumerate(
+                [("DEBATER_A", "賛成"), ("DEBATER_N", "反対")])
+        ] + [Message(sender_id="MODERATOR", recipient_id="DEBATER_A",
+                     message_type="REBUTTAL_FOR_REVIEW",
+                     payload={"speaker": "DEBATER_N"}, turn_id=3)])
+        self._run("JUDGE_L")
+        # 処理中に異常終了した（確定していない）発言は再配信で記録される
+        self.broker.post_message(Message(
+            sender_id="MODERATOR", recipient_id="JUDGE_L",
+            message_type="REBUTTAL_FOR_REVIEW",
+            payload={"speaker": "DEBATER_A", "rebuttal": "再反論"},
+            turn_id=4))
+        self.assertIsNotNone(self.broker.claim_message("JUDGE_L"))
+
+        restarted = AgentController("JUDGE_L", message_bus=self.broker,
+                                    llm_service=_RecordingLLM())
+        self.assertEqual(restarted.restore_transcript(), 2)
+        self.assertEqual(restarted.history_service.transcript.render(),
+                         "DEBATER_A: 賛成\n\nDEBATER_N: 反対")
+
+    def test_restore_is_skipped_without_message_history(self):
+        """履歴を持たないメッセージバスでは復元しない"""
+        agent = AgentController("JUDGE_L", message_bus=Mock(spec=[]),
+                                llm_service=_RecordingLLM())
+        self.assertEqual(agent.restore_transcript(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+"""
+司会の遷移表のテスト
+TDD: YAMLの遷移表を (message_type, sender_id) の辞書に変換し、
+決定的な遷移はLLMを呼ばずに応答することを定義する
+"""
+import time
+import unittest
+from unittest.mock import Mock
+from main.entities.models import Message
+from main.frameworks_and_drivers.frameworks.debate_transitions import (
+    create_debate_service_from_config, load_transition_table
+)
+from main.interface_adapters.controllers.agent_controller import (
+    AgentController
+)
+from main.use_cases.services.debate_service import (
+    ANY_SENDER, DebateService, compile_transitions
+)
+
+JUDGES = ["JUDGE_L", "JUDGE_E", "JUDGE_R"]
+
+
+def _message(message_type, sender_id, **payload):
+    return Message(sender_id=sender_id, recipient_id="MODERATOR",
+                   message_type=message_type, payload=payload, turn_id=4)
+
+
+class TestCompileTransitions(unittest.TestCase):
+    def test_table_is_keyed_by_message_type_and_sender(self):
+        """遷移は (message_type, sender_id) で引け、グループは展開済み"""
+        table = compile_transitions({
+            "groups": {"judges": JUDGES},
+            "transitions": [
+                {"receive": "SUBMIT_STATEMENT", "from": "DEBATER_A",
+                 "send": [{"message_type": "STATEMENT_FOR_REVIEW",
+                           "to": ["DEBATER_N", "judges"]}]},
+                {"receive": "INITIATE_DEBATE", "llm": True},
+            ],
+        })
+
+        self.assertEqual(set(table), {("SUBMIT_STATEMENT", "DEBATER_A"),
+                                      ("INITIATE_DEBATE", ANY_SENDER)})
+        transition, = table[("SUBMIT_STATEMENT", "DEBATER_A")]
+        self.assertEqual(transition.send[0].recipients,
+                         ("DEBATER_N", *JUDGES))
+
+    def test_invalid_definitions_are_rejected(self):
+        """種類のない遷移・何も送らない遷移・重複した遷移・不正なgatherはエラー"""
+        send = [{"message_type": "PROMPT_FOR_STATEMENT", "to": "DEBATER_A"}]
+        invalid = [
+            [{"send": send}],
+            [{"receive": "START_DEBATE"}],
+            [{"receive": "START_DEBATE", "send": [{"to": "DEBATER_A"}]}],
+            [{"receive": "START_DEBATE", "send": send},
+             {"receive": "START_DEBATE", "send": send}],
+            [{"receive": "START_DEBATE", "send": send, "quorum": 1}],
+            [{"receive": "SUBMIT_JUDGEMENT", "llm": True,
+              "gather": JUDGES, "quorum": 4}],
+            [{"receive": "SUBMIT_JUDGEMENT", "llm": True,
+              "gather": JUDGES, "deadline": 0}],
+        ]
+        for transitions in invalid:
+            with self.assertRaises(ValueError):
+                compile_transitions({"transitions": transitions})
+
+
+class TestDebateTransitionTable(unittest.TestCase):
+    def setUp(self):
+        self.service = DebateService(
+            load_transition_table("debate_transitions.yml"))
+
+    def test_statement_is_forwarded_and_next_debater_prompted(self):
+        """DEBATER_Aの発言をレビューに回し、DEBATER_Nに発言を求める"""
+        messages = self.service.route(_message(
+            "SUBMIT_STATEMENT", "DEBATER_A", statement="AI helps"))
+
+        self.assertEqual(
+            [(m.message_type, m.recipient_id) for m in messages],
+            [("STATEMENT_FOR_REVIEW", "DEBATER_N")]
+            + [("STATEMENT_FOR_REVIEW", judge) for judge in JUDGES]
+            + [("PROMPT_FOR_STATEMENT", "DEBATER_N")])
+        self.assertEqual(messages[0].payload,
+                         {"statement": "AI helps", "speaker": "DEBATER_A"})
+        self.assertTrue(all(m.sender_id == "MODERATOR" and m.turn_id == 5
+                            for m in messages))
+
+    def test_same_message_type_routes_by_sender(self):
+        """同じ種類のメッセージでも送信者によって次の遷移が変わる"""
+        messages = self.service.route(
+            _message("SUBMIT_CLOSING_STATEMENT", "DEBATER_N"))
+        self.assertEqual(
+            [(m.message_type, m.recipient_id) for m in messages[-3:]],
+            [("REQUEST_JUDGEMENT", judge) for judge in JUDGES])
+
+    def test_content_generating_steps_are_left_to_the_llm(self):
+        """ブリーフィングと結果の作成、未定義の遷移はLLMに任せる"""
+        for message in (_message("INITIATE_DEBATE", "SYSTEM", topic="AI"),
+                        _message("SUBMIT_JUDGEMENT", "JUDGE_L"),
+                        _message("SUBMIT_STATEMENT", "JUDGE_L")):
+            self.assertIsNone(self.service.route(message))
+
+    def test_routing_takes_microseconds(self):
+        """遷移は辞書を引くだけで決まる"""
+        message = _message("SUBMIT_REBUTTAL", "DEBATER_A", rebuttal="No")
+        started = time.perf_counter()
+        for _ in range(1000):
+            self.service.route(message)
+        self.assertLess((time.perf_counter() - started) / 1000, 0.001)
+
+    def test_payload_conditions_and_templates(self):
+        """whenの条件に一致した遷移だけを使い、"{キー}" を置き換える"""
+        service = DebateService()
+        self.assertIsNone(service.route(
+            _message("START_SESSION", "SYSTEM", session_type="chat")))
+        prompt, = service.route(
+            _message("START_SESSION", "SYSTEM", session_type="debate",
+                     topic="AI Ethics"))
+        self.assertEqual(prompt.payload, {"topic": "AI Ethics",
+                                          "phase": "statement", "turn": 1})
+
+
+class TestModeratorRouting(unittest.TestCase):
+    def setUp(self):
+        self.bus = Mock()
+        self.llm = Mock()
+        self.controller = AgentController(
+            "MODERATOR", message_bus=self.bus, llm_service=self.llm,
+            debate_service=create_debate_service_from_config(
+                "MODERATOR", {"transitions_file": "debate_transitions.yml"}))
+
+    def test_deterministic_transition_skips_the_llm(self):
+        """遷移表で決まる応答はLLMを呼ばずに投函する"""
+        self.controller._process_message(
+            _message("SUBMIT_REBUTTAL", "DEBATER_N", rebuttal="No"))
+
+        self.llm.generate_structured_responses.assert_not_called()
+        posted = self.bus.post_messages.call_args[0][0]
+        self.assertEqual(posted[-1].message_type,
+                         "PROMPT_FOR_CLOSING_STATEMENT")
+
+    def test_content_generating_transition_calls_the_llm(self):
+        """ブリーフィングはLLMで生成する"""
+        self.llm.generate_structured_responses.return_value = []
+        self.controller._process_message(
+            _message("INITIATE_DEBATE", "SYSTEM", topic="AI"))
+        self.llm.generate_structured_responses.assert_called_once()
+
+    def test_only_the_moderator_uses_the_table(self):
+        """遷移表は司会にだけ適用し、未指定なら使わない"""
+        config = {"transitions_file": "debate_transitions.yml"}
+        self.assertIsNone(
+            create_debate_service_from_config("DEBATER_A", config))
+        self.assertIsNone(create_debate_service_from_config("MODERATOR", {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+FileBasedPromptRepositoryのペルソナキャッシュのテスト
+TDD: 毎ターンのペルソナ取得でファイルを読まず、更新時のみ読み直すことを定義する
+"""
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from main.frameworks_and_drivers.frameworks.file_repository import (
+    FileBasedPromptRepository
+)
+
+
+class TestFileBasedPromptRepositoryCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.config_dir = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write(self, agent, text, mtime_ns=None):
+        path = os.path.join(self.config_dir, f"{agent}.md")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        return path
+
+    def test_cached_persona_is_not_reread(self):
+        """2回目以降の取得ではファイルを開かない"""
+        self._write("debater_a", "persona v1")
+        repo = FileBasedPromptRepository(self.config_dir, check_interval=0)
+        self.assertEqual(repo.get_persona("DEBATER_A"), "persona v1")
+
+        with patch("builtins.open") as mock_open:
+            for _ in range(10):
+                self.assertEqual(repo.get_persona("DEBATER_A"), "persona v1")
+        mock_open.assert_not_called()
+
+    def test_modified_persona_is_reloaded(self):
+        """ファイルが更新されると新しい内容を返す"""
+        self._write("moderator", "old", mtime_ns=1_000_000_000)
+        repo = FileBasedPromptRepository(self.config_dir, check_interval=0)
+        self.assertEqual(repo.get_persona("MODERATOR"), "old")
+
+        self._write("moderator", "new", mtime_ns=2_000_000_000)
+        self.assertEqual(repo.get_persona("MODERATOR"), "new")
+
+    def test_check_interval_skips_stat(self):
+        """確認間隔内はファイルの更新確認も行わない"""
+        self._write("judge_l", "judge")
+        repo = FileBasedPromptRepository(self.config_dir, check_interval=60)
+        repo.get_persona("JUDGE_L")
+
+        with patch("os.stat") as mock_stat:
+            self.assertEqual(repo.get_persona("JUDGE_L"), "judge")
+        mock_stat.assert_not_called()
+
+    def test_deleted_persona_returns_empty(self):
+        """ファイルが削除されると空文字列を返す"""
+        path = self._write("analyst", "analyst")
+        repo = FileBasedPromptRepository(self.config_dir, check_interval=0)
+        repo.get_persona("ANALYST")
+
+        os.unlink(path)
+        self.assertEqual(repo.get_persona("ANALYST"), "")
+
+    def test_preload_all_personas(self):
+        """起動時にディレクトリ内のすべてのペルソナを読み込める"""
+        self._write("moderator", "m")
+        self._write("debater_a", "a")
+        repo = FileBasedPromptRepository(self.config_dir, check_interval=60)
+
+        self.assertEqual(repo.preload(), ["debater_a", "moderator"])
+        self.assertEqual(repo.preload(["MODERATOR", "MISSING"]),
+                         ["moderator"])
+        with patch("builtins.open") as mock_open:
+            self.assertEqual(repo.get_persona("DEBATER_A"), "a")
+        mock_open.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+"""
+討論履歴の窓掛け・圧縮のテスト
+TDD: プロンプトに含める履歴がディベートの長さに比例して増え続けないことを定義する
+"""
+import unittest
+from unittest.mock import Mock
+from main.use_cases.debate_use_cases import (
+    SubmitJudgementUseCase, SubmitRebuttalUseCase
+)
+from main.use_cases.services.history_window import (
+    FullHistory, LastNWindow, PhaseSummaryWindow, TokenBudgetWindow,
+    estimate_tokens, extractive_summarizer, llm_summarizer, render_history
+)
+
+
+def _history(turns_per_phase=4, phases=("opening", "rebuttal", "closing"),
+             length=200):
+    return [
+        {"sender": "DEBATER_A" if turn % 2 == 0 else "DEBATER_N",
+         "phase": phase,
+         "content": f"{phase}{turn}の主張です。" + "根拠" * length}
+        for phase in phases for turn in range(turns_per_phase)
+    ]
+
+
+class TestEstimateTokens(unittest.TestCase):
+    def test_estimates_ascii_and_japanese(self):
+        """ASCIIは4文字で1トークン、日本語は1文字で1トークンと見積もる"""
+        self.assertEqual(estimate_tokens(""), 0)
+        self.assertEqual(estimate_tokens("abcdefgh"), 2)
+        self.assertEqual(estimate_tokens("討論"), 2)
+        self.assertEqual(estimate_tokens("AI討論"), 3)
+
+
+class TestHistoryWindows(unittest.TestCase):
+    def test_full_history_matches_previous_format(self):
+        """FullHistoryは従来の連結結果と同じテキストを返す"""
+        history = _history(turns_per_phase=1)
+        self.assertEqual(
+            FullHistory().render(history),
+            "\n\n".join(f"{h['sender']}: {h['content']}" for h in history))
+
+    def test_last_n_keeps_recent_entries(self):
+        """直近N件だけを残し、省略した件数を示す"""
+        selected = LastNWindow(3).select(_history())
+        self.assertEqual(len(selected), 4)
+        self.assertIn("9件", selected[0]["content"])
+        self.assertEqual(selected[-1]["content"], _history()[-1]["content"])
+
+    def test_phase_summaries_are_generated_once(self):
+        """完了したフェーズは要約に置き換え、要約は再利用する"""
+        summarizer = Mock(side_effect=lambda phase, entries: f"{phase}要約")
+        window = PhaseSummaryWindow(summarizer)
+        history = _history()
+
+        first = window.render(history)
+        second = window.render(history + [
+            {"sender": "DEBATER_A", "phase": "closing", "content": "追加"}])
+
+        self.assertIn("（openingの要約）opening要約", first)
+        self.assertIn("（rebuttalの要約）rebuttal要約", first)
+        self.assertIn(history[-1]["content"], first)
+        self.assertIn("追加", second)
+        self.assertEqual(summarizer.call_count, 2)
+
+    def test_token_budget_is_never_exceeded(self):
+        """推定トークン数が上限を超えない"""
+        for max_tokens in (50, 500, 2000):
+            text = TokenBudgetWindow(max_tokens).render(_history())
+            self.assertLessEqual(estimate_tokens(text), max_tokens)
+
+    def test_token_budget_truncates_single_long_entry(self):
+        """最新の発言だけで上限を超える場合は切り詰める"""
+        history = [{"sender": "DEBATER_A", "content": "長" * 1000}]
+        selected = TokenBudgetWindow(100).select(history)
+        self.assertEqual(len(selected), 1)
+        self.assertTrue(selected[0]["content"].endswith("…"))
+        self.assertLessEqual(estimate_tokens(render_history(selected)), 100)
+
+    def test_budget_uses_full_history_when_it_fits(self):
+        """上限に収まる場合は要約せずに全文を使う"""
+        summarizer = Mock()
+        window = TokenBudgetWindow(
+            100000, fallback=PhaseSummaryWindow(summarizer))
+        self.assertEqual(window.render(_history()),
+                         render_history(_history()))
+        summarizer.assert_not_called()
+
+    def test_budget_falls_back_to_phase_summaries(self):
+        """収まらない場合は全フェーズを要約で残し、最新フェーズは全文を残す"""
+        window = TokenBudgetWindow(
+            2000, fallback=PhaseSummaryWindow(extractive_summarizer()))
+        text = window.render(_history())
+        self.assertIn("（openingの要約）DEBATER_A: opening0の主張です。", text)
+        self.assertIn("（rebuttalの要約）", text)
+        self.assertIn(_history()[-1]["content"], text)
+        self.assertLessEqual(estimate_tokens(text), 2000)
+
+    def test_llm_summarizer_uses_generate_response(self):
+        """LLM要約はフェーズの発言をプロンプトに含める"""
+        llm_service = Mock()
+        llm_service.generate_response.return_value = " 要約 "
+        summary = llm_summarizer(llm_service)("opening", _history()[:2])
+        self.assertEqual(summary, "要約")
+        prompt = llm_service.generate_response.call_args[0][0]
+        self.assertIn("opening0の主張です。", prompt)
+
+
+class TestUseCasePromptsAreBounded(unittest.TestCase):
+    def _use_case(self, cls, history):
+        history_service = Mock()
+        history_service.get_debate_history.return_value = history
+        llm_service = Mock()
+        llm_service.generate_response.return_value = "DEBATER_A 合計: 40"
+        prompt_repository = Mock()
+        prompt_repository.get_persona.return_value = "persona"
+        return cls(llm_service, Mock(), prompt_repository,
+                   history_service), llm_service
+
+    def test_prompts_stop_growing_with_long_debates(self):
+        """長いディベートでも反駁・判定のプロンプトは上限内に収まる"""
+        for cls in (SubmitRebuttalUseCase, SubmitJudgementUseCase):
+            sizes = []
+            for phases in (("p1",), tuple(f"p{i}" for i in range(30))):
+                use_case, llm_service = self._use_case(
+                    cls, _history(phases=phases))
+                use_case.execute("AI", "JUDGE_L", 10)
+                sizes.append(estimate_tokens(
+                    llm_service.generate_response.call_args[0][0]))
+            self.assertLess(sizes[1], 15000, cls.__name__)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+"""
+LLM応答キャッシュのテスト
+TDD: 同一プロンプトの再送でCLIを起動しないことを定義する
+"""
+import unittest
+import sqlite3
+import tempfile
+import time
+import os
+from unittest.mock import Mock, patch, MagicMock
+from main.frameworks_and_drivers.frameworks.llm_response_cache import (
+    LLMResponseCache, create_response_cache_from_config
+)
+from main.frameworks_and_drivers.frameworks.gemini_service import GeminiService
+from main.entities.models import Message
+
+CLI_OUTPUT = ('{"recipient_id": "MODERATOR", "sender_id": "JUDGE_L", '
+              '"message_type": "SUBMIT_JUDGEMENT", "payload": {}, '
+              '"turn_id": 9}')
+
+
+class TestLLMResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "cache",
+                                    "llm_responses.db")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_key_depends_on_all_inputs(self):
+        """キーはモデル・プロンプト・生成設定・MCPサーバー名の全てに依存する"""
+        base = LLMResponseCache.make_key("m", "p", {"t": 0.1}, "mcp")
+
+        self.assertEqual(base, LLMResponseCache.make_key(
+            "m", "p", {"t": 0.1}, "mcp"))
+        self.assertNotEqual(base, LLMResponseCache.make_key(
+            "m2", "p", {"t": 0.1}, "mcp"))
+        self.assertNotEqual(base, LLMResponseCache.make_key(
+            "m", "p2", {"t": 0.1}, "mcp"))
+        self.assertNotEqual(base, LLMResponseCache.make_key(
+            "m", "p", {"t": 0.2}, "mcp"))
+        self.assertNotEqual(base, LLMResponseCache.make_key(
+            "m", "p", {"t": 0.1}, None))
+
+    def test_memory_tier_hit_and_miss_metrics(self):
+        """メモリ層のヒット・ミスを計測する"""
+        cache = LLMResponseCache()
+
+        self.assertIsNone(cache.get("k"))
+        cache.put("k", "v")
+        self.assertEqual(cache.get("k"), "v")
+
+        self.assertEqual(cache.stats["misses"], 1)
+        self.assertEqual(cache.stats["memory_hits"], 1)
+        self.assertEqual(cache.hit_rate(), 0.5)
+
+    def test_memory_tier_is_lru(self):
+        """メモリ層は最も長く参照されていないエントリから追い出す"""
+        cache = LLMResponseCache(max_memory_entries=2)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")
+        cache.put("c", "3")
+
+        self.assertEqual(cache.get("a"), "1")
+        self.assertIsNone(cache.get("b"))
+
+    def test_disk_tier_survives_new_instance(self):
+        """ディスク層の応答は別インスタンス（別プロセス）からも参照できる"""
+        first = LLMResponseCache(db_path=self.db_path)
+        first.put("k", "persisted")
+        first.close()
+
+        second = LLMResponseCache(db_path=self.db_path)
+        self.assertEqual(second.get("k"), "persisted")
+        self.assertEqual(second.stats["disk_hits"], 1)
+        self.assertEqual(second.get("k"), "persisted")
+        self.assertEqual(second.stats["memory_hits"], 1)
+        second.close()
+
+    def test_ttl_expires_entries(self):
+        """有効期間を過ぎたエントリは返さない"""
+        cache = LLMResponseCache(db_path=self.db_path, ttl_sec=0.05)
+        cache.put("k", "v")
+        time.sleep(0.1)
+
+        self.assertIsNone(cache.get("k"))
+        cache.close()
+
+    def test_disk_tier_size_limit(self):
+        """ディスク層は上限件数を超えた古いエントリを削除する"""
+        cache = LLMResponseCache(db_path=self.db_path, max_memory_entries=1,
+                                 max_disk_entries=2)
+        for key in ["a", "b", "c"]:
+            cache.put(key, key)
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c"), "c")
+        cache.close()
+
+    def test_put_does_not_count_rows_on_every_write(self):
+        """件数の数え直しはrecount_interval回のputごとに行う"""
+        cache = LLMResponseCache(db_path=self.db_path, max_disk_entries=100,
+                                 recount_interval=10)
+        statements = []
+        cache._connection.set_trace_callback(statements.append)
+        for i in range(25):
+            cache.put(str(i), "v")
+
+        counts = [s for s in statements if "COUNT(*)" in s]
+        self.assertEqual(len(counts), 2)
+        self.assertEqual(cache._disk_entries, 25)
+        cache.close()
+
+    def test_disk_errors_are_treated_as_misses(self):
+        """ディスク層のロック待ちタイムアウトなどはミスとして扱う"""
+        cache = LLMResponseCache(db_path=self.db_path,
+                                 pragmas={"busy_timeout": 0})
+        cache.put("k", "v")
+        cache._memory.clear()
+        with sqlite3.connect(self.db_path) as other:
+            other.execute("BEGIN EXCLUSIVE")
+            self.assertIsNone(cache.get("k"))
+            cache.put("k2", "v2")
+            other.rollback()
+
+        self.assertEqual(cache.stats["errors"], 2)
+        self.assertEqual(cache.get("k2"), "v2")
+        cache.close()
+
+    def test_create_from_config(self):
+        """llm設定で有効化された場合のみキャッシュを作成する"""
+        self.assertIsNone(create_response_cache_from_config({}))
+        cache = create_response_cache_from_config(
+            {"response_cache": {"enabled": True, "max_memory_entries": 8}})
+        self.assertEqual(cache.max_memory_entries, 8)
+
+
+class TestGeminiServiceResponseCache(unittest.TestCase):
+    def setUp(self):
+        injector = Mock()
+        injector.build_prompt.return_value = "same transcript"
+        self.service = GeminiService(prompt_injector=injector,
+                                     response_cache=LLMResponseCache())
+        self.context = Message(sender_id="MODERATOR", recipient_id="JUDGE_L",
+                               message_type="REQUEST_JUDGEMENT", payload={},
+                               turn_id=8)
+
+    def test_structured_response_is_served_from_cache(self):
+        """同一の入力ではCLIを1回しか起動しない"""
+        with patch('subprocess.run') as mock_run:
+            mock_run.return_value = MagicMock(stdout=CLI_OUTPUT)
+            first = self.service.generate_structured_response(
+                "JUDGE_L", self.context)
+            second = self.service.generate_structured_response(
+                "JUDGE_L", self.context)
+
+        self.assertEqual(mock_run.call_count, 1)
+        self.assertEqual(first, second)
+
+    def test_failed_calls_are_not_cached(self):
+        """失敗した呼び出しはキャッシュしない"""
+        with patch.object(self.service, '_call_gemini_cli',
+                          return_value="Error: timeout") as mock_call:
+            self.service.generate_response("JUDGE_L", self.context)
+            self.service.generate_response("JUDGE_L", self.context)
+
+        self.assertEqual(mock_call.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
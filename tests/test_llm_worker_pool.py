@@ -0,0 +1,231 @@
+"""
+常駐LLMワーカープールのテスト
+TDD: 起動コストを持つ偽のCLIワーカーに対して、プロセス再利用の効果を定義する
+"""
+import io
+import json
+import subprocess
+import unittest
+import tempfile
+import textwrap
+import time
+import sys
+import os
+from unittest.mock import Mock, patch
+from main.frameworks_and_drivers.frameworks.llm_worker_pool import (
+    GEMINI_CLI_WORKER_COMMAND, LLMWorkerPool, LLMWorkerError,
+    create_worker_pool_from_config
+)
+from main.frameworks_and_drivers.frameworks import gemini_worker
+from main.frameworks_and_drivers.frameworks.gemini_service import GeminiService
+from main.entities.models import Message
+
+STARTUP_SEC = 0.3
+
+# 起動コストを模擬し、1行1JSONプロトコルで応答する偽のCLIワーカー
+FAKE_WORKER = textwrap.dedent(f"""
+    import json, sys, time
+    time.sleep({STARTUP_SEC})
+    for line in sys.stdin:
+        request = json.loads(line)
+        if request.get("type") == "ping":
+            response = {{"id": request["id"], "type": "pong"}}
+        elif request["prompt"] == "crash":
+            sys.exit(1)
+        elif request["prompt"] == "hang":
+            time.sleep(10)
+            continue
+        elif request["prompt"] == "fail":
+            response = {{"id": request["id"], "error": "model overloaded"}}
+        else:
+            response = {{"id": request["id"],
+                        "output": "echo:" + request["prompt"]}}
+        print(json.dumps(response), flush=True)
+""")
+
+
+class TestLLMWorkerPool(unittest.TestCase):
+    def setUp(self):
+        """偽のワーカースクリプトを一時ファイルに書き出す"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.script = os.path.join(self.temp_dir.name, "fake_worker.py")
+        with open(self.script, "w") as f:
+            f.write(FAKE_WORKER)
+        self.command = [sys.executable, self.script]
+        self.pools = []
+
+    def tearDown(self):
+        for pool in self.pools:
+            pool.close()
+        self.temp_dir.cleanup()
+
+    def _pool(self, **kwargs):
+        pool = LLMWorkerPool(self.command, **kwargs)
+        self.pools.append(pool)
+        return pool
+
+    def test_reuses_worker_across_requests(self):
+        """連続するリクエストは同じワーカーで処理され、起動コストは1回のみ"""
+        pool = self._pool(size=1)
+
+        start = time.monotonic()
+        outputs = [pool.generate(f"p{i}") for i in range(5)]
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(outputs, [f"echo:p{i}" for i in range(5)])
+        self.assertEqual(pool.stats["workers_started"], 1)
+        # 呼び出しごとに起動する場合は5回分の起動コストがかかる
+        self.assertLess(elapsed, STARTUP_SEC * 5)
+
+    def test_recycles_worker_after_max_requests(self):
+        """規定回数処理したワーカーは入れ替える"""
+        pool = self._pool(size=1, max_requests_per_worker=2)
+
+        for i in range(3):
+            pool.generate(str(i))
+
+        self.assertEqual(pool.stats["workers_started"], 2)
+        self.assertEqual(pool.stats["workers_recycled"], 1)
+
+    def test_replaces_crashed_worker(self):
+        """異常終了したワーカーは次のリクエストで置き換える"""
+        pool = self._pool(size=1)
+
+        with self.assertRaises(LLMWorkerError):
+            pool.generate("crash")
+        self.assertEqual(pool.generate("after"), "echo:after")
+        self.assertEqual(pool.stats["workers_started"], 2)
+
+    def test_worker_error_response_raises(self):
+        """ワーカーが返したエラーは例外として通知し、ワーカーは再利用する"""
+        pool = self._pool(size=1)
+
+        with self.assertRaises(LLMWorkerError):
+            pool.generate("fail")
+        pool.generate("ok")
+        self.assertEqual(pool.stats["workers_started"], 1)
+
+    def test_request_timeout(self):
+        """応答がない場合はタイムアウトする"""
+        pool = self._pool(size=1, request_timeout=STARTUP_SEC + 0.5)
+
+        with self.assertRaises(LLMWorkerError):
+            pool.generate("hang")
+
+    def test_health_check_on_idle_worker(self):
+        """アイドル時間が長いワーカーはpingで死活確認してから貸し出す"""
+        pool = self._pool(size=1, health_check_interval=0)
+
+        pool.generate("first")
+        pool.generate("second")
+
+        self.assertEqual(pool.stats["workers_started"], 1)
+        self.assertEqual(pool.stats["health_check_failures"], 0)
+
+    def test_worker_that_cannot_start_raises_worker_error(self):
+        """起動できないコマンドはLLMWorkerErrorになり、呼び出し元に漏れない"""
+        pool = LLMWorkerPool([os.path.join(self.temp_dir.name, "missing")])
+        self.pools.append(pool)
+        with self.assertRaises(LLMWorkerError):
+            pool.generate("hello")
+
+        injector = Mock()
+        injector.build_prompt.return_value = "prompt"
+        service = GeminiService(prompt_injector=injector, worker_pool=pool)
+        context = Message(sender_id="SYSTEM", recipient_id="MODERATOR",
+                          message_type="INITIATE_DEBATE", payload={},
+                          turn_id=1)
+        self.assertEqual(
+            service.generate_structured_responses("MODERATOR", context), [])
+
+    def test_create_from_config(self):
+        """llm設定で有効化された場合のみプールを作成する"""
+        self.assertIsNone(create_worker_pool_from_config({}))
+        pool = create_worker_pool_from_config({
+            "worker_pool": {"enabled": True, "command": self.command,
+                            "size": 3}
+        })
+        self.pools.append(pool)
+        self.assertEqual(pool.size, 3)
+
+    def test_gemini_service_dispatches_into_pool(self):
+        """GeminiServiceはプール指定時にサブプロセスを起動しない"""
+        pool = Mock()
+        pool.generate.return_value = (
+            '{"recipient_id": "DEBATER_A", "sender_id": "MODERATOR", '
+            '"message_type": "PROMPT_FOR_STATEMENT", "payload": {}, '
+            '"turn_id": 2}')
+        injector = Mock()
+        injector.build_prompt.return_value = "prompt"
+        service = GeminiService(prompt_injector=injector, worker_pool=pool)
+        context = Message(sender_id="SYSTEM", recipient_id="MODERATOR",
+                          message_type="INITIATE_DEBATE", payload={},
+                          turn_id=1)
+
+        with patch('subprocess.run') as mock_run:
+            response = service.generate_structured_response(
+                "MODERATOR", context, model="gemini-1.5-flash")
+
+        mock_run.assert_not_called()
+        pool.generate.assert_called_once_with(
+            "prompt", "gemini-1.5-flash", mcp_server_name=None)
+        self.assertEqual(response.recipient_id, "DEBATER_A")
+
+
+
+class TestGeminiWorker(unittest.TestCase):
+    def test_generate_runs_gemini_cli_with_request_options(self):
+        """generateごとにモデルとMCPサーバー名を指定してgemini-cliを実行する"""
+        run = Mock(return_value=subprocess.CompletedProcess(
+            [], 0, stdout="{}", stderr=""))
+        requests = [
+            {"id": 1, "type": "ping"},
+            {"id": 2, "type": "generate", "prompt": "hi",
+             "model": "gemini-1.5-flash", "mcp_server_name": "a2a"},
+        ]
+        stdout = io.StringIO()
+        with patch.object(gemini_worker.subprocess, "run", run):
+            gemini_worker.serve(
+                io.StringIO("".join(json.dumps(r) + "\n" for r in requests)),
+                stdout)
+
+        responses = [json.loads(line)
+                     for line in stdout.getvalue().splitlines()]
+        self.assertEqual(responses, [{"id": 1, "type": "pong"},
+                                     {"id": 2, "output": "{}"}])
+        self.assertEqual(run.call_args[0][0], [
+            "gemini", "--allowed-mcp-server-names", "a2a",
+            "-m", "gemini-1.5-flash", "-p", "hi"])
+
+    def test_cli_failures_become_error_responses(self):
+        """CLIの異常終了や起動失敗はerror応答として返す"""
+        failed = Mock(return_value=subprocess.CompletedProcess(
+            [], 1, stdout="", stderr="quota exceeded"))
+        missing = Mock(side_effect=FileNotFoundError("gemini"))
+        request = {"id": 3, "type": "generate", "prompt": "hi"}
+
+        self.assertIn("quota exceeded", gemini_worker.handle_request(
+            request, run=failed)["error"])
+        self.assertIn("gemini", gemini_worker.handle_request(
+            request, run=missing)["error"])
+
+    def test_pool_requires_an_explicit_command(self):
+        """有効化する場合は、ワーカーのコマンドを明示する"""
+        with self.assertRaises(ValueError):
+            create_worker_pool_from_config({"worker_pool": {"enabled": True}})
+
+    def test_bundled_worker_speaks_the_protocol(self):
+        """同梱のワーカーはプールのプロトコルに応答する"""
+        pool = create_worker_pool_from_config(
+            {"worker_pool": {"enabled": True,
+                             "command": GEMINI_CLI_WORKER_COMMAND}})
+        try:
+            worker = pool._acquire()
+            self.assertTrue(worker.ping(timeout=30))
+            pool._release(worker, healthy=True)
+        finally:
+            pool.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -23,6 +23,11 @@ from main.entities.models import Message
 class TestMCPMessageBusServerTDD:
     """MCPサーバー機能のTDDテスト"""
 
+    @pytest.fixture(autouse=True)
+    def debate_dir(self, tmp_path, monkeypatch):
+        """既定のmessages.db（とWALファイル）を一時ディレクトリに作成する"""
+        monkeypatch.setenv("DEBATE_DIR", str(tmp_path))
+
     def test_post_message_tool_exists(self):
         """RED: post_messageツールが存在することをテスト"""
         # 現在は失敗するはず（まだ実装していない）
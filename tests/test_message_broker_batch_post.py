@@ -0,0 +1,138 @@
+"""
+メッセージの一括投函（post_messages / broadcast）のテスト
+TDD: モデレーターのファンアウトを1トランザクションで書き込めることを定義する
+"""
+import unittest
+import tempfile
+import os
+from unittest.mock import Mock
+from main.frameworks_and_drivers.frameworks.message_broker import SqliteMessageBroker
+from main.frameworks_and_drivers.frameworks.gemini_service import GeminiService
+from main.interface_adapters.controllers.agent_controller import AgentController
+from main.entities.models import Message
+
+REVIEWERS = ["DEBATER_N", "JUDGE_L", "JUDGE_E", "JUDGE_R"]
+
+
+def _review_message():
+    return Message(
+        sender_id="MODERATOR",
+        recipient_id="",
+        message_type="STATEMENT_FOR_REVIEW",
+        payload={"statement": "立論"},
+        turn_id=3
+    )
+
+
+class TestSqliteMessageBrokerBatchPost(unittest.TestCase):
+    def setUp(self):
+        """テスト用の一時データベースを作成"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "messages.db")
+        self.broker = SqliteMessageBroker(self.db_path)
+        self.broker.initialize_db()
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        self.broker.close()
+        self.temp_dir.cleanup()
+
+    def test_post_messages_writes_all_in_order(self):
+        """post_messagesは全メッセージを投函順に書き込む"""
+        messages = [
+            Message(sender_id="MODERATOR", recipient_id="DEBATER_N",
+                    message_type=f"TYPE_{i}", payload={}, turn_id=i)
+            for i in range(3)
+        ]
+
+        self.broker.post_messages(messages)
+
+        received = [self.broker.get_message("DEBATER_N") for _ in range(3)]
+        self.assertEqual([m.message_type for m in received],
+                         ["TYPE_0", "TYPE_1", "TYPE_2"])
+        self.assertEqual(self.broker.get_statistics()["total_messages"], 3)
+
+    def test_post_messages_with_empty_list_is_noop(self):
+        """空のリストでは何も書き込まない"""
+        self.broker.post_messages([])
+
+        self.assertEqual(self.broker.get_statistics()["total_messages"], 0)
+
+    def test_broadcast_delivers_copy_to_each_recipient(self):
+        """broadcastは受信者ごとに独立したメッセージを配信する"""
+        self.broker.broadcast(_review_message(), REVIEWERS)
+
+        for recipient in REVIEWERS:
+            message = self.broker.get_message(recipient)
+            self.assertEqual(message.recipient_id, recipient)
+            self.assertEqual(message.payload, {"statement": "立論"})
+            self.assertEqual(message.message_type, "STATEMENT_FOR_REVIEW")
+
+
+class TestMultiMessageLLMResponses(unittest.TestCase):
+    def setUp(self):
+        self.service = GeminiService(prompt_injector=Mock())
+
+    def _message_json(self, recipient):
+        return ('{"recipient_id": "%s", "sender_id": "MODERATOR", '
+                '"message_type": "STATEMENT_FOR_REVIEW", '
+                '"payload": {}, "turn_id": 2}' % recipient)
+
+    def test_parse_responses_accepts_json_array(self):
+        """JSON配列の応答から全メッセージを取り出す"""
+        text = "思考...\n[%s, %s]\n" % (self._message_json("JUDGE_L"),
+                                       self._message_json("JUDGE_E"))
+
+        messages = self.service._parse_responses(text)
+
+        self.assertEqual([m.recipient_id for m in messages],
+                         ["JUDGE_L", "JUDGE_E"])
+
+    def test_parse_responses_accepts_messages_key(self):
+        """"messages"キーを持つオブジェクトにも対応する"""
+        text = '{"messages": [%s]}' % self._message_json("JUDGE_R")
+
+        messages = self.service._parse_responses(text)
+
+        self.assertEqual([m.recipient_id for m in messages], ["JUDGE_R"])
+
+    def test_parse_responses_accepts_single_object(self):
+        """単一のJSONオブジェクトは1件のリストになる"""
+        messages = self.service._parse_responses(
+            self._message_json("DEBATER_N"))
+
+        self.assertEqual(len(messages), 1)
+
+    def test_parse_responses_ignores_bracketed_prose(self):
+        """配列として読めない前置きの括弧があっても単一オブジェクトを取り出す"""
+        messages = self.service._parse_responses(
+            "[MODERATOR] " + self._message_json("DEBATER_N"))
+
+        self.assertEqual([m.recipient_id for m in messages], ["DEBATER_N"])
+
+    def test_controller_posts_fan_out_in_one_batch(self):
+        """AgentControllerは複数の応答を1回のpost_messagesで投函する"""
+        controller = AgentController.__new__(AgentController)
+        controller.agent_id = "MODERATOR"
+        controller.message_bus = Mock()
+        controller.gemini_service = Mock()
+        controller.gemini_service.generate_structured_responses.return_value = [
+            Message(sender_id="MODERATOR", recipient_id=recipient,
+                    message_type="STATEMENT_FOR_REVIEW", payload={},
+                    turn_id=0)
+            for recipient in REVIEWERS
+        ]
+        incoming = Message(sender_id="DEBATER_A", recipient_id="MODERATOR",
+                           message_type="SUBMIT_STATEMENT", payload={},
+                           turn_id=4)
+
+        controller._process_message(incoming)
+
+        controller.message_bus.post_messages.assert_called_once()
+        posted = controller.message_bus.post_messages.call_args[0][0]
+        self.assertEqual([m.recipient_id for m in posted], REVIEWERS)
+        self.assertTrue(all(m.turn_id == 5 for m in posted))
+
+
+if __name__ == '__main__':
+    unittest.main()
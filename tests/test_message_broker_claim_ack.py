@@ -0,0 +1,166 @@
+"""
+SqliteMessageBrokerのアトミックな取得・確定（claim/ack）機能テスト
+TDD: 複数ワーカーが同じ受信キューを安全に共有できることを定義する
+"""
+import unittest
+import tempfile
+import threading
+import time
+import os
+from main.frameworks_and_drivers.frameworks.message_broker import SqliteMessageBroker
+from main.entities.models import Message
+
+
+def _make_message(text):
+    return Message(
+        sender_id="MODERATOR",
+        recipient_id="JUDGE_L",
+        message_type="REQUEST_JUDGEMENT",
+        payload={"text": text},
+        turn_id=1
+    )
+
+
+class TestSqliteMessageBrokerClaimAck(unittest.TestCase):
+    def setUp(self):
+        """テスト用の一時データベースを作成"""
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False)
+        self.temp_db.close()
+        self.db_path = self.temp_db.name
+        self.broker = SqliteMessageBroker(self.db_path)
+        self.broker.initialize_db()
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        self.broker.__exit__(None, None, None)
+        os.unlink(self.db_path)
+
+    def test_claimed_message_is_hidden_from_other_workers(self):
+        """リース中のメッセージは他のワーカーに配信されない"""
+        self.broker.post_message(_make_message("first"))
+        self.broker.post_message(_make_message("second"))
+
+        with SqliteMessageBroker(self.db_path) as other:
+            first = self.broker.claim_message("JUDGE_L")
+            second = other.claim_message("JUDGE_L")
+            third = other.claim_message("JUDGE_L")
+
+        self.assertEqual(first.message.payload["text"], "first")
+        self.assertEqual(second.message.payload["text"], "second")
+        self.assertIsNone(third)
+
+    def test_ack_removes_message_from_queue(self):
+        """ackしたメッセージは再配信されない"""
+        self.broker.post_message(_make_message("only"))
+
+        claimed = self.broker.claim_message("JUDGE_L", lease_sec=0)
+        self.assertTrue(self.broker.ack(claimed.delivery_id))
+
+        self.assertIsNone(self.broker.claim_message("JUDGE_L"))
+        self.assertFalse(self.broker.ack(claimed.delivery_id))
+
+    def test_nack_makes_message_available_again(self):
+        """nackしたメッセージは再び配信対象になる"""
+        self.broker.post_message(_make_message("retry"))
+
+        claimed = self.broker.claim_message("JUDGE_L")
+        self.assertTrue(self.broker.nack(claimed.delivery_id))
+
+        redelivered = self.broker.claim_message("JUDGE_L")
+        self.assertEqual(redelivered.delivery_id, claimed.delivery_id)
+
+    def test_expired_lease_is_redelivered(self):
+        """リースが切れたメッセージは再配信される"""
+        self.broker.post_message(_make_message("expire"))
+
+        claimed = self.broker.claim_message("JUDGE_L", lease_sec=0.05)
+        self.assertIsNone(self.broker.get_message("JUDGE_L"))
+
+        time.sleep(0.1)
+        redelivered = self.broker.get_message("JUDGE_L")
+        self.assertIsNotNone(redelivered)
+        self.assertEqual(redelivered.payload["text"], "expire")
+        self.assertFalse(self.broker.ack(claimed.delivery_id))
+
+    def test_stale_ack_after_reclaim_has_no_effect(self):
+        """リースが切れた後の古いack/nackは、取得し直したワーカーに影響しない"""
+        self.broker.post_message(_make_message("reclaimed"))
+
+        with SqliteMessageBroker(self.db_path) as other:
+            stale = self.broker.claim_message("JUDGE_L", lease_sec=0.05)
+            time.sleep(0.1)
+            current = other.claim_message("JUDGE_L", lease_sec=30)
+            self.assertEqual(current.delivery_id, stale.delivery_id)
+
+            self.assertFalse(self.broker.ack(stale.delivery_id,
+                                             stale.delivery_count))
+            self.assertFalse(self.broker.nack(
+                stale.delivery_id, delivery_count=stale.delivery_count))
+            # 取得し直したワーカーの処理中は他のワーカーに配信されない
+            self.assertIsNone(self.broker.claim_message("JUDGE_L"))
+            self.assertTrue(other.ack(current.delivery_id,
+                                      current.delivery_count))
+
+    def test_concurrent_consumers_never_receive_duplicates(self):
+        """同じ受信者を複数ワーカーがポーリングしても重複配信しない"""
+        total = 50
+        for i in range(total):
+            self.broker.post_message(_make_message(str(i)))
+
+        received = []
+        lock = threading.Lock()
+
+        def consume():
+            with SqliteMessageBroker(self.db_path) as worker:
+                while True:
+                    message = worker.get_message("JUDGE_L")
+                    if message is None:
+                        return
+                    with lock:
+                        received.append(message.payload["text"])
+
+        threads = [threading.Thread(target=consume) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(received, key=int),
+                         [str(i) for i in range(total)])
+
+    def test_threads_sharing_one_broker_never_receive_duplicates(self):
+        """単一接続のブローカーを複数スレッドで共有しても重複配信しない"""
+        total = 50
+        for i in range(total):
+            self.broker.post_message(_make_message(str(i)))
+
+        received = []
+        errors = []
+        lock = threading.Lock()
+
+        def consume():
+            try:
+                while True:
+                    claimed = self.broker.claim_message("JUDGE_L")
+                    if claimed is None:
+                        return
+                    with lock:
+                        received.append(claimed.message.payload["text"])
+                    self.broker.ack(claimed.delivery_id,
+                                    claimed.delivery_count)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=consume) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(received, key=int),
+                         [str(i) for i in range(total)])
+
+
+if __name__ == '__main__':
+    unittest.main()
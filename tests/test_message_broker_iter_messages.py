@@ -0,0 +1,109 @@
+"""
+SqliteMessageBrokerの履歴ストリーミングのテスト
+TDD: 長い履歴も一定件数ずつ読み出し、全件をメモリに載せないことを定義する
+"""
+import os
+import tempfile
+import unittest
+from main.entities.models import Message
+from main.frameworks_and_drivers.frameworks.message_broker import (
+    SqliteMessageBroker
+)
+from main.use_cases.interfaces import MessageFilter
+
+
+class TestSqliteMessageBrokerIterMessages(unittest.TestCase):
+    def setUp(self):
+        """テスト用の一時データベースに20ターン分の履歴を作成"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.broker = SqliteMessageBroker(
+            os.path.join(self.temp_dir.name, "messages.db"))
+        self.broker.initialize_db()
+        self.broker.post_messages([
+            Message(
+                sender_id="DEBATER_A" if turn % 2 else "DEBATER_N",
+                recipient_id="MODERATOR",
+                message_type=("SUBMIT_REBUTTAL" if turn > 10
+                              else "SUBMIT_STATEMENT"),
+                payload={"content": f"turn {turn}"},
+                turn_id=turn
+            ) for turn in range(1, 21)
+        ])
+
+    def tearDown(self):
+        self.broker.close()
+        self.temp_dir.cleanup()
+
+    def _turns(self, messages):
+        return [message.turn_id for message in messages]
+
+    def test_iterates_whole_history_in_batches(self):
+        """バッチの境界をまたいでも投函順にすべて読み出す"""
+        self.assertEqual(
+            self._turns(self.broker.iter_messages(batch_size=3)),
+            list(range(1, 21)))
+        self.assertEqual(self._turns(self.broker.get_all_messages()),
+                         list(range(1, 21)))
+
+    def test_reads_lazily_one_batch_per_query(self):
+        """読み出した分だけ問い合わせ、1回の問い合わせはbatch_size件まで"""
+        statements = []
+        with self.broker._connection_scope() as conn:
+            conn.set_trace_callback(statements.append)
+        try:
+            iterator = self.broker.iter_messages(batch_size=4)
+            first = [next(iterator) for _ in range(4)]
+            queries_after_first_batch = len(statements)
+            rest = list(iterator)
+        finally:
+            with self.broker._connection_scope() as conn:
+                conn.set_trace_callback(None)
+
+        self.assertEqual(len(first) + len(rest), 20)
+        self.assertEqual(queries_after_first_batch, 1)
+        # 20件を4件ずつ: 5回 + 空の結果を確認する1回
+        self.assertEqual(len(statements), 6)
+
+    def test_filters_by_sender_type_and_turn_range(self):
+        """送信者・メッセージ種別・ターン範囲で絞り込む"""
+        messages = self.broker.iter_messages(
+            filter=MessageFilter(sender_id="DEBATER_A",
+                                 message_type="SUBMIT_REBUTTAL",
+                                 min_turn=12, max_turn=17),
+            batch_size=2)
+        self.assertEqual(self._turns(messages), [13, 15, 17])
+
+    def test_filter_accepts_multiple_values(self):
+        """複数の値を指定した場合はいずれかに一致すればよい"""
+        messages = self.broker.iter_messages(filter=MessageFilter(
+            sender_id=("DEBATER_A", "DEBATER_N"), max_turn=3))
+        self.assertEqual(self._turns(messages), [1, 2, 3])
+        self.assertEqual(list(self.broker.iter_messages(
+            filter=MessageFilter(recipient_id="JUDGE_L"))), [])
+
+    def test_filters_by_delivery(self):
+        """受信を確定したメッセージと未確定のメッセージを分けて読み出す"""
+        for _ in range(3):
+            claimed = self.broker.claim_message("MODERATOR")
+            self.broker.ack(claimed.delivery_id, claimed.delivery_count)
+        self.broker.claim_message("MODERATOR")
+
+        self.assertEqual(self._turns(self.broker.iter_messages(
+            filter=MessageFilter(delivered=True))), [1, 2, 3])
+        self.assertEqual(self._turns(self.broker.iter_messages(
+            filter=MessageFilter(delivered=False, max_turn=5))), [4, 5])
+
+    def test_after_id_resumes_from_known_position(self):
+        """after_idより後のメッセージだけを読み出す"""
+        self.assertEqual(
+            self._turns(self.broker.iter_messages(after_id=15)),
+            [16, 17, 18, 19, 20])
+
+    def test_invalid_batch_size_is_rejected(self):
+        """batch_sizeは1以上でなければならない"""
+        with self.assertRaises(ValueError):
+            next(self.broker.iter_messages(batch_size=0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+SqliteMessageBrokerの性能プロファイルと接続プールのテスト
+TDD: WAL等のPRAGMA設定と、スレッド間で共有できる接続プールの振る舞いを定義する
+"""
+import unittest
+import tempfile
+import threading
+import os
+from main.frameworks_and_drivers.frameworks.message_broker import (
+    SqliteMessageBroker, broker_options_from_config
+)
+from main.frameworks_and_drivers.frameworks.sqlite_connection_pool import (
+    SqliteConnectionPool, resolve_pragmas
+)
+from main.entities.models import Message
+
+
+class TestSqliteMessageBrokerPerformanceProfile(unittest.TestCase):
+    def setUp(self):
+        """テスト用の一時ディレクトリを作成"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "messages.db")
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        self.temp_dir.cleanup()
+
+    def test_default_profile_enables_wal(self):
+        """既定の性能プロファイルはWALとsynchronous=NORMALを使う"""
+        with SqliteMessageBroker(self.db_path) as broker:
+            broker.initialize_db()
+            conn = broker._get_connection()
+            journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+            busy_timeout = conn.execute("PRAGMA busy_timeout").fetchone()[0]
+
+        self.assertEqual(journal_mode, "wal")
+        self.assertEqual(synchronous, 1)  # NORMAL
+        self.assertEqual(busy_timeout, 5000)
+
+    def test_durable_profile_with_overrides(self):
+        """プロファイルを切り替え、個別のPRAGMAを上書きできる"""
+        with SqliteMessageBroker(self.db_path, profile="durable",
+                                 pragmas={"busy_timeout": 100}) as broker:
+            conn = broker._get_connection()
+            journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            busy_timeout = conn.execute("PRAGMA busy_timeout").fetchone()[0]
+
+        self.assertEqual(journal_mode, "delete")
+        self.assertEqual(busy_timeout, 100)
+
+    def test_rejects_unknown_profile_and_pragma(self):
+        """未知のプロファイルや許可されていないPRAGMAは拒否する"""
+        with self.assertRaises(ValueError):
+            resolve_pragmas("turbo")
+        with self.assertRaises(ValueError):
+            resolve_pragmas(overrides={"writable_schema": 1})
+        with self.assertRaises(ValueError):
+            resolve_pragmas(overrides={"synchronous": "OFF; DROP TABLE x"})
+
+    def test_options_from_message_bus_config(self):
+        """message_bus設定からコンストラクタ引数のみを抽出する"""
+        options = broker_options_from_config({
+            "type": "sqlite",
+            "db_path": "messages.db",
+            "profile": "durable",
+            "pool_size": 4,
+        })
+
+        self.assertEqual(options, {"profile": "durable", "pool_size": 4})
+
+    def test_pooled_broker_can_be_shared_across_threads(self):
+        """接続プールを使うブローカーは複数スレッドから共有できる"""
+        broker = SqliteMessageBroker(self.db_path, pool_size=3)
+        broker.initialize_db()
+        errors = []
+
+        def post_many(sender):
+            try:
+                for i in range(20):
+                    broker.post_message(Message(
+                        sender_id=sender,
+                        recipient_id="MODERATOR",
+                        message_type="SUBMIT_STATEMENT",
+                        payload={"i": i},
+                        turn_id=i
+                    ))
+            except Exception as e:  # pragma: no cover - 失敗時の診断用
+                errors.append(e)
+
+        threads = [threading.Thread(target=post_many, args=(f"AGENT_{n}",))
+                   for n in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = broker.get_statistics()
+        broker.close()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(stats["total_messages"], 100)
+
+    def test_pool_limits_open_connections(self):
+        """接続プールは上限を超えて接続を開かない"""
+        pool = SqliteConnectionPool(self.db_path, size=1,
+                                    acquire_timeout=0.05)
+        conn = pool.acquire()
+        with self.assertRaises(TimeoutError):
+            pool.acquire()
+        pool.release(conn)
+        self.assertIs(pool.acquire(), conn)
+        pool.release(conn)
+        pool.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+SqliteMessageBrokerのスキーママイグレーションテスト
+TDD: 型付きカラムとインデックスによりキュー検索が全件走査にならないことを定義する
+"""
+import unittest
+import tempfile
+import sqlite3
+import json
+import os
+from main.frameworks_and_drivers.frameworks.message_broker import (
+    SqliteMessageBroker, SCHEMA_VERSION
+)
+from main.entities.models import Message
+
+
+class TestSqliteMessageBrokerSchema(unittest.TestCase):
+    def setUp(self):
+        """テスト用の一時データベースを作成"""
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False)
+        self.temp_db.close()
+        self.db_path = self.temp_db.name
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        os.unlink(self.db_path)
+
+    def _columns(self, conn):
+        return {row[1] for row in conn.execute("PRAGMA table_info(messages)")}
+
+    def test_initialize_db_sets_schema_version(self):
+        """初期化後のDBは最新のスキーマバージョンを持つ"""
+        with SqliteMessageBroker(self.db_path) as broker:
+            broker.initialize_db()
+            broker.initialize_db()  # 二重適用しても壊れない
+
+        with sqlite3.connect(self.db_path) as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            columns = self._columns(conn)
+        self.assertEqual(version, SCHEMA_VERSION)
+        self.assertTrue({"sender_id", "message_type", "turn_id",
+                         "timestamp"} <= columns)
+
+    def test_post_message_populates_typed_columns(self):
+        """投函したメッセージの属性は型付きカラムにも保存される"""
+        with SqliteMessageBroker(self.db_path) as broker:
+            broker.initialize_db()
+            broker.post_message(Message(
+                sender_id="DEBATER_A",
+                recipient_id="MODERATOR",
+                message_type="SUBMIT_STATEMENT",
+                payload={"text": "typed"},
+                turn_id=3
+            ))
+
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT sender_id, message_type, turn_id FROM messages"
+            ).fetchone()
+        self.assertEqual(row, ("DEBATER_A", "SUBMIT_STATEMENT", 3))
+
+    def test_legacy_database_is_migrated_and_backfilled(self):
+        """バージョン管理導入前のDBも移行され、既存行の値が補完される"""
+        body = json.dumps({
+            "turn_id": 2, "timestamp": "2025-01-01T00:00:00Z",
+            "sender_id": "MODERATOR", "recipient_id": "DEBATER_A",
+            "message_type": "PROMPT_FOR_STATEMENT", "payload": {}
+        })
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("""
+                CREATE TABLE messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    recipient_id TEXT NOT NULL,
+                    message_body TEXT NOT NULL,
+                    is_read INTEGER DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.execute(
+                "INSERT INTO messages (recipient_id, message_body) "
+                "VALUES (?, ?)", ("DEBATER_A", body))
+        conn.close()
+
+        with SqliteMessageBroker(self.db_path) as broker:
+            broker.initialize_db()
+            stats = broker.get_statistics()
+            message = broker.get_message("DEBATER_A")
+            row = broker._get_connection().execute(
+                "SELECT sender_id, message_type, turn_id, timestamp "
+                "FROM messages").fetchone()
+
+        self.assertEqual(message.message_type, "PROMPT_FOR_STATEMENT")
+        self.assertEqual(row, ("MODERATOR", "PROMPT_FOR_STATEMENT", 2,
+                               "2025-01-01T00:00:00Z"))
+        # 既存行はqueue_statsの初期値にも反映される
+        self.assertEqual(stats['by_sender'],
+                         {"MODERATOR": {"total": 1, "unread": 1}})
+
+    def test_queue_lookup_uses_covering_index(self):
+        """受信キューの先頭検索はインデックスのみで解決される"""
+        with SqliteMessageBroker(self.db_path) as broker:
+            broker.initialize_db()
+            plan = broker._get_connection().execute("""
+                EXPLAIN QUERY PLAN
+                SELECT id FROM messages
+                WHERE recipient_id = ? AND is_read = 0
+                  AND (lease_expires_at IS NULL OR lease_expires_at <= ?)
+                ORDER BY id
+                LIMIT 1
+            """, ("MODERATOR", 0)).fetchall()
+
+        details = " ".join(row[-1] for row in plan)
+        self.assertIn("COVERING INDEX idx_messages_queue", details)
+        self.assertNotIn("TEMP B-TREE", details)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -53,6 +53,71 @@ class TestSqliteMessageBrokerStatistics(unittest.TestCase):
         self.assertEqual(stats['total_messages'], 2)
         self.assertIn('unread_messages', stats)
 
+    def test_statistics_are_broken_down_and_follow_reads(self):
+        """受信者・送信者・種別ごとの件数が取得とackに追従する"""
+        self.broker.post_messages([
+            Message(sender_id="MODERATOR", recipient_id="DEBATER_A",
+                    message_type="REQUEST_STATEMENT", payload={}, turn_id=1),
+            Message(sender_id="MODERATOR", recipient_id="DEBATER_N",
+                    message_type="REQUEST_STATEMENT", payload={}, turn_id=1),
+            Message(sender_id="DEBATER_A", recipient_id="MODERATOR",
+                    message_type="SUBMIT_STATEMENT", payload={}, turn_id=2),
+        ])
+        self.broker.get_message("DEBATER_A")
+        claimed = self.broker.claim_message("DEBATER_N")
+        self.broker.nack(claimed.delivery_id)
+
+        stats = self.broker.get_statistics()
+
+        self.assertEqual(stats['total_messages'], 3)
+        self.assertEqual(stats['unread_messages'], 2)
+        self.assertEqual(stats['by_recipient']['DEBATER_A'],
+                         {'total': 1, 'unread': 0})
+        self.assertEqual(stats['by_recipient']['DEBATER_N'],
+                         {'total': 1, 'unread': 1})
+        self.assertEqual(stats['by_sender']['MODERATOR'],
+                         {'total': 2, 'unread': 1})
+        self.assertEqual(stats['by_message_type']['SUBMIT_STATEMENT'],
+                         {'total': 1, 'unread': 1})
+
+        self.broker.ack(claimed.delivery_id)
+        self.assertEqual(
+            self.broker.get_statistics()['by_recipient']['DEBATER_N'],
+            {'total': 1, 'unread': 0})
+
+    def test_statistics_do_not_scan_messages(self):
+        """統計の取得はmessagesテーブルを参照しない"""
+        self.broker.post_messages([
+            Message(sender_id="MODERATOR", recipient_id="DEBATER_A",
+                    message_type="PING", payload={}, turn_id=i)
+            for i in range(100)
+        ])
+        statements = []
+        with self.broker._connection_scope() as conn:
+            conn.set_trace_callback(statements.append)
+        try:
+            self.assertEqual(self.broker.get_statistics()['total_messages'],
+                             100)
+        finally:
+            with self.broker._connection_scope() as conn:
+                conn.set_trace_callback(None)
+        self.assertTrue(statements)
+        self.assertFalse(any("FROM messages" in sql for sql in statements))
+
+    def test_deleted_messages_are_subtracted(self):
+        """メッセージを削除すると件数からも差し引かれる"""
+        self.broker.post_message(Message(
+            sender_id="MODERATOR", recipient_id="DEBATER_A",
+            message_type="PING", payload={}, turn_id=1))
+        with self.broker._connection_scope() as conn:
+            conn.execute("DELETE FROM messages")
+            conn.commit()
+
+        stats = self.broker.get_statistics()
+        self.assertEqual(stats['total_messages'], 0)
+        self.assertEqual(stats['unread_messages'], 0)
+        self.assertEqual(stats['by_recipient'], {})
+
     def test_get_all_messages_should_return_full_history(self):
         """全メッセージ履歴を取得できる必要がある"""
         # Arrange
@@ -0,0 +1,131 @@
+"""
+SqliteMessageBrokerのプッシュ型待機機能テスト
+TDD: スリープポーリングを置き換えるwait_for_messageの振る舞いを定義する
+"""
+import unittest
+import tempfile
+import threading
+import time
+import os
+from main.frameworks_and_drivers.frameworks.message_broker import SqliteMessageBroker
+from main.entities.models import Message
+
+
+def _make_message(recipient_id="MODERATOR"):
+    return Message(
+        sender_id="DEBATER_A",
+        recipient_id=recipient_id,
+        message_type="SUBMIT_STATEMENT",
+        payload={"text": "待機テスト"},
+        turn_id=1
+    )
+
+
+class TestSqliteMessageBrokerWaitForMessage(unittest.TestCase):
+    def setUp(self):
+        """テスト用の一時データベースを作成"""
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False)
+        self.temp_db.close()
+        self.db_path = self.temp_db.name
+        self.broker = SqliteMessageBroker(self.db_path)
+        self.broker.initialize_db()
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        self.broker.__exit__(None, None, None)
+        os.unlink(self.db_path)
+
+    def test_returns_pending_message_immediately(self):
+        """既に届いているメッセージは待たずに返す"""
+        self.broker.post_message(_make_message())
+
+        start = time.monotonic()
+        message = self.broker.wait_for_message("MODERATOR", timeout=5)
+
+        self.assertIsNotNone(message)
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_returns_none_on_timeout(self):
+        """メッセージが届かなければタイムアウトでNoneを返す"""
+        start = time.monotonic()
+        message = self.broker.wait_for_message("MODERATOR", timeout=0.1)
+
+        self.assertIsNone(message)
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+
+    def test_wakes_up_when_another_connection_posts(self):
+        """別の接続からの投函で待機中の受信者が即座に起床する"""
+        def post_later():
+            time.sleep(0.2)
+            with SqliteMessageBroker(self.db_path) as sender:
+                sender.post_message(_make_message())
+
+        thread = threading.Thread(target=post_later)
+        start = time.monotonic()
+        thread.start()
+        message = self.broker.wait_for_message("MODERATOR", timeout=5)
+        elapsed = time.monotonic() - start
+        thread.join()
+
+        self.assertIsNotNone(message)
+        self.assertEqual(message.sender_id, "DEBATER_A")
+        self.assertLess(elapsed, 1.0)
+
+    def test_wakes_up_when_same_instance_posts_from_another_thread(self):
+        """同じインスタンス（同じ接続）からの投函でも即座に起床する"""
+        timer = threading.Timer(
+            0.2, self.broker.post_message, args=(_make_message(),))
+        start = time.monotonic()
+        timer.start()
+        message = self.broker.wait_for_message("MODERATOR", timeout=5)
+        elapsed = time.monotonic() - start
+        timer.join()
+
+        self.assertIsNotNone(message)
+        self.assertLess(elapsed, 1.0)
+
+    def test_notification_before_wait_is_not_lost(self):
+        """取得から待機までの間の通知も、待機を即座に終わらせる"""
+        watcher = self.broker._watcher
+        generation = watcher.generation
+        watcher.notify()
+
+        start = time.monotonic()
+        self.assertTrue(watcher.wait(generation, time.monotonic() + 5))
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_own_commits_change_data_version(self):
+        """自分の書き込みもdata_versionに現れる"""
+        version = self.broker.data_version()
+        self.broker.post_message(_make_message())
+        self.assertNotEqual(self.broker.data_version(), version)
+
+    def test_waiters_share_one_watcher_thread(self):
+        """待機者が複数いても、他プロセスの監視は1本のスレッドで行う"""
+        receivers = [
+            threading.Thread(target=self.broker.wait_for_message,
+                             args=(f"AGENT_{i}",), kwargs={"timeout": 0.5})
+            for i in range(4)
+        ]
+        for receiver in receivers:
+            receiver.start()
+        time.sleep(0.2)
+        watchers = [thread for thread in threading.enumerate()
+                    if thread.name == "message-bus-watcher "
+                    + os.path.abspath(self.db_path)]
+        for receiver in receivers:
+            receiver.join()
+
+        self.assertEqual(len(watchers), 1)
+
+    def test_ignores_messages_for_other_recipients(self):
+        """他の受信者宛のメッセージでは結果を返さない"""
+        self.broker.post_message(_make_message("DEBATER_N"))
+
+        message = self.broker.wait_for_message("MODERATOR", timeout=0.1)
+
+        self.assertIsNone(message)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,204 @@
+"""
+Prometheus形式のメトリクスのテスト
+TDD: 値を逐次加算し、スクレイプ時にメッセージ履歴を数え直さないことを定義する
+"""
+import json
+import os
+import tempfile
+import unittest
+import urllib.error
+import urllib.request
+from unittest.mock import patch
+import yaml
+from main.entities.models import Message
+from main.frameworks_and_drivers.drivers.supervisor import Supervisor
+from main.frameworks_and_drivers.frameworks import metrics
+from main.frameworks_and_drivers.frameworks.message_broker import (
+    SqliteMessageBroker
+)
+
+
+def _message(recipient_id="DEBATER_A", message_type="REQUEST_STATEMENT"):
+    return Message(
+        sender_id="MODERATOR",
+        recipient_id=recipient_id,
+        message_type=message_type,
+        payload={},
+        turn_id=1
+    )
+
+
+class TestMetricsRendering(unittest.TestCase):
+    def test_counter_and_histogram_exposition(self):
+        """カウンタとヒストグラムをPrometheusのテキスト形式で出力する"""
+        registry = metrics.MetricsRegistry()
+        counter = registry.counter("test_calls_total", "calls", ("kind",))
+        histogram = registry.histogram("test_latency_seconds", "latency",
+                                       ("model",), buckets=(0.5, 1.0))
+        counter.inc(kind="a")
+        counter.inc(2, kind="a")
+        histogram.observe(0.2, model="m")
+        histogram.observe(0.7, model="m")
+        histogram.observe(3.0, model="m")
+
+        text = metrics.render(registry)
+
+        self.assertIn("# TYPE test_calls_total counter", text)
+        self.assertIn('test_calls_total{kind="a"} 3', text)
+        self.assertIn("# TYPE test_latency_seconds histogram", text)
+        self.assertIn('test_latency_seconds_bucket{model="m",le="0.5"} 1',
+                      text)
+        self.assertIn('test_latency_seconds_bucket{model="m",le="1"} 2',
+                      text)
+        self.assertIn('test_latency_seconds_bucket{model="m",le="+Inf"} 3',
+                      text)
+        self.assertIn('test_latency_seconds_count{model="m"} 3', text)
+        self.assertIn('test_latency_seconds_sum{model="m"} 3.9', text)
+
+    def test_unknown_labels_are_rejected(self):
+        """定義と異なるラベルは受け付けない"""
+        counter = metrics.MetricsRegistry().counter("x_total", "x", ("a",))
+        with self.assertRaises(ValueError):
+            counter.inc(b="1")
+
+
+class TestSqliteMetricsStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "messages.db")
+        SqliteMessageBroker(self.db_path).initialize_db()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _process(self):
+        """別プロセスに相当する独立したレジストリとストア"""
+        registry = metrics.MetricsRegistry()
+        counter = registry.counter("test_spawns_total", "spawns", ("kind",))
+        return counter, metrics.SqliteMetricsStore(self.db_path, registry)
+
+    def test_flush_adds_only_deltas_across_processes(self):
+        """各プロセスの差分がmetricsテーブルで合算される"""
+        counter_a, store_a = self._process()
+        counter_b, store_b = self._process()
+
+        counter_a.inc(3, kind="llm_cli")
+        store_a.flush()
+        store_a.flush()  # 変化がなければ何も書かない
+        counter_a.inc(kind="llm_cli")
+        store_a.flush()
+        counter_b.inc(2, kind="llm_cli")
+        store_b.flush()
+
+        key = ("test_spawns_total", (("kind", "llm_cli"),))
+        self.assertEqual(store_a.load()[key], 6)
+        self.assertEqual(store_a.flush(), 0)
+        store_a.close()
+        store_b.close()
+
+
+class TestBrokerMetrics(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.broker = SqliteMessageBroker(
+            os.path.join(self.temp_dir.name, "messages.db"))
+        self.broker.initialize_db()
+
+    def tearDown(self):
+        self.broker.close()
+        self.temp_dir.cleanup()
+
+    def test_post_and_delivery_update_counters(self):
+        """投函・取得・ackで受信者・種別ごとのカウンタが増える"""
+        before = metrics.REGISTRY.samples()
+        self.broker.post_messages([_message("METRICS_A"),
+                                   _message("METRICS_A"),
+                                   _message("METRICS_A", "PING")])
+        self.broker.get_message("METRICS_A")
+        claimed = self.broker.claim_message("METRICS_A")
+        self.broker.ack(claimed.delivery_id)
+        self.assertFalse(self.broker.ack(claimed.delivery_id))
+        after = metrics.REGISTRY.samples()
+
+        def delta(name, message_type):
+            key = (name, (("recipient_id", "METRICS_A"),
+                          ("message_type", message_type)))
+            return after.get(key, 0) - before.get(key, 0)
+
+        self.assertEqual(
+            delta("a2a_messages_posted_total", "REQUEST_STATEMENT"), 2)
+        self.assertEqual(delta("a2a_messages_posted_total", "PING"), 1)
+        self.assertEqual(
+            delta("a2a_messages_delivered_total", "REQUEST_STATEMENT"), 2)
+
+
+class TestSupervisorMetricsEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'messages.db')
+        project_file = os.path.join(self.temp_dir.name, 'project.yml')
+        with open(project_file, 'w') as f:
+            yaml.dump({
+                'agents': [{'id': 'MODERATOR'}, {'id': 'DEBATER_A'}],
+                'message_bus': {'db_path': self.db_path},
+                'metrics': {'enabled': True, 'port': 0,
+                            'flush_interval': 0.1},
+            }, f)
+        self.supervisor = Supervisor(project_file)
+
+    def tearDown(self):
+        self.supervisor.stop_metrics_server()
+        if self.supervisor.message_bus:
+            self.supervisor.message_bus.close()
+        self.temp_dir.cleanup()
+
+    def _get(self, path):
+        port = self.supervisor.metrics_server.server_address[1]
+        with urllib.request.urlopen(
+                f"http://127.0.0.1:{port}{path}", timeout=5) as response:
+            return response.headers["Content-Type"], response.read().decode()
+
+    @patch('subprocess.Popen')
+    def test_metrics_endpoint_merges_agent_values(self, mock_popen):
+        """/metrics はスーパーバイザーとエージェントの値を合わせて返す"""
+        self.supervisor.start()
+        self.supervisor.message_bus.post_messages(
+            [_message("DEBATER_A"), _message("DEBATER_A")])
+        env = mock_popen.call_args[1]['env']
+        self.assertTrue(json.loads(env['METRICS_CONFIG'])['enabled'])
+
+        # エージェントプロセスがフラッシュした値
+        registry = metrics.MetricsRegistry()
+        registry.histogram(
+            "a2a_llm_call_duration_seconds", "latency", ("model", "ok")
+        ).observe(1.5, model="gemini-2.5-pro", ok="true")
+        store = metrics.SqliteMetricsStore(self.db_path, registry)
+        store.flush()
+        store.close()
+
+        content_type, body = self._get("/metrics")
+        self.assertTrue(content_type.startswith("text/plain"))
+        self.assertRegex(body, r'a2a_subprocess_spawns_total\{kind="agent"\} '
+                               r'[1-9]')
+        self.assertIn('a2a_agent_restarts_total{agent_id="DEBATER_A"}', body)
+        self.assertIn('a2a_llm_call_duration_seconds_bucket{'
+                      'model="gemini-2.5-pro",ok="true",le="2.5"}', body)
+        self.assertIn('a2a_queue_depth{recipient_id="DEBATER_A"} 2', body)
+
+    @patch('subprocess.Popen')
+    def test_unknown_path_returns_404(self, mock_popen):
+        """/metrics 以外のパスには404を返す"""
+        self.supervisor.start()
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            self._get("/")
+        self.assertEqual(context.exception.code, 404)
+
+    def test_disabled_metrics_does_not_listen(self):
+        """metrics.enabledがfalseの場合はサーバーを起動しない"""
+        self.supervisor.project_def['metrics']['enabled'] = False
+        self.supervisor.start_metrics_server()
+        self.assertIsNone(self.supervisor.metrics_server)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,257 @@
+"""
+司会のルールエンジンのテスト
+TDD: 司会は発言の転送と指示を遷移表で行い、LLMはブリーフィングと
+結果の作成だけに使うことを定義する
+"""
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock
+from main.entities.models import Message
+from main.frameworks_and_drivers.frameworks import metrics
+from main.frameworks_and_drivers.frameworks.message_broker import (
+    SqliteMessageBroker
+)
+from main.frameworks_and_drivers.frameworks.debate_transitions import (
+    create_debate_service_from_config, load_transition_table
+)
+from main.interface_adapters.controllers.agent_controller import (
+    AgentController
+)
+from main.use_cases.services.debate_service import DebateService
+from main.use_cases.services.moderator_rules import ModeratorRuleEngine
+
+JUDGES = ["JUDGE_L", "JUDGE_E", "JUDGE_R"]
+
+# 1回のディベートで司会が受信するメッセージ（config/moderator.md）
+DEBATE = [("INITIATE_DEBATE", "SYSTEM"),
+          ("PROMPT_FOR_STATEMENT", "SYSTEM")] + [
+    (message_type, debater)
+    for message_type in ("SUBMIT_STATEMENT", "SUBMIT_REBUTTAL",
+                         "SUBMIT_CLOSING_STATEMENT")
+    for debater in ("DEBATER_A", "DEBATER_N")
+] + [("SUBMIT_JUDGEMENT", judge) for judge in JUDGES]
+
+
+def _message(message_type, sender_id, **payload):
+    return Message(sender_id=sender_id, recipient_id="MODERATOR",
+                   message_type=message_type, payload=payload, turn_id=9)
+
+
+class _Clock:
+    """テストから進める時計"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestModeratorRuleEngine(unittest.TestCase):
+    def setUp(self):
+        self.clock = _Clock()
+        self.engine = ModeratorRuleEngine(DebateService(
+            load_transition_table("debate_transitions.yml")),
+            clock=self.clock)
+
+    def test_llm_is_used_only_for_briefing_and_results(self):
+        """1回のディベートで司会がLLMを呼ぶのはブリーフィングと結果だけ"""
+        decisions = [self.engine.decide(_message(*entry)).kind
+                     for entry in DEBATE]
+
+        self.assertEqual(decisions.count("llm"), 2)
+        self.assertEqual(decisions.count("rules"), 7)
+        self.assertEqual(decisions.count("gather"), 2)
+        self.assertEqual((decisions[0], decisions[-1]), ("llm", "llm"))
+
+    def test_judgements_are_gathered_into_one_llm_context(self):
+        """3人分の判定を1通にまとめてLLMに渡す"""
+        for judge in ("JUDGE_R", "JUDGE_L"):
+            decision = self.engine.decide(
+                _message("SUBMIT_JUDGEMENT", judge, score=judge[-1]))
+            self.assertEqual((decision.kind, decision.messages),
+                             ("gather", []))
+
+        decision = self.engine.decide(
+            _message("SUBMIT_JUDGEMENT", "JUDGE_E", score="E"))
+        context = decision.llm_context
+        self.assertEqual(context.message_type, "SUBMIT_JUDGEMENT")
+        self.assertEqual(context.payload, {"judgements": {
+            judge: {"score": judge[-1]} for judge in JUDGES}})
+
+    def test_gathering_waits_for_every_judge_and_then_resets(self):
+        """同じ審査員の再送では揃わず、揃った後は次のディベートに備える"""
+        for judge in ("JUDGE_L", "JUDGE_L", "JUDGE_E"):
+            self.assertEqual(self.engine.decide(
+                _message("SUBMIT_JUDGEMENT", judge)).kind, "gather")
+        self.assertEqual(self.engine.decide(
+            _message("SUBMIT_JUDGEMENT", "JUDGE_R")).kind, "llm")
+        self.assertEqual(self.engine.decide(
+            _message("SUBMIT_JUDGEMENT", "JUDGE_R")).kind, "gather")
+
+    def test_receipts_are_held_until_the_group_completes(self):
+        """集めている間は受信を確定せず、揃った時点でまとめて返す"""
+        decision = self.engine.decide(
+            _message("INITIATE_DEBATE", "SYSTEM"), receipt="r-init")
+        self.assertEqual(decision.receipts, ["r-init"])
+
+        for judge in ("JUDGE_L", "JUDGE_E"):
+            decision = self.engine.decide(
+                _message("SUBMIT_JUDGEMENT", judge), receipt=f"r-{judge}")
+            self.assertEqual(decision.receipts, [])
+        decision = self.engine.decide(
+            _message("SUBMIT_JUDGEMENT", "JUDGE_R"), receipt="r-JUDGE_R")
+        self.assertEqual(decision.receipts,
+                         ["r-JUDGE_L", "r-JUDGE_E", "r-JUDGE_R"])
+        self.assertEqual(decision.gathered.timed_out, [])
+
+    def test_deadline_completes_the_group_with_quorum(self):
+        """期限までにquorum件が届けば、届いた分で遷移する"""
+        self.engine.decide(_message("SUBMIT_JUDGEMENT", "JUDGE_L", score=1),
+                           receipt="r-L")
+        self.clock.now = 179
+        self.engine.decide(_message("SUBMIT_JUDGEMENT", "JUDGE_E", score=2),
+                           receipt="r-E")
+        self.assertEqual(self.engine.expire(), [])
+
+        self.clock.now = 180
+        [(message, decision)] = self.engine.expire()
+        self.assertEqual(decision.kind, "llm")
+        self.assertIs(decision.llm_context.payload, message.payload)
+        self.assertEqual(message.payload, {
+            "judgements": {"JUDGE_L": {"score": 1}, "JUDGE_E": {"score": 2}},
+            "missing": ["JUDGE_R"]})
+        self.assertEqual(decision.receipts, ["r-L", "r-E"])
+        self.assertEqual(decision.gathered.timed_out, ["JUDGE_R"])
+        self.assertEqual(self.engine.expire(), [])
+
+    def test_grace_ends_the_wait_after_quorum(self):
+        """quorumに達した後は猶予の間だけ残りを待つ"""
+        for judge in ("JUDGE_L", "JUDGE_E"):
+            self.engine.decide(_message("SUBMIT_JUDGEMENT", judge))
+        self.clock.now = 29
+        self.assertEqual(self.engine.expire(), [])
+        self.clock.now = 30
+        [(message, decision)] = self.engine.expire()
+        self.assertEqual(decision.kind, "llm")
+        self.assertEqual(message.payload["missing"], ["JUDGE_R"])
+
+    def test_deadline_without_quorum_times_out(self):
+        """期限までにquorumに届かなければtimeoutとし、次の回に備える"""
+        self.engine.decide(_message("SUBMIT_JUDGEMENT", "JUDGE_L"),
+                           receipt="r-L")
+        self.clock.now = 180
+        [(_, decision)] = self.engine.expire()
+        self.assertEqual(decision.kind, "timeout")
+        self.assertEqual(decision.messages, [])
+        self.assertEqual(decision.receipts, ["r-L"])
+        self.assertFalse(decision.gathered.has_quorum(2))
+        self.assertEqual(self.engine.decide(
+            _message("SUBMIT_JUDGEMENT", "JUDGE_L")).kind, "gather")
+
+    def test_messages_outside_the_table_go_to_the_llm(self):
+        """遷移表にないメッセージはそのままLLMに渡す"""
+        message = _message("QUESTION", "DEBATER_A")
+        decision = self.engine.decide(message)
+        self.assertEqual(decision.kind, "llm")
+        self.assertIs(decision.llm_context, message)
+
+
+class TestModeratorMode(unittest.TestCase):
+    def setUp(self):
+        self.bus = Mock()
+        self.llm = Mock()
+        self.llm.generate_structured_responses.return_value = []
+        self.controller = AgentController(
+            "MODERATOR", message_bus=self.bus, llm_service=self.llm,
+            debate_service=create_debate_service_from_config(
+                "MODERATOR", {"mode": "rules",
+                              "transitions_file": "debate_transitions.yml"}))
+
+    def test_controller_calls_llm_once_for_all_judgements(self):
+        """判定が揃うまで応答せず、揃ったら1回だけLLMを呼ぶ"""
+        key = ("a2a_moderator_decisions_total", (("decision", "gather"),))
+        before = metrics.REGISTRY.samples().get(key, 0)
+        for judge in JUDGES:
+            self.controller._process_message(
+                _message("SUBMIT_JUDGEMENT", judge, winner="DEBATER_A"))
+
+        self.llm.generate_structured_responses.assert_called_once()
+        context = self.llm.generate_structured_responses.call_args[1][
+            "context"]
+        self.assertEqual(set(context.payload["judgements"]), set(JUDGES))
+        self.bus.post_messages.assert_not_called()
+        self.assertEqual(metrics.REGISTRY.samples()[key], before + 2)
+
+    def test_controller_completes_judgements_at_the_deadline(self):
+        """判定が揃わなくても、期限を過ぎればquorum分でLLMを呼ぶ"""
+        clock = _Clock()
+        self.controller.rule_engine.clock = clock
+        for judge in ("JUDGE_L", "JUDGE_E"):
+            self.controller._process_message(
+                _message("SUBMIT_JUDGEMENT", judge, winner="DEBATER_A"))
+        self.assertEqual(self.controller._expire_gathers(), [])
+        self.llm.generate_structured_responses.assert_not_called()
+
+        clock.now = 180
+        self.controller._expire_gathers()
+        context = self.llm.generate_structured_responses.call_args[1][
+            "context"]
+        self.assertEqual(context.payload["missing"], ["JUDGE_R"])
+
+    def test_llm_mode_and_unknown_modes(self):
+        """llmモードでは遷移表を使わず、不明なモードはエラー"""
+        config = {"transitions_file": "debate_transitions.yml"}
+        self.assertIsNone(create_debate_service_from_config(
+            "MODERATOR", dict(config, mode="llm")))
+        with self.assertRaises(ValueError):
+            create_debate_service_from_config(
+                "MODERATOR", dict(config, mode="fast"))
+
+
+class TestGatherDurability(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.broker = SqliteMessageBroker(
+            os.path.join(self.temp_dir.name, "messages.db"))
+        self.broker.initialize_db()
+        self.llm = Mock()
+        self.llm.generate_structured_responses.return_value = []
+
+    def tearDown(self):
+        self.broker.close()
+        self.temp_dir.cleanup()
+
+    def _run_moderator(self):
+        controller = AgentController(
+            "MODERATOR", message_bus=self.broker, llm_service=self.llm,
+            debate_service=create_debate_service_from_config(
+                "MODERATOR", {"mode": "rules",
+                              "transitions_file": "debate_transitions.yml"}))
+        controller.WAIT_TIMEOUT_SEC = 0.01
+        controller.run()
+
+    def test_gathered_judgements_survive_a_restart(self):
+        """揃う前に司会が終了しても、再配信された判定から集め直す"""
+        self.broker.post_messages([
+            _message("SUBMIT_JUDGEMENT", judge) for judge in JUDGES[:2]])
+        self._run_moderator()
+        self.llm.generate_structured_responses.assert_not_called()
+
+        # 異常終了後の再起動（スーパーバイザーが未確定の判定を再配信する）
+        self.assertEqual(self.broker.release_claims("MODERATOR"), 2)
+        self.broker.post_message(_message("SUBMIT_JUDGEMENT", JUDGES[2]))
+        self._run_moderator()
+
+        self.llm.generate_structured_responses.assert_called_once()
+        context = self.llm.generate_structured_responses.call_args[1][
+            "context"]
+        self.assertEqual(set(context.payload["judgements"]), set(JUDGES))
+        # 揃った判定はすべて受信を確定している
+        self.assertEqual(self.broker.release_claims("MODERATOR"), 0)
+        self.assertIsNone(self.broker.claim_message("MODERATOR"))
+
+
+if __name__ == '__main__':
+    unittest.main()
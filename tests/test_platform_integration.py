@@ -15,6 +15,8 @@ class TestPlatformIntegration(unittest.TestCase):
 
     def setUp(self):
         """テストの前準備"""
+        # テスト用DB（とWALファイル）は一時ディレクトリに作成する
+        self.temp_dir = tempfile.TemporaryDirectory()
         # 統合テスト用のプロジェクト定義を作成
         self.integration_project_def = {
             'project_name': 'agent_platform_integration',
@@ -25,7 +27,8 @@ class TestPlatformIntegration(unittest.TestCase):
             ],
             'message_bus': {
                 'type': 'sqlite',
-                'db_path': 'integration_test_messages.db'
+                'db_path': os.path.join(self.temp_dir.name,
+                                        'integration_test_messages.db')
             },
             'initial_task': {
                 'type': 'debate',
@@ -46,9 +49,7 @@ class TestPlatformIntegration(unittest.TestCase):
             os.unlink(self.temp_project_file.name)
 
         # テスト用DBファイルも削除
-        test_db = 'integration_test_messages.db'
-        if os.path.exists(test_db):
-            os.unlink(test_db)
+        self.temp_dir.cleanup()
 
     @patch('subprocess.Popen')
     def test_platform_supervisor_full_lifecycle(self, mock_popen):
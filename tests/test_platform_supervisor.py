@@ -15,6 +15,8 @@ class TestPlatformSupervisor(unittest.TestCase):
 
     def setUp(self):
         """テストの前準備"""
+        # テスト用DB（とWALファイル）は一時ディレクトリに作成する
+        self.temp_dir = tempfile.TemporaryDirectory()
         # テスト用のプロジェクト定義ファイルを作成
         self.test_project_def = {
             'project_name': 'test_debate',
@@ -25,7 +27,8 @@ class TestPlatformSupervisor(unittest.TestCase):
             ],
             'message_bus': {
                 'type': 'sqlite',
-                'db_path': 'test_messages.db'
+                'db_path': os.path.join(self.temp_dir.name,
+                                        'test_messages.db')
             }
         }
 
@@ -40,6 +43,7 @@ class TestPlatformSupervisor(unittest.TestCase):
         """テストの後処理"""
         if os.path.exists(self.temp_project_file.name):
             os.unlink(self.temp_project_file.name)
+        self.temp_dir.cleanup()
 
     def test_supervisor_should_load_project_definition(self):
         """Red: スーパーバイザーはプロジェクト定義を読み込める必要がある"""
@@ -0,0 +1,77 @@
+"""
+並行収集（scatter_gather）のテスト
+TDD: 独立した処理を同時に発行し、遅い処理を待たずに結果を集められることを定義する
+"""
+import threading
+import time
+import unittest
+from main.use_cases.services.scatter_gather import scatter_gather
+
+
+class TestScatterGather(unittest.TestCase):
+    def test_tasks_run_concurrently(self):
+        """処理は同時に実行され、所要時間は最も遅い処理の分で済む"""
+        result = scatter_gather(
+            {i: (lambda i=i: time.sleep(0.2) or i) for i in range(3)},
+            deadline=5)
+        self.assertEqual(result.results, {0: 0, 1: 1, 2: 2})
+        self.assertLess(result.elapsed, 0.5)
+
+    def test_deadline_abandons_slow_tasks(self):
+        """期限を過ぎた処理は待たずに打ち切る"""
+        release = threading.Event()
+        try:
+            result = scatter_gather(
+                {"fast": lambda: 1, "slow": lambda: release.wait(5)},
+                deadline=0.2)
+        finally:
+            release.set()
+        self.assertEqual(result.results, {"fast": 1})
+        self.assertEqual(result.timed_out, ["slow"])
+        self.assertLess(result.elapsed, 1)
+
+    def test_returns_early_when_quorum_is_unreachable(self):
+        """失敗が増えてquorumに届かなくなれば期限を待たない"""
+        def fail():
+            raise RuntimeError("boom")
+
+        release = threading.Event()
+        try:
+            result = scatter_gather(
+                {"a": fail, "b": fail, "c": lambda: release.wait(5)},
+                deadline=5, quorum=2)
+        finally:
+            release.set()
+        self.assertEqual(sorted(result.errors), ["a", "b"])
+        self.assertFalse(result.has_quorum(2))
+        self.assertLess(result.elapsed, 1)
+
+    def test_quorum_grace_returns_before_deadline(self):
+        """quorumに達した後は猶予の間に終わった処理だけを待つ"""
+        release = threading.Event()
+        try:
+            result = scatter_gather(
+                {"a": lambda: 1, "b": lambda: time.sleep(0.1) or 2,
+                 "c": lambda: release.wait(5)},
+                deadline=5, quorum=1, quorum_grace=0.5)
+        finally:
+            release.set()
+        self.assertEqual(result.results, {"a": 1, "b": 2})
+        self.assertEqual(result.timed_out, ["c"])
+        self.assertLess(result.elapsed, 1)
+
+    def test_zero_quorum_grace_returns_on_quorum(self):
+        """猶予0ならquorumに達した時点で返す"""
+        release = threading.Event()
+        try:
+            result = scatter_gather(
+                {"fast": lambda: 1, "slow": lambda: release.wait(5)},
+                deadline=5, quorum=1, quorum_grace=0)
+        finally:
+            release.set()
+        self.assertEqual(result.results, {"fast": 1})
+        self.assertLess(result.elapsed, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,248 @@
+"""
+オフラインLLMサービスのテスト
+TDD: スクリプト済みの応答を決定的に返し、遅延・エラー率・出力サイズを再現できることを定義する
+"""
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+import unittest
+from unittest.mock import Mock
+from main.frameworks_and_drivers.frameworks.simulated_llm_service import (
+    LatencyModel, RecordingLLMService, SimulatedLLMError,
+    SimulatedLLMService, create_simulated_llm_service_from_config
+)
+from main.frameworks_and_drivers.frameworks.llm_service_factory import (
+    create_llm_service_from_config
+)
+from main.entities.models import Message
+
+SCRIPT = {
+    "MODERATOR": {
+        "INITIATE_DEBATE": [
+            {"recipient_id": "DEBATER_A",
+             "message_type": "REQUEST_STATEMENT",
+             "payload": {"topic": "{topic}", "note": "{missing}"}},
+        ],
+        "SUBMIT_STATEMENT": [
+            [{"recipient_id": "JUDGE_L", "message_type": "REQUEST_JUDGEMENT"},
+             {"recipient_id": "JUDGE_E", "message_type": "REQUEST_JUDGEMENT"}],
+            {"recipient_id": "SUPERVISOR", "message_type": "SHUTDOWN_SYSTEM"},
+        ],
+    },
+    "*": {"*": []},
+}
+
+
+def _context(message_type, sender="SYSTEM", payload=None):
+    return Message(sender_id=sender, recipient_id="MODERATOR",
+                   message_type=message_type, payload=payload or {},
+                   turn_id=4)
+
+
+class TestSimulatedLLMService(unittest.TestCase):
+    def test_scripted_response_is_rendered(self):
+        """受信メッセージのpayloadで応答のテンプレートを埋める"""
+        service = SimulatedLLMService(SCRIPT)
+
+        messages = service.generate_structured_responses(
+            "MODERATOR", _context("INITIATE_DEBATE", payload={"topic": "AI"}))
+
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(messages[0].sender_id, "MODERATOR")
+        self.assertEqual(messages[0].recipient_id, "DEBATER_A")
+        self.assertEqual(messages[0].payload,
+                         {"topic": "AI", "note": "{missing}"})
+        self.assertEqual(messages[0].turn_id, 5)
+
+    def test_responses_cycle_and_fan_out(self):
+        """応答は順番に使われ、リストは複数メッセージとして返す"""
+        service = SimulatedLLMService(SCRIPT)
+        context = _context("SUBMIT_STATEMENT", sender="DEBATER_A")
+
+        first = service.generate_structured_responses("MODERATOR", context)
+        second = service.generate_structured_responses("MODERATOR", context)
+        third = service.generate_structured_responses("MODERATOR", context)
+
+        self.assertEqual([m.recipient_id for m in first],
+                         ["JUDGE_L", "JUDGE_E"])
+        self.assertEqual([m.message_type for m in second],
+                         ["SHUTDOWN_SYSTEM"])
+        self.assertEqual([m.recipient_id for m in third],
+                         ["JUDGE_L", "JUDGE_E"])
+
+    def test_wildcard_and_unscripted(self):
+        """ワイルドカードに一致すれば空の応答、一致しなければ未定義として数える"""
+        service = SimulatedLLMService(SCRIPT)
+        self.assertEqual(service.generate_structured_responses(
+            "DEBATER_A", _context("ANYTHING")), [])
+        self.assertEqual(service.stats["unscripted"], 0)
+
+        service = SimulatedLLMService({})
+        self.assertEqual(service.generate_structured_responses(
+            "DEBATER_A", _context("ANYTHING")), [])
+        self.assertEqual(service.stats["unscripted"], 1)
+
+    def test_same_seed_is_deterministic(self):
+        """同じシードなら遅延・エラー・本文が同じになる"""
+        def run(seed):
+            service = SimulatedLLMService(
+                {"*": {"*": [{"message_type": "R"}]}},
+                latency=LatencyModel("uniform", min_ms=0, max_ms=2),
+                error_rate=0.3,
+                output_size={"min_chars": 10, "max_chars": 50},
+                seed=seed)
+            results = []
+            for _ in range(30):
+                try:
+                    results.append([
+                        m.payload for m in
+                        service.generate_structured_responses(
+                            "A", _context("X"))])
+                except SimulatedLLMError:
+                    results.append(None)
+            return results
+
+        self.assertEqual(run(7), run(7))
+        self.assertNotEqual(run(7), run(8))
+
+    def test_error_rate_and_output_size(self):
+        """エラー率に応じて失敗し、本文は指定した長さになる"""
+        service = SimulatedLLMService(
+            {"*": {"*": [{"message_type": "R"}]}},
+            error_rate=0.25,
+            output_size={"min_chars": 100, "max_chars": 100,
+                         "field": "text"},
+            seed=1)
+
+        results = []
+        for _ in range(400):
+            try:
+                results.append(service.generate_structured_responses(
+                    "A", _context("X")))
+            except SimulatedLLMError:
+                results.append(None)
+
+        errors = sum(1 for messages in results if messages is None)
+        self.assertEqual(errors, service.stats["errors"])
+        self.assertNotIn([], results)
+        self.assertAlmostEqual(errors / 400, 0.25, delta=0.07)
+        sizes = {len(messages[0].payload["text"])
+                 for messages in results if messages}
+        self.assertEqual(sizes, {100})
+
+    def test_injected_error_differs_from_missing_script(self):
+        """注入した失敗は例外、スクリプトにない応答は空のリストになる"""
+        failing = SimulatedLLMService({"*": {"*": [{"message_type": "R"}]}},
+                                      error_rate=1.0)
+        with self.assertRaises(SimulatedLLMError):
+            failing.generate_structured_responses("A", _context("X"))
+        with self.assertRaises(SimulatedLLMError):
+            asyncio.run(failing.generate_structured_responses_async(
+                "A", _context("X")))
+        self.assertEqual(failing.stats["errors"], 2)
+
+        unscripted = SimulatedLLMService({})
+        self.assertEqual(unscripted.generate_structured_responses(
+            "A", _context("X")), [])
+        self.assertEqual(unscripted.stats["errors"], 0)
+
+    def test_latency_distributions(self):
+        """各分布から非負の遅延を抽出できる"""
+        rng = random.Random(0)
+        models = [
+            LatencyModel("constant", value_ms=5),
+            LatencyModel("uniform", min_ms=1, max_ms=3),
+            LatencyModel("normal", mean_ms=1, stddev_ms=5),
+            LatencyModel("lognormal", median_ms=10, sigma=0.5),
+            LatencyModel("exponential", mean_ms=10),
+        ]
+        self.assertEqual(models[0].sample(rng), 0.005)
+        for model in models:
+            samples = [model.sample(rng) for _ in range(200)]
+            self.assertTrue(all(s >= 0 for s in samples))
+        with self.assertRaises(ValueError):
+            LatencyModel("pareto")
+
+    def test_async_latency_does_not_block_loop(self):
+        """非同期版の遅延は並行して待機できる"""
+        service = SimulatedLLMService(
+            {"*": {"*": [{"message_type": "R"}]}},
+            latency=LatencyModel("constant", value_ms=200))
+
+        async def run():
+            return await asyncio.gather(*(
+                service.generate_structured_responses_async(
+                    "A", _context("X"))
+                for _ in range(10)
+            ))
+
+        start = time.monotonic()
+        results = asyncio.run(run())
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(len(results), 10)
+
+
+class TestRecordingAndConfig(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_recorded_responses_can_be_replayed(self):
+        """記録した応答をSimulatedLLMServiceで再生できる"""
+        recording_file = os.path.join(self.temp_dir.name, "rec.jsonl")
+        inner = Mock()
+        inner.generate_structured_responses.return_value = [Message(
+            sender_id="MODERATOR", recipient_id="DEBATER_A",
+            message_type="REQUEST_STATEMENT", payload={"topic": "T"},
+            turn_id=9)]
+        recorder = RecordingLLMService(inner, recording_file)
+        recorder.generate_structured_responses(
+            "MODERATOR", _context("INITIATE_DEBATE"))
+
+        service = create_simulated_llm_service_from_config(
+            {"simulated": {"recording_file": recording_file}})
+        messages = service.generate_structured_responses(
+            "MODERATOR", _context("INITIATE_DEBATE"))
+
+        self.assertEqual(messages[0].message_type, "REQUEST_STATEMENT")
+        self.assertEqual(messages[0].payload, {"topic": "T"})
+
+    def test_recording_file_wraps_the_real_service(self):
+        """providerがsimulated以外でrecording_fileがあれば実際の応答を記録する"""
+        recording_file = os.path.join(self.temp_dir.name, "runs", "rec.jsonl")
+        config = {"provider": "gemini",
+                  "simulated": {"recording_file": recording_file}}
+
+        service = create_llm_service_from_config(config, Mock())
+
+        self.assertIsInstance(service, RecordingLLMService)
+        self.assertEqual(service.recording_file, recording_file)
+        self.assertIsNotNone(service.prompt_injector)
+        self.assertNotIsInstance(create_llm_service_from_config(
+            {"provider": "gemini"}, Mock()), RecordingLLMService)
+
+    def test_project_script_drives_scenario(self):
+        """同梱のシナリオ用スクリプトでMODERATORとDEBATER_Aの応答が得られる"""
+        service = create_simulated_llm_service_from_config({"simulated": {
+            "script_file": "config/scenario_test/simulated_llm.yml"}})
+
+        reply = service.generate_structured_responses(
+            "DEBATER_A", Message("DEBATER_A", "MODERATOR",
+                                 "REQUEST_STATEMENT", {"topic": "AI"}, 2))
+        self.assertEqual(reply[0].message_type, "SUBMIT_STATEMENT")
+        self.assertIn("AI", reply[0].payload["statement"])
+
+        shutdown = service.generate_structured_responses(
+            "MODERATOR", reply[0])
+        self.assertEqual(shutdown[0].recipient_id, "SUPERVISOR")
+        self.assertEqual(json.loads(json.dumps(shutdown[0].payload)),
+                         {"reason": "Scenario completed successfully"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+スーパーバイザーの制御メッセージ処理のテスト
+TDD: SUPERVISOR宛のメッセージを書き込みと同時に受信し、
+種類ごとのハンドラへ捨てずに振り分けることを定義する
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import yaml
+from main.entities.models import Message
+from main.frameworks_and_drivers.drivers.supervisor import Supervisor
+from main.frameworks_and_drivers.frameworks.message_broker import (
+    SqliteMessageBroker
+)
+
+
+def _control(message_type, sender_id="MODERATOR", **payload):
+    return Message(sender_id=sender_id, recipient_id="SUPERVISOR",
+                   message_type=message_type, payload=payload, turn_id=1)
+
+
+class TestMonitorForShutdown(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'messages.db')
+        project_file = os.path.join(self.temp_dir.name, 'project.yml')
+        with open(project_file, 'w') as f:
+            yaml.dump({'agents': [{'id': 'MODERATOR'}],
+                       'message_bus': {'db_path': self.db_path}}, f)
+        self.supervisor = Supervisor(project_file)
+        self.supervisor.initialize_message_bus()
+        self.bus = self.supervisor.message_bus
+
+    def tearDown(self):
+        self.bus.close()
+        self.temp_dir.cleanup()
+
+    def test_returns_within_milliseconds_of_shutdown(self):
+        """待機中にSHUTDOWN_SYSTEMが書き込まれると即座に戻る"""
+        posted_at = []
+
+        def post_later():
+            # 監視スレッドと同じく、スレッドごとに別のブローカーで書き込む
+            with SqliteMessageBroker(self.db_path) as bus:
+                time.sleep(0.2)
+                posted_at.append(time.monotonic())
+                bus.post_message(_control("SHUTDOWN_SYSTEM"))
+
+        threading.Thread(target=post_later).start()
+        self.assertTrue(self.supervisor.monitor_for_shutdown(timeout_sec=10))
+        self.assertLess(time.monotonic() - posted_at[0], 0.1)
+
+    def test_wakes_on_write_from_another_process(self):
+        """他プロセスからの書き込みでも待機を終える"""
+        code = (
+            "import sys, time\n"
+            "from main.entities.models import Message\n"
+            "from main.frameworks_and_drivers.frameworks.message_broker "
+            "import SqliteMessageBroker\n"
+            "time.sleep(0.3)\n"
+            "with SqliteMessageBroker(sys.argv[1]) as bus:\n"
+            "    bus.post_message(Message(sender_id='MODERATOR', "
+            "recipient_id='SUPERVISOR', message_type='SHUTDOWN_SYSTEM', "
+            "payload={}, turn_id=1))\n")
+        writer = subprocess.Popen([sys.executable, "-c", code, self.db_path])
+        self.addCleanup(writer.wait)
+
+        started = time.monotonic()
+        self.assertTrue(self.supervisor.monitor_for_shutdown(timeout_sec=30))
+        self.assertLess(time.monotonic() - started, 5)
+
+    def test_dispatches_control_messages_without_dropping_them(self):
+        """シャットダウン以外のメッセージも種類ごとのハンドラで処理する"""
+        self.bus.post_messages([
+            _control("HEALTH_REPORT", "DEBATER_A", status="ok"),
+            _control("PROGRESS_REPORT", phase="REBUTTAL", turn=3),
+            _control("CUSTOM_NOTICE"),
+            _control("SHUTDOWN_SYSTEM"),
+        ])
+
+        self.assertTrue(self.supervisor.monitor_for_shutdown(timeout_sec=5))
+        self.assertEqual(
+            [m.message_type for m in self.supervisor.control_messages],
+            ["HEALTH_REPORT", "PROGRESS_REPORT", "CUSTOM_NOTICE",
+             "SHUTDOWN_SYSTEM"])
+        self.assertEqual(self.supervisor.agent_health,
+                         {"DEBATER_A": {"status": "ok"}})
+        self.assertEqual(self.supervisor.agent_progress["MODERATOR"],
+                         {"phase": "REBUTTAL", "turn": 3})
+        self.assertEqual(
+            self.bus.get_statistics()["by_recipient"]["SUPERVISOR"]["unread"],
+            0)
+
+    def test_messages_after_shutdown_are_left_for_the_next_call(self):
+        """シャットダウン以降のメッセージは受信しない"""
+        self.bus.post_messages([_control("SHUTDOWN_SYSTEM"),
+                                _control("PROGRESS_REPORT", phase="CLOSING")])
+        self.assertTrue(self.supervisor.monitor_for_shutdown(timeout_sec=5))
+        self.assertEqual(self.bus.get_message("SUPERVISOR").message_type,
+                         "PROGRESS_REPORT")
+
+    def test_registered_handler_can_end_monitoring(self):
+        """登録したハンドラの戻り値で監視を終える"""
+        received = []
+
+        def on_verdict(message):
+            received.append(message.payload)
+            return message.payload["passed"]
+
+        self.supervisor.register_control_handler("VERDICT", on_verdict)
+        self.bus.post_message(_control("VERDICT", passed=False))
+
+        self.assertFalse(self.supervisor.monitor_for_shutdown(timeout_sec=5))
+        self.assertEqual(received, [{"passed": False}])
+
+    def test_times_out_without_shutdown(self):
+        """シャットダウンがなければ期限で失敗とする"""
+        self.bus.post_message(_control("HEALTH_REPORT", status="degraded"))
+        started = time.monotonic()
+        self.assertFalse(self.supervisor.monitor_for_shutdown(timeout_sec=0.3))
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(self.supervisor.agent_health["MODERATOR"],
+                         {"status": "degraded"})
+
+
+if __name__ == '__main__':
+    unittest.main()
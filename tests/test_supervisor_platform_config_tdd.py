@@ -20,6 +20,8 @@ class TestSupervisorPlatformConfigTDD:
 
     def setup_method(self):
         """各テストの前準備"""
+        # 実行ディレクトリとDBは一時ディレクトリに作成する
+        self.temp_dir = tempfile.TemporaryDirectory()
         # テスト用の設定データ
         self.test_config = {
             'project_name': 'test_debate_platform',
@@ -40,12 +42,17 @@ class TestSupervisorPlatformConfigTDD:
                 'db_path': 'test_messages.db'
             },
             'platform_config': {
-                'data_storage_path': './test_runs',
-                'message_db_path': './',
+                'data_storage_path': os.path.join(self.temp_dir.name,
+                                                  'test_runs'),
+                'message_db_path': self.temp_dir.name,
                 'agent_config_path': './test_config'
             }
         }
 
+    def teardown_method(self):
+        """各テストの後処理"""
+        self.temp_dir.cleanup()
+
     def test_supervisor_can_accept_platform_config_object(self):
         """� GREEN: SupervisorがPlatformConfigオブジェクトを受け取れる"""
         # Arrange
@@ -0,0 +1,246 @@
+"""
+スパントレーシングのテスト
+TDD: エージェント・ブローカー・LLM呼び出しのスパンが1つのトレースに繋がることを定義する
+"""
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import yaml
+from main.entities.models import Message
+from main.frameworks_and_drivers.drivers.supervisor import Supervisor
+from main.frameworks_and_drivers.frameworks import tracing
+from main.frameworks_and_drivers.frameworks.message_broker import (
+    SqliteMessageBroker
+)
+from main.interface_adapters.controllers.agent_controller import (
+    AgentController
+)
+from main.use_cases.interfaces.interfaces import ILLMService
+
+
+class EchoLLMService(ILLMService):
+    """受信したpayloadをSUPERVISORへそのまま返すLLMのスタブ"""
+
+    def __init__(self):
+        self.contexts = []
+
+    def generate_response(self, prompt: str) -> str:
+        return ""
+
+    def generate_structured_response(self, agent_id, context,
+                                     generation_config=None, model=None):
+        return None
+
+    def generate_structured_responses(self, agent_id, context,
+                                      generation_config=None, model=None):
+        self.contexts.append(context)
+        with tracing.span("llm.cli", model="stub"):
+            return [Message(
+                sender_id=agent_id,
+                recipient_id="SUPERVISOR",
+                message_type="DONE",
+                payload=dict(context.payload),
+                turn_id=context.turn_id
+            )]
+
+
+def _message(payload=None):
+    return Message(
+        sender_id="SYSTEM",
+        recipient_id="DEBATER_A",
+        message_type="REQUEST_STATEMENT",
+        payload=payload if payload is not None else {"topic": "AI"},
+        turn_id=1
+    )
+
+
+class TracingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.temp_dir.name, "trace.jsonl")
+
+    def tearDown(self):
+        tracing.shutdown()
+        self.temp_dir.cleanup()
+
+    def _configure(self, format="jsonl"):
+        return tracing.configure({"enabled": True, "format": format,
+                                  "output": self.output}, process_name="TEST")
+
+    def _spans(self):
+        tracing.shutdown()
+        with open(self.output, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+
+class TestTracer(TracingTestCase):
+    def test_disabled_tracing_writes_nothing(self):
+        """無効時はファイルを作らず、injectもpayloadを変更しない"""
+        tracing.configure({"enabled": False, "output": self.output})
+        message = _message()
+        with tracing.span("agent.process_message", root=True):
+            tracing.inject(message)
+        self.assertFalse(tracing.is_enabled())
+        self.assertFalse(os.path.exists(self.output))
+        self.assertNotIn(tracing.TRACE_KEY, message.payload)
+
+    def test_child_span_shares_trace_and_points_to_parent(self):
+        """入れ子のスパンは同じトレースIDで親のspan_idを参照する"""
+        self._configure()
+        with tracing.span("supervisor.kickoff", root=True) as parent:
+            with tracing.span("broker.post_messages", count=1):
+                pass
+        child, root = self._spans()
+        self.assertEqual(child["name"], "broker.post_messages")
+        self.assertEqual(child["trace_id"], root["trace_id"])
+        self.assertEqual(child["parent_id"], parent.span_id)
+        self.assertIsNone(root["parent_id"])
+        self.assertEqual(child["attributes"], {"count": 1})
+
+    def test_inject_and_extract_propagate_context(self):
+        """メッセージで運んだコンテキストから子スパンを開始し、payloadから取り除く"""
+        self._configure()
+        message = _message()
+        with tracing.span("supervisor.kickoff", root=True) as parent:
+            tracing.inject(message)
+
+        context = tracing.extract(message)
+        self.assertNotIn(tracing.TRACE_KEY, message.payload)
+        with tracing.span("agent.process_message", trace_context=context):
+            pass
+
+        spans = {span["name"]: span for span in self._spans()}
+        self.assertEqual(spans["agent.process_message"]["trace_id"],
+                         parent.trace_id)
+        self.assertEqual(spans["agent.process_message"]["parent_id"],
+                         parent.span_id)
+
+    def test_discarded_span_is_not_written(self):
+        """discardしたスパンは記録しない"""
+        self._configure()
+        with tracing.span("broker.get_message") as span:
+            span.discard()
+        self.assertEqual(self._spans(), [])
+
+    def test_exception_is_recorded_as_attribute(self):
+        """スパン内の例外はerror属性として記録し、そのまま送出する"""
+        self._configure()
+        with self.assertRaises(RuntimeError):
+            with tracing.span("llm.cli"):
+                raise RuntimeError("boom")
+        self.assertIn("boom", self._spans()[0]["attributes"]["error"])
+
+    def test_chrome_format_is_loadable_trace_event_array(self):
+        """chrome形式は閉じ括弧を補えばJSON配列として読める"""
+        self.output = os.path.join(self.temp_dir.name, "trace.json")
+        self._configure("chrome")
+        with tracing.span("prompt.build_prompt", agent_id="DEBATER_A"):
+            pass
+        tracing.shutdown()
+        # 2つ目のプロセスが同じファイルに追記しても先頭の"["は1つだけ
+        self._configure("chrome")
+        tracing.shutdown()
+
+        with open(self.output, "r", encoding="utf-8") as f:
+            text = f.read()
+        events = json.loads(text.rstrip().rstrip(",") + "]")
+        complete = [e for e in events if e["ph"] == "X"]
+        self.assertEqual(len(complete), 1)
+        self.assertEqual(complete[0]["name"], "prompt.build_prompt")
+        self.assertEqual(complete[0]["args"]["agent_id"], "DEBATER_A")
+        self.assertEqual(
+            [e["args"]["name"] for e in events if e["ph"] == "M"],
+            ["TEST", "TEST"])
+
+
+class TestTracingInstrumentation(TracingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.db_path = os.path.join(self.temp_dir.name, "messages.db")
+        self.broker = SqliteMessageBroker(self.db_path)
+        self.broker.initialize_db()
+
+    def tearDown(self):
+        self.broker.close()
+        super().tearDown()
+
+    def test_empty_polls_are_not_recorded(self):
+        """メッセージのないget_messageはスパンを残さない"""
+        self._configure()
+        for _ in range(5):
+            self.assertIsNone(self.broker.get_message("DEBATER_A"))
+        self.assertEqual(self._spans(), [])
+
+    def test_agent_turn_is_traced_end_to_end(self):
+        """キックオフから応答の投函までが1つのトレースに繋がる"""
+        self._configure()
+        llm = EchoLLMService()
+        controller = AgentController("DEBATER_A", message_bus=self.broker,
+                                     llm_service=llm)
+        with tracing.span("supervisor.kickoff", root=True) as kickoff:
+            message = _message()
+            tracing.inject(message)
+            self.broker.post_message(message)
+
+        received = self.broker.get_message("DEBATER_A")
+        controller._process_message(received)
+
+        # トレースコンテキストはLLMに渡すメッセージから取り除かれている
+        self.assertNotIn(tracing.TRACE_KEY, llm.contexts[0].payload)
+        # 応答には処理スパンのコンテキストが埋め込まれている
+        response = self.broker.get_message("SUPERVISOR")
+        self.assertIn(tracing.TRACE_KEY, response.payload)
+
+        spans = self._spans()
+        self.assertEqual({span["trace_id"] for span in spans},
+                         {kickoff.trace_id})
+        by_name = {}
+        for span in spans:
+            by_name.setdefault(span["name"], []).append(span)
+        process = by_name["agent.process_message"][0]
+        self.assertEqual(process["parent_id"], kickoff.span_id)
+        self.assertEqual(by_name["llm.cli"][0]["parent_id"],
+                         process["span_id"])
+        self.assertEqual(len(by_name["broker.get_message"]), 2)
+
+
+class TestSupervisorTracingConfig(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.project_def = {
+            'agents': [{'id': 'MODERATOR'}],
+            'message_bus': {
+                'db_path': os.path.join(self.temp_dir.name, 'messages.db')
+            },
+            'tracing': {'enabled': True, 'format': 'chrome'},
+        }
+
+    def tearDown(self):
+        tracing.shutdown()
+        self.temp_dir.cleanup()
+
+    @patch('subprocess.Popen')
+    def test_trace_file_defaults_to_run_directory(self, mock_popen):
+        """出力先を省略するとメッセージDBと同じディレクトリに出力し、エージェントにも渡す"""
+        project_file = os.path.join(self.temp_dir.name, 'project.yml')
+        with open(project_file, 'w') as f:
+            yaml.dump(self.project_def, f)
+        supervisor = Supervisor(project_file)
+        supervisor.start()
+        supervisor.kickoff_scenario()
+
+        expected = os.path.abspath(
+            os.path.join(self.temp_dir.name, 'trace.json'))
+        env = mock_popen.call_args[1]['env']
+        self.assertEqual(json.loads(env['TRACING_CONFIG']),
+                         {'enabled': True, 'format': 'chrome',
+                          'output': expected})
+        kickoff = supervisor.message_bus.get_message("MODERATOR")
+        self.assertIn(tracing.TRACE_KEY, kickoff.payload)
+        supervisor.message_bus.close()
+
+
+if __name__ == '__main__':
+    unittest.main()